@@ -1,8 +1,38 @@
+from functools import lru_cache
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.shortcuts import redirect
 from django.urls import Resolver404, resolve, reverse
 
 from .models import OnboardingWizard
+from .onboarding import is_onboarding_complete_cached, remember_onboarding_state
+
+
+@lru_cache(maxsize=2048)
+def _is_exempt_path(path):
+    """Whether a path skips the onboarding redirect (resolved once per path)."""
+    for prefix in getattr(settings, "ONBOARDING_EXEMPT_PATH_PREFIXES", []):
+        if prefix and path.startswith(prefix):
+            return True
+
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return False
+
+    url_name = match.url_name
+    if not url_name:
+        return False
+
+    return url_name in getattr(settings, "ONBOARDING_EXEMPT_URLNAMES", set())
+
+
+@receiver(setting_changed)
+def _clear_exempt_paths(setting, **kwargs):
+    if setting in ("ONBOARDING_EXEMPT_PATH_PREFIXES", "ONBOARDING_EXEMPT_URLNAMES", "ROOT_URLCONF"):
+        _is_exempt_path.cache_clear()
 
 
 class OnboardingRedirectMiddleware:
@@ -23,6 +53,10 @@ class OnboardingRedirectMiddleware:
         if request.user.is_superuser:
             return self.get_response(request)
 
+        # Finished users (cached flag) never touch the database here
+        if is_onboarding_complete_cached(request.user.pk):
+            return self.get_response(request)
+
         # Check if this URL is exempt from onboarding redirect
         if self._is_exempt(request):
             return self.get_response(request)
@@ -30,8 +64,9 @@ class OnboardingRedirectMiddleware:
         # Get or create wizard for this user
         wizard, _ = OnboardingWizard.objects.get_or_create(user=request.user)
         
-        # If wizard is complete, let them through
+        # If wizard is complete, let them through (and remember it)
         if wizard.is_complete():
+            remember_onboarding_state(request.user.pk, True)
             return self.get_response(request)
 
         # Calculate where they should be in the wizard
@@ -45,21 +80,7 @@ class OnboardingRedirectMiddleware:
         return redirect(redirect_url)
 
     def _is_exempt(self, request):
-        path = request.path
-        for prefix in getattr(settings, "ONBOARDING_EXEMPT_PATH_PREFIXES", []):
-            if prefix and path.startswith(prefix):
-                return True
-
-        try:
-            match = resolve(path)
-        except Resolver404:
-            return False
-
-        url_name = match.url_name
-        if not url_name:
-            return False
-
-        return url_name in getattr(settings, "ONBOARDING_EXEMPT_URLNAMES", set())
+        return _is_exempt_path(request.path)
 
     def _get_wizard_url(self, wizard):
         stage = wizard.current_stage or 1
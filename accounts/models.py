@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
@@ -161,11 +161,16 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.email}'s Profile"
     
+    def get_target_timeline(self):
+        """FTP / pace history of the user, loaded once per request (see accounts.timeline)"""
+        from .timeline import get_target_timeline
+        return get_target_timeline(self)
+    
     def get_current_ftp(self):
         """Get the current active FTP value from FTPEntry, fallback to ftp_score"""
-        active_ftp = self.user.ftp_entries.filter(is_active=True).first()
-        if active_ftp:
-            return active_ftp.ftp_value
+        active_ftp = self.get_target_timeline().current_ftp()
+        if active_ftp is not None:
+            return active_ftp
         return self.ftp_score
     
     def get_ftp_at_date(self, date):
@@ -173,28 +178,16 @@ class Profile(models.Model):
         Get the FTP value that was active at a specific date.
         Returns the most recent FTP entry with recorded_date <= date, or current FTP if none found.
         """
-        from django.db.models import Q
-        
-        # Get FTP entries recorded on or before the workout date, ordered by most recent first
-        ftp_entry = self.user.ftp_entries.filter(
-            recorded_date__lte=date
-        ).order_by('-recorded_date', '-created_at').first()
-        
-        if ftp_entry:
-            return ftp_entry.ftp_value
+        ftp_value = self.get_target_timeline().ftp_at(date)
+        if ftp_value is not None:
+            return ftp_value
         
         # Fallback to current FTP
         return self.get_current_ftp()
     
     def get_current_pace(self, activity_type='running'):
         """Get the current active pace level from PaceEntry for the given activity type"""
-        active_pace = self.user.pace_entries.filter(
-            activity_type=activity_type, 
-            is_active=True
-        ).first()
-        if active_pace:
-            return active_pace.level
-        return None
+        return self.get_target_timeline().current_pace(activity_type)
     
     def get_pace_at_date(self, date, activity_type='running'):
         """
@@ -202,16 +195,9 @@ class Profile(models.Model):
         Returns the most recent PaceEntry with recorded_date <= date for the given activity type,
         or current pace if none found.
         """
-        from django.db.models import Q
-        
-        # Get pace entries recorded on or before the workout date, ordered by most recent first
-        pace_entry = self.user.pace_entries.filter(
-            activity_type=activity_type,
-            recorded_date__lte=date
-        ).order_by('-recorded_date', '-created_at').first()
-        
-        if pace_entry:
-            return pace_entry.level
+        level = self.get_target_timeline().pace_at(date, activity_type)
+        if level is not None:
+            return level
         
         # Fallback to current active pace
         return self.get_current_pace(activity_type=activity_type)
@@ -357,6 +343,16 @@ class PaceEntry(models.Model):
         return f"{self.user.email} - Level {self.level} ({self.get_activity_type_display()}) on {self.recorded_date} ({self.get_source_display()})"
 
 
+@receiver(post_save, sender=FTPEntry)
+@receiver(post_delete, sender=FTPEntry)
+@receiver(post_save, sender=PaceEntry)
+@receiver(post_delete, sender=PaceEntry)
+def invalidate_target_timelines(sender, instance, **kwargs):
+    """Cached FTP / pace timelines of the user are out of date"""
+    from .timeline import invalidate_target_timeline
+    invalidate_target_timeline(instance.user_id)
+
+
 class PaceLevel(models.Model):
     """User-defined pace level definitions with pace bands"""
     ACTIVITY_TYPE_CHOICES = [
@@ -473,3 +469,18 @@ class OnboardingWizard(models.Model):
     def get_progress_percentage(self):
         """Get completion percentage (0-100)"""
         return int((len(self.completed_stages) / 6) * 100)
+
+
+@receiver(post_save, sender=OnboardingWizard)
+def cache_onboarding_state(sender, instance, **kwargs):
+    """Keep the middleware's cached completion flag in step with the wizard"""
+    from .onboarding import remember_onboarding_state
+    remember_onboarding_state(instance.user_id, instance.is_complete())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reset_onboarding_state(sender, instance, created, **kwargs):
+    """New users start without a cached completion flag"""
+    if created:
+        from .onboarding import remember_onboarding_state
+        remember_onboarding_state(instance.pk, False)
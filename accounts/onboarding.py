@@ -0,0 +1,32 @@
+"""Cached onboarding completion state for OnboardingRedirectMiddleware.
+
+Finished users are the vast majority of requests, so the middleware checks a
+cache flag before touching OnboardingWizard. The flag is written whenever a
+wizard is saved (set once it is complete, cleared on restart) and cleared
+for new users, so a reused user id never inherits it.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+ONBOARDING_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def _cache_key(user_id):
+    return f'ctz:onboarding:complete:{user_id}'
+
+
+def is_onboarding_complete_cached(user_id):
+    """True if the user's wizard is known to be complete (False means "ask the database")."""
+    return bool(cache.get(_cache_key(user_id)))
+
+
+def remember_onboarding_state(user_id, complete):
+    """Store (or clear) the completion flag of a user's wizard.
+
+    Completion is stored once the transaction commits; a restart clears the
+    flag right away so the user is sent back to the wizard immediately.
+    """
+    if complete:
+        transaction.on_commit(lambda: cache.set(_cache_key(user_id), True, ONBOARDING_CACHE_TIMEOUT))
+    else:
+        cache.delete(_cache_key(user_id))
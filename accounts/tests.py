@@ -1,3 +1,102 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from .middleware import OnboardingRedirectMiddleware
+from .models import FTPEntry, OnboardingWizard, PaceEntry, Profile
+
+User = get_user_model()
+
+
+class TargetTimelineTestCase(TestCase):
+    """FTP / pace lookups by date from one load of the user's entries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='timeline@example.com', password='testpass123')
+        FTPEntry.objects.create(user=self.user, ftp_value=180, recorded_date=date(2025, 1, 1), is_active=False)
+        FTPEntry.objects.create(user=self.user, ftp_value=200, recorded_date=date(2025, 3, 1))
+        PaceEntry.objects.create(user=self.user, activity_type='running', level=4, recorded_date=date(2025, 2, 1))
+        PaceEntry.objects.create(
+            user=self.user, activity_type='walking', level=3, recorded_date=date(2025, 2, 1), is_active=False
+        )
+
+    def _profile(self):
+        return Profile.objects.select_related('user').get(user=self.user)
+
+    def test_values_at_dates(self):
+        profile = self._profile()
+        self.assertEqual(profile.get_current_ftp(), 200)
+        self.assertEqual(profile.get_ftp_at_date(date(2025, 2, 15)), 180)
+        self.assertEqual(profile.get_ftp_at_date(date(2025, 3, 1)), 200)
+        # Before the first entry: current FTP
+        self.assertEqual(profile.get_ftp_at_date(date(2024, 6, 1)), 200)
+        self.assertEqual(profile.get_pace_at_date(date(2025, 2, 2)), 4)
+        self.assertEqual(profile.get_current_pace('walking'), None)
+        self.assertEqual(profile.get_pace_at_date(date(2025, 2, 2), 'walking'), 3)
+        self.assertEqual(profile.get_target_timeline().latest_pace('walking'), 3)
+
+    def test_repeated_lookups_load_entries_once(self):
+        profile = self._profile()
+        profile.get_current_ftp()
+        with self.assertNumQueries(0):
+            for day in range(1, 29):
+                profile.get_ftp_at_date(date(2025, 2, day))
+                profile.get_pace_at_date(date(2025, 2, day))
+            profile.get_power_zone_ranges()
+            profile.get_pace_zone_targets()
+
+        # Another request (fresh profile) is served from the shared cache
+        other_request_profile = Profile(pk=profile.pk, user=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(other_request_profile.get_current_ftp(), 200)
+
+    def test_entry_changes_invalidate_timeline(self):
+        profile = self._profile()
+        self.assertEqual(profile.get_current_ftp(), 200)
+        FTPEntry.objects.filter(user=self.user).update(is_active=False)
+        FTPEntry.objects.create(user=self.user, ftp_value=230, recorded_date=date(2025, 4, 1))
+        self.assertEqual(profile.get_current_ftp(), 230)
+        self.assertEqual(self._profile().get_ftp_at_date(date(2025, 4, 2)), 230)
+
+        FTPEntry.objects.get(ftp_value=230).delete()
+        self.assertEqual(profile.get_ftp_at_date(date(2025, 4, 2)), 200)
+
+
+class OnboardingRedirectMiddlewareTestCase(TestCase):
+    """Finished users pass the onboarding middleware without database queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='onboarded@example.com', password='testpass123', is_active=True)
+        self.middleware = OnboardingRedirectMiddleware(lambda request: HttpResponse('ok'))
+
+    def _get(self, path='/dashboard/'):
+        request = RequestFactory().get(path)
+        request.user = self.user
+        return self.middleware(request)
+
+    def _finish_wizard(self):
+        wizard, _ = OnboardingWizard.objects.get_or_create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for stage in range(1, 7):
+                wizard.mark_stage_complete(stage)
+        return wizard
+
+    def test_incomplete_wizard_redirects(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('wizard', response.url)
+
+    def test_completed_wizard_is_cached(self):
+        self._finish_wizard()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get().status_code, 200)
+
+    def test_restarting_wizard_clears_cached_flag(self):
+        wizard = self._finish_wizard()
+        wizard.completed_stages = []
+        wizard.completed_at = None
+        wizard.current_stage = 1
+        wizard.save()
+        self.assertEqual(self._get().status_code, 302)
@@ -0,0 +1,133 @@
+"""FTP and pace level history of a user, loaded once and looked up by date.
+
+Profile.get_ftp_at_date / get_pace_at_date used to query FTPEntry and
+PaceEntry on every call, which views and services do per workout. A
+TargetTimeline holds all of a user's entries (two queries) and answers
+"value at date X" with a binary search.
+
+Timelines are kept in the shared cache under the user's targets tag and
+memoized on the Profile instance for the rest of the request; entry saves
+and deletes invalidate both (see the entry receivers in accounts.models).
+"""
+from bisect import bisect_right
+from itertools import count
+
+from core.services import TaggedCacheService
+
+TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Per-process generation per user, bumped on entry changes so Profile
+# instances that outlive a save (tests, long tasks) drop their memo
+_generations = {}
+_generation_counter = count(1)
+
+
+class TargetTimeline:
+    """A user's FTP and pace entries, oldest first."""
+
+    def __init__(self, ftp_entries, pace_entries):
+        """
+        Args:
+            ftp_entries: (recorded_date, created_at, ftp_value, is_active) tuples
+            pace_entries: (activity_type, recorded_date, created_at, level, is_active) tuples
+        """
+        self._ftp = self._series(ftp_entries)
+        by_type = {}
+        for activity_type, recorded_date, created_at, level, is_active in pace_entries:
+            by_type.setdefault(activity_type, []).append((recorded_date, created_at, level, is_active))
+        self._pace = {activity_type: self._series(rows) for activity_type, rows in by_type.items()}
+
+    @staticmethod
+    def _series(rows):
+        # Same order as the entries' Meta.ordering, reversed: the last entry
+        # on a date is the one the old `-recorded_date, -created_at` query hit
+        rows = sorted(rows, key=lambda row: (row[0], row[1]))
+        dates = [row[0] for row in rows]
+        values = [row[2] for row in rows]
+        active = [row[2] for row in rows if row[3]]
+        return dates, values, (active[-1] if active else None)
+
+    @classmethod
+    def load(cls, user_id):
+        """Build a timeline from the database (two queries)."""
+        from .models import FTPEntry, PaceEntry
+        ftp_entries = FTPEntry.objects.filter(user_id=user_id).values_list(
+            'recorded_date', 'created_at', 'ftp_value', 'is_active'
+        )
+        pace_entries = PaceEntry.objects.filter(user_id=user_id).values_list(
+            'activity_type', 'recorded_date', 'created_at', 'level', 'is_active'
+        )
+        return cls(list(ftp_entries), list(pace_entries))
+
+    @staticmethod
+    def _at(series, date):
+        dates, values, _ = series
+        index = bisect_right(dates, date)
+        return values[index - 1] if index else None
+
+    def current_ftp(self):
+        """Most recent active FTP value (None without an active entry)."""
+        return self._ftp[2]
+
+    def ftp_at(self, date):
+        """FTP of the latest entry recorded on or before `date` (None if there is none)."""
+        return self._at(self._ftp, date)
+
+    def current_pace(self, activity_type='running'):
+        """Most recent active pace level of an activity type (None without one)."""
+        series = self._pace.get(activity_type)
+        return series[2] if series else None
+
+    def latest_pace(self, activity_type='running'):
+        """Pace level of the most recent entry of an activity type, active or not."""
+        series = self._pace.get(activity_type)
+        return series[1][-1] if series else None
+
+    def pace_at(self, date, activity_type='running'):
+        """Pace level of the latest entry recorded on or before `date` (None if there is none)."""
+        series = self._pace.get(activity_type)
+        return self._at(series, date) if series else None
+
+
+def _cache_key(user):
+    # date_joined keeps reused ids (e.g. between test databases) apart
+    joined = user.date_joined.timestamp() if user.date_joined else 0
+    return f'{TaggedCacheService.KEY_PREFIX}:targets:timeline:{user.pk}:{joined}'
+
+
+def get_target_timeline(profile):
+    """
+    The TargetTimeline of a profile's user, memoized on the profile.
+
+    Args:
+        profile: Profile (its `user` is used for the cache key)
+
+    Returns:
+        TargetTimeline
+    """
+    user_id = profile.user_id
+    generation = _generations.get(user_id, 0)
+    memo = getattr(profile, '_target_timeline', None)
+    if memo is not None and memo[0] == generation:
+        return memo[1]
+
+    timeline = TaggedCacheService.get_or_set(
+        _cache_key(profile.user),
+        lambda: TargetTimeline.load(user_id),
+        tags=[TaggedCacheService.user_targets_tag(user_id)],
+        timeout=TIMELINE_CACHE_TIMEOUT,
+        namespace='targets',
+    )
+    profile._target_timeline = (generation, timeline)
+    return timeline
+
+
+def invalidate_target_timeline(user_id):
+    """Drop cached timelines of a user (memos in this process and the shared cache entry).
+
+    The shared entry is invalidated right away, not on commit, so reads later
+    in the same transaction see the change; the on-commit invalidation of the
+    targets tag then covers workers that rebuilt it from the old rows.
+    """
+    _generations[user_id] = next(_generation_counter)
+    TaggedCacheService.invalidate(TaggedCacheService.user_targets_tag(user_id))
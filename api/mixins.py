@@ -0,0 +1,91 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+
+
+def requested_fields(request):
+    """
+    Field names asked for with `?fields=a,b,c`.
+
+    Returns:
+        set of field names, or None when every field is wanted
+    """
+    if request is None:
+        return None
+    value = request.query_params.get('fields', '')
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    return fields or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets: `?fields=id,title` keeps only
+    those fields in the response (unknown names are ignored).
+
+    Only the top-level serializer is trimmed, never nested ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        is_root = self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+        )
+        if not is_root:
+            return
+        fields = requested_fields(self.context.get('request'))
+        if fields is None or not fields & set(self.fields):
+            return
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering list and detail GETs with ETag / Last-Modified
+    and `304 Not Modified` when the client's copy is current.
+
+    The validators come from one aggregate over the filtered queryset (row
+    count, highest pk and `last_modified_field`), so nothing is serialized
+    for an unchanged resource.
+    """
+    # DateTimeField updated on every change (None: ETag only)
+    last_modified_field = None
+
+    def _validators(self, queryset):
+        aggregates = {'count': Count('pk'), 'max_pk': Max('pk')}
+        if self.last_modified_field:
+            aggregates['last_modified'] = Max(self.last_modified_field)
+        state = queryset.order_by().aggregate(**aggregates)
+        last_modified = state.get('last_modified')
+        digest = hashlib.sha1(
+            f"{self.request.get_full_path()}|{state['count']}|{state['max_pk']}|{last_modified}".encode()
+        ).hexdigest()
+        return quote_etag(digest), last_modified.timestamp() if last_modified else None
+
+    def _conditional(self, queryset, respond):
+        etag, last_modified = self._validators(queryset)
+        not_modified = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = respond()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional(queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self._conditional(
+            queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Cursor pagination used by every list endpoint (REST_FRAMEWORK setting).
+
+    Cursors stay cheap on deep pages (no OFFSET) and stable while rows are
+    added. Ordered by primary key, newest first; `?page_size=` up to
+    max_page_size.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-pk'
+
+
+class SampleCursorPagination(DefaultCursorPagination):
+    """
+    Pagination for per-sample endpoints (workout performance data).
+
+    Samples are read in primary-key (insertion) order in larger pages;
+    filter by workout to page through one workout's samples.
+    """
+    page_size = 1000
+    max_page_size = 5000
+    ordering = 'pk'
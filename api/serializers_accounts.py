@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .mixins import SparseFieldsetMixin
 from accounts.models import User, Profile, WeightEntry, FTPEntry, PaceEntry
 
 
@@ -12,7 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email']
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Profile, representing extended user profile information.
     """
@@ -30,7 +31,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WeightEntrySerializer(serializers.ModelSerializer):
+class WeightEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for WeightEntry, representing a user's weight log entry.
     """
@@ -41,7 +42,7 @@ class WeightEntrySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class FTPEntrySerializer(serializers.ModelSerializer):
+class FTPEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for FTPEntry, representing a user's FTP (Functional Threshold Power) entry.
     """
@@ -53,7 +54,7 @@ class FTPEntrySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PaceEntrySerializer(serializers.ModelSerializer):
+class PaceEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for PaceEntry, representing a user's running or walking pace entry.
     """
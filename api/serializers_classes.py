@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from .mixins import SparseFieldsetMixin
 from workouts.models import RideDetail
 
 
-class RideDetailSerializer(serializers.ModelSerializer):
+class RideDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for RideDetail, representing a Peloton ride/class detail.
     """
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.mixins import SparseFieldsetMixin
 from workouts.models import ClassType, WorkoutType, Instructor
 
 
-class ClassTypeSerializer(serializers.ModelSerializer):
+class ClassTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for ClassType, representing a Peloton class type/category.
     """
@@ -14,7 +15,7 @@ class ClassTypeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WorkoutTypeSerializer(serializers.ModelSerializer):
+class WorkoutTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for WorkoutType, representing a workout type/category (Cycling, Running, Yoga, etc.).
     """
@@ -26,7 +27,7 @@ class WorkoutTypeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class InstructorSerializer(serializers.ModelSerializer):
+class InstructorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Instructor, representing a Peloton instructor.
     """
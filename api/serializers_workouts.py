@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from .mixins import SparseFieldsetMixin
 from workouts.models import Workout, WorkoutDetails, WorkoutPerformanceData
 
 
-class WorkoutSerializer(serializers.ModelSerializer):
+class WorkoutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Workout, representing a user's workout session.
     """
@@ -12,7 +13,7 @@ class WorkoutSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WorkoutDetailsSerializer(serializers.ModelSerializer):
+class WorkoutDetailsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for WorkoutDetails, representing detailed data for a workout.
     """
@@ -21,7 +22,7 @@ class WorkoutDetailsSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WorkoutPerformanceDataSerializer(serializers.ModelSerializer):
+class WorkoutPerformanceDataSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for WorkoutPerformanceData, representing performance metrics for a workout.
     """
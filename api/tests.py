@@ -1,3 +1,89 @@
+import json
+from datetime import date
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from workouts.models import RideDetail, Workout, WorkoutType
+from workouts.services.time_series import PerformanceSample, build_time_series, store_time_series
+
+User = get_user_model()
+
+
+class WorkoutAPITestCase(TestCase):
+    """Paging, sparse fieldsets, conditional GETs and streamed time series"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='api@example.com', password='testpass123', is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        ride = RideDetail.objects.create(
+            peloton_ride_id='api-ride', title='API Ride', duration_seconds=1200,
+            workout_type=workout_type, fitness_discipline='cycling',
+        )
+        self.workouts = [
+            Workout.objects.create(
+                user=self.user, ride_detail=ride,
+                recorded_date=date(2025, 1, day), completed_date=date(2025, 1, day),
+            )
+            for day in range(1, 6)
+        ]
+
+    def test_list_is_cursor_paginated(self):
+        response = self.client.get('/api/workouts/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(sorted(seen), sorted(workout.pk for workout in self.workouts))
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get('/api/workouts/', {'fields': 'id,completed_date'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'completed_date'})
+
+    def test_conditional_get(self):
+        response = self.client.get('/api/workouts/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get('/api/workouts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.workouts[0].save()
+        response = self.client.get('/api/workouts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_time_series_stream(self):
+        workout = self.workouts[0]
+        samples = [PerformanceSample(t, output=100.0 + t, heart_rate=120) for t in range(0, 10)]
+        store_time_series([build_time_series(workout, samples)])
+
+        response = self.client.get(f'/api/workouts/{workout.pk}/time-series/', {'channels': 'output'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[3], {'timestamp': 3, 'output': 103.0})
+
+        response = self.client.get(f'/api/workouts/{workout.pk}/time-series/', {'layout': 'columns'})
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['sample_count'], 10)
+        self.assertEqual(data['heart_rate'], [120] * 10)
+        self.assertNotIn('cadence', data)
+
+    def test_legacy_performance_data_is_read_only(self):
+        from workouts.models import WorkoutPerformanceData
+
+        workout = self.workouts[0]
+        WorkoutPerformanceData.objects.create(workout=workout, timestamp=0, output=100.0)
+        response = self.client.get('/api/workout-performance/', {'workout': workout.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['timestamp'] for row in response.data['results']], [0])
 
-# Create your tests here.
+        response = self.client.post('/api/workout-performance/', {'workout': workout.pk, 'timestamp': 5})
+        self.assertEqual(response.status_code, 405)
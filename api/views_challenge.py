@@ -6,5 +6,5 @@ class ChallengeViewSet(viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing admin-defined challenges.
     """
-    queryset = Challenge.objects.all()
+    queryset = Challenge.objects.prefetch_related('available_templates')
     serializer_class = ChallengeSerializer
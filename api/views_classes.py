@@ -1,15 +1,17 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from .mixins import ConditionalGetMixin
 from workouts.models import RideDetail
 from .serializers_classes import RideDetailSerializer
 
 
-class RideDetailViewSet(viewsets.ModelViewSet):
+class RideDetailViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing Peloton ride/class details.
     """
     serializer_class = RideDetailSerializer
     permission_classes = [IsAuthenticated]
+    last_modified_field = 'last_synced_at'
 
     def get_queryset(self):
         return RideDetail.objects.all()
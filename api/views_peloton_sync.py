@@ -2,7 +2,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from peloton.models import PelotonConnection
-from django.utils import timezone
+from workouts.services.sync_engine import WorkoutSyncEngine, create_sync_job, get_job_progress
+from workouts.tasks import run_workout_sync_job
 from rest_framework import status
 
 class PelotonSyncAPIView(APIView):
@@ -24,15 +25,15 @@ class PelotonSyncAPIView(APIView):
             connection = PelotonConnection.objects.get(user=user)
             if connection.sync_in_progress:
                 return Response({'detail': 'Sync already in progress.'}, status=status.HTTP_409_CONFLICT)
-            # Mark sync as started
-            connection.sync_in_progress = True
-            connection.sync_started_at = timezone.now()
-            connection.save(update_fields=['sync_in_progress', 'sync_started_at'])
-            # Here you would trigger the actual sync task (e.g., Celery task)
-            # For now, just simulate immediate completion
-            connection.last_sync_at = timezone.now()
-            connection.sync_in_progress = False
-            connection.save(update_fields=['last_sync_at', 'sync_in_progress'])
-            return Response({'detail': 'Peloton sync triggered.'})
+            job = create_sync_job(connection)
+            try:
+                run_workout_sync_job.delay(job.pk)
+            except Exception as e:
+                WorkoutSyncEngine(job).fail(e)
+                return Response({'detail': 'Could not start sync.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return Response(
+                {'detail': 'Peloton sync triggered.', 'progress': get_job_progress(job)},
+                status=status.HTTP_202_ACCEPTED,
+            )
         except PelotonConnection.DoesNotExist:
             return Response({'detail': 'No Peloton connection found.'}, status=status.HTTP_404_NOT_FOUND)
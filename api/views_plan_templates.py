@@ -7,7 +7,7 @@ class PlanTemplateViewSet(viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing plan templates (weekly structures).
     """
-    queryset = PlanTemplate.objects.all()
+    queryset = PlanTemplate.objects.prefetch_related('days')
     serializer_class = PlanTemplateSerializer
 
 
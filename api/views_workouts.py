@@ -1,19 +1,87 @@
+import json
+
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from workouts.models import Workout, WorkoutDetails, WorkoutPerformanceData
+from workouts.services.time_series import CHANNELS, get_series
+from .mixins import ConditionalGetMixin
+from .pagination import SampleCursorPagination
 from .serializers_workouts import WorkoutSerializer, WorkoutDetailsSerializer, WorkoutPerformanceDataSerializer
 
+# Samples per chunk written by the streaming time-series endpoint
+TIME_SERIES_CHUNK_SIZE = 500
+
+
+def _ndjson_rows(series, channels):
+    """One JSON object per sample, written in chunks."""
+    columns = [series.column(channel) for channel in channels]
+    names = ['timestamp'] + channels
+    lines = []
+    for row in zip(series.timestamps, *columns):
+        lines.append(json.dumps(dict(zip(names, row)), separators=(',', ':')))
+        if len(lines) >= TIME_SERIES_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _columnar(series, channels):
+    """`{"sample_count": n, "timestamp": [...], "<channel>": [...]}`, written one column chunk at a time."""
+    yield f'{{"sample_count":{len(series)}'
+    for name in ['timestamp'] + channels:
+        values = series.timestamps if name == 'timestamp' else series.column(name)
+        yield f',"{name}":['
+        for start in range(0, len(values), TIME_SERIES_CHUNK_SIZE):
+            chunk = json.dumps(values[start:start + TIME_SERIES_CHUNK_SIZE], separators=(',', ':'))[1:-1]
+            yield (',' if start else '') + chunk
+        yield ']'
+    yield '}'
+
 
-class WorkoutViewSet(viewsets.ModelViewSet):
+class WorkoutViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing user workouts.
     """
     serializer_class = WorkoutSerializer
     permission_classes = [IsAuthenticated]
+    last_modified_field = 'last_synced_at'
 
     def get_queryset(self):
         return Workout.objects.filter(user=self.request.user)
 
+    @action(detail=True, methods=['get'], url_path='time-series')
+    def time_series(self, request, pk=None):
+        """
+        Stream one workout's samples.
+
+        Query parameters:
+            layout: `rows` (default, NDJSON - one object per sample) or
+                `columns` (one JSON object with an array per channel)
+            channels: Comma-separated channels (default: every channel with data)
+        """
+        workout = get_object_or_404(
+            Workout.objects.filter(user=request.user).select_related('time_series'), pk=pk
+        )
+        layout = request.query_params.get('layout', 'rows')
+        if layout not in ('rows', 'columns'):
+            raise ValidationError({'layout': "Must be 'rows' or 'columns'."})
+
+        series = get_series(workout)
+        wanted = [name.strip() for name in request.query_params.get('channels', '').split(',') if name.strip()]
+        unknown = sorted(set(wanted) - set(CHANNELS))
+        if unknown:
+            raise ValidationError({'channels': f"Unknown channels: {', '.join(unknown)}"})
+        channels = wanted or [channel for channel in CHANNELS if series.has(channel)]
+
+        if layout == 'columns':
+            return StreamingHttpResponse(_columnar(series, channels), content_type='application/json')
+        return StreamingHttpResponse(_ndjson_rows(series, channels), content_type='application/x-ndjson')
+
 
 class WorkoutDetailsViewSet(viewsets.ModelViewSet):
     """
@@ -26,12 +94,24 @@ class WorkoutDetailsViewSet(viewsets.ModelViewSet):
         return WorkoutDetails.objects.filter(workout__user=self.request.user)
 
 
-class WorkoutPerformanceDataViewSet(viewsets.ModelViewSet):
+class WorkoutPerformanceDataViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    API endpoint for viewing and editing workout performance data (metrics, time series, etc.).
+    API endpoint for reading legacy per-sample workout performance data.
+
+    Read-only: syncs store packed series, which `workouts/<id>/time-series/`
+    serves (these rows only exist for workouts not yet migrated by
+    migrate_performance_time_series). Paged, with `?workout=<id>` to narrow
+    to one workout.
     """
     serializer_class = WorkoutPerformanceDataSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SampleCursorPagination
 
     def get_queryset(self):
-        return WorkoutPerformanceData.objects.filter(workout__user=self.request.user)
+        queryset = WorkoutPerformanceData.objects.filter(workout__user=self.request.user)
+        workout_id = self.request.query_params.get('workout')
+        if workout_id:
+            if not workout_id.isdigit():
+                raise ValidationError({'workout': 'Must be a workout id.'})
+            queryset = queryset.filter(workout_id=workout_id)
+        return queryset
@@ -5,7 +5,8 @@ from django.core.exceptions import ValidationError
 from django.db.models import Q, Count
 from django.http import JsonResponse
 from datetime import date
-from .models import Challenge, ChallengeInstance, ChallengeWorkoutAssignment, ChallengeWeekUnlock, ChallengeBonusWorkout, Team, TeamMember, TeamLeaderVolunteer
+from .models import Challenge, ChallengeInstance, ChallengeWeekUnlock, Team, TeamMember, TeamLeaderVolunteer
+from .assignments import AssignmentMatrix
 from .utils import extract_class_id
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -283,336 +284,20 @@ def admin_assign_workouts(request, challenge_id):
         messages.warning(request, "No templates available for this challenge. Please add templates first.")
         return redirect("challenges:admin_challenge_edit", challenge_id=challenge_id)
     
-    # Build structure: template -> week -> day -> activities
-    workout_structure = []
-    for template in templates:
-        template_data = {
-            "template": template,
-            "weeks": []
-        }
-        
-        for week_num in range(1, num_weeks + 1):
-            week_data = {
-                "week_number": week_num,
-                "days": []
-            }
-            
-            # Get template days to determine which activities are expected
-            template_days = {d.day_of_week: d for d in template.days.all()}
-            
-            for day_num in range(7):
-                template_day = template_days.get(day_num)
-                focus_lower = template_day.peloton_focus.lower() if template_day else ""
-                
-                # Determine which activities are expected for this day
-                has_ride = template_day and ("pze" in focus_lower or "power zone" in focus_lower or "pz" in focus_lower or "ride" in focus_lower)
-                has_run = template_day and "run" in focus_lower
-                has_yoga = template_day and "yoga" in focus_lower
-                has_strength = template_day and "strength" in focus_lower
-                
-                # Get existing assignments (including alternatives)
-                assignments = ChallengeWorkoutAssignment.objects.filter(
-                    challenge=challenge,
-                    template=template,
-                    week_number=week_num,
-                    day_of_week=day_num
-                ).order_by('alternative_group', 'order_in_group')
-                
-                # Group assignments by activity type and alternative_group
-                day_assignments = {
-                    "ride": [],
-                    "run": [],
-                    "yoga": [],
-                    "strength": [],
-                }
-                
-                for assignment in assignments:
-                    if assignment.activity_type in day_assignments:
-                        day_assignments[assignment.activity_type].append(assignment)
-                
-                # Determine if this day should allow alternatives
-                template_name_lower = template.name.lower()
-                is_3_plan = "3" in template_name_lower and ("ride" in template_name_lower or "run" in template_name_lower)
-                is_4_plan = "4" in template_name_lower and ("ride" in template_name_lower or "run" in template_name_lower)
-                is_2r2r_plan = "2 runs 2 rides" in template_name_lower or "2 rides 2 runs" in template_name_lower
-                
-                # Count workout days to determine which day number this is
-                workout_days = []
-                for d in range(7):
-                    td = template_days.get(d)
-                    if td:
-                        focus_lower = td.peloton_focus.lower()
-                        if ("pze" in focus_lower or "power zone" in focus_lower or "pz" in focus_lower or 
-                            "ride" in focus_lower or "run" in focus_lower or 
-                            "yoga" in focus_lower or "strength" in focus_lower):
-                            workout_days.append(d)
-                
-                workout_day_number = None
-                if day_num in workout_days:
-                    workout_day_number = workout_days.index(day_num) + 1
-                
-                allows_alternatives = False
-                if is_3_plan and workout_day_number in [2, 3]:
-                    allows_alternatives = True
-                elif is_4_plan and workout_day_number in [1, 4, 6]:
-                    allows_alternatives = True
-                elif is_2r2r_plan and workout_day_number in [2, 4]:
-                    allows_alternatives = True
-                
-                # Use day number if it's a workout day, otherwise use day name
-                if workout_day_number:
-                    day_label = f"Day {workout_day_number}"
-                else:
-                    day_name_labels = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
-                    day_label = day_name_labels[day_num]
-                
-                week_data["days"].append({
-                    "day_of_week": day_num,
-                    "day_label": day_label,
-                    "peloton_focus": template_day.peloton_focus if template_day else "",
-                    "has_ride": has_ride,
-                    "has_run": has_run,
-                    "has_yoga": has_yoga,
-                    "has_strength": has_strength,
-                    "assignments": day_assignments,
-                    "allows_alternatives": allows_alternatives,
-                    "workout_day_number": workout_day_number,
-                })
-            
-            template_data["weeks"].append(week_data)
-        
-        workout_structure.append(template_data)
-    
-    # Get bonus workouts for each week
-    challenge_name_lower = challenge.name.lower()
-    default_bonus_activity = "run" if "3 runs" in challenge_name_lower or ("run" in challenge_name_lower and "3" in challenge_name_lower) else "ride"
-    
-    bonus_workouts = {}
-    for week_num in range(1, num_weeks + 1):
-        bonus_workout = ChallengeBonusWorkout.objects.filter(
-            challenge=challenge,
-            week_number=week_num
-        ).first()
-        bonus_workouts[week_num] = bonus_workout
+    # Assignments, template days and bonus workouts, indexed once
+    matrix = AssignmentMatrix(challenge, templates)
+    default_bonus_activity = matrix.default_bonus_activity()
     
     if request.method == "POST":
         # Process form submission
-        assignments_created = 0
-        assignments_updated = 0
-        
-        for template in templates:
-            template_name_lower = template.name.lower()
-            is_3_plan = "3" in template_name_lower and ("ride" in template_name_lower or "run" in template_name_lower)
-            is_4_plan = "4" in template_name_lower and ("ride" in template_name_lower or "run" in template_name_lower)
-            is_2r2r_plan = "2 runs 2 rides" in template_name_lower or "2 rides 2 runs" in template_name_lower
-            
-            template_days = {d.day_of_week: d for d in template.days.all()}
-            workout_days = []
-            for d in range(7):
-                td = template_days.get(d)
-                if td:
-                    focus_lower = td.peloton_focus.lower()
-                    if ("pze" in focus_lower or "power zone" in focus_lower or "pz" in focus_lower or 
-                        "ride" in focus_lower or "run" in focus_lower or 
-                        "yoga" in focus_lower or "strength" in focus_lower):
-                        workout_days.append(d)
-            
-            for week_num in range(1, num_weeks + 1):
-                for day_num in range(7):
-                    workout_day_number = None
-                    if day_num in workout_days:
-                        workout_day_number = workout_days.index(day_num) + 1
-                    
-                    allows_alternatives = False
-                    if is_3_plan and workout_day_number in [2, 3]:
-                        allows_alternatives = True
-                    elif is_4_plan and workout_day_number in [1, 4, 6]:
-                        allows_alternatives = True
-                    elif is_2r2r_plan and workout_day_number in [2, 4]:
-                        allows_alternatives = True
-                    
-                    for activity_type in ["ride", "run", "yoga", "strength"]:
-                        # Process primary workout
-                        url_key = f"workout_{template.id}_{week_num}_{day_num}_{activity_type}"
-                        ride_id_key = f"ride_id_{template.id}_{week_num}_{day_num}_{activity_type}"
-                        title_key = f"title_{template.id}_{week_num}_{day_num}_{activity_type}"
-                        points_key = f"points_{template.id}_{week_num}_{day_num}_{activity_type}"
-                        
-                        # Try to get ride_id first (from search), fallback to URL
-                        ride_id = request.POST.get(ride_id_key, "").strip()
-                        peloton_url = request.POST.get(url_key, "").strip()
-                        workout_title = request.POST.get(title_key, "").strip()
-                        points_str = request.POST.get(points_key, "50").strip()
-                        
-                        try:
-                            points = int(points_str) if points_str else 50
-                        except (ValueError, TypeError):
-                            points = 50
-                        
-                        # Get ride_detail if ride_id is provided
-                        ride_detail = None
-                        if ride_id:
-                            try:
-                                from workouts.models import RideDetail
-                                ride_detail = RideDetail.objects.get(id=ride_id)
-                                # Use ride_detail's URL if no URL provided
-                                if not peloton_url and ride_detail.peloton_class_url:
-                                    peloton_url = ride_detail.peloton_class_url
-                                if not workout_title:
-                                    workout_title = ride_detail.title
-                            except (RideDetail.DoesNotExist, ValueError):
-                                pass
-                        
-                        if peloton_url or ride_detail:
-                            defaults = {
-                                "peloton_url": peloton_url,
-                                "workout_title": workout_title,
-                                "points": points,
-                                "ride_detail": ride_detail,
-                            }
-                            assignment, created = ChallengeWorkoutAssignment.objects.update_or_create(
-                                challenge=challenge,
-                                template=template,
-                                week_number=week_num,
-                                day_of_week=day_num,
-                                activity_type=activity_type,
-                                alternative_group=None,
-                                order_in_group=0,
-                                defaults=defaults
-                            )
-                            if created:
-                                assignments_created += 1
-                            else:
-                                assignments_updated += 1
-                        else:
-                            ChallengeWorkoutAssignment.objects.filter(
-                                challenge=challenge,
-                                template=template,
-                                week_number=week_num,
-                                day_of_week=day_num,
-                                activity_type=activity_type
-                            ).delete()
-                        
-                        # Process alternatives
-                        if allows_alternatives:
-                            alternative_index = 1
-                            while alternative_index <= 10:
-                                url_key = f"workout_{template.id}_{week_num}_{day_num}_{activity_type}_alt{alternative_index}"
-                                ride_id_key = f"ride_id_{template.id}_{week_num}_{day_num}_{activity_type}_alt{alternative_index}"
-                                title_key = f"title_{template.id}_{week_num}_{day_num}_{activity_type}_alt{alternative_index}"
-                                points_key = f"points_{template.id}_{week_num}_{day_num}_{activity_type}_alt{alternative_index}"
-                                
-                                # Try to get ride_id first (from search), fallback to URL
-                                ride_id = request.POST.get(ride_id_key, "").strip()
-                                peloton_url = request.POST.get(url_key, "").strip()
-                                workout_title = request.POST.get(title_key, "").strip()
-                                points_str = request.POST.get(points_key, "50").strip()
-                                
-                                try:
-                                    points = int(points_str) if points_str else 50
-                                except (ValueError, TypeError):
-                                    points = 50
-                                
-                                # Get ride_detail if ride_id is provided
-                                ride_detail = None
-                                if ride_id:
-                                    try:
-                                        from workouts.models import RideDetail
-                                        ride_detail = RideDetail.objects.get(id=ride_id)
-                                        # Use ride_detail's URL if no URL provided
-                                        if not peloton_url and ride_detail.peloton_class_url:
-                                            peloton_url = ride_detail.peloton_class_url
-                                        if not workout_title:
-                                            workout_title = ride_detail.title
-                                    except (RideDetail.DoesNotExist, ValueError):
-                                        pass
-                                
-                                if peloton_url or ride_detail:
-                                    defaults = {
-                                        "peloton_url": peloton_url,
-                                        "workout_title": workout_title,
-                                        "points": points,
-                                        "ride_detail": ride_detail,
-                                    }
-                                    assignment, created = ChallengeWorkoutAssignment.objects.update_or_create(
-                                        challenge=challenge,
-                                        template=template,
-                                        week_number=week_num,
-                                        day_of_week=day_num,
-                                        activity_type=activity_type,
-                                        alternative_group=day_num,
-                                        order_in_group=alternative_index,
-                                        defaults=defaults
-                                    )
-                                    if created:
-                                        assignments_created += 1
-                                    else:
-                                        assignments_updated += 1
-                                else:
-                                    ChallengeWorkoutAssignment.objects.filter(
-                                        challenge=challenge,
-                                        template=template,
-                                        week_number=week_num,
-                                        day_of_week=day_num,
-                                        activity_type=activity_type,
-                                        alternative_group=day_num,
-                                        order_in_group=alternative_index
-                                    ).delete()
-                                    break
-                                
-                                alternative_index += 1
-        
-        # Handle bonus workouts
-        challenge_name_lower = challenge.name.lower()
-        default_bonus_activity = "run" if "3 runs" in challenge_name_lower or ("run" in challenge_name_lower and "3" in challenge_name_lower) else "ride"
-        
-        bonus_created = 0
-        bonus_updated = 0
-        for week_num in range(1, num_weeks + 1):
-            url_key = f"bonus_workout_{week_num}"
-            title_key = f"bonus_title_{week_num}"
-            points_key = f"bonus_points_{week_num}"
-            activity_key = f"bonus_activity_{week_num}"
-            
-            peloton_url = request.POST.get(url_key, "").strip()
-            workout_title = request.POST.get(title_key, "").strip()
-            points = request.POST.get(points_key, "10").strip()
-            activity_type = request.POST.get(activity_key, default_bonus_activity).strip()
-            
-            if activity_type not in ["ride", "run", "yoga", "strength"]:
-                activity_type = default_bonus_activity
-            
-            try:
-                points = int(points) if points else 10
-            except ValueError:
-                points = 10
-            
-            if workout_title or peloton_url:
-                bonus_workout, created = ChallengeBonusWorkout.objects.update_or_create(
-                    challenge=challenge,
-                    week_number=week_num,
-                    defaults={
-                        "activity_type": activity_type,
-                        "peloton_url": peloton_url if peloton_url else "",
-                        "workout_title": workout_title if workout_title else f"Week {week_num} Bonus {activity_type.title()}",
-                        "points": points,
-                    }
-                )
-                if created:
-                    bonus_created += 1
-                else:
-                    bonus_updated += 1
-            else:
-                ChallengeBonusWorkout.objects.filter(
-                    challenge=challenge,
-                    week_number=week_num
-                ).delete()
+        saved = matrix.save(request.POST, num_weeks)
+        assignments_created = saved["created"]
+        assignments_updated = saved["updated"]
         
         # Validate that all assigned workouts exist in the local library
         # Collect all peloton URLs/IDs from assignments
         all_class_ids = []
-        all_assignments = ChallengeWorkoutAssignment.objects.filter(challenge=challenge)
-        for assignment in all_assignments:
+        for assignment in saved["assignments"]:
             if assignment.peloton_url:
                 try:
                     class_id = extract_class_id(assignment.peloton_url)
@@ -638,7 +323,7 @@ def admin_assign_workouts(request, challenge_id):
                 )
                 messages.info(request, info_msg)
         
-        messages.success(request, f"Workout assignments saved! ({assignments_created} created, {assignments_updated} updated, {bonus_created + bonus_updated} bonus workouts)")
+        messages.success(request, f"Workout assignments saved! ({assignments_created} created, {assignments_updated} updated, {saved['bonus']} bonus workouts)")
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             from django.http import JsonResponse
@@ -653,9 +338,11 @@ def admin_assign_workouts(request, challenge_id):
     
     week_range = list(range(1, num_weeks + 1))
     
+    bonus_workouts = {week_num: matrix.bonus_workouts.get(week_num) for week_num in week_range}
+    
     return render(request, "challenges/admin/assign_workouts.html", {
         "challenge": challenge,
-        "workout_structure": workout_structure,
+        "workout_structure": matrix.structure(num_weeks),
         "bonus_workouts": bonus_workouts,
         "default_bonus_activity": default_bonus_activity,
         "num_weeks": num_weeks,
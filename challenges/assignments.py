@@ -0,0 +1,275 @@
+"""Workout assignment matrix of a challenge.
+
+The admin assignment wizard shows every template x week x day of a
+challenge. Instead of asking for each cell's assignments (and each week's
+template days and bonus workout), the matrix reads a challenge's
+assignments, the templates' days and the bonus workouts once and indexes
+the assignments by (template id, week, day of week). Saving diffs the
+submitted form against the loaded rows and writes the changes with
+bulk_create / bulk_update / one delete.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from plans.models import PlanTemplateDay
+
+from .models import ChallengeBonusWorkout, ChallengeWorkoutAssignment
+
+ACTIVITY_TYPES = ("ride", "run", "yoga", "strength")
+DAY_NAME_LABELS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+# Alternatives accepted per activity on days that allow them
+MAX_ALTERNATIVES = 10
+DEFAULT_POINTS = 50
+DEFAULT_BONUS_POINTS = 10
+
+ASSIGNMENT_FIELDS = ("peloton_url", "workout_title", "points", "ride_detail")
+BONUS_FIELDS = ("activity_type", "peloton_url", "workout_title", "points")
+
+
+def focus_activities(focus):
+    """Which activities a template day's focus expects (ride, run, yoga, strength flags)."""
+    focus_lower = focus.lower()
+    return {
+        "ride": "pze" in focus_lower or "power zone" in focus_lower or "pz" in focus_lower or "ride" in focus_lower,
+        "run": "run" in focus_lower,
+        "yoga": "yoga" in focus_lower,
+        "strength": "strength" in focus_lower,
+    }
+
+
+def _int_or_default(value, default):
+    try:
+        return int(value) if value else default
+    except (ValueError, TypeError):
+        return default
+
+
+class AssignmentMatrix:
+    """
+    A challenge's workout assignments indexed by (template id, week, day of week).
+
+    Loads the challenge's templates, their days, the assignments and the
+    bonus workouts in four queries.
+    """
+
+    def __init__(self, challenge, templates=None):
+        self.challenge = challenge
+        self.templates = list(templates if templates is not None else challenge.available_templates.all())
+
+        # template id -> day of week -> PlanTemplateDay
+        self.template_days = defaultdict(dict)
+        for day in PlanTemplateDay.objects.filter(template__in=self.templates):
+            self.template_days[day.template_id][day.day_of_week] = day
+
+        # (template id, week, day of week) -> assignments in alternative order
+        self.cells = defaultdict(list)
+        assignments = ChallengeWorkoutAssignment.objects.filter(challenge=challenge).order_by(
+            "template_id", "week_number", "day_of_week", "alternative_group", "order_in_group"
+        )
+        for assignment in assignments:
+            self.cells[(assignment.template_id, assignment.week_number, assignment.day_of_week)].append(assignment)
+
+        # week -> bonus workout
+        self.bonus_workouts = {}
+        for bonus in ChallengeBonusWorkout.objects.filter(challenge=challenge).order_by("week_number", "pk"):
+            self.bonus_workouts.setdefault(bonus.week_number, bonus)
+
+    def assignments(self, template, week_number, day_of_week):
+        """Assignments of one cell, alternatives in order."""
+        return self.cells.get((template.pk, week_number, day_of_week), [])
+
+    def workout_days(self, template):
+        """Days of week of the template that hold a workout, in order (day N = index + 1)."""
+        days = self.template_days.get(template.pk, {})
+        return [dow for dow in range(7) if dow in days and any(focus_activities(days[dow].peloton_focus).values())]
+
+    @staticmethod
+    def allows_alternatives(template, workout_day_number):
+        """Plans whose given workout day lets participants pick between alternatives."""
+        name = template.name.lower()
+        if "3" in name and ("ride" in name or "run" in name):
+            return workout_day_number in (2, 3)
+        if "4" in name and ("ride" in name or "run" in name):
+            return workout_day_number in (1, 4, 6)
+        if "2 runs 2 rides" in name or "2 rides 2 runs" in name:
+            return workout_day_number in (2, 4)
+        return False
+
+    def structure(self, num_weeks):
+        """Template -> weeks -> days rows for the assignment wizard."""
+        workout_structure = []
+        for template in self.templates:
+            template_days = self.template_days.get(template.pk, {})
+            workout_days = self.workout_days(template)
+            day_info = []
+            for day_num in range(7):
+                template_day = template_days.get(day_num)
+                workout_day_number = workout_days.index(day_num) + 1 if day_num in workout_days else None
+                expected = focus_activities(template_day.peloton_focus) if template_day else {}
+                day_info.append({
+                    "day_of_week": day_num,
+                    "day_label": f"Day {workout_day_number}" if workout_day_number else DAY_NAME_LABELS[day_num],
+                    "peloton_focus": template_day.peloton_focus if template_day else "",
+                    "has_ride": bool(template_day and expected["ride"]),
+                    "has_run": bool(template_day and expected["run"]),
+                    "has_yoga": bool(template_day and expected["yoga"]),
+                    "has_strength": bool(template_day and expected["strength"]),
+                    "allows_alternatives": self.allows_alternatives(template, workout_day_number),
+                    "workout_day_number": workout_day_number,
+                })
+
+            weeks = []
+            for week_num in range(1, num_weeks + 1):
+                days = []
+                for info in day_info:
+                    day_assignments = {activity_type: [] for activity_type in ACTIVITY_TYPES}
+                    for assignment in self.assignments(template, week_num, info["day_of_week"]):
+                        if assignment.activity_type in day_assignments:
+                            day_assignments[assignment.activity_type].append(assignment)
+                    days.append(dict(info, assignments=day_assignments))
+                weeks.append({"week_number": week_num, "days": days})
+            workout_structure.append({"template": template, "weeks": weeks})
+        return workout_structure
+
+    # -- saving ----------------------------------------------------------------------
+
+    @staticmethod
+    def _ride_details(data):
+        """RideDetail rows picked in the form (ride_id_* fields), in one query."""
+        from workouts.models import RideDetail
+
+        ride_ids = {
+            value.strip() for key, value in data.items()
+            if key.startswith("ride_id_") and value.strip().isdigit()
+        }
+        return {str(ride.pk): ride for ride in RideDetail.objects.filter(pk__in=ride_ids)} if ride_ids else {}
+
+    @staticmethod
+    def _submitted(data, suffix, ride_details):
+        """Values of one form slot, or None if nothing was assigned to it."""
+        ride_detail = ride_details.get(data.get(f"ride_id_{suffix}", "").strip())
+        peloton_url = data.get(f"workout_{suffix}", "").strip()
+        workout_title = data.get(f"title_{suffix}", "").strip()
+        points = _int_or_default(data.get(f"points_{suffix}", str(DEFAULT_POINTS)).strip(), DEFAULT_POINTS)
+        if ride_detail is not None:
+            # Use ride_detail's URL / title if none was entered
+            if not peloton_url and ride_detail.peloton_class_url:
+                peloton_url = ride_detail.peloton_class_url
+            if not workout_title:
+                workout_title = ride_detail.title
+        if not (peloton_url or ride_detail):
+            return None
+        return {"peloton_url": peloton_url, "workout_title": workout_title, "points": points, "ride_detail": ride_detail}
+
+    def save(self, data, num_weeks):
+        """
+        Write the assignment wizard form back.
+
+        An empty primary slot clears every assignment of that activity; on
+        days with alternatives, slots `_alt1`, `_alt2`, ... are read until the
+        first empty one, which is cleared.
+
+        Returns:
+            dict: 'created', 'updated', 'bonus' counts and the saved 'assignments'
+        """
+        ride_details = self._ride_details(data)
+        existing = {}
+        for assignments in self.cells.values():
+            for assignment in assignments:
+                existing[(
+                    assignment.template_id, assignment.week_number, assignment.day_of_week,
+                    assignment.activity_type, assignment.alternative_group, assignment.order_in_group,
+                )] = assignment
+
+        wanted = {}
+        deleted = set()
+        for template in self.templates:
+            workout_days = self.workout_days(template)
+            for week_num in range(1, num_weeks + 1):
+                for day_num in range(7):
+                    workout_day_number = workout_days.index(day_num) + 1 if day_num in workout_days else None
+                    allows_alternatives = self.allows_alternatives(template, workout_day_number)
+                    for activity_type in ACTIVITY_TYPES:
+                        slot = (template.pk, week_num, day_num, activity_type)
+                        suffix = f"{template.pk}_{week_num}_{day_num}_{activity_type}"
+                        values = self._submitted(data, suffix, ride_details)
+                        if values:
+                            wanted[slot + (None, 0)] = values
+                        else:
+                            deleted.update(key for key in existing if key[:4] == slot)
+                        if not allows_alternatives:
+                            continue
+                        for index in range(1, MAX_ALTERNATIVES + 1):
+                            values = self._submitted(data, f"{suffix}_alt{index}", ride_details)
+                            if not values:
+                                deleted.add(slot + (day_num, index))
+                                break
+                            wanted[slot + (day_num, index)] = values
+
+        to_create, to_update = [], []
+        for key, values in wanted.items():
+            assignment = existing.get(key)
+            if assignment is None:
+                template_id, week_num, day_num, activity_type, alternative_group, order_in_group = key
+                to_create.append(ChallengeWorkoutAssignment(
+                    challenge=self.challenge, template_id=template_id, week_number=week_num,
+                    day_of_week=day_num, activity_type=activity_type,
+                    alternative_group=alternative_group, order_in_group=order_in_group, **values,
+                ))
+                continue
+            for field, value in values.items():
+                setattr(assignment, field, value)
+            to_update.append(assignment)
+        delete_pks = [existing[key].pk for key in deleted if key in existing and key not in wanted]
+
+        bonus_count = 0
+        with transaction.atomic():
+            if delete_pks:
+                ChallengeWorkoutAssignment.objects.filter(pk__in=delete_pks).delete()
+            ChallengeWorkoutAssignment.objects.bulk_update(to_update, ASSIGNMENT_FIELDS, batch_size=500)
+            ChallengeWorkoutAssignment.objects.bulk_create(to_create, batch_size=500)
+            bonus_count = self._save_bonus_workouts(data, num_weeks)
+
+        saved = [assignment for key, assignment in existing.items() if key not in deleted or key in wanted] + to_create
+        return {"created": len(to_create), "updated": len(to_update), "bonus": bonus_count, "assignments": saved}
+
+    def default_bonus_activity(self):
+        """Bonus activity for challenges that don't pick one (run challenges default to run)."""
+        name = self.challenge.name.lower()
+        return "run" if "3 runs" in name or ("run" in name and "3" in name) else "ride"
+
+    def _save_bonus_workouts(self, data, num_weeks):
+        default_activity = self.default_bonus_activity()
+        to_create, to_update, delete_pks = [], [], []
+        for week_num in range(1, num_weeks + 1):
+            peloton_url = data.get(f"bonus_workout_{week_num}", "").strip()
+            workout_title = data.get(f"bonus_title_{week_num}", "").strip()
+            points = _int_or_default(data.get(f"bonus_points_{week_num}", str(DEFAULT_BONUS_POINTS)).strip(), DEFAULT_BONUS_POINTS)
+            activity_type = data.get(f"bonus_activity_{week_num}", default_activity).strip()
+            if activity_type not in ACTIVITY_TYPES:
+                activity_type = default_activity
+
+            bonus = self.bonus_workouts.get(week_num)
+            if not (workout_title or peloton_url):
+                if bonus is not None:
+                    delete_pks.append(bonus.pk)
+                continue
+            values = {
+                "activity_type": activity_type,
+                "peloton_url": peloton_url,
+                "workout_title": workout_title or f"Week {week_num} Bonus {activity_type.title()}",
+                "points": points,
+            }
+            if bonus is None:
+                to_create.append(ChallengeBonusWorkout(challenge=self.challenge, week_number=week_num, **values))
+            else:
+                for field, value in values.items():
+                    setattr(bonus, field, value)
+                to_update.append(bonus)
+
+        if delete_pks:
+            ChallengeBonusWorkout.objects.filter(pk__in=delete_pks).delete()
+        ChallengeBonusWorkout.objects.bulk_update(to_update, BONUS_FIELDS)
+        ChallengeBonusWorkout.objects.bulk_create(to_create)
+        return len(to_create) + len(to_update)
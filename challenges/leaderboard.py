@@ -0,0 +1,132 @@
+"""Team leaderboard scores computed in one pass per challenge.
+
+Instead of asking each team, week and member for its plan points, the
+engine reads the active team members of a challenge and the stored points
+of the scoring members' plans (WeeklyPlan.total_points) in two queries,
+and writes TeamLeaderboard rows in bulk.
+
+The nightly calculate_leaderboards job runs it for every active team
+challenge; activity toggles refresh just the member's team.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from tracker.models import WeeklyPlan
+
+from .models import TeamLeaderboard, TeamMember
+
+logger = logging.getLogger(__name__)
+
+
+def week_number_for(challenge, week_start):
+    """Challenge week number of a plan's week_start (None if it doesn't start a challenge week)."""
+    days = (week_start - challenge.start_date).days
+    if days < 0 or days % 7:
+        return None
+    return days // 7 + 1
+
+
+def compute_team_scores(challenge, team_ids=None):
+    """
+    Total and per-week points of every team in a challenge.
+
+    Only members with an active instance count, and only scoring ones
+    (see ChallengeInstance.is_scoring) add points.
+
+    Args:
+        challenge: Challenge
+        team_ids: Optional team ids to limit the computation to
+
+    Returns:
+        dict: {team_id: {None: total points, week_number: points, ...}}
+        (teams whose members score nothing map to {None: 0})
+    """
+    members = TeamMember.objects.filter(
+        challenge_instance__challenge=challenge,
+        challenge_instance__is_active=True,
+    ).select_related('challenge_instance')
+    if team_ids is not None:
+        members = members.filter(team_id__in=list(team_ids))
+
+    scores = {}
+    team_by_instance = {}
+    for member in members:
+        scores.setdefault(member.team_id, defaultdict(int))[None] += 0
+        instance = member.challenge_instance
+        instance.challenge = challenge  # is_scoring reads the challenge dates
+        if instance.is_scoring:
+            team_by_instance[instance.pk] = member.team_id
+
+    if not team_by_instance:
+        return {team_id: dict(team_scores) for team_id, team_scores in scores.items()}
+
+    plans = WeeklyPlan.objects.filter(
+        challenge_instance_id__in=list(team_by_instance),
+    ).values_list('challenge_instance_id', 'week_start', 'total_points')
+    for instance_id, week_start, points in plans:
+        team_scores = scores[team_by_instance[instance_id]]
+        team_scores[None] += points
+        week_number = week_number_for(challenge, week_start)
+        if week_number:
+            team_scores[week_number] += points
+
+    return {team_id: dict(team_scores) for team_id, team_scores in scores.items()}
+
+
+def update_challenge_leaderboard(challenge, team_ids=None, today=None):
+    """
+    Write TeamLeaderboard rows (total plus every started week) for a challenge.
+
+    Existing rows are updated and missing ones created in bulk; rows with a
+    NULL week_number can't go through an ON CONFLICT upsert, so both are
+    matched against one read of the challenge's current rows.
+
+    Returns:
+        int: leaderboard rows written
+    """
+    today = today or date.today()
+    scores = compute_team_scores(challenge, team_ids=team_ids)
+    if not scores:
+        return 0
+
+    weeks = [
+        week for week in challenge.week_range
+        if challenge.start_date + timedelta(days=(week - 1) * 7) <= today
+    ]
+    existing = {
+        (entry.team_id, entry.week_number): entry
+        for entry in TeamLeaderboard.objects.filter(challenge=challenge, team_id__in=list(scores))
+    }
+
+    now = timezone.now()
+    to_update, to_create = [], []
+    for team_id, team_scores in scores.items():
+        for week in [None] + weeks:
+            points = team_scores.get(week, 0)
+            entry = existing.get((team_id, week))
+            if entry is None:
+                to_create.append(TeamLeaderboard(
+                    team_id=team_id, challenge=challenge, week_number=week, total_points=points, calculated_at=now,
+                ))
+            else:
+                entry.total_points = points
+                entry.calculated_at = now
+                to_update.append(entry)
+
+    with transaction.atomic():
+        TeamLeaderboard.objects.bulk_update(to_update, ['total_points', 'calculated_at'], batch_size=500)
+        TeamLeaderboard.objects.bulk_create(to_create, batch_size=500)
+    return len(to_update) + len(to_create)
+
+
+def refresh_team_leaderboard(challenge_instance):
+    """Recompute the leaderboard rows of a member's team (no-op without a team)."""
+    try:
+        membership = challenge_instance.team_membership
+    except TeamMember.DoesNotExist:
+        return 0
+    return update_challenge_leaderboard(challenge_instance.challenge, team_ids=[membership.team_id])
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import date, timedelta
-from challenges.models import Challenge, Team, TeamLeaderboard
+from datetime import date
+from challenges.leaderboard import update_challenge_leaderboard
+from challenges.models import Challenge, Team
 
 
 class Command(BaseCommand):
@@ -35,25 +36,8 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'  No teams found for {challenge.name}'))
                 continue
             
-            # Calculate total scores (week_number=None)
-            for team in participating_teams:
-                score = team.calculate_team_score(challenge, week_number=None)
-                entry = team.get_leaderboard_entry(challenge, week_number=None)
-                entry.total_points = score
-                entry.save()
-                total_calculated += 1
-            
-            # Calculate scores for each week
-            for week_num in challenge.week_range:
-                # Only calculate for weeks that have started
-                week_start = challenge.start_date + timedelta(days=(week_num - 1) * 7)
-                if week_start <= today:
-                    for team in participating_teams:
-                        score = team.calculate_team_score(challenge, week_number=week_num)
-                        entry = team.get_leaderboard_entry(challenge, week_number=week_num)
-                        entry.total_points = score
-                        entry.save()
-                        total_calculated += 1
+            # Totals and every started week for all teams, in one pass
+            total_calculated += update_challenge_leaderboard(challenge, today=today)
             
             self.stdout.write(self.style.SUCCESS(f'  Calculated scores for {participating_teams.count()} teams'))
         
@@ -1,10 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta, date
-from tracker.models import WeeklyPlan
+from django.db import connection
+from django.db.models import Count
 from challenges.models import ChallengeInstance
-from core.services import DateRangeService
-from plans.services import generate_weekly_plan
+from plans.services import PlanMaterializer, challenge_plan_weeks
+
+
+def regenerate_chunk(instance_ids):
+    """
+    Generate the plans of a chunk of challenge instances.
+
+    Returns:
+        list of (style, message, weeks generated) per instance
+    """
+    results = []
+    materializers = {}
+    instances = ChallengeInstance.objects.filter(pk__in=instance_ids).select_related(
+        "user", "challenge", "challenge__default_template", "selected_template"
+    ).annotate(plan_count=Count("weekly_plans"))
+    for ci in instances:
+        challenge = ci.challenge
+        template = ci.selected_template or challenge.default_template
+
+        if not template:
+            results.append(("WARNING", f"Skipping {ci.user.username} - {challenge.name}: No template selected", 0))
+            continue
+
+        # Check if plans already exist
+        if ci.plan_count > 0:
+            results.append((None, f"Skipping {ci.user.username} - {challenge.name}: Already has {ci.plan_count} plan(s)", 0))
+            continue
+
+        # Past challenges get all weeks from the challenge start, current/upcoming
+        # ones start at the current week; week numbers are sequential (1, 2, 3, ...)
+        # to match seeding logic
+        weeks = challenge_plan_weeks(challenge, sequential=True)
+        if not weeks:
+            results.append((None, f"  {ci.user.username} - {challenge.name}: No weeks to generate", 0))
+            continue
+
+        key = (template.pk, challenge.pk)
+        if key not in materializers:
+            materializers[key] = PlanMaterializer(template, challenge)
+        materializers[key].materialize(user=ci.user, weeks=weeks, challenge_instance=ci)
+        results.append(("SUCCESS", f"✓ {ci.user.username} - {challenge.name}: Generated {len(weeks)} week(s)", len(weeks)))
+    return results
+
+
+def _regenerate_chunk_in_thread(instance_ids):
+    try:
+        return regenerate_chunk(instance_ids)
+    finally:
+        # Worker threads open their own connection
+        connection.close()
 
 
 class Command(BaseCommand):
@@ -21,108 +70,59 @@ class Command(BaseCommand):
             type=int,
             help="Challenge ID to regenerate plans for (optional)",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Chunks processed in parallel (1 = in this thread)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50,
+            help="Challenge instances per chunk",
+        )
 
     def handle(self, *args, **options):
         username = options.get("user")
         challenge_id = options.get("challenge")
+        workers = max(1, options["workers"])
+        chunk_size = max(1, options["chunk_size"])
 
         # Get challenge instances
         challenge_instances = ChallengeInstance.objects.all()
-        
+
         if username:
             challenge_instances = challenge_instances.filter(user__username=username)
-        
+
         if challenge_id:
             challenge_instances = challenge_instances.filter(challenge_id=challenge_id)
-        
-        if not challenge_instances.exists():
+
+        instance_ids = list(challenge_instances.order_by("pk").values_list("pk", flat=True))
+        if not instance_ids:
             self.stdout.write(self.style.WARNING("No challenge instances found."))
             return
-        
+
+        chunks = [instance_ids[i:i + chunk_size] for i in range(0, len(instance_ids), chunk_size)]
         total_regenerated = 0
-        
-        for ci in challenge_instances:
-            challenge = ci.challenge
-            template = ci.selected_template or challenge.default_template
-            
-            if not template:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Skipping {ci.user.username} - {challenge.name}: No template selected"
-                    )
-                )
-                continue
-            
-            # Check if plans already exist
-            existing_plans_count = ci.weekly_plans.count()
-            
-            if existing_plans_count > 0:
-                self.stdout.write(
-                    f"Skipping {ci.user.username} - {challenge.name}: Already has {existing_plans_count} plan(s)"
-                )
-                continue
-            
-            # Generate plans
-            today = date.today()
-            challenge_start = challenge.start_date
-            challenge_end = challenge.end_date
-            
-            # For past challenges, generate all weeks from challenge start
-            # For current/upcoming challenges, generate from current week or challenge start
-            if challenge.has_ended:
-                start_week = DateRangeService.sunday_of_current_week(challenge_start)
-                use_start_from_today = False
-            else:
-                challenge_week_start = DateRangeService.sunday_of_current_week(challenge_start)
-                start_week = max(DateRangeService.sunday_of_current_week(today), challenge_week_start)
-                use_start_from_today = (start_week == DateRangeService.sunday_of_current_week(today))
-            
-            # Generate plans for each week of the challenge
-            current_week_start = start_week
-            week_num = 1
-            weeks_generated = 0
-            
-            while current_week_start <= challenge_end:
-                # Week numbers are sequential (1, 2, 3, ...) to match seeding logic
-                # No recalculation needed - just increment after each iteration
-                
-                # Check if plan already exists for this week
-                existing_plan = WeeklyPlan.objects.filter(
-                    user=ci.user,
-                    week_start=current_week_start,
-                    challenge_instance=ci
-                ).first()
-                
-                if not existing_plan:
-                    weekly = generate_weekly_plan(
-                        user=ci.user,
-                        week_start=current_week_start,
-                        template=template,
-                        start_from_today=(use_start_from_today and current_week_start == DateRangeService.sunday_of_current_week(today)),
-                        challenge_instance=ci,
-                        week_number=week_num
-                    )
-                    weekly.challenge_instance = ci
-                    weekly.save(update_fields=["challenge_instance"])
-                    weeks_generated += 1
-                
-                current_week_start += timedelta(days=7)
-                week_num += 1
-            
-            if weeks_generated > 0:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"✓ {ci.user.username} - {challenge.name}: Generated {weeks_generated} week(s)"
-                    )
-                )
-                total_regenerated += weeks_generated
-            else:
-                self.stdout.write(
-                    f"  {ci.user.username} - {challenge.name}: No weeks to generate"
-                )
-        
+        if workers == 1:
+            chunk_results = map(regenerate_chunk, chunks)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            futures = [executor.submit(_regenerate_chunk_in_thread, chunk) for chunk in chunks]
+            chunk_results = (future.result() for future in as_completed(futures))
+
+        try:
+            for results in chunk_results:
+                for style, message, weeks_generated in results:
+                    self.stdout.write(getattr(self.style, style)(message) if style else message)
+                    total_regenerated += weeks_generated
+        finally:
+            if workers > 1:
+                executor.shutdown()
+
         self.stdout.write(
             self.style.SUCCESS(
-                f"\nDone. Regenerated {total_regenerated} week(s) across {challenge_instances.count()} challenge instance(s)."
+                f"\nDone. Regenerated {total_regenerated} week(s) across {len(instance_ids)} challenge instance(s)."
             )
         )
@@ -559,28 +559,9 @@ class Team(models.Model):
     
     def calculate_team_score(self, challenge, week_number=None):
         """Calculate total team score for a challenge (optionally for a specific week)"""
-        members = self.get_members_for_challenge(challenge)
-        total_score = 0
-        
-        for member in members:
-            instance = member.challenge_instance
-            if not instance.is_scoring:
-                continue
-            
-            if week_number:
-                # Calculate score for specific week
-                from tracker.models import WeeklyPlan
-                from datetime import timedelta
-                challenge_start = challenge.start_date
-                week_start = challenge_start + timedelta(days=(week_number - 1) * 7)
-                week_plan = instance.weekly_plans.filter(week_start=week_start).first()
-                if week_plan:
-                    total_score += week_plan.total_points
-            else:
-                # Calculate total score across all weeks
-                total_score += instance.total_points
-        
-        return total_score
+        from .leaderboard import compute_team_scores
+        team_scores = compute_team_scores(challenge, team_ids=[self.pk]).get(self.pk, {})
+        return team_scores.get(week_number or None, 0)
     
     def get_leaderboard_entry(self, challenge, week_number=None):
         """Get or create leaderboard entry for this team/challenge/week"""
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from datetime import date, datetime, timedelta
@@ -109,3 +111,215 @@ class ChallengeSignupScoringTests(TestCase):
 		# Team score should only include inst1's points
 		total = team.calculate_team_score(chal)
 		self.assertEqual(total, wp1.total_points)
+
+	def test_recalculate_points_scores_items_in_one_pass(self):
+		wp = WeeklyPlan.objects.create(user=self.user1, week_start=date.today(), template_name='T')
+		url = 'https://members.onepeloton.com/classes/cycling?modal=classDetailsModal&classId=abc'
+		DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=1, peloton_focus='PZ', exercise=self.exercise, peloton_ride_url=url, workout_points=60, ride_done=True)
+		DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=1, peloton_focus='PZ alt', exercise=self.exercise, peloton_ride_url=url, workout_points=40, ride_done=True)
+		DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=3, peloton_focus='PZE', exercise=self.exercise, peloton_ride_url=url, workout_points=0, ride_done=True)
+		DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=5, peloton_focus='Bonus ride', exercise=self.exercise, peloton_ride_url=url, ride_done=True)
+
+		with self.assertNumQueries(2):
+			wp.recalculate_points()
+		wp.refresh_from_db()
+		# One workout per day counts (60 + 50 fallback), bonus once all core days are done
+		self.assertEqual(wp.activity_points, 110)
+		self.assertEqual(wp.bonus_points, 10)
+		self.assertEqual(wp.total_points, 120)
+		self.assertEqual(wp.max_core_points, 110)
+		self.assertEqual(wp.core_workout_count, 3)
+		self.assertEqual(round(wp.completion_rate, 2), 109.09)
+
+	def test_item_writes_keep_plan_points_current(self):
+		wp = WeeklyPlan.objects.create(user=self.user1, week_start=date.today(), template_name='T')
+		url = 'https://members.onepeloton.com/classes/cycling?modal=classDetailsModal&classId=abc'
+		# A plain save (admin, shell) recomputes the plan without the views
+		with self.captureOnCommitCallbacks(execute=True):
+			item = DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=1, peloton_focus='PZ', exercise=self.exercise, peloton_ride_url=url, workout_points=60, ride_done=True)
+		wp.refresh_from_db()
+		self.assertEqual(wp.total_points, 60)
+
+		# Several writes in one transaction recompute the plan once, on commit
+		with patch.object(WeeklyPlan, 'recalculate_points_for', wraps=WeeklyPlan.recalculate_points_for) as recalc:
+			with self.captureOnCommitCallbacks(execute=True):
+				for day in (3, 5):
+					DailyPlanItem.objects.create(weekly_plan=wp, day_of_week=day, peloton_focus='PZE', exercise=self.exercise, peloton_ride_url=url, workout_points=50, ride_done=True)
+		self.assertEqual(recalc.call_count, 1)
+		wp.refresh_from_db()
+		self.assertEqual(wp.total_points, 160)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			item.delete()
+		wp.refresh_from_db()
+		self.assertEqual(wp.total_points, 100)
+
+		# Items deleted along with their plan queue nothing
+		with self.captureOnCommitCallbacks() as callbacks:
+			wp.delete()
+		self.assertFalse(any(getattr(cb, '__name__', '') == '_flush_pending_recalculations' for cb in callbacks))
+
+	def test_leaderboard_engine_writes_totals_and_weeks(self):
+		from .leaderboard import refresh_team_leaderboard, update_challenge_leaderboard
+		from .models import TeamLeaderboard
+
+		today = date.today()
+		start = today - timedelta(days=7)
+		chal = Challenge.objects.create(
+			name='Team Board',
+			start_date=start,
+			end_date=start + timedelta(days=27),
+			signup_opens_date=start - timedelta(days=10),
+			challenge_type='team',
+			is_active=True,
+			is_visible=True,
+		)
+		team = Team.objects.create(name='Blue Team')
+		inst = ChallengeInstance.objects.create(user=self.user1, challenge=chal, selected_template=self.template, is_active=True)
+		inst.started_at = datetime.combine(start - timedelta(days=1), datetime.min.time())
+		inst.save(update_fields=['started_at'])
+		TeamMember.objects.create(team=team, challenge_instance=inst)
+
+		url = 'https://members.onepeloton.com/classes/cycling?modal=classDetailsModal&classId=abc'
+		week1 = WeeklyPlan.objects.create(user=self.user1, challenge_instance=inst, week_start=start, template_name='T')
+		DailyPlanItem.objects.create(weekly_plan=week1, day_of_week=0, peloton_focus='Ride', exercise=self.exercise, peloton_ride_url=url, workout_points=50, ride_done=True)
+		week2 = WeeklyPlan.objects.create(user=self.user1, challenge_instance=inst, week_start=start + timedelta(days=7), template_name='T')
+		item = DailyPlanItem.objects.create(weekly_plan=week2, day_of_week=0, peloton_focus='Ride', exercise=self.exercise, peloton_ride_url=url, workout_points=50)
+		WeeklyPlan.recalculate_points_for([week1, week2])
+
+		update_challenge_leaderboard(chal, today=today)
+		points = dict(TeamLeaderboard.objects.filter(team=team, challenge=chal).values_list('week_number', 'total_points'))
+		self.assertEqual(points, {None: 50, 1: 50, 2: 0})
+		self.assertEqual(team.calculate_team_score(chal, week_number=1), 50)
+
+		# Toggling an activity only needs the member's team refreshed
+		item.ride_done = True
+		item.save(update_fields=['ride_done'])
+		week2.recalculate_points()
+		refresh_team_leaderboard(inst)
+		points = dict(TeamLeaderboard.objects.filter(team=team, challenge=chal).values_list('week_number', 'total_points'))
+		self.assertEqual(points, {None: 100, 1: 50, 2: 50})
+
+
+class PlanMaterializerTests(TestCase):
+	"""Challenge plans are built in memory and written in bulk"""
+
+	def setUp(self):
+		from plans.models import Exercise, PlanTemplateDay
+		from .models import ChallengeBonusWorkout, ChallengeWorkoutAssignment
+
+		self.user = User.objects.create_user(email='plans@example.com', password='pass')
+		self.exercise = Exercise.objects.create(name='Pelvic Tilts', category='mobility', position='', key_cue='', reps_hold='', video_url='')
+		self.template = PlanTemplate.objects.create(name='Materializer Template')
+		PlanTemplateDay.objects.create(template=self.template, day_of_week=1, peloton_focus='PZE (Z2)')
+		# Three past weeks: Jan 7, 14 and 21 2024 (Sundays)
+		self.challenge = Challenge.objects.create(
+			name='Materializer Challenge',
+			start_date=date(2024, 1, 7),
+			end_date=date(2024, 1, 27),
+			default_template=self.template,
+		)
+		for activity_type, order in (('ride', 0), ('run', 1)):
+			ChallengeWorkoutAssignment.objects.create(
+				challenge=self.challenge, template=self.template, week_number=1, day_of_week=1,
+				activity_type=activity_type, peloton_url=f'https://members.onepeloton.com/classes/{activity_type}',
+				points=60, alternative_group=1, order_in_group=order,
+			)
+		ChallengeBonusWorkout.objects.create(
+			challenge=self.challenge, week_number=2, activity_type='ride',
+			peloton_url='https://members.onepeloton.com/classes/bonus', points=10,
+		)
+
+	def test_materialize_all_weeks(self):
+		from plans.services import PlanMaterializer, challenge_plan_weeks
+
+		instance = ChallengeInstance.objects.create(user=self.user, challenge=self.challenge, selected_template=self.template)
+		weeks = challenge_plan_weeks(self.challenge)
+		self.assertEqual([(week_start, number) for week_start, number, _ in weeks], [
+			(date(2024, 1, 7), 1), (date(2024, 1, 14), 2), (date(2024, 1, 21), 3),
+		])
+
+		plans = PlanMaterializer(self.template, self.challenge).materialize(
+			user=self.user, weeks=weeks, challenge_instance=instance,
+		)
+		self.assertEqual([plan.challenge_instance_id for plan in plans], [instance.pk] * 3)
+
+		week_one = list(plans[0].items.all())
+		self.assertEqual([item.peloton_ride_url is not None for item in week_one], [True, False])
+		self.assertEqual([item.workout_points for item in week_one], [60, 60])
+
+		bonus = plans[1].items.get()
+		self.assertEqual((bonus.day_of_week, bonus.peloton_focus, bonus.points_earned), (6, 'Bonus Ride', 10))
+		self.assertFalse(plans[2].items.exists())
+
+		# Regenerating a week keeps the plan and replaces its items
+		again = PlanMaterializer(self.template, self.challenge).materialize(
+			user=self.user, weeks=weeks[:1], challenge_instance=instance,
+		)
+		self.assertEqual(again[0].pk, plans[0].pk)
+		self.assertEqual(DailyPlanItem.objects.filter(weekly_plan=plans[0]).count(), 2)
+
+	def test_regenerate_command(self):
+		from io import StringIO
+		from django.core.management import call_command
+
+		instance = ChallengeInstance.objects.create(user=self.user, challenge=self.challenge, selected_template=self.template)
+		out = StringIO()
+		call_command('regenerate_challenge_plans', workers=1, stdout=out)
+		self.assertEqual(instance.weekly_plans.count(), 3)
+		self.assertIn('Regenerated 3 week(s)', out.getvalue())
+
+		call_command('regenerate_challenge_plans', workers=1, stdout=out)
+		self.assertIn('Already has 3 plan(s)', out.getvalue())
+
+
+class AssignmentMatrixTests(TestCase):
+	"""The assignment wizard reads and writes a challenge's assignments in bulk"""
+
+	def setUp(self):
+		from plans.models import PlanTemplateDay
+
+		self.template = PlanTemplate.objects.create(name='3 Rides Plan')
+		for day_of_week, focus in ((1, 'PZE (Z2)'), (3, 'Power Zone'), (5, 'Ride'), (6, 'Rest')):
+			PlanTemplateDay.objects.create(template=self.template, day_of_week=day_of_week, peloton_focus=focus)
+		self.challenge = Challenge.objects.create(
+			name='Matrix Challenge', start_date=date(2024, 1, 7), end_date=date(2024, 1, 27),
+		)
+		self.challenge.available_templates.add(self.template)
+
+	def test_structure_queries_do_not_grow_with_weeks(self):
+		from .assignments import AssignmentMatrix
+
+		with self.assertNumQueries(4):
+			structure = AssignmentMatrix(self.challenge).structure(12)
+		days = structure[0]['weeks'][0]['days']
+		self.assertEqual([day['day_label'] for day in days], ['Sun', 'Day 1', 'Tue', 'Day 2', 'Thu', 'Day 3', 'Sat'])
+		self.assertEqual([day['allows_alternatives'] for day in days if day['workout_day_number']], [False, True, True])
+
+	def test_save_writes_primary_and_alternatives(self):
+		from .assignments import AssignmentMatrix
+		from .models import ChallengeBonusWorkout, ChallengeWorkoutAssignment
+
+		t = self.template.pk
+		url = 'https://members.onepeloton.com/classes/cycling?modal=classDetailsModal&classId='
+		data = {
+			f'workout_{t}_1_1_ride': url + 'a',
+			f'workout_{t}_1_3_ride': url + 'b',
+			f'workout_{t}_1_3_ride_alt1': url + 'c',
+			f'points_{t}_1_3_ride_alt1': '25',
+			'bonus_workout_2': url + 'd',
+		}
+		saved = AssignmentMatrix(self.challenge).save(data, 3)
+		self.assertEqual((saved['created'], saved['updated'], saved['bonus']), (3, 0, 1))
+		alternative = ChallengeWorkoutAssignment.objects.get(alternative_group=3, order_in_group=1)
+		self.assertEqual(alternative.points, 25)
+		self.assertEqual(ChallengeBonusWorkout.objects.get().workout_title, 'Week 2 Bonus Ride')
+
+		# Clearing the primary slot drops the activity's alternatives too
+		del data[f'workout_{t}_1_3_ride']
+		del data[f'workout_{t}_1_3_ride_alt1']
+		saved = AssignmentMatrix(self.challenge).save(data, 3)
+		self.assertEqual((saved['created'], saved['updated']), (0, 1))
+		self.assertEqual(
+			list(ChallengeWorkoutAssignment.objects.values_list('day_of_week', flat=True)), [1]
+		)
@@ -6,8 +6,9 @@ from django.utils import timezone
 from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
 from plans.models import PlanTemplate
-from plans.services import generate_weekly_plan
+from plans.services import PlanMaterializer, challenge_plan_weeks
 from tracker.models import WeeklyPlan
+from .leaderboard import compute_team_scores
 from .models import Challenge, ChallengeInstance, Team, TeamMember, TeamLeaderboard, TeamLeaderVolunteer
 from core.services import DateRangeService, ChallengeService
 
@@ -456,48 +457,12 @@ def join_challenge(request, challenge_id):
             )
         
         # Auto-generate weekly plans for the challenge duration
-        today = date.today()
-        challenge_start = challenge.start_date
-        challenge_end = challenge.end_date
-        
-        # For past challenges (retaking), generate all weeks from challenge start
-        # For current/upcoming challenges, generate from current week or challenge start (whichever is later)
-        if challenge.has_ended:
-            # Past challenge - generate all weeks from challenge start
-            start_week = sunday_of_current_week(challenge_start)
-            use_start_from_today = False
-        else:
-            # Current or upcoming challenge - start from current week or challenge start
-            challenge_week_start = sunday_of_current_week(challenge_start)
-            start_week = max(sunday_of_current_week(today), challenge_week_start)
-            use_start_from_today = (start_week == sunday_of_current_week(today))
-        
-        # Generate plans for each week of the challenge
-        current_week_start = start_week
-        week_num = 1
-        weeks_generated = 0
-        
-        while current_week_start <= challenge_end:
-            # Calculate week number based on challenge start
-            if current_week_start >= challenge_start:
-                week_num = ((current_week_start - challenge_start).days // 7) + 1
-            else:
-                week_num = 1
-            
-            # Always generate fresh plans (old ones were deleted above if rejoining)
-            weekly = generate_weekly_plan(
-                user=request.user,
-                week_start=current_week_start,
-                template=template,
-                start_from_today=(use_start_from_today and current_week_start == sunday_of_current_week(today)),
-                challenge_instance=challenge_instance,
-                week_number=week_num
-            )
-            weekly.challenge_instance = challenge_instance
-            weekly.save(update_fields=["challenge_instance"])
-            weeks_generated += 1
-            
-            current_week_start += timedelta(days=7)
+        # (old ones were deleted above if rejoining)
+        weeks_generated = len(PlanMaterializer(template, challenge).materialize(
+            user=request.user,
+            weeks=challenge_plan_weeks(challenge),
+            challenge_instance=challenge_instance,
+        ))
         
         # Assign user to team (if team was selected)
         # Only assign to team if this is a scoring signup (joined on-or-before cutoff)
@@ -635,49 +600,11 @@ def retake_challenge(request, challenge_id):
         messages.success(request, f"Retaking '{challenge.name}' with template '{template.name}'. Generating weekly plans...")
         
         # Generate weekly plans (same logic as join_challenge)
-        today = date.today()
-        challenge_start = challenge.start_date
-        challenge_end = challenge.end_date
-        
-        # For past challenges (retaking), generate all weeks from challenge start
-        # For current/upcoming challenges, generate from current week or challenge start
-        if challenge.has_ended:
-            # Past challenge - generate all weeks from challenge start
-            start_week = sunday_of_current_week(challenge_start)
-            use_start_from_today = False
-        else:
-            # Current or upcoming challenge - start from current week or challenge start
-            challenge_week_start = sunday_of_current_week(challenge_start)
-            start_week = max(sunday_of_current_week(today), challenge_week_start)
-            use_start_from_today = (start_week == sunday_of_current_week(today))
-        
-        # Generate plans for each week of the challenge
-        current_week_start = start_week
-        week_num = 1
-        weeks_generated = 0
-        
-        while current_week_start <= challenge_end:
-            # Calculate week number based on challenge start
-            if current_week_start >= challenge_start:
-                week_num = ((current_week_start - challenge_start).days // 7) + 1
-            else:
-                week_num = 1
-            
-            # Always generate fresh plans for retake
-            weekly = generate_weekly_plan(
-                user=request.user,
-                week_start=current_week_start,
-                template=template,
-                start_from_today=(use_start_from_today and current_week_start == sunday_of_current_week(today)),
-                challenge_instance=new_instance,
-                week_number=week_num
-            )
-            weekly.challenge_instance = new_instance
-            weekly.save(update_fields=["challenge_instance"])
-            weeks_generated += 1
-            
-            current_week_start += timedelta(days=7)
-            use_start_from_today = False  # Only for first week
+        weeks_generated = len(PlanMaterializer(template, challenge).materialize(
+            user=request.user,
+            weeks=challenge_plan_weeks(challenge),
+            challenge_instance=new_instance,
+        ))
         
         if weeks_generated > 0:
             messages.success(request, f"Retaking '{challenge.name}'! Generated {weeks_generated} week(s).")
@@ -1178,14 +1105,15 @@ def team_leader_overview(request):
             members__challenge_instance__is_active=True
         ).distinct()
         
-        # Calculate or get leaderboard scores
+        # Recalculate every team's scores in one pass (in case they're not up to date)
+        scores = compute_team_scores(selected_challenge)
         leaderboard_entries = []
         for t in participating_teams:
             entry = t.get_leaderboard_entry(selected_challenge, week_number)
-            # Recalculate score (in case it's not up to date)
-            score = t.calculate_team_score(selected_challenge, week_number)
-            entry.total_points = score
-            entry.save()
+            score = scores.get(t.id, {}).get(week_number, 0)
+            if entry.total_points != score:
+                entry.total_points = score
+                entry.save(update_fields=['total_points'])
             leaderboard_entries.append({
                 'team': t,
                 'score': score,
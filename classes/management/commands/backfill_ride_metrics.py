@@ -0,0 +1,52 @@
+"""
+Management command to fill the class library metrics index (RideMetrics).
+
+New and re-synced rides are indexed when they are stored; run this once after
+deploying the index, and again after RIDE_METRICS_VERSION is bumped.
+
+Usage:
+    python manage.py backfill_ride_metrics
+    python manage.py backfill_ride_metrics --all --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from classes.services.library_metrics import RIDE_METRICS_VERSION, refresh_ride_metrics
+from workouts.models import RideDetail
+
+
+class Command(BaseCommand):
+    help = 'Compute TSS / IF / zone mix index rows for class library rides'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every ride, not only missing or outdated rows'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rides computed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        rides = RideDetail.objects.select_related('workout_type').order_by('pk')
+        if not options['all']:
+            rides = rides.filter(
+                Q(library_metrics__isnull=True) | ~Q(library_metrics__version=RIDE_METRICS_VERSION)
+            )
+
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(rides.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            total += refresh_ride_metrics(batch)
+            self.stdout.write(f"Indexed {total} rides...")
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} rides (version {RIDE_METRICS_VERSION})'))
@@ -2,11 +2,14 @@
 Service for handling class library filtering, searching, and pagination.
 Encapsulates all the complex query logic from class_library view.
 """
-from django.db.models import Q, Value, BigIntegerField
+from django.db.models import F, Q, Value, BigIntegerField
 from django.db.models.functions import Coalesce
 from datetime import datetime
 import logging
 
+from classes.services.library_metrics import zone_kind_for_type, zone_mix_filter
+from workouts.services.search import search_rides
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,12 +26,9 @@ class ClassLibraryFilter:
         self.filters = {}
     
     def apply_search(self, search_query):
-        """Filter by search term (title or instructor name)."""
+        """Filter by search term (title, instructor, class type, description) via the search index."""
         if search_query and search_query.strip():
-            self.queryset = self.queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(instructor__name__icontains=search_query)
-            )
+            self.queryset = search_rides(self.queryset, search_query)
             self.filters['search'] = search_query
         return self
     
@@ -101,16 +101,69 @@ class ClassLibraryFilter:
                 pass
         return self
     
+    def apply_tss_filter(self, min_tss):
+        """Filter by minimum class TSS (from the RideMetrics index)."""
+        if min_tss:
+            try:
+                self.queryset = self.queryset.filter(library_metrics__tss__gte=float(min_tss))
+                self.filters['tss'] = min_tss
+            except (ValueError, TypeError):
+                pass
+        return self
+    
+    def apply_intensity_filter(self, min_if=None, max_if=None):
+        """Filter by intensity factor range (from the RideMetrics index)."""
+        for key, value, lookup in (('if_min', min_if, 'gte'), ('if_max', max_if, 'lte')):
+            if value:
+                try:
+                    self.queryset = self.queryset.filter(**{f'library_metrics__intensity_factor__{lookup}': float(value)})
+                    self.filters[key] = value
+                except (ValueError, TypeError):
+                    pass
+        return self
+    
+    def apply_zone_filter(self, zone, min_percent=None, kind=None):
+        """
+        Filter by zone mix: at least `min_percent` of the main set in `zone`, else `zone` is the dominant one.
+
+        Zones are pace levels when the workout type filter is running or walking
+        and power zones otherwise, unless `kind` ('power' / 'pace') is given.
+        """
+        if zone:
+            try:
+                kind = kind or zone_kind_for_type(self.filters.get('workout_type'))
+                condition = zone_mix_filter(zone, min_percent, kind)
+                if condition is not None:
+                    self.queryset = self.queryset.filter(condition)
+                    if min_percent:
+                        self.filters['zone_min'] = min_percent
+                    self.filters['zone'] = int(zone)
+            except (ValueError, TypeError):
+                pass
+        return self
+    
     def apply_ordering(self, order_by=None):
-        """Apply ordering with proper NULL handling."""
+        """Apply ordering with proper NULL handling (best search matches first when searching and no order is given)."""
+        if not order_by and 'search' in self.filters:
+            order_by = 'relevance'
+        if order_by == 'relevance' and 'search' in self.filters:
+            self.queryset = self.queryset.order_by('-search_rank', '-original_air_time')
+            self.filters['order_by'] = order_by
+            return self
         if not order_by or order_by not in [
             'original_air_time', '-original_air_time',
             'title', '-title',
-            'duration_seconds', '-duration_seconds'
+            'duration_seconds', '-duration_seconds',
+            'tss', '-tss', 'intensity_factor', '-intensity_factor',
         ]:
             order_by = '-original_air_time'
         
-        if order_by == '-original_air_time':
+        if order_by.lstrip('-') in ('tss', 'intensity_factor'):
+            # Index columns: rides without metrics go last either way
+            metric = F(f"library_metrics__{order_by.lstrip('-')}")
+            metric = metric.desc(nulls_last=True) if order_by.startswith('-') else metric.asc(nulls_last=True)
+            self.queryset = self.queryset.order_by(metric, '-original_air_time')
+        elif order_by == '-original_air_time':
             # Descending: NULLs last using Coalesce with 0
             self.queryset = self.queryset.annotate(
                 sort_air_time=Coalesce('original_air_time', Value(0, output_field=BigIntegerField()))
@@ -1,204 +1,130 @@
+import hashlib
 import json
+import logging
+
 from django.utils.safestring import mark_safe
 
+from core.services import TaggedCacheService
+
+logger = logging.getLogger(__name__)
+
+# Bump when the per-ride computation changes so old cache entries and
+# RideMetrics rows are ignored / rebuilt
+RIDE_METRICS_VERSION = 1
+
+# Intensity is relative to FTP, so any FTP gives the same IF / TSS / zone mix
+INDEX_REFERENCE_FTP = 100
+
+PACE_ZONE_ORDER = ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']
+
+ZONE_PCT_FIELDS = [f'zone_{zone}_pct' for zone in range(1, 8)]
+
+# Class library workout types whose zones are pace levels (RideMetrics.kind 'pace'); others are power zones
+PACE_ZONE_TYPES = ('running', 'walking')
 
-def build_class_library_metrics(*, page_obj, user_profile, tss_filter, metrics_calculator):
-    """
-    Build per-class card metrics for class_library view.
+
+def _user_targets(user_profile):
+    """The user's FTP and pace zone targets, read once per request.
 
     Returns:
-        List of ride_data dicts with tss/if/zone/chart/difficulty for each ride.
+        Tuple of (ftp, {activity_type: pace zone targets}, cache key fragment)
     """
-    rides_with_metrics = []
-    for ride in page_obj:
-        ride_data = {
-            'ride': ride,
-            'tss': None,
-            'if_value': None,
-            'zone_data': None,
-            'chart_data': None,
-            'difficulty': None,
-        }
-
-        # Try to get from target_class_metrics first
-        if ride.target_class_metrics:
-            ride_data['tss'] = ride.target_class_metrics.get('total_expected_output') or ride.target_class_metrics.get('tss')
-            ride_data['if_value'] = ride.target_class_metrics.get('if') or ride.target_class_metrics.get('intensity_factor')
-
-        # Calculate zone distribution for chart
-        zone_distribution = []
-        if ride.class_type == 'power_zone' or ride.is_power_zone_class:
-            user_ftp = user_profile.get_current_ftp() if user_profile else None
-            if user_ftp:
-                segments = ride.get_power_zone_segments(user_ftp=user_ftp)
-                if segments:
-                    zone_times = {}
-                    total_duration = ride.duration_seconds
-                    warm_up_cutoff = total_duration * 0.15  # First 15% is warm up
-                    cool_down_start = total_duration * 0.90  # Last 10% is cool down
-
-                    for segment in segments:
-                        zone = segment.get('zone', 0)
-                        start = segment.get('start', 0)
-                        # Skip warm up and cool down segments
-                        if start < warm_up_cutoff or start >= cool_down_start:
-                            continue
-                        duration = segment.get('end', 0) - segment.get('start', 0)
-                        zone_times[zone] = zone_times.get(zone, 0) + duration
+    if not user_profile:
+        return None, {}, 'anon'
+    user_ftp = user_profile.get_current_ftp()
+    pace_zones_by_activity = {
+        activity_type: user_profile.get_pace_zone_targets(activity_type=activity_type)
+        for activity_type in ('running', 'walking')
+    }
+    pace_digest = hashlib.md5(
+        json.dumps(pace_zones_by_activity, sort_keys=True, default=str).encode()
+    ).hexdigest()[:12]
+    return user_ftp, pace_zones_by_activity, f'ftp={user_ftp}:pace={pace_digest}'
+
+
+def _compute_ride_metrics(ride, user_ftp, pace_zones_by_activity, metrics_calculator):
+    """
+    Card metrics for one ride at a given FTP / pace zones.
 
-                    # Calculate total time excluding warm up and cool down for percentage calculation
-                    main_workout_duration = total_duration * 0.75  # 75% of class is main workout
+    Plain data only (chart_data is a JSON string) so the result can be shared
+    through the cache by every user with the same targets.
+    """
+    ride_data = {
+        'tss': None,
+        'if_value': None,
+        'zone_data': None,
+        'chart_data': None,
+        'difficulty': None,
+    }
+
+    # Try to get from target_class_metrics first
+    if ride.target_class_metrics:
+        ride_data['tss'] = ride.target_class_metrics.get('total_expected_output') or ride.target_class_metrics.get('tss')
+        ride_data['if_value'] = ride.target_class_metrics.get('if') or ride.target_class_metrics.get('intensity_factor')
+
+    # Calculate zone distribution for chart
+    zone_distribution = []
+    if ride.class_type == 'power_zone' or ride.is_power_zone_class:
+        if user_ftp:
+            segments = ride.get_power_zone_segments(user_ftp=user_ftp)
+            if segments:
+                zone_times = {}
+                total_duration = ride.duration_seconds
+                warm_up_cutoff = total_duration * 0.15  # First 15% is warm up
+                cool_down_start = total_duration * 0.90  # Last 10% is cool down
+
+                for segment in segments:
+                    zone = segment.get('zone', 0)
+                    start = segment.get('start', 0)
+                    # Skip warm up and cool down segments
+                    if start < warm_up_cutoff or start >= cool_down_start:
+                        continue
+                    duration = segment.get('end', 0) - segment.get('start', 0)
+                    zone_times[zone] = zone_times.get(zone, 0) + duration
+
+                # Calculate total time excluding warm up and cool down for percentage calculation
+                main_workout_duration = total_duration * 0.75  # 75% of class is main workout
+
+                # Order zones from Zone 1 to Zone 7 for proper stacking (bottom to top)
+                for zone in range(1, 8):
+                    time_sec = zone_times.get(zone, 0)
+                    if time_sec > 0:
+                        percentage = (time_sec / main_workout_duration * 100) if main_workout_duration > 0 else 0
+                        zone_distribution.append({
+                            'zone': zone,
+                            'percentage': percentage
+                        })
 
-                    # Order zones from Zone 1 to Zone 7 for proper stacking (bottom to top)
-                    for zone in range(1, 8):
+                # Calculate TSS/IF if not already set
+                if ride_data['tss'] is None or ride_data['if_value'] is None:
+                    zone_power_percentages = metrics_calculator.ZONE_POWER_PERCENTAGES
+                    total_weighted_power = 0.0
+                    total_time = 0.0
+                    for zone_info in zone_distribution:
+                        zone = zone_info.get('zone')
                         time_sec = zone_times.get(zone, 0)
-                        if time_sec > 0:
-                            percentage = (time_sec / main_workout_duration * 100) if main_workout_duration > 0 else 0
-                            zone_distribution.append({
-                                'zone': zone,
-                                'percentage': percentage
-                            })
-
-                    # Calculate TSS/IF if not already set
-                    if ride_data['tss'] is None or ride_data['if_value'] is None:
-                        zone_power_percentages = metrics_calculator.ZONE_POWER_PERCENTAGES
-                        total_weighted_power = 0.0
-                        total_time = 0.0
-                        for zone_info in zone_distribution:
-                            zone = zone_info.get('zone')
-                            time_sec = zone_times.get(zone, 0)
-                            if zone and zone in zone_power_percentages and time_sec > 0:
-                                zone_power = user_ftp * zone_power_percentages[zone]
-                                total_weighted_power += zone_power * time_sec
-                                total_time += time_sec
-
-                        if total_time > 0:
-                            normalized_power = total_weighted_power / total_time
-                            ride_data['if_value'] = normalized_power / user_ftp
-                            ride_data['tss'] = (ride.duration_seconds / 3600.0) * (ride_data['if_value'] ** 2) * 100
-
-                    # Generate chart data for mini chart (including full class with warm up and cool down)
-                    if segments:
-                        chart_segments = []
-                        total_duration = ride.duration_seconds
-
-                        for i, segment in enumerate(segments):
-                            zone_num = segment.get('zone', 1)
-                            start = segment.get('start', 0)
-                            end = segment.get('end', 0)
-
-                            if start == end and i < len(segments) - 1:
-                                next_segment = segments[i + 1]
-                                end = next_segment.get('start', start + 60)
-                            elif start == end:
-                                end = start + 60
-
-                            duration = end - start
-                            if duration <= 0:
-                                continue
-
-                            chart_zone = max(1, min(7, int(zone_num)))
-                            chart_segments.append({
-                                'duration': duration,
-                                'zone': chart_zone,
-                                'start': start,
-                                'end': end,
-                            })
-
-                        if chart_segments:
-                            ride_data['chart_data'] = mark_safe(json.dumps({
-                                'type': 'power_zone',
-                                'segments': chart_segments,
-                                'total_duration': ride.duration_seconds,
-                                'zones': [
-                                    {'name': 'Zone 1', 'color': '#9333ea'},
-                                    {'name': 'Zone 2', 'color': '#3b82f6'},
-                                    {'name': 'Zone 3', 'color': '#10b981'},
-                                    {'name': 'Zone 4', 'color': '#eab308'},
-                                    {'name': 'Zone 5', 'color': '#f97316'},
-                                    {'name': 'Zone 6', 'color': '#ef4444'},
-                                    {'name': 'Zone 7', 'color': '#ec4899'},
-                                ]
-                            }))
-
-        elif ride.class_type == 'pace_target' or ride.fitness_discipline in ['running', 'walking', 'run', 'walk']:
-            activity_type = 'running'
-            if ride.fitness_discipline in ['walking', 'walk']:
-                activity_type = 'walking'
-            elif ride.workout_type and ride.workout_type.slug in ['walking', 'walk']:
-                activity_type = 'walking'
-            elif 'walk' in (ride.title or '').lower():
-                activity_type = 'walking'
-
-            chart_segments = []
-            zone_times = {}
-            zone_name_map = {0: 'recovery', 1: 'easy', 2: 'moderate', 3: 'challenging',
-                            4: 'hard', 5: 'very_hard', 6: 'max'}
-
-            if ride.target_metrics_data and isinstance(ride.target_metrics_data, dict):
-                target_metrics_list = ride.target_metrics_data.get('target_metrics', [])
-                if target_metrics_list:
-                    segments = ride.get_target_metrics_segments()
+                        if zone and zone in zone_power_percentages and time_sec > 0:
+                            zone_power = user_ftp * zone_power_percentages[zone]
+                            total_weighted_power += zone_power * time_sec
+                            total_time += time_sec
 
-                    total_duration = ride.duration_seconds
-                    warm_up_cutoff = total_duration * 0.15
-                    cool_down_start = total_duration * 0.90
-
-                    for segment in segments:
-                        if segment.get('type') == 'pace_target':
-                            start = segment.get('start', 0)
-                            if start < warm_up_cutoff or start >= cool_down_start:
-                                continue
-                            for metric in segment.get('metrics', []):
-                                if metric.get('name') == 'pace_target':
-                                    zone = metric.get('lower') or metric.get('upper')
-                                    if zone is not None:
-                                        zone = int(zone) - 1
-                                        duration = segment.get('end', 0) - segment.get('start', 0)
-                                        zone_times[zone] = zone_times.get(zone, 0) + duration
+                    if total_time > 0:
+                        normalized_power = total_weighted_power / total_time
+                        ride_data['if_value'] = normalized_power / user_ftp
+                        ride_data['tss'] = (ride.duration_seconds / 3600.0) * (ride_data['if_value'] ** 2) * 100
 
-                    for i, segment in enumerate(segments):
-                        if segment.get('type') == 'pace_target':
-                            for metric in segment.get('metrics', []):
-                                if metric.get('name') == 'pace_target':
-                                    zone = metric.get('lower') or metric.get('upper')
-                                    if zone is not None:
-                                        zone = int(zone) - 1
-                                        start = segment.get('start', 0)
-                                        end = segment.get('end', 0)
-
-                                        if start == end and i < len(segments) - 1:
-                                            next_segment = segments[i + 1] if i + 1 < len(segments) else None
-                                            if next_segment:
-                                                end = next_segment.get('start', start + 60)
-                                        elif start == end:
-                                            end = start + 60
-
-                                        duration = end - start
-                                        if duration <= 0:
-                                            continue
-
-                                        chart_segments.append({
-                                            'duration': duration,
-                                            'zone': zone,
-                                            'start': start,
-                                            'end': end,
-                                        })
-
-            if not chart_segments and hasattr(ride, 'get_pace_segments'):
-                pace_zones = user_profile.get_pace_zone_targets(activity_type=activity_type) if user_profile else None
-                pace_segments = ride.get_pace_segments(user_pace_zones=pace_zones)
-                if pace_segments:
+                # Generate chart data for mini chart (including full class with warm up and cool down)
+                if segments:
+                    chart_segments = []
                     total_duration = ride.duration_seconds
 
-                    for i, segment in enumerate(pace_segments):
+                    for i, segment in enumerate(segments):
                         zone_num = segment.get('zone', 1)
-                        zone = zone_num - 1
                         start = segment.get('start', 0)
                         end = segment.get('end', 0)
 
-                        if start == end and i < len(pace_segments) - 1:
-                            next_segment = pace_segments[i + 1]
+                        if start == end and i < len(segments) - 1:
+                            next_segment = segments[i + 1]
                             end = next_segment.get('start', start + 60)
                         elif start == end:
                             end = start + 60
@@ -207,91 +133,313 @@ def build_class_library_metrics(*, page_obj, user_profile, tss_filter, metrics_c
                         if duration <= 0:
                             continue
 
+                        chart_zone = max(1, min(7, int(zone_num)))
                         chart_segments.append({
                             'duration': duration,
-                            'zone': zone,
+                            'zone': chart_zone,
                             'start': start,
                             'end': end,
                         })
 
-                    total_duration = ride.duration_seconds
-                    warm_up_cutoff = total_duration * 0.15
-                    cool_down_start = total_duration * 0.90
+                    if chart_segments:
+                        ride_data['chart_data'] = json.dumps({
+                            'type': 'power_zone',
+                            'segments': chart_segments,
+                            'total_duration': ride.duration_seconds,
+                            'zones': [
+                                {'name': 'Zone 1', 'color': '#9333ea'},
+                                {'name': 'Zone 2', 'color': '#3b82f6'},
+                                {'name': 'Zone 3', 'color': '#10b981'},
+                                {'name': 'Zone 4', 'color': '#eab308'},
+                                {'name': 'Zone 5', 'color': '#f97316'},
+                                {'name': 'Zone 6', 'color': '#ef4444'},
+                                {'name': 'Zone 7', 'color': '#ec4899'},
+                            ]
+                        })
 
-                    for segment in pace_segments:
+    elif ride.class_type == 'pace_target' or ride.fitness_discipline in ['running', 'walking', 'run', 'walk']:
+        activity_type = 'running'
+        if ride.fitness_discipline in ['walking', 'walk']:
+            activity_type = 'walking'
+        elif ride.workout_type and ride.workout_type.slug in ['walking', 'walk']:
+            activity_type = 'walking'
+        elif 'walk' in (ride.title or '').lower():
+            activity_type = 'walking'
+
+        chart_segments = []
+        zone_times = {}
+        zone_name_map = {0: 'recovery', 1: 'easy', 2: 'moderate', 3: 'challenging',
+                        4: 'hard', 5: 'very_hard', 6: 'max'}
+
+        if ride.target_metrics_data and isinstance(ride.target_metrics_data, dict):
+            target_metrics_list = ride.target_metrics_data.get('target_metrics', [])
+            if target_metrics_list:
+                segments = ride.get_target_metrics_segments()
+
+                total_duration = ride.duration_seconds
+                warm_up_cutoff = total_duration * 0.15
+                cool_down_start = total_duration * 0.90
+
+                for segment in segments:
+                    if segment.get('type') == 'pace_target':
                         start = segment.get('start', 0)
                         if start < warm_up_cutoff or start >= cool_down_start:
                             continue
-                        zone_num = segment.get('zone', 1)
-                        zone = zone_num - 1
-                        duration = segment.get('end', 0) - segment.get('start', 0)
-                        zone_times[zone] = zone_times.get(zone, 0) + duration
-
-            if chart_segments:
-                ride_data['chart_data'] = mark_safe(json.dumps({
-                    'type': 'pace_target',
-                    'activity_type': activity_type,
-                    'segments': chart_segments,
-                    'total_duration': ride.duration_seconds,
-                    'zones': [
-                        {'name': 'Recovery', 'color': '#6f42c1'},
-                        {'name': 'Easy', 'color': '#4c6ef5'},
-                        {'name': 'Moderate', 'color': '#228be6'},
-                        {'name': 'Challenging', 'color': '#0ca678'},
-                        {'name': 'Hard', 'color': '#ff922b'},
-                        {'name': 'Very Hard', 'color': '#f76707'},
-                        {'name': 'Max', 'color': '#fa5252'},
-                    ]
-                }))
-
-            total_duration = ride.duration_seconds
-            main_workout_duration = total_duration * 0.75
-
-            if zone_times:
-                zone_order = ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']
-                for zone_name in zone_order:
+                        for metric in segment.get('metrics', []):
+                            if metric.get('name') == 'pace_target':
+                                zone = metric.get('lower') or metric.get('upper')
+                                if zone is not None:
+                                    zone = int(zone) - 1
+                                    duration = segment.get('end', 0) - segment.get('start', 0)
+                                    zone_times[zone] = zone_times.get(zone, 0) + duration
+
+                for i, segment in enumerate(segments):
+                    if segment.get('type') == 'pace_target':
+                        for metric in segment.get('metrics', []):
+                            if metric.get('name') == 'pace_target':
+                                zone = metric.get('lower') or metric.get('upper')
+                                if zone is not None:
+                                    zone = int(zone) - 1
+                                    start = segment.get('start', 0)
+                                    end = segment.get('end', 0)
+
+                                    if start == end and i < len(segments) - 1:
+                                        next_segment = segments[i + 1] if i + 1 < len(segments) else None
+                                        if next_segment:
+                                            end = next_segment.get('start', start + 60)
+                                    elif start == end:
+                                        end = start + 60
+
+                                    duration = end - start
+                                    if duration <= 0:
+                                        continue
+
+                                    chart_segments.append({
+                                        'duration': duration,
+                                        'zone': zone,
+                                        'start': start,
+                                        'end': end,
+                                    })
+
+        if not chart_segments and hasattr(ride, 'get_pace_segments'):
+            pace_zones = pace_zones_by_activity.get(activity_type)
+            pace_segments = ride.get_pace_segments(user_pace_zones=pace_zones)
+            if pace_segments:
+                total_duration = ride.duration_seconds
+
+                for i, segment in enumerate(pace_segments):
+                    zone_num = segment.get('zone', 1)
+                    zone = zone_num - 1
+                    start = segment.get('start', 0)
+                    end = segment.get('end', 0)
+
+                    if start == end and i < len(pace_segments) - 1:
+                        next_segment = pace_segments[i + 1]
+                        end = next_segment.get('start', start + 60)
+                    elif start == end:
+                        end = start + 60
+
+                    duration = end - start
+                    if duration <= 0:
+                        continue
+
+                    chart_segments.append({
+                        'duration': duration,
+                        'zone': zone,
+                        'start': start,
+                        'end': end,
+                    })
+
+                total_duration = ride.duration_seconds
+                warm_up_cutoff = total_duration * 0.15
+                cool_down_start = total_duration * 0.90
+
+                for segment in pace_segments:
+                    start = segment.get('start', 0)
+                    if start < warm_up_cutoff or start >= cool_down_start:
+                        continue
+                    zone_num = segment.get('zone', 1)
+                    zone = zone_num - 1
+                    duration = segment.get('end', 0) - segment.get('start', 0)
+                    zone_times[zone] = zone_times.get(zone, 0) + duration
+
+        if chart_segments:
+            ride_data['chart_data'] = json.dumps({
+                'type': 'pace_target',
+                'activity_type': activity_type,
+                'segments': chart_segments,
+                'total_duration': ride.duration_seconds,
+                'zones': [
+                    {'name': 'Recovery', 'color': '#6f42c1'},
+                    {'name': 'Easy', 'color': '#4c6ef5'},
+                    {'name': 'Moderate', 'color': '#228be6'},
+                    {'name': 'Challenging', 'color': '#0ca678'},
+                    {'name': 'Hard', 'color': '#ff922b'},
+                    {'name': 'Very Hard', 'color': '#f76707'},
+                    {'name': 'Max', 'color': '#fa5252'},
+                ]
+            })
+
+        total_duration = ride.duration_seconds
+        main_workout_duration = total_duration * 0.75
+
+        if zone_times:
+            zone_order = ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']
+            for zone_name in zone_order:
+                zone_num = [k for k, v in zone_name_map.items() if v == zone_name]
+                if zone_num:
+                    time_sec = zone_times.get(zone_num[0], 0) if zone_num else 0
+                    if time_sec > 0:
+                        percentage = (time_sec / main_workout_duration * 100) if main_workout_duration > 0 else 0
+                        zone_distribution.append({
+                            'zone': zone_name,
+                            'percentage': percentage
+                        })
+
+            if zone_distribution:
+                pace_zone_intensity_factors = {
+                    'recovery': 0.5, 'easy': 0.7, 'moderate': 1.0,
+                    'challenging': 1.15, 'hard': 1.3, 'very_hard': 1.5, 'max': 1.8
+                }
+                total_weighted_intensity = 0.0
+                total_time = 0.0
+                for zone_info in zone_distribution:
+                    zone_name = zone_info.get('zone')
                     zone_num = [k for k, v in zone_name_map.items() if v == zone_name]
-                    if zone_num:
-                        time_sec = zone_times.get(zone_num[0], 0) if zone_num else 0
-                        if time_sec > 0:
-                            percentage = (time_sec / main_workout_duration * 100) if main_workout_duration > 0 else 0
-                            zone_distribution.append({
-                                'zone': zone_name,
-                                'percentage': percentage
-                            })
-
-                if zone_distribution:
-                    pace_zone_intensity_factors = {
-                        'recovery': 0.5, 'easy': 0.7, 'moderate': 1.0,
-                        'challenging': 1.15, 'hard': 1.3, 'very_hard': 1.5, 'max': 1.8
-                    }
-                    total_weighted_intensity = 0.0
-                    total_time = 0.0
-                    for zone_info in zone_distribution:
-                        zone_name = zone_info.get('zone')
-                        zone_num = [k for k, v in zone_name_map.items() if v == zone_name]
-                        time_sec = zone_times.get(zone_num[0], 0) if zone_num else 0
-                        zone_if = pace_zone_intensity_factors.get(zone_name, 1.0)
-                        if time_sec > 0:
-                            total_weighted_intensity += zone_if * time_sec
-                            total_time += time_sec
+                    time_sec = zone_times.get(zone_num[0], 0) if zone_num else 0
+                    zone_if = pace_zone_intensity_factors.get(zone_name, 1.0)
+                    if time_sec > 0:
+                        total_weighted_intensity += zone_if * time_sec
+                        total_time += time_sec
 
-                    if total_time > 0:
-                        avg_intensity = total_weighted_intensity / total_time
-                        ride_data['difficulty'] = round((avg_intensity / 1.8) * 10, 1)
-                        ride_data['if_value'] = avg_intensity
-                        ride_data['tss'] = (ride.duration_seconds / 3600.0) * (avg_intensity ** 2) * 100
+                if total_time > 0:
+                    avg_intensity = total_weighted_intensity / total_time
+                    ride_data['difficulty'] = round((avg_intensity / 1.8) * 10, 1)
+                    ride_data['if_value'] = avg_intensity
+                    ride_data['tss'] = (ride.duration_seconds / 3600.0) * (avg_intensity ** 2) * 100
+
+    ride_data['zone_data'] = zone_distribution
+
+    return ride_data
+
+
+def build_class_library_metrics(*, page_obj, user_profile, metrics_calculator):
+    """
+    Build per-class card metrics for class_library view.
 
-        ride_data['zone_data'] = zone_distribution
+    Per-ride metrics are cached per (ride, FTP, pace zones) and dropped when
+    the ride changes (see TaggedCacheService.ride_tag). TSS/IF/zone filters
+    are applied to the queryset before pagination (see RideMetrics).
 
-        if tss_filter:
-            try:
-                tss_value = float(tss_filter)
-                if ride_data['tss'] is None or ride_data['tss'] < tss_value:
-                    continue
-            except (ValueError, TypeError):
-                pass
+    Returns:
+        List of ride_data dicts with tss/if/zone/chart/difficulty for each ride.
+    """
+    user_ftp, pace_zones_by_activity, targets_key = _user_targets(user_profile)
+
+    rides_with_metrics = []
+    for ride in page_obj:
+        ride_data = TaggedCacheService.get_or_set(
+            f'ctz:class_library:v{RIDE_METRICS_VERSION}:ride={ride.id}:{targets_key}',
+            lambda: _compute_ride_metrics(ride, user_ftp, pace_zones_by_activity, metrics_calculator),
+            tags=[TaggedCacheService.ride_tag(ride.id)],
+            namespace='class_library',
+        )
+        ride_data['ride'] = ride
+        if ride_data['chart_data']:
+            ride_data['chart_data'] = mark_safe(ride_data['chart_data'])
 
         rides_with_metrics.append(ride_data)
 
     return rides_with_metrics
+
+
+def _ride_metrics_row(ride, metrics_calculator):
+    """Unsaved RideMetrics for a ride (computed at INDEX_REFERENCE_FTP)."""
+    from workouts.models import RideMetrics
+
+    ride_data = _compute_ride_metrics(ride, INDEX_REFERENCE_FTP, {}, metrics_calculator)
+    row = RideMetrics(ride=ride, version=RIDE_METRICS_VERSION)
+    chart_type = json.loads(ride_data['chart_data'])['type'] if ride_data['chart_data'] else None
+    row.kind = {'power_zone': 'power', 'pace_target': 'pace'}.get(chart_type, '')
+
+    for entry in ride_data['zone_data'] or []:
+        zone = entry['zone']
+        if zone in PACE_ZONE_ORDER:
+            zone = PACE_ZONE_ORDER.index(zone) + 1
+        if isinstance(zone, int) and 1 <= zone <= 7:
+            setattr(row, f'zone_{zone}_pct', round(entry['percentage'], 2))
+    shares = [getattr(row, field) for field in ZONE_PCT_FIELDS]
+    if any(shares):
+        row.dominant_zone = shares.index(max(shares)) + 1
+
+    for field, value in (('tss', ride_data['tss']), ('intensity_factor', ride_data['if_value'])):
+        try:
+            setattr(row, field, float(value) if value is not None else None)
+        except (TypeError, ValueError):
+            setattr(row, field, None)
+    row.difficulty = ride_data['difficulty']
+    return row
+
+
+def refresh_ride_metrics(rides):
+    """
+    Recompute and upsert the RideMetrics index rows of the given rides.
+
+    Called when ride details are stored (sync upserts and RideDetail saves);
+    see also the backfill_ride_metrics command.
+
+    Returns:
+        int: rows written
+    """
+    from workouts.models import RideMetrics
+    from workouts.services.metrics import MetricsCalculator
+
+    metrics_calculator = MetricsCalculator()
+    rows = []
+    for ride in rides:
+        try:
+            rows.append(_ride_metrics_row(ride, metrics_calculator))
+        except Exception as e:
+            logger.warning(f"Could not compute library metrics for ride {ride.pk}: {e}")
+    if rows:
+        RideMetrics.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['ride'],
+            update_fields=[
+                'version', 'kind', 'tss', 'intensity_factor', 'difficulty', 'dominant_zone', 'updated_at',
+            ] + ZONE_PCT_FIELDS,
+        )
+    return len(rows)
+
+
+def zone_kind_for_type(workout_type_slug):
+    """RideMetrics kind ('power' / 'pace') whose zones a workout type filter refers to."""
+    return 'pace' if workout_type_slug in PACE_ZONE_TYPES else 'power'
+
+
+def zone_mix_filter(zone, min_percent=None, kind='power'):
+    """
+    Q over `library_metrics` for rides of `kind` with at least `min_percent`
+    of the main set in `zone`, else with `zone` as the dominant one.
+
+    Power zones and pace levels share the zone columns, so `kind` is always
+    part of the condition.
+
+    Raises:
+        ValueError / TypeError: zone or min_percent is not a number
+
+    Returns:
+        Q, or None when the zone is outside 1..7
+    """
+    from django.db.models import Q
+
+    zone = int(zone)
+    if not 1 <= zone <= 7:
+        return None
+    if min_percent:
+        condition = Q(**{f'library_metrics__zone_{zone}_pct__gte': float(min_percent)})
+    else:
+        condition = Q(library_metrics__dominant_zone=zone)
+    return condition & Q(library_metrics__kind=kind)
@@ -92,7 +92,12 @@ def class_library(request):
     class_filter.apply_duration_filter(request.GET.get('duration', ''))
     class_filter.apply_year_filter(request.GET.get('year', ''))
     class_filter.apply_month_filter(request.GET.get('year', ''), request.GET.get('month', ''))
-    class_filter.apply_ordering(request.GET.get('order_by', '-original_air_time'))
+    # TSS / IF / zone mix come from the RideMetrics index, so they filter the whole catalog
+    class_filter.apply_tss_filter(request.GET.get('tss', ''))
+    class_filter.apply_intensity_filter(request.GET.get('if_min', ''), request.GET.get('if_max', ''))
+    class_filter.apply_zone_filter(request.GET.get('zone', ''), request.GET.get('zone_min', ''))
+    # No explicit order: newest first, or best matches first when searching
+    class_filter.apply_ordering(request.GET.get('order_by', ''))
     
     rides = class_filter.get_queryset()
     filters = class_filter.get_filters()
@@ -106,8 +111,11 @@ def class_library(request):
     month_filter = filters.get('month', '')
     order_by = filters.get('order_by', '-original_air_time')
     
-    # TSS filter (not part of ClassLibraryFilter yet - applied post-metrics calculation)
-    tss_filter = request.GET.get('tss', '')
+    tss_filter = filters.get('tss', '')
+    if_min_filter = filters.get('if_min', '')
+    if_max_filter = filters.get('if_max', '')
+    zone_filter = filters.get('zone', '')
+    zone_min_filter = filters.get('zone_min', '')
     
     # Pagination
     paginator = Paginator(rides, 12)  # 12 rides per page
@@ -154,7 +162,6 @@ def class_library(request):
     rides_with_metrics = build_class_library_metrics(
         page_obj=page_obj,
         user_profile=user_profile,
-        tss_filter=tss_filter,
         metrics_calculator=metrics_calculator,
     )
     
@@ -189,9 +196,9 @@ def class_library(request):
         from accounts.walking_pace_levels_data import DEFAULT_WALKING_PACE_LEVELS
         
         # Running pace zones (7 zones)
-        running_pace_entry = request.user.pace_entries.filter(activity_type='running', is_active=True).first()
-        if running_pace_entry and running_pace_entry.level in DEFAULT_RUNNING_PACE_LEVELS:
-            level_data = DEFAULT_RUNNING_PACE_LEVELS[running_pace_entry.level]
+        running_pace_level = request.user.profile.get_current_pace('running')
+        if running_pace_level in DEFAULT_RUNNING_PACE_LEVELS:
+            level_data = DEFAULT_RUNNING_PACE_LEVELS[running_pace_level]
             user_running_pace_zones = {}
             for zone_name, (min_mph, max_mph, min_pace, max_pace, desc) in level_data.items():
                 # Use min_pace (the faster/lower end of the range) as target
@@ -199,9 +206,9 @@ def class_library(request):
                 user_running_pace_zones[zone_name] = int(min_pace * 60)
         
         # Walking pace zones (5 zones)
-        walking_pace_entry = request.user.pace_entries.filter(activity_type='walking', is_active=True).first()
-        if walking_pace_entry and walking_pace_entry.level in DEFAULT_WALKING_PACE_LEVELS:
-            level_data = DEFAULT_WALKING_PACE_LEVELS[walking_pace_entry.level]
+        walking_pace_level = request.user.profile.get_current_pace('walking')
+        if walking_pace_level in DEFAULT_WALKING_PACE_LEVELS:
+            level_data = DEFAULT_WALKING_PACE_LEVELS[walking_pace_level]
             user_walking_pace_zones = {}
             for zone_name, (min_mph, max_mph, min_pace, max_pace, desc) in level_data.items():
                 # Use min_pace (the faster/lower end of the range) as target
@@ -221,6 +228,10 @@ def class_library(request):
         'instructor_filter': instructor_filter,
         'duration_filter': duration_filter,
         'tss_filter': tss_filter,
+        'if_min_filter': if_min_filter,
+        'if_max_filter': if_max_filter,
+        'zone_filter': zone_filter,
+        'zone_min_filter': zone_min_filter,
         'workout_types': workout_types,
         'instructors': instructors,
         'durations': durations,
@@ -852,13 +863,7 @@ def class_detail(request, pk):
             
             # If no active PaceEntry, try to get the latest PaceEntry regardless of is_active status
             if user_pace_level is None:
-                from accounts.models import PaceEntry
-                latest_pace_entry = PaceEntry.objects.filter(
-                    user=request.user,
-                    activity_type=activity_type
-                ).order_by('-recorded_date', '-created_at').first()
-                if latest_pace_entry:
-                    user_pace_level = latest_pace_entry.level
+                user_pace_level = user_profile.get_target_timeline().latest_pace(activity_type)
             
             # Fallback to pace_target_level if no PaceEntry exists at all
             if user_pace_level is None:
@@ -1579,13 +1584,7 @@ def class_detail(request, pk):
             
             # If no active PaceEntry, try to get the latest PaceEntry regardless of is_active status
             if user_pace_level is None:
-                from accounts.models import PaceEntry
-                latest_pace_entry = PaceEntry.objects.filter(
-                    user=request.user,
-                    activity_type=activity_type
-                ).order_by('-recorded_date', '-created_at').first()
-                if latest_pace_entry:
-                    user_pace_level = latest_pace_entry.level
+                user_pace_level = user_profile.get_target_timeline().latest_pace(activity_type)
             
             # Fallback to old system: pace_target_level (deprecated but still used as fallback)
             if user_pace_level is None:
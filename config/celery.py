@@ -32,6 +32,9 @@ app.conf.task_routes = {
     'workouts.tasks.batch_fetch_ride_details': {'queue': 'ride_details'},
     'workouts.tasks.fetch_performance_graph_task': {'queue': 'performance_graphs'},
     'workouts.tasks.batch_fetch_performance_graphs': {'queue': 'performance_graphs'},
+    'workouts.tasks.run_workout_sync_job': {'queue': 'workouts'},
+    'workouts.tasks.sync_*': {'queue': 'workouts'},
+    'plans.tasks.*': {'queue': 'workouts'},
 }
 
 app.conf.task_queues = (
@@ -51,4 +54,18 @@ app.conf.beat_schedule = {
         'schedule': crontab(minute=0),
         'args': (120,),
     },
+    'resume-stalled-sync-jobs-every-5-minutes': {
+        'task': 'workouts.tasks.resume_stalled_sync_jobs',
+        'schedule': crontab(minute='*/5'),
+        'args': (10,),
+    },
+    # Recaps for the current year open on December 21st
+    'prewarm-recaps-on-december-21': {
+        'task': 'plans.tasks.prewarm_recaps_task',
+        'schedule': crontab(minute=0, hour=2, day_of_month=21, month_of_year=12),
+    },
+    'rebuild-instructor-index-nightly': {
+        'task': 'recommender.tasks.rebuild_instructor_index_task',
+        'schedule': crontab(minute=30, hour=3),
+    },
 }
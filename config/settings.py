@@ -1,6 +1,9 @@
 # DRF spectacular: set schema class
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Cursor pages of 100 (?page_size= up to 1000), see api/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultCursorPagination',
+    'PAGE_SIZE': 100,
 }
 """
 Django settings for config project.
@@ -306,6 +309,24 @@ CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes max per task
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes soft limit
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # Process one task at a time for better memory usage
 CELERY_TASK_ACKS_LATE = True  # Acknowledge tasks after completion
+# Worker processes per host (celery -c); unset lets Celery use the CPU count.
+# Also sizes the per-process share of PELOTON_API_RATE_LIMIT.
+CELERY_WORKER_CONCURRENCY = int(os.environ['CELERY_WORKER_CONCURRENCY']) if os.environ.get('CELERY_WORKER_CONCURRENCY') else None
+
+# Peloton API root; point at a local stand-in (manage.py fake_peloton_server) for load tests
+PELOTON_API_BASE_URL = os.environ.get('PELOTON_API_BASE_URL', 'https://api.onepeloton.com')
+
+# Async Peloton client (peloton/async_client.py). The rate limit is global when
+# PELOTON_API_RATE_LIMIT_SHARED keeps the token bucket in Redis; without it (or
+# while Redis is down) each worker process gets RATE_LIMIT / CELERY_WORKER_CONCURRENCY.
+PELOTON_API_RATE_LIMIT = float(os.environ.get('PELOTON_API_RATE_LIMIT', '10'))  # requests/second
+PELOTON_API_RATE_BURST = int(os.environ.get('PELOTON_API_RATE_BURST', '20'))
+PELOTON_API_RATE_LIMIT_SHARED = os.environ.get('PELOTON_API_RATE_LIMIT_SHARED', 'True') == 'True'
+PELOTON_API_CONCURRENCY = int(os.environ.get('PELOTON_API_CONCURRENCY', '20'))  # in-flight requests per fan-out
+PELOTON_API_POOL_SIZE = int(os.environ.get('PELOTON_API_POOL_SIZE', '50'))
+PELOTON_API_MAX_RETRIES = int(os.environ.get('PELOTON_API_MAX_RETRIES', '5'))
+# Keep raw API responses for offline re-parsing (workouts/services/payload_archive.py)
+PELOTON_PAYLOAD_ARCHIVE = os.environ.get('PELOTON_PAYLOAD_ARCHIVE', 'True') == 'True'
 
 # Remember-me and secure session cookie settings
 REMEMBER_ME_DAYS = int(os.environ.get('REMEMBER_ME_DAYS', '30'))
@@ -315,9 +336,29 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
 
 
-CACHES = {
-  "default": {
-    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    "LOCATION": "ctz-local",
-  }
-}
\ No newline at end of file
+# Shared Redis cache (dashboard, metrics, class library, eddington; see
+# core.services.TaggedCacheService). Falls back to a per-process cache for
+# local dev when REDIS_CACHE_URL is not set.
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "TIMEOUT": 60 * 60,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": 2,
+                "SOCKET_TIMEOUT": 2,
+                # A Redis outage degrades to cache misses instead of errors
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+      "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ctz-local",
+      }
+    }
\ No newline at end of file
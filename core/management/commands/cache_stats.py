@@ -0,0 +1,36 @@
+"""
+Management command to show shared cache hit/miss counters.
+
+Counters are kept per namespace by TaggedCacheService (dashboard, metrics,
+class library, eddington) and shared by every worker when Redis is configured.
+
+Usage:
+    python manage.py cache_stats
+    python manage.py cache_stats --reset
+"""
+from django.core.management.base import BaseCommand
+
+from core.services import TaggedCacheService
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the shared view cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Zero the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        namespaces = TaggedCacheService.NAMESPACES
+        for namespace, counts in TaggedCacheService.stats(namespaces).items():
+            hit_rate = f"{counts['hit_rate']}%" if counts['hit_rate'] is not None else '-'
+            self.stdout.write(
+                f"{namespace:<16} hits={counts['hits']:<8} misses={counts['misses']:<8} hit rate={hit_rate}"
+            )
+
+        if options['reset']:
+            TaggedCacheService.reset_stats(namespaces)
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -4,6 +4,7 @@ from .challenge_service import ChallengeService
 from .zone_calculator import ZoneCalculatorService
 from .activity_toggle import ActivityToggleService
 from .plan_processor import PlanProcessorService
+from .tagged_cache import TaggedCacheService
 
-__all__ = ['DateRangeService', 'FormattingService', 'ChallengeService', 'ZoneCalculatorService', 'ActivityToggleService', 'PlanProcessorService']
+__all__ = ['DateRangeService', 'FormattingService', 'ChallengeService', 'ZoneCalculatorService', 'ActivityToggleService', 'PlanProcessorService', 'TaggedCacheService']
 
@@ -0,0 +1,217 @@
+"""Shared cache with tag-based invalidation and hit/miss counters."""
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class TaggedCacheService:
+    """Cache entries tagged with the data they depend on.
+
+    Each tag (``user:{id}:workouts``, ``ride:{id}``, ...) has a version stored
+    in the cache. Entries are saved together with the versions of their tags,
+    and invalidating a tag bumps its version, so every entry built from the
+    old version reads as a miss without having to find and delete it.
+
+    With the Redis backend (see ``CACHES`` in settings) tags, entries and the
+    hit/miss counters are shared by every web and Celery worker.
+    """
+
+    KEY_PREFIX = 'ctz'
+    DEFAULT_TIMEOUT = 60 * 60
+
+    # Namespaces the views count hits/misses under (see the cache_stats command)
+    NAMESPACES = ('dashboard', 'dashboard_plans', 'metrics', 'class_library', 'eddington', 'targets')
+
+    @staticmethod
+    def user_workouts_tag(user_id: int) -> str:
+        """Tag for data derived from a user's workouts."""
+        return f'user:{user_id}:workouts'
+
+    @staticmethod
+    def user_targets_tag(user_id: int) -> str:
+        """Tag for data derived from a user's FTP / pace levels."""
+        return f'user:{user_id}:targets'
+
+    @staticmethod
+    def user_plans_tag(user_id: int) -> str:
+        """Tag for data derived from a user's weekly plans and challenges."""
+        return f'user:{user_id}:plans'
+
+    @staticmethod
+    def ride_tag(ride_id: int) -> str:
+        """Tag for data derived from a class (RideDetail)."""
+        return f'ride:{ride_id}'
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f'{TaggedCacheService.KEY_PREFIX}:tag:{tag}'
+
+    @staticmethod
+    def _counter_key(namespace: str, outcome: str) -> str:
+        return f'{TaggedCacheService.KEY_PREFIX}:stats:{namespace}:{outcome}'
+
+    @staticmethod
+    def _tag_versions(tags: Iterable[str], found: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Current version of each tag, creating versions for unseen tags.
+
+        New versions are time based so a tag evicted from the cache never
+        comes back with a version an old entry was stored with.
+        """
+        keys = {tag: TaggedCacheService._tag_key(tag) for tag in tags}
+        if found is None:
+            found = cache.get_many(list(keys.values()))
+        versions = {}
+        for tag, key in keys.items():
+            version = found.get(key)
+            if version is None:
+                cache.add(key, time.time_ns(), None)
+                version = cache.get(key)
+            versions[tag] = version
+        return versions
+
+    @staticmethod
+    def _count(namespace: str, outcome: str) -> None:
+        key = TaggedCacheService._counter_key(namespace, outcome)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key)
+
+    @staticmethod
+    def _lookup(key: str, tags: list, namespace: str):
+        """One round trip for the entry and its tags; counts the hit/miss.
+
+        Returns:
+            Tuple of (hit, value, current tag versions)
+        """
+        found = cache.get_many([key] + [TaggedCacheService._tag_key(tag) for tag in tags])
+        versions = TaggedCacheService._tag_versions(tags, found)
+        entry = found.get(key)
+        if entry is not None and entry[0] == versions:
+            TaggedCacheService._count(namespace, 'hit')
+            return True, entry[1], versions
+        TaggedCacheService._count(namespace, 'miss')
+        return False, None, versions
+
+    @staticmethod
+    def get(key: str, tags: Iterable[str] = (), namespace: str = 'default') -> Any:
+        """Return a cached value, or None if missing or any of its tags changed.
+
+        Args:
+            key: Cache key
+            tags: Tags the entry was stored with
+            namespace: Name the hit/miss is counted under
+        """
+        return TaggedCacheService._lookup(key, list(tags), namespace)[1]
+
+    @staticmethod
+    def set(key: str, value: Any, tags: Iterable[str] = (), timeout: Optional[int] = None,
+            versions: Optional[Dict[str, int]] = None) -> None:
+        """Store a value with the current versions of its tags.
+
+        Args:
+            key: Cache key
+            value: Picklable value
+            tags: Tags the value depends on
+            timeout: Seconds to keep the entry (default DEFAULT_TIMEOUT)
+            versions: Tag versions read before the value was computed
+        """
+        if versions is None:
+            versions = TaggedCacheService._tag_versions(tags)
+        cache.set(key, (versions, value), timeout or TaggedCacheService.DEFAULT_TIMEOUT)
+
+    @staticmethod
+    def get_or_set(key: str, compute: Callable[[], Any], tags: Iterable[str] = (),
+                   timeout: Optional[int] = None, namespace: str = 'default') -> Any:
+        """Return the cached value or compute, store and return it.
+
+        Tag versions are read before computing, so an invalidation that lands
+        while the value is being computed still makes the stored entry stale.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            tags: Tags the value depends on
+            timeout: Seconds to keep the entry (default DEFAULT_TIMEOUT)
+            namespace: Name the hit/miss is counted under
+        """
+        tags = list(tags)
+        hit, value, versions = TaggedCacheService._lookup(key, tags, namespace)
+        if not hit:
+            value = compute()
+            TaggedCacheService.set(key, value, tags, timeout=timeout, versions=versions)
+        return value
+
+    @staticmethod
+    def invalidate(*tags: str) -> None:
+        """Make every entry stored with any of the tags stale."""
+        for tag in tags:
+            try:
+                cache.incr(TaggedCacheService._tag_key(tag))
+            except ValueError:
+                # Never used (or evicted): no entry can carry a current version
+                pass
+            except Exception as e:
+                logger.warning(f"Could not invalidate cache tag {tag}: {e}")
+
+    @staticmethod
+    def invalidate_on_commit(*tags: str) -> None:
+        """Invalidate once the current transaction commits (immediately outside one).
+
+        Invalidating before the commit would let another worker rebuild the
+        entry from the old rows under the new tag version.
+        """
+        if tags:
+            transaction.on_commit(lambda: TaggedCacheService.invalidate(*tags))
+
+    @staticmethod
+    def invalidate_user(user_id: int, workouts: bool = False, targets: bool = False,
+                        plans: bool = False) -> None:
+        """Invalidate a user's tags (any combination) once the transaction commits."""
+        tags = []
+        if workouts:
+            tags.append(TaggedCacheService.user_workouts_tag(user_id))
+        if targets:
+            tags.append(TaggedCacheService.user_targets_tag(user_id))
+        if plans:
+            tags.append(TaggedCacheService.user_plans_tag(user_id))
+        TaggedCacheService.invalidate_on_commit(*tags)
+
+    @staticmethod
+    def stats(namespaces: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters per namespace.
+
+        Returns:
+            Dictionary of namespace -> {'hits', 'misses', 'hit_rate'}
+        """
+        namespaces = list(namespaces)
+        keys = {
+            (namespace, outcome): TaggedCacheService._counter_key(namespace, outcome)
+            for namespace in namespaces for outcome in ('hit', 'miss')
+        }
+        found = cache.get_many(list(keys.values()))
+        result = {}
+        for namespace in namespaces:
+            hits = found.get(keys[(namespace, 'hit')]) or 0
+            misses = found.get(keys[(namespace, 'miss')]) or 0
+            total = hits + misses
+            result[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / total * 100, 1) if total else None,
+            }
+        return result
+
+    @staticmethod
+    def reset_stats(namespaces: Iterable[str]) -> None:
+        """Zero the hit/miss counters of the given namespaces."""
+        cache.delete_many([
+            TaggedCacheService._counter_key(namespace, outcome)
+            for namespace in namespaces for outcome in ('hit', 'miss')
+        ])
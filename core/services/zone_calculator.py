@@ -1,7 +1,6 @@
 """Zone calculation services for workouts (cycling and running)."""
 from typing import Dict, Any, Optional
 from datetime import date
-from collections import defaultdict
 
 
 class ZoneCalculatorService:
@@ -14,7 +13,8 @@ class ZoneCalculatorService:
         Args:
             workouts: QuerySet of Workout objects
             period: Time period filter - 'month', 'year', or None for all time
-            current_ftp: FTP (Functional Threshold Power) entry object for zone calculations
+            current_ftp: Unused; zones use the FTP in effect on each workout's date.
+                Kept for backwards compatibility.
             
         Returns:
             Dictionary with zone breakdown including times and formatted strings
@@ -25,8 +25,9 @@ class ZoneCalculatorService:
             >>> print(zones['total_formatted'])   # 'Formatted total time'
         """
         from django.utils import timezone
-        from django.db.models import Q
-        from workouts.models import WorkoutPerformanceData
+        from workouts.services.zone_times import (
+            CYCLING_WORKOUTS_Q, KIND_POWER, ensure_zone_times, sum_zone_times,
+        )
         
         today = timezone.now().date()
         
@@ -40,97 +41,13 @@ class ZoneCalculatorService:
         # period == 'all' or None means all time
         
         # Filter to cycling workouts only - try multiple ways to detect cycling
-        cycling_workout_ids = workouts.filter(
-            Q(ride_detail__fitness_discipline__in=['cycling', 'ride']) |
-            Q(ride_detail__workout_type__slug__in=['cycling', 'ride']) |
-            Q(ride_detail__workout_type__name__icontains='cycle') |
-            Q(ride_detail__workout_type__name__icontains='bike')
-        ).values_list('id', flat=True)
+        cycling_workout_ids = workouts.filter(CYCLING_WORKOUTS_Q).values_list('id', flat=True)
         
-        if not cycling_workout_ids:
-            # Return empty zones if no workouts
-            zone_times = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0}
-        else:
-            # Initialize zone times (in seconds)
-            zone_times = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0}
-            
-            # Get user's FTP for calculating zones if power_zone is not set
-            user_ftp = None
-            if current_ftp:
-                user_ftp = float(current_ftp.ftp_value)
-            
-            # Get performance data in bulk - only fetch what we need
-            perf_data_qs = WorkoutPerformanceData.objects.filter(
-                workout_id__in=cycling_workout_ids
-            ).select_related('workout', 'workout__ride_detail').order_by('workout_id', 'timestamp').only(
-                'workout_id', 'timestamp', 'power_zone', 'output', 'workout__ride_detail__duration_seconds'
-            )
-            
-            # Group by workout for efficient processing
-            perf_by_workout = defaultdict(list)
-            for perf in perf_data_qs:
-                perf_by_workout[perf.workout_id].append(perf)
-            
-            # Process workouts in batches
-            for workout_id, perf_list in perf_by_workout.items():
-                if not perf_list:
-                    continue
-                
-                # Sort by timestamp
-                perf_list.sort(key=lambda x: x.timestamp)
-                
-                # Calculate time interval (assume consistent intervals)
-                if len(perf_list) > 1:
-                    time_interval = perf_list[1].timestamp - perf_list[0].timestamp
-                else:
-                    # Single data point - use workout duration if available
-                    duration = perf_list[0].workout.ride_detail.duration_seconds if perf_list[0].workout.ride_detail else None
-                    time_interval = duration if duration else 5
-                
-                # Process data points - sample every Nth point if too many to speed up
-                sample_rate = 1
-                if len(perf_list) > 1000:  # If more than 1000 points, sample every 2nd
-                    sample_rate = 2
-                elif len(perf_list) > 2000:  # If more than 2000 points, sample every 3rd
-                    sample_rate = 3
-                
-                for i in range(0, len(perf_list), sample_rate):
-                    perf = perf_list[i]
-                    zone = None
-                    
-                    # First try to use power_zone field if available
-                    if perf.power_zone and perf.power_zone in zone_times:
-                        zone = perf.power_zone
-                    # Otherwise, calculate zone from output and FTP
-                    elif perf.output and user_ftp:
-                        percentage = perf.output / user_ftp
-                        if percentage < 0.55:
-                            zone = 1
-                        elif percentage < 0.75:
-                            zone = 2
-                        elif percentage < 0.90:
-                            zone = 3
-                        elif percentage < 1.05:
-                            zone = 4
-                        elif percentage < 1.20:
-                            zone = 5
-                        elif percentage < 1.50:
-                            zone = 6
-                        else:
-                            zone = 7
-                    
-                    if zone and zone in zone_times:
-                        # Calculate time for this data point
-                        if i + sample_rate < len(perf_list):
-                            # Time until next sampled point
-                            time_spent = (perf_list[i + sample_rate].timestamp - perf.timestamp) * sample_rate
-                        else:
-                            # Last data point - use average interval
-                            time_spent = time_interval * sample_rate
-                        
-                        # Ensure time is positive and reasonable
-                        if time_spent > 0 and time_spent < 300:  # Max 5 minutes per interval
-                            zone_times[zone] += time_spent
+        # Sum the stored per-workout zone vectors (computed once per workout at
+        # the FTP in effect on its date; any missing ones are filled in first)
+        ensure_zone_times(cycling_workout_ids, KIND_POWER)
+        totals = sum_zone_times(cycling_workout_ids, KIND_POWER)
+        zone_times = {zone: totals[zone - 1] for zone in range(1, 8)}
         
         # Convert to formatted time strings and return
         total_seconds = sum(zone_times.values())
@@ -166,8 +83,11 @@ class ZoneCalculatorService:
             >>> print(zones['total_formatted'])        # 'Formatted total time'
         """
         from django.utils import timezone
-        from django.db.models import Q
-        from workouts.models import WorkoutPerformanceData, Workout
+        from django.db.models import Exists, OuterRef, Q
+        from workouts.models import Workout, WorkoutZoneTime
+        from workouts.services.zone_times import (
+            KIND_PACE, PACE_ZONE_KEYS, RUNNING_WORKOUTS_Q, ensure_zone_times, sum_zone_times,
+        )
         
         today = timezone.now().date()
         
@@ -182,132 +102,29 @@ class ZoneCalculatorService:
         
         # Filter to running workouts only - try multiple ways to detect running
         running_workout_ids = workouts.filter(
-            Q(ride_detail__fitness_discipline__in=['running', 'run', 'walking']) |
-            Q(ride_detail__fitness_discipline__isnull=True, ride_detail__workout_type__slug__in=['running', 'run', 'walking']) |
-            Q(ride_detail__workout_type__slug__in=['running', 'run', 'walking']) |
-            Q(ride_detail__workout_type__name__icontains='run') |
-            Q(ride_detail__workout_type__name__icontains='walk') |
-            Q(ride_detail__workout_type__name__icontains='tread')
-        ).values_list('id', flat=True).distinct()
-        
-        # Initialize zone times (in seconds)
-        zone_times = {
-            'recovery': 0,
-            'easy': 0,
-            'moderate': 0,
-            'challenging': 0,
-            'hard': 0,
-            'very_hard': 0,
-            'max': 0
-        }
+            RUNNING_WORKOUTS_Q |
+            Q(ride_detail__fitness_discipline__isnull=True, ride_detail__workout_type__slug__in=['running', 'run', 'walking'])
+        ).values_list('id', flat=True)
         
-        if not running_workout_ids:
-            # Return empty zones if no workouts
-            pass
-        else:
-            # Get performance data in bulk - only fetch what we need
-            perf_data_qs = WorkoutPerformanceData.objects.filter(
-                workout_id__in=running_workout_ids
-            ).select_related('workout', 'workout__ride_detail').order_by('workout_id', 'timestamp').only(
-                'workout_id', 'timestamp', 'intensity_zone', 'speed', 'heart_rate', 'workout__ride_detail__duration_seconds'
-            )
-            
-            # Group by workout for efficient processing
-            perf_by_workout = defaultdict(list)
-            workouts_without_data = set(running_workout_ids)
-            
-            for perf in perf_data_qs:
-                perf_by_workout[perf.workout_id].append(perf)
-                workouts_without_data.discard(perf.workout_id)
-            
-            # Handle workouts without performance data
-            if workouts_without_data:
-                workouts_no_data = Workout.objects.filter(
-                    id__in=workouts_without_data
-                ).select_related('ride_detail').only('id', 'ride_detail__duration_seconds')
-                
-                for workout in workouts_no_data:
-                    if workout.ride_detail and workout.ride_detail.duration_seconds:
-                        duration = workout.ride_detail.duration_seconds
-                        # Rough estimate: most running is in easy/moderate zones
-                        zone_times['easy'] += duration * 0.3
-                        zone_times['moderate'] += duration * 0.4
-                        zone_times['challenging'] += duration * 0.2
-                        zone_times['hard'] += duration * 0.1
-            
-            # Process workouts with performance data
-            for workout_id, perf_list in perf_by_workout.items():
-                if not perf_list:
-                    continue
-                
-                # Sort by timestamp
-                perf_list.sort(key=lambda x: x.timestamp)
-                
-                # Calculate time interval
-                if len(perf_list) > 1:
-                    time_interval = perf_list[1].timestamp - perf_list[0].timestamp
-                else:
-                    duration = perf_list[0].workout.ride_detail.duration_seconds if perf_list[0].workout.ride_detail else None
-                    time_interval = duration if duration else 5
-                
-                # Process data points - sample every Nth point if too many to speed up
-                sample_rate = 1
-                if len(perf_list) > 1000:  # If more than 1000 points, sample every 2nd
-                    sample_rate = 2
-                elif len(perf_list) > 2000:  # If more than 2000 points, sample every 3rd
-                    sample_rate = 3
-                
-                for i in range(0, len(perf_list), sample_rate):
-                    perf = perf_list[i]
-                    zone = None
-                    
-                    # First try to use intensity_zone field if available
-                    if perf.intensity_zone and perf.intensity_zone in zone_times:
-                        zone = perf.intensity_zone
-                    # Fallback: try to calculate zone from speed or heart rate if available
-                    elif perf.speed:
-                        avg_speed = perf.speed
-                        if avg_speed < 4.0:
-                            zone = 'recovery'
-                        elif avg_speed < 5.5:
-                            zone = 'easy'
-                        elif avg_speed < 7.0:
-                            zone = 'moderate'
-                        elif avg_speed < 8.5:
-                            zone = 'challenging'
-                        elif avg_speed < 10.0:
-                            zone = 'hard'
-                        elif avg_speed < 12.0:
-                            zone = 'very_hard'
-                        else:
-                            zone = 'max'
-                    elif perf.heart_rate:
-                        hr = perf.heart_rate
-                        if hr < 120:
-                            zone = 'recovery'
-                        elif hr < 140:
-                            zone = 'easy'
-                        elif hr < 160:
-                            zone = 'moderate'
-                        elif hr < 175:
-                            zone = 'challenging'
-                        elif hr < 185:
-                            zone = 'hard'
-                        elif hr < 195:
-                            zone = 'very_hard'
-                        else:
-                            zone = 'max'
-                    
-                    if zone and zone in zone_times:
-                        # Calculate time for this data point
-                        if i + sample_rate < len(perf_list):
-                            time_spent = (perf_list[i + sample_rate].timestamp - perf.timestamp) * sample_rate
-                        else:
-                            time_spent = time_interval * sample_rate
-                        
-                        # Ensure time is positive and reasonable
-                        if time_spent > 0 and time_spent < 300:  # Max 5 minutes per interval
-                            zone_times[zone] += time_spent
+        # Sum the stored per-workout zone vectors (pace zones at the pace level in
+        # effect on each workout's date; any missing ones are filled in first)
+        ensure_zone_times(running_workout_ids, KIND_PACE)
+        totals = sum_zone_times(running_workout_ids, KIND_PACE)
+        zone_times = dict(zip(PACE_ZONE_KEYS, totals))
+        
+        # Workouts without any samples: rough estimate from class length
+        # (most running is in easy/moderate zones)
+        workouts_no_data = Workout.objects.filter(
+            id__in=running_workout_ids,
+            ride_detail__duration_seconds__gt=0,
+        ).exclude(
+            Exists(WorkoutZoneTime.objects.filter(workout_id=OuterRef('pk'), kind=KIND_PACE))
+        ).values_list('ride_detail__duration_seconds', flat=True)
+        for duration in workouts_no_data:
+            zone_times['easy'] += duration * 0.3
+            zone_times['moderate'] += duration * 0.4
+            zone_times['challenging'] += duration * 0.2
+            zone_times['hard'] += duration * 0.1
         
         total_seconds = sum(zone_times.values())
         
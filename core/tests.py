@@ -1321,3 +1321,57 @@ class WorkoutTargetsTests(TestCase):
         # Zone 3 at 82.5% of FTP 200 = 165 watts
         self.assertEqual(targets[60]['target_output'], 165)
 
+
+
+from django.core.cache import cache
+from core.services import TaggedCacheService
+
+
+class TaggedCacheServiceTests(TestCase):
+    """Tests for TaggedCacheService"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_or_set_computes_once(self):
+        """A second read is served from the cache."""
+        calls = []
+        compute = lambda: calls.append(1) or {'value': 42}
+
+        first = TaggedCacheService.get_or_set('k', compute, tags=['user:1:workouts'], namespace='dashboard')
+        second = TaggedCacheService.get_or_set('k', compute, tags=['user:1:workouts'], namespace='dashboard')
+
+        self.assertEqual(first, {'value': 42})
+        self.assertEqual(second, {'value': 42})
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidate_tag_makes_entry_stale(self):
+        """Invalidating any tag of an entry turns it into a miss."""
+        TaggedCacheService.set('k', 'old', tags=['user:1:workouts', 'ride:5'])
+        self.assertEqual(TaggedCacheService.get('k', ['user:1:workouts', 'ride:5']), 'old')
+
+        TaggedCacheService.invalidate('ride:5')
+
+        self.assertIsNone(TaggedCacheService.get('k', ['user:1:workouts', 'ride:5']))
+
+    def test_invalidate_other_tag_keeps_entry(self):
+        """Entries of other users survive an invalidation."""
+        TaggedCacheService.set('k', 'value', tags=[TaggedCacheService.user_workouts_tag(1)])
+
+        TaggedCacheService.invalidate(TaggedCacheService.user_workouts_tag(2))
+
+        self.assertEqual(TaggedCacheService.get('k', [TaggedCacheService.user_workouts_tag(1)]), 'value')
+
+    def test_stats_count_hits_and_misses(self):
+        """Hits and misses are counted per namespace."""
+        TaggedCacheService.get_or_set('k', lambda: 1, namespace='metrics')
+        TaggedCacheService.get_or_set('k', lambda: 1, namespace='metrics')
+        TaggedCacheService.get_or_set('k', lambda: 1, namespace='metrics')
+
+        stats = TaggedCacheService.stats(['metrics', 'eddington'])
+
+        self.assertEqual(stats['metrics'], {'hits': 2, 'misses': 1, 'hit_rate': 66.7})
+        self.assertEqual(stats['eddington'], {'hits': 0, 'misses': 0, 'hit_rate': None})
+
+        TaggedCacheService.reset_stats(['metrics'])
+        self.assertEqual(TaggedCacheService.stats(['metrics'])['metrics']['hits'], 0)
@@ -1,9 +1,9 @@
 from django.conf import settings
 import redis
 
-def get_redis_client():
+def get_redis_client(**kwargs):
     url = getattr(settings, 'REDIS_URL', None) or getattr(settings, 'CELERY_BROKER_URL', None) or 'redis://localhost:6379/0'
-    return redis.from_url(url)
+    return redis.from_url(url, **kwargs)
 
 
 class RedisLock:
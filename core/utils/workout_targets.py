@@ -101,6 +101,37 @@ def target_segment_at_time_with_shift(segments: List[Dict], t_seconds: int, shif
     return None
 
 
+def target_segments_at_times(segments: List[Dict], timestamps: List[int], shift_seconds: int = 0) -> List[Optional[Dict]]:
+    """
+    Target segment dict (or None) for every timestamp, like calling
+    target_segment_at_time_with_shift per timestamp but with the segments
+    compiled once (see workouts.services.segment_timeline).
+
+    Args:
+        segments: List of segment dicts with 'start', 'end' keys
+        timestamps: Timestamps in seconds (non-int entries get None)
+        shift_seconds: Time shift to apply (negative = earlier, positive = later)
+
+    Returns:
+        List of segment dicts / None, one per timestamp
+    """
+    from workouts.services.segment_timeline import segment_lookup_timeline
+
+    result = [None] * len(timestamps)
+    if not segments:
+        return result
+    try:
+        s = int(shift_seconds or 0)
+    except Exception:
+        s = 0
+    positions = [i for i, t in enumerate(timestamps) if isinstance(t, int)]
+    timeline = segment_lookup_timeline(segments, s)
+    for i, index in zip(positions, timeline.values_at([timestamps[i] for i in positions])):
+        if index is not None:
+            result[i] = segments[index]
+    return result
+
+
 def extract_spin_up_intervals(ride_detail) -> List[Dict[str, int]]:
     """
     Return list of {'start': int, 'end': int} intervals covering Spin Ups segments.
@@ -220,10 +251,6 @@ def calculate_target_line_from_segments(
             7: 1.60,    # Z7: 160% (sprint target)
         }
     
-    sample_count = len(seconds_array)
-    target_series = [None] * sample_count
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    
     # Shift target line 60 seconds backwards
     TIME_SHIFT = -60
     
@@ -264,108 +291,22 @@ def calculate_target_line_from_segments(
                 return round(lower * 1.25)
         return None
     
-    base_segments = list(segments or [])
-
-    # Process each segment from the class plan
-    for segment in base_segments:
-        zone_num = segment.get('zone')
-        if not zone_num:
-            continue
-        
-        # Shift segment times 60 seconds backwards
-        start_time = max(0, segment.get('start', 0) + TIME_SHIFT)
-        end_time = max(0, segment.get('end', 0) + TIME_SHIFT)
-        
-        if end_time <= start_time:
-            continue
-        
-        # Skip segments that start after the workout ends
-        if max_timestamp is not None and start_time > max_timestamp:
-            continue
-        
-        # Calculate target watts for this zone (middle of zone range)
-        target_watts = _zone_to_watts(zone_num)
-        if target_watts is None:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = target_watts
-
-    # Fill any gaps (None values) using spin-up intervals (treated as Zone 1 unless specified)
-    if spin_up_intervals:
-        for interval in spin_up_intervals:
-            if not isinstance(interval, dict):
-                continue
-            start_raw = interval.get('start')
-            end_raw = interval.get('end')
-            if start_raw is None or end_raw is None:
-                continue
-            try:
-                start_val = int(start_raw)
-                end_val = int(end_raw)
-            except (TypeError, ValueError):
-                continue
-            if end_val <= start_val:
-                continue
-
-            # Shift interval to match chart alignment
-            start_time = max(0, start_val + TIME_SHIFT)
-            end_time = max(0, end_val + TIME_SHIFT)
-            if end_time <= start_time:
-                continue
-            if max_timestamp is not None and start_time > max_timestamp:
-                continue
-
-            spin_zone = interval.get('zone') or 1
-            target_watts = _zone_to_watts(spin_zone)
-            if target_watts is None:
-                continue
-
-            start_idx = 0
-            end_idx = sample_count
-
-            for i, timestamp in enumerate(seconds_array):
-                if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                    start_idx = i
-                    break
+    from workouts.services.segment_timeline import power_zone_timeline, target_line
 
-            for i in range(len(seconds_array) - 1, -1, -1):
-                timestamp = seconds_array[i]
-                if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                    end_idx = i + 1
-                    break
+    # Target watts of every zone the plan uses; zones without one are skipped
+    zone_watts = {}
+    candidates = [segment.get('zone') for segment in segments]
+    candidates += [interval.get('zone') or 1 for interval in (spin_up_intervals or []) if isinstance(interval, dict)]
+    for zone_num in candidates:
+        if zone_num and zone_num not in zone_watts:
+            target_watts = _zone_to_watts(zone_num)
+            if target_watts is not None:
+                zone_watts[zone_num] = target_watts
 
-            for i in range(start_idx, min(end_idx, sample_count)):
-                if target_series[i] is None:
-                    target_series[i] = target_watts
-    
-    # Convert to list of {timestamp, target_output} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_output': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    timeline = power_zone_timeline(
+        segments, zone_watts, spin_up_intervals=spin_up_intervals, shift=TIME_SHIFT
+    )
+    return target_line(timeline, seconds_array, zone_watts, 'target_output')
 
 
 def calculate_pace_target_line_from_segments(segments: List[Dict], seconds_array: List[int]) -> List[Dict[str, Any]]:
@@ -391,61 +332,10 @@ def calculate_pace_target_line_from_segments(segments: List[Dict], seconds_array
     if not segments or not seconds_array:
         return []
     
-    sample_count = len(seconds_array)
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    target_series = [None] * sample_count
-    
-    # Process each segment from the class plan
-    for idx, segment in enumerate(segments):
-        # Get pace zone/level (0-6)
-        zone_num = segment.get('zone') or segment.get('pace_level')
-        if zone_num is None:
-            continue
-        
-        # Ensure zone is in 0-6 range
-        zone_num = max(0, min(6, int(zone_num)))
-        
-        # Get segment times (no shift for pace targets)
-        start_time = max(0, segment.get('start', 0))
-        end_time = max(0, segment.get('end', 0))
-        
-        if end_time <= start_time:
-            continue
-        
-        # Skip segments that start after the workout ends
-        if max_timestamp is not None and start_time > max_timestamp:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = zone_num
-    
-    # Convert to list of {timestamp, target_pace_zone} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_pace_zone': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    from workouts.services.segment_timeline import pace_zone_timeline, target_line
+
+    timeline = pace_zone_timeline(segments)
+    return target_line(timeline, seconds_array, {zone: zone for zone in range(7)}, 'target_pace_zone')
 
 
 def calculate_power_zone_target_line(
@@ -489,79 +379,12 @@ def calculate_power_zone_target_line(
     # Shift target line 60 seconds backwards
     TIME_SHIFT = -60
     
-    # Create target series array matching seconds_array length
-    sample_count = len(seconds_array)
-    target_series = [None] * sample_count
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    
-    # Helper function to calculate target watts from zone number
-    def _zone_to_watts(zone_num):
-        if zone_num and zone_num in zone_power_percentages:
-            return round(user_ftp * zone_power_percentages[zone_num])
-        return None
-    
-    # Process each target metric segment
-    for segment in target_metrics_list:
-        if segment.get('segment_type') != 'power_zone':
-            continue
-            
-        offsets = segment.get('offsets', {})
-        # Shift segment times 60 seconds backwards
-        start_offset = max(0, offsets.get('start', 0) + TIME_SHIFT)
-        end_offset = max(0, offsets.get('end', 0) + TIME_SHIFT)
-        
-        if start_offset is None or end_offset is None or end_offset <= start_offset:
-            continue
-        
-        # Skip segments that start after the workout ends
-        if max_timestamp is not None and start_offset > max_timestamp:
-            continue
-        
-        # Extract zone number from metrics
-        zone_num = None
-        for metric in segment.get('metrics', []):
-            if metric.get('name') == 'power_zone':
-                zone_lower = metric.get('lower')
-                zone_upper = metric.get('upper')
-                # Use lower if they match, otherwise use lower
-                zone_num = zone_lower if zone_lower == zone_upper else zone_lower
-                break
-        
-        if zone_num is None:
-            continue
-        
-        # Calculate target watts for this zone
-        target_watts = _zone_to_watts(zone_num)
-        if target_watts is None:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_offset:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_offset:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = target_watts
-    
-    # Convert to list of {timestamp, target_output} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_output': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    from workouts.services.segment_timeline import target_metrics_zone_timeline, target_line
+
+    zone_watts = {
+        zone_num: round(user_ftp * percentage)
+        for zone_num, percentage in zone_power_percentages.items()
+        if zone_num
+    }
+    timeline = target_metrics_zone_timeline(target_metrics_list, zone_watts, shift=TIME_SHIFT)
+    return target_line(timeline, seconds_array, zone_watts, 'target_output')
@@ -2,7 +2,6 @@ from datetime import date, timedelta
 import json
 
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.db.models import Avg, Count, DateField, F, Sum
 from django.db.models.expressions import ExpressionWrapper
 from django.db.models.functions import TruncWeek
@@ -10,12 +9,13 @@ from django.shortcuts import render
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 
-from core.services import DateRangeService
+from core.services import DateRangeService, TaggedCacheService
 from plans.services import get_dashboard_period, get_dashboard_challenge_context
 
 
-def _dash_cache_key(user_id: int, period: str, hide_manual: bool) -> str:
-    return f"ctz:dash:v3:user={user_id}:period={period}:hide_manual={int(hide_manual)}"
+def _dash_cache_key(user_id: int, period: str, hide_manual: bool, today: date) -> str:
+    # The day is part of the key: periods and "this week/month" roll over at midnight
+    return f"ctz:dash:v4:user={user_id}:period={period}:hide_manual={int(hide_manual)}:day={today.isoformat()}"
 
 
 def _pace_str_from_mph(mph):
@@ -63,10 +63,11 @@ def dashboard(request):
         current_week_start=current_week_start,
     )
 
-    # Cached analytics (heavy)
+    # Cached analytics (heavy), dropped as soon as a sync changes the user's workouts
     # -----------------------------
-    key = _dash_cache_key(request.user.pk, period, hide_manual)
-    cached = cache.get(key)
+    key = _dash_cache_key(request.user.pk, period, hide_manual, today)
+    cache_tags = [TaggedCacheService.user_workouts_tag(request.user.pk)]
+    cached = TaggedCacheService.get(key, cache_tags, namespace="dashboard")
 
     from workouts.models import Workout  # cheap import, keep here
 
@@ -279,22 +280,16 @@ def dashboard(request):
         avg_speed = running_kpis_raw.get("avg_speed")
         if not avg_speed:
             try:
-                from workouts.models import WorkoutPerformanceData
-                avg_speed = WorkoutPerformanceData.objects.filter(
-                    workout__in=running_period,
-                    speed__isnull=False,
-                ).aggregate(avg_speed=Avg("speed")).get("avg_speed")
+                from workouts.services.time_series import channel_mean
+                avg_speed = channel_mean(running_period.values_list("id", flat=True), "speed")
             except Exception:
                 avg_speed = None
 
         avg_walk_speed = walking_kpis_raw.get("avg_speed")
         if not avg_walk_speed:
             try:
-                from workouts.models import WorkoutPerformanceData
-                avg_walk_speed = WorkoutPerformanceData.objects.filter(
-                    workout__in=walking_period,
-                    speed__isnull=False,
-                ).aggregate(avg_speed=Avg("speed")).get("avg_speed")
+                from workouts.services.time_series import channel_mean
+                avg_walk_speed = channel_mean(walking_period.values_list("id", flat=True), "speed")
             except Exception:
                 avg_walk_speed = None
 
@@ -362,7 +357,7 @@ def dashboard(request):
             "walking_kpis": walking_kpis,
         }
 
-        cache.set(key, cached, 60)  # 60s
+        TaggedCacheService.set(key, cached, cache_tags)
 
     # Ensure recent_workouts is always present (non-cached)
     cached = {**cached, "recent_workouts": recent_workouts}
@@ -1,38 +1,357 @@
-"""AsyncPelotonClient prototype (aiohttp-based).
+"""Async Peloton API client (aiohttp-based).
 
-This is a minimal async HTTP client scaffold for Peloton endpoints.
-It is a prototype to use when converting synchronous fetches to async/batched calls.
+`AsyncPelotonClient` mirrors `PelotonClient` method for method so callers can
+fan out many requests at once (ride details, performance graphs, ...) instead
+of fetching them one by one.
 
-Note: `aiohttp` must be added to `requirements.txt` and the runtime image
-must install it to actually use this class.
+Each worker process keeps:
+
+* one event loop (`run_async`) so pooled connections survive between tasks,
+* one pooled `aiohttp.TCPConnector` shared by every client in the process,
+* one token-bucket limiter capping requests per second to Peloton. With
+  PELOTON_API_RATE_LIMIT_SHARED the bucket lives in Redis, so the limit holds
+  across every worker process; otherwise (or while Redis is unreachable) each
+  process enforces its share of it, PELOTON_API_RATE_LIMIT divided by
+  CELERY_WORKER_CONCURRENCY.
+
+Requests that hit 429/5xx or a network error are retried with jittered
+exponential backoff; a 401 triggers the optional token refresh hook once.
 """
+from __future__ import annotations
+
+import asyncio
+import atexit
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from django.conf import settings
+
+from .services.peloton import BEARER_TOKEN_DEFAULT_TTL_SECONDS, DEFAULT_BASE_URL, PelotonAPIError
+
 try:
     import aiohttp
 except Exception:  # pragma: no cover - aiohttp may not be installed yet
     aiohttp = None
 
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+TokenRefresher = Callable[[], Union[str, Awaitable[str]]]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class PelotonRateLimitError(PelotonAPIError):
+    """Raised when Peloton keeps answering 429 after every retry."""
+
+
+# ------------------------------------------------------------------------------
+# Rate limiting
+# ------------------------------------------------------------------------------
+class AsyncTokenBucket:
+    """
+    Token bucket shared by every coroutine in a process.
+
+    `acquire()` reserves a token immediately (the balance may go negative)
+    and sleeps for however long that reservation needs to become valid, so
+    no lock is needed and concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RedisTokenBucket:
+    """
+    Token bucket kept in Redis and shared by every worker process.
+
+    The refill and reservation run in one Lua script, so processes never race
+    on the balance; like `AsyncTokenBucket` a reservation may go negative and
+    the caller sleeps until it becomes valid. While Redis is unreachable the
+    `fallback` bucket (this process's share of the limit) is used instead.
+    """
+
+    KEY = 'ratelimit:peloton-api'
+    RETRY_REDIS_AFTER = 30.0  # seconds on the fallback before trying Redis again
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate) - 1
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+    if tokens >= 0 then
+        return 0
+    end
+    return math.ceil(-tokens / rate * 1000)
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 fallback: Optional[AsyncTokenBucket] = None, client=None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.fallback = fallback or AsyncTokenBucket(rate, capacity)
+        self._client = client
+        self._script = None
+        self._redis_down_until = 0.0
+
+    def _get_script(self):
+        if self._script is None:
+            if self._client is None:
+                from core.utils.redis_lock import get_redis_client
+
+                self._client = get_redis_client(socket_connect_timeout=0.5, socket_timeout=0.5)
+            self._script = self._client.register_script(self.SCRIPT)
+        return self._script
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                wait_ms = self._get_script()(keys=[self.KEY], args=[self.rate, self.capacity])
+                return int(wait_ms) / 1000.0
+            except Exception as exc:
+                logger.warning(
+                    'Shared Peloton rate limiter unavailable (%s); using the per-process limit for %ss',
+                    exc, self.RETRY_REDIS_AFTER,
+                )
+                self._redis_down_until = time.monotonic() + self.RETRY_REDIS_AFTER
+        return self.fallback.reserve()
+
+    async def acquire(self) -> None:
+        # The Redis round trip is blocking I/O; keep it off the event loop
+        delay = await asyncio.to_thread(self.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rate_limiter: Optional[Union[AsyncTokenBucket, RedisTokenBucket]] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def worker_concurrency() -> int:
+    """Worker processes per host sharing the limit (CELERY_WORKER_CONCURRENCY, else CPU count)."""
+    return max(int(_setting('CELERY_WORKER_CONCURRENCY', None) or os.cpu_count() or 1), 1)
+
+
+def get_rate_limiter() -> Union[AsyncTokenBucket, RedisTokenBucket]:
+    """
+    Return the process-wide limiter for PELOTON_API_RATE_LIMIT requests/second.
+
+    The shared Redis bucket enforces the limit across all workers; the local
+    bucket (used on its own when PELOTON_API_RATE_LIMIT_SHARED is off, or as
+    the Redis fallback) gets this process's share of the rate and burst.
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            rate = _setting('PELOTON_API_RATE_LIMIT', 10)
+            burst = _setting('PELOTON_API_RATE_BURST', None)
+            processes = worker_concurrency()
+            local = AsyncTokenBucket(
+                rate=rate / processes,
+                capacity=max(burst / processes, 1) if burst is not None else None,
+            )
+            if _setting('PELOTON_API_RATE_LIMIT_SHARED', False):
+                _rate_limiter = RedisTokenBucket(rate=rate, capacity=burst, fallback=local)
+            else:
+                _rate_limiter = local
+        return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """Drop the process-wide limiter so the next request rebuilds it from settings."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+# ------------------------------------------------------------------------------
+# Per-process event loop and connection pool
+# ------------------------------------------------------------------------------
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_connector = None
+_connector_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return this process's event loop, creating a fresh one after a fork."""
+    global _loop, _loop_pid, _connector, _connector_loop
+    pid = os.getpid()
+    if _loop is None or _loop.is_closed() or _loop_pid != pid:
+        _loop = asyncio.new_event_loop()
+        _loop_pid = pid
+        # A connector inherited across fork (or from a closed loop) is unusable
+        _connector = None
+        _connector_loop = None
+    return _loop
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the process-wide event loop and return its result.
+
+    Celery tasks are synchronous; running every batch on the same loop is what
+    lets the shared connector keep its pooled connections between tasks.
+    """
+    with _loop_lock:
+        loop = _get_loop()
+        return loop.run_until_complete(coro)
+
+
+def get_shared_connector():
+    """Return the pooled connector for the running loop (created on first use)."""
+    global _connector, _connector_loop
+    if aiohttp is None:
+        raise RuntimeError("aiohttp is not installed; add it to requirements to use AsyncPelotonClient")
+    loop = asyncio.get_running_loop()
+    if _connector is None or _connector.closed or _connector_loop is not loop:
+        _connector = aiohttp.TCPConnector(
+            limit=_setting('PELOTON_API_POOL_SIZE', 50),
+            limit_per_host=_setting('PELOTON_API_POOL_SIZE_PER_HOST', 50),
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        _connector_loop = loop
+    return _connector
+
+
+@atexit.register
+def close_shared_connector():
+    """Close pooled connections at worker shutdown."""
+    global _connector
+    if _connector is not None and _loop_pid == os.getpid() and not _loop.is_closed():
+        try:
+            _loop.run_until_complete(_connector.close())
+        except Exception:
+            pass
+    _connector = None
 
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[str] = None) -> float:
+    """
+    Full-jitter exponential backoff for retry number `attempt` (0-based).
+
+    A numeric Retry-After header is honoured as a lower bound.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, min(cap, float(retry_after)))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
+# ------------------------------------------------------------------------------
+# Client
+# ------------------------------------------------------------------------------
 class AsyncPelotonClient:
-    def __init__(self, session=None, base_url="https://api.onepeloton.com", timeout=30, headers=None, cookies=None):
-        self._session = session
-        self._own_session = False
+    """Async counterpart of `PelotonClient` with pooling, rate limiting and retries."""
+
+    def __init__(
+        self,
+        bearer_token: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: int = 30,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        token_refresher: Optional[TokenRefresher] = None,
+        rate_limiter: Optional[Union[AsyncTokenBucket, RedisTokenBucket]] = None,
+        max_retries: Optional[int] = None,
+        session=None,
+    ) -> None:
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        # Optional headers/cookies to pass to aiohttp session (useful for auth)
-        self.headers = headers or {}
+        self.headers = dict(headers or {})
         self.cookies = cookies or None
+        if bearer_token:
+            self.headers['Authorization'] = f"Bearer {bearer_token}"
+        self.token_refresher = token_refresher
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = max_retries if max_retries is not None else _setting('PELOTON_API_MAX_RETRIES', 5)
+        self._session = session
+        self._own_session = False
+        self._refresh_future: Optional[asyncio.Future] = None
+
+    @classmethod
+    def for_connection(cls, connection, **kwargs) -> "AsyncPelotonClient":
+        """
+        Build a client authenticated as a PelotonConnection.
+
+        Headers come from the synchronous client (so both send the same browser
+        headers); on 401 the connection's token is refreshed and saved.
+        """
+        sync_client = connection.get_client()
+        cookies = None
+        try:
+            cookies = sync_client.session.cookies.get_dict() or None
+        except Exception:
+            cookies = None
+
+        async def _refresh():
+            from asgiref.sync import sync_to_async
+            return await sync_to_async(refresh_connection_token, thread_sensitive=False)(connection)
+
+        kwargs.setdefault('token_refresher', _refresh)
+        return cls(
+            base_url=sync_client.base_url,
+            timeout=sync_client.timeout,
+            headers=dict(sync_client.session.headers),
+            cookies=cookies,
+            **kwargs,
+        )
 
     async def __aenter__(self):
         if self._session is None:
             if aiohttp is None:
                 raise RuntimeError("aiohttp is not installed; add it to requirements to use AsyncPelotonClient")
-            # Propagate optional headers and cookies to the aiohttp session
-            session_kwargs = {}
-            if self.headers:
-                session_kwargs['headers'] = self.headers
-            if self.cookies:
-                session_kwargs['cookies'] = self.cookies
-            self._session = aiohttp.ClientSession(**session_kwargs)
+            self._session = aiohttp.ClientSession(
+                connector=get_shared_connector(),
+                connector_owner=False,
+                cookies=self.cookies,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
             self._own_session = True
         return self
 
@@ -40,26 +359,302 @@ class AsyncPelotonClient:
         if self._own_session and self._session is not None:
             await self._session.close()
             self._session = None
+            self._own_session = False
 
-    async def _get(self, path, params=None, headers=None):
-        if aiohttp is None:
-            raise RuntimeError("aiohttp is not installed; add it to requirements to use AsyncPelotonClient")
-        url = f"{self.base_url}{path}"
-        async with self._session.get(url, params=params, headers=headers, timeout=self.timeout) as resp:
-            resp.raise_for_status()
-            return await resp.json()
+    # ------------------------------------------------------------------------------
+    # Users & Workouts
+    # ------------------------------------------------------------------------------
+    async def fetch_user_workouts_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        page: int = 0,
+        sort_by: str = "-created_at,-pk",
+        cursor: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"page": page, "limit": limit, "sort_by": sort_by}
+        if cursor:
+            params.update(cursor)
+        return await self._get(f"/api/user/{user_id}/workouts", params=params)
 
-    async def fetch_ride_details(self, ride_id):
-        """Fetch ride details for a given Peloton ride id.
+    async def iter_user_workouts(
+        self,
+        user_id: str,
+        limit: int = 20,
+        page: int = 0,
+        page_count: Optional[int] = None,
+        sort_by: str = "-created_at,-pk",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield individual workout list entries for the given user."""
+        current_page = page
+        fetched_pages = 0
+        cursor = None
+        while True:
+            payload = await self.fetch_user_workouts_page(
+                user_id, limit=limit, page=current_page, sort_by=sort_by, cursor=cursor
+            )
+            for item in payload.get("data", []):
+                yield item
 
-        Example endpoint path is a best-effort placeholder — update to match
-        the actual API used elsewhere in the codebase when integrating.
-        """
-        return await self._get(f"/api/ride/{ride_id}")
+            fetched_pages += 1
+            cursor = payload.get("next")
+            if not payload.get("show_next") or (page_count and fetched_pages >= page_count):
+                break
+            current_page += 1
 
-    async def fetch_workout(self, workout_id):
+    async def fetch_workout(self, workout_id: str) -> Dict[str, Any]:
         return await self._get(f"/api/workout/{workout_id}")
 
-    async def fetch_performance_graph(self, workout_id, every_n=5):
-        params = {"every_n": every_n}
-        return await self._get(f"/api/workout/{workout_id}/performance_graph", params=params)
+    async def fetch_performance_graph(self, workout_id: str, every_n: int = 5) -> Dict[str, Any]:
+        """Fetch the performance graph, normalised the same way as `PelotonClient`."""
+        payload = await self._get(
+            f"/api/workout/{workout_id}/performance_graph",
+            params={"every_n": every_n},
+        )
+        payload.setdefault("segment_length", payload.get("sample_interval", every_n))
+        payload.setdefault("duration", payload.get("duration_sec") or payload.get("duration_secs"))
+        payload.setdefault("metrics", payload.get("metrics") or [])
+        return payload
+
+    async def fetch_ride_details(self, ride_id: str) -> Dict[str, Any]:
+        return await self._get(f"/api/ride/{ride_id}/details")
+
+    async def fetch_playlist(self, ride_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a ride's playlist; None when the class has none (404)."""
+        try:
+            return await self._get(f"/api/ride/{ride_id}/playlist")
+        except PelotonAPIError as e:
+            if getattr(e, 'status', None) == 404:
+                logger.debug(f"Playlist not found for ride_id {ride_id} (404) - this is normal for some class types")
+                return None
+            raise
+
+    async def fetch_user(self, user_id: str) -> Dict[str, Any]:
+        return await self._get(f"/api/user/{user_id}")
+
+    # ------------------------------------------------------------------------------
+    # Instructors
+    # ------------------------------------------------------------------------------
+    async def fetch_instructor(self, instructor_id: str) -> Dict[str, Any]:
+        return await self._get(f"/api/instructor/{instructor_id}")
+
+    async def fetch_all_instructors(self, limit: int = 20, page: int = 0) -> Dict[str, Any]:
+        return await self._get("/api/instructor", params={"page": page, "limit": limit})
+
+    async def iter_all_instructors(self, limit: int = 20) -> AsyncIterator[Dict[str, Any]]:
+        """Yield individual instructor entries, handling pagination automatically."""
+        current_page = 0
+        cursor = None
+        while True:
+            params: Dict[str, Any] = {"page": current_page, "limit": limit}
+            if cursor:
+                params.update(cursor)
+            payload = await self._get("/api/instructor", params=params)
+            for item in payload.get("data", []):
+                yield item
+
+            cursor = payload.get("next")
+            if not payload.get("show_next"):
+                break
+            current_page += 1
+
+    # ------------------------------------------------------------------------------
+    # Rides/Classes Library
+    # ------------------------------------------------------------------------------
+    async def fetch_archived_rides(
+        self,
+        page: int = 0,
+        limit: int = 20,
+        fitness_discipline: Optional[str] = None,
+        start_date: Optional[int] = None,
+        end_date: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        params = self._archived_params(page, limit, fitness_discipline, start_date, end_date)
+        return await self._get("/api/v2/ride/archived", params=params)
+
+    async def iter_archived_rides(
+        self,
+        limit: int = 20,
+        fitness_discipline: Optional[str] = None,
+        start_date: Optional[int] = None,
+        end_date: Optional[int] = None,
+        max_pages: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield individual archived ride entries, handling pagination automatically."""
+        current_page = 0
+        fetched_pages = 0
+        cursor = None
+        while True:
+            params = self._archived_params(current_page, limit, fitness_discipline, start_date, end_date)
+            if cursor:
+                params.update(cursor)
+            try:
+                payload = await self._get("/api/v2/ride/archived", params=params)
+            except PelotonAPIError as e:
+                logger.warning(f"Error fetching archived rides page {current_page}: {e}")
+                break
+
+            data = payload.get("data", []) if isinstance(payload, dict) else payload
+            for item in data or []:
+                yield item
+
+            fetched_pages += 1
+            if not isinstance(payload, dict):
+                break
+            cursor = payload.get("next")
+            if not payload.get("show_next", False) or (max_pages and fetched_pages >= max_pages):
+                break
+            current_page += 1
+
+    @staticmethod
+    def _archived_params(page, limit, fitness_discipline, start_date, end_date) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"page": page, "limit": limit}
+        if fitness_discipline:
+            params["fitness_discipline"] = fitness_discipline
+        if start_date:
+            params["start_date"] = start_date
+        if end_date:
+            params["end_date"] = end_date
+        return params
+
+    # ------------------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------------------
+    async def fetch_many(
+        self,
+        method: str,
+        keys: Iterable[Any],
+        concurrency: Optional[int] = None,
+        **kwargs,
+    ) -> Dict[Any, Any]:
+        """
+        Call `method(key, **kwargs)` for every key concurrently.
+
+        Returns:
+            dict: key -> result, or the exception raised for that key
+        """
+        keys = list(dict.fromkeys(keys))
+        semaphore = asyncio.Semaphore(concurrency or _setting('PELOTON_API_CONCURRENCY', 20))
+        func = getattr(self, method)
+
+        async def _one(key):
+            async with semaphore:
+                try:
+                    return key, await func(key, **kwargs)
+                except Exception as e:
+                    return key, e
+
+        return dict(await asyncio.gather(*(_one(key) for key in keys)))
+
+    # ------------------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------------------
+    async def _refresh_auth(self) -> bool:
+        """Run the token refresh hook once, even if many requests got a 401 at the same time."""
+        if not self.token_refresher:
+            return False
+        if self._refresh_future is None:
+            self._refresh_future = asyncio.ensure_future(self._call_refresher())
+        try:
+            token = await asyncio.shield(self._refresh_future)
+        except Exception as e:
+            logger.warning(f"Token refresh failed: {e}")
+            return False
+        finally:
+            if self._refresh_future is not None and self._refresh_future.done():
+                self._refresh_future = None
+        if not token:
+            return False
+        self.headers['Authorization'] = f"Bearer {token}"
+        return True
+
+    async def _call_refresher(self) -> Optional[str]:
+        token = self.token_refresher()
+        if inspect.isawaitable(token):
+            token = await token
+        return token
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if self._session is None:
+            raise RuntimeError("AsyncPelotonClient must be used as an async context manager")
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        refreshed = False
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                async with self._session.get(url, params=params or {}, headers=self.headers) as resp:
+                    if resp.status == 401 and not refreshed and self.token_refresher:
+                        refreshed = True
+                        if await self._refresh_auth():
+                            continue
+                    if resp.status in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        delay = backoff_delay(attempt, retry_after=resp.headers.get('Retry-After'))
+                        logger.debug(f"Peloton API {resp.status} for {path}; retry {attempt + 1} in {delay:.2f}s")
+                        attempt += 1
+                        await asyncio.sleep(delay)
+                        continue
+                    return await self._raise_for_status(resp)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if attempt >= self.max_retries:
+                    raise PelotonAPIError(f"Peloton API request failed: {exc}") from exc
+                delay = backoff_delay(attempt)
+                logger.debug(f"Peloton API network error for {path}: {exc}; retry {attempt + 1} in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _raise_for_status(resp) -> Dict[str, Any]:
+        if resp.status >= 400:
+            text = await resp.text()
+            try:
+                payload = await resp.json(content_type=None)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict) and payload.get("message"):
+                message = f"Peloton API error {resp.status}: {payload['message']}"
+            else:
+                message = f"Peloton API error {resp.status}: {text[:200]}"
+            error_cls = PelotonRateLimitError if resp.status == 429 else PelotonAPIError
+            error = error_cls(message)
+            error.status = resp.status
+            raise error
+        try:
+            return await resp.json(content_type=None)
+        except ValueError as exc:
+            raise PelotonAPIError("Peloton API returned non-JSON response") from exc
+
+
+def refresh_connection_token(connection) -> str:
+    """
+    Obtain a new bearer token for a PelotonConnection and save it.
+
+    Uses the stored refresh token when there is one, otherwise logs in again
+    with the stored credentials. Returns the new access token.
+    """
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from .services.peloton import PelotonClient, Token
+
+    client = PelotonClient(base_url=_setting('PELOTON_API_BASE_URL', DEFAULT_BASE_URL))
+    refresh_token = connection.refresh_token
+    if refresh_token:
+        client.token = Token(access_token=connection.bearer_token, refresh_token=refresh_token)
+        token = client.refresh_token()
+    elif connection.username and connection.password:
+        token = client.authenticate(connection.username, connection.password)
+    else:
+        raise PelotonAPIError("No refresh token or credentials available")
+
+    connection.bearer_token = token.access_token
+    if token.refresh_token:
+        connection.refresh_token = token.refresh_token
+    expires_in = token.expires_in or BEARER_TOKEN_DEFAULT_TTL_SECONDS
+    connection.token_expires_at = timezone.now() + timedelta(seconds=expires_in)
+    connection.save(update_fields=[
+        '_encrypted_bearer_token', '_encrypted_refresh_token', 'token_expires_at', 'updated_at',
+    ])
+    logger.info(f"Refreshed Peloton token for {connection.user_id}")
+    return token.access_token
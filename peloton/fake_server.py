@@ -0,0 +1,559 @@
+"""Local stand-in for the Peloton API (aiohttp), for load-testing the sync.
+
+`FakePelotonAPI` serves deterministic synthetic payloads for the endpoints
+the sync and the class library use:
+
+    /api/me, /api/user/{id}
+    /api/user/{id}/workouts              paginated, newest first
+    /api/workout/{id}
+    /api/workout/{id}/performance_graph
+    /api/ride/{id}/details, /api/ride/{id}/playlist
+    /api/v2/ride/archived                paginated class library
+    /api/instructor, /api/instructor/{id}
+
+Every id encodes what it points at, so any workout or ride id can be
+answered without keeping state: the same config and seed always produce the
+same accounts, classes and graphs. Latency and 429 responses are injected by
+a middleware (see FakePelotonConfig).
+
+Run it in-process with `FakePelotonServer` (background thread, random port)
+or standalone with `manage.py fake_peloton_server` and point
+PELOTON_API_BASE_URL at it.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    from aiohttp import web
+except Exception:  # pragma: no cover - aiohttp may not be installed yet
+    web = None
+
+# Every id the fake hands out starts with this (valid hex, like Peloton's ids)
+FAKE_ID_PREFIX = 'fa4ec0de'
+
+# Newest workout / class is at this time (2026-01-01 UTC); older ones step back from it
+BASE_TIMESTAMP = 1767225600
+WORKOUT_SPACING_SECONDS = 20 * 3600
+CLASS_SPACING_SECONDS = 6 * 3600
+
+INSTRUCTOR_COUNT = 24
+CLASS_DURATIONS = (1200, 1800, 2700, 3600)
+# Library discipline mix, by class index % 10
+DISCIPLINE_CYCLE = (
+    'cycling', 'cycling', 'cycling', 'cycling', 'cycling',
+    'running', 'running', 'running', 'strength', 'yoga',
+)
+DISCIPLINE_NAMES = {'cycling': 'Cycling', 'running': 'Running', 'strength': 'Strength', 'yoga': 'Yoga'}
+DEVICE_TYPES = {'cycling': 'home_bike_v1', 'running': 'home_treadmill_v1'}
+
+
+@dataclass
+class FakePelotonConfig:
+    """
+    Shape of the fake account data and how the fake behaves under load.
+
+    Attributes:
+        workouts_per_user: Workouts in every user's history
+        library_size: Classes in the library (workouts pick theirs from it)
+        latency_ms: Mean added latency per request
+        latency_jitter_ms: Standard deviation of the added latency
+        throttle_ratio: Share of URLs whose first request gets a 429
+        retry_after: Retry-After header sent with 429s (seconds)
+        seed: Changes every generated id and value
+    """
+    workouts_per_user: int = 500
+    library_size: int = 2000
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    throttle_ratio: float = 0.0
+    retry_after: str = '0'
+    seed: int = 0
+
+
+def _digest(*parts) -> str:
+    return hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+class FakePelotonAPI:
+    """Payload builders and aiohttp application of the fake API."""
+
+    def __init__(self, config: Optional[FakePelotonConfig] = None) -> None:
+        self.config = config or FakePelotonConfig()
+        self.requests: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self._attempts: Counter = Counter()
+        self._latency_rng = random.Random(self.config.seed)
+        self._library_by_discipline: Dict[str, List[int]] = {}
+
+    # ------------------------------------------------------------------------------
+    # Ids
+    # ------------------------------------------------------------------------------
+    def make_id(self, kind: str, index: int) -> str:
+        """32-hex id: prefix, a seeded digest of (kind, index), then the index itself."""
+        return f"{FAKE_ID_PREFIX}{_digest(self.config.seed, kind, index)[:16]}{index:08x}"
+
+    def parse_id(self, kind: str, object_id: str) -> Optional[int]:
+        """Index an id was made from, or None if this fake did not make it."""
+        if len(object_id) != 32 or not object_id.startswith(FAKE_ID_PREFIX):
+            return None
+        try:
+            index = int(object_id[-8:], 16)
+        except ValueError:
+            return None
+        return index if object_id == self.make_id(kind, index) else None
+
+    def workout_id(self, user_id: str, index: int) -> str:
+        # A user's workouts use indexes offset by a digest of their id, so accounts never share ids
+        return self.make_id('workout', self._user_offset(user_id) + index)
+
+    def _user_offset(self, user_id: str) -> int:
+        return (int(_digest(self.config.seed, 'user', user_id)[:6], 16) % 4096) * 1_000_000
+
+    def _ride_index_for_workout(self, workout_index: int) -> int:
+        return int(_digest(self.config.seed, 'takes', workout_index)[:8], 16) % max(1, self.config.library_size)
+
+    # ------------------------------------------------------------------------------
+    # Payloads
+    # ------------------------------------------------------------------------------
+    def instructor(self, index: int) -> Dict[str, Any]:
+        return {
+            'id': self.make_id('instructor', index),
+            'name': f"Instructor {index + 1:02d}",
+            'first_name': 'Instructor',
+            'last_name': f"{index + 1:02d}",
+            'image_url': f"https://example.com/instructors/{index}.jpg",
+            'bio': '',
+        }
+
+    def ride(self, index: int) -> Dict[str, Any]:
+        """Ride object as found in ride details, workout entries and the archived library."""
+        discipline = DISCIPLINE_CYCLE[index % len(DISCIPLINE_CYCLE)]
+        duration = CLASS_DURATIONS[(index // len(DISCIPLINE_CYCLE)) % len(CLASS_DURATIONS)]
+        is_power_zone = discipline == 'cycling' and (index // len(DISCIPLINE_CYCLE)) % 3 == 0
+        minutes = duration // 60
+        if is_power_zone:
+            title = f"{minutes} min Power Zone Ride"
+        elif discipline == 'cycling':
+            title = f"{minutes} min Climb Ride"
+        elif discipline == 'running':
+            title = f"{minutes} min Endurance Run"
+        else:
+            title = f"{minutes} min {DISCIPLINE_NAMES[discipline]} Flow"
+        instructor_index = index % INSTRUCTOR_COUNT
+        air_time = BASE_TIMESTAMP - index * CLASS_SPACING_SECONDS
+        rng = random.Random(_digest(self.config.seed, 'ride', index))
+        return {
+            'id': self.make_id('ride', index),
+            'title': title,
+            'description': f"Synthetic {DISCIPLINE_NAMES[discipline].lower()} class #{index}.",
+            'duration': duration,
+            'fitness_discipline': discipline,
+            'fitness_discipline_display_name': DISCIPLINE_NAMES[discipline],
+            'difficulty_rating_avg': round(rng.uniform(6.0, 9.5), 4),
+            'difficulty_rating_count': rng.randint(50, 5000),
+            'difficulty_level': None,
+            'overall_estimate': round(rng.uniform(0.9, 1.0), 4),
+            'difficulty_estimate': round(rng.uniform(6.0, 9.5), 4),
+            'image_url': f"https://example.com/classes/{index}.jpg",
+            'home_peloton_id': _digest(self.config.seed, 'home', index),
+            'original_air_time': air_time,
+            'scheduled_start_time': air_time,
+            'created_at': air_time - 86400,
+            'instructor_id': self.make_id('instructor', instructor_index),
+            'instructor': self.instructor(instructor_index),
+            'class_type_ids': [_digest('class_type', 'power_zone' if is_power_zone else discipline)],
+            'equipment_ids': [],
+            'equipment_tags': [],
+            'content_format': 'video',
+            'content_provider': 'peloton',
+            'has_closed_captions': True,
+            'is_archived': True,
+            'is_power_zone_class': is_power_zone,
+        }
+
+    def _segments(self, index: int, duration: int, is_power_zone: bool):
+        """segments and target_metrics_data of a class: warm up, main blocks, cool down."""
+        rng = random.Random(_digest(self.config.seed, 'segments', index))
+        warm_up = min(300, duration // 6)
+        cool_down = min(300, duration // 6)
+        segment_list = [{'name': 'Warm Up', 'start_time_offset': 0, 'length': warm_up, 'icon_slug': 'warmup'}]
+        targets = []
+        offset = warm_up
+        main_end = duration - cool_down
+        while offset < main_end:
+            length = min(rng.choice((60, 120, 180, 240, 300)), main_end - offset)
+            if is_power_zone:
+                zone = rng.randint(2, 6)
+                targets.append({
+                    'offsets': {'start': offset, 'end': offset + length - 1},
+                    'segment_type': 'power_zone',
+                    'metrics': [{'name': 'power_zone', 'lower': zone, 'upper': zone}],
+                })
+            offset += length
+        segment_list.append({'name': 'Main', 'start_time_offset': warm_up, 'length': main_end - warm_up, 'icon_slug': 'cycling'})
+        segment_list.append({'name': 'Cool Down', 'start_time_offset': main_end, 'length': cool_down, 'icon_slug': 'cooldown'})
+        return {'segment_list': segment_list}, {'target_metrics': targets, 'total_expected_output': None}
+
+    def playlist(self, index: int) -> Optional[Dict[str, Any]]:
+        """Class playlist; strength and yoga classes have none (404), as on Peloton."""
+        discipline = DISCIPLINE_CYCLE[index % len(DISCIPLINE_CYCLE)]
+        if discipline not in DEVICE_TYPES:
+            return None
+        rng = random.Random(_digest(self.config.seed, 'playlist', index))
+        songs = []
+        for position in range(rng.randint(8, 14)):
+            artist = f"Artist {rng.randint(1, 300)}"
+            songs.append({
+                'id': _digest(self.config.seed, 'song', index, position),
+                'title': f"Song {rng.randint(1, 5000)}",
+                'artists': [{'artist_id': _digest('artist', artist), 'artist_name': artist}],
+                'album': {'id': _digest('album', artist), 'name': f"{artist} Album", 'image_url': ''},
+                'start_time_offset': position * 240,
+                'explicit_rating': 0,
+            })
+        return {
+            'id': _digest(self.config.seed, 'playlist', index),
+            'ride_id': self.make_id('ride', index),
+            'songs': songs,
+            'top_artists': [song['artists'][0] for song in songs[:3]],
+            'top_albums': [song['album'] for song in songs[:3]],
+            'stream_id': None,
+            'stream_url': None,
+            'is_top_artists_shown': True,
+            'is_playlist_shown': True,
+            'is_in_class_music_shown': True,
+        }
+
+    def ride_details(self, index: int) -> Dict[str, Any]:
+        ride = self.ride(index)
+        segments, target_metrics = self._segments(index, ride['duration'], ride['is_power_zone_class'])
+        return {
+            'ride': ride,
+            'playlist': self.playlist(index),
+            'segments': segments,
+            'target_metrics_data': target_metrics,
+            'target_class_metrics': {},
+            'pace_target_type': 'standard' if ride['fitness_discipline'] == 'running' else None,
+            'averages': {},
+        }
+
+    def workout_entry(self, user_id: str, index: int) -> Dict[str, Any]:
+        """Workout as listed by /api/user/{id}/workouts (index 0 is the newest)."""
+        workout_index = self._user_offset(user_id) + index
+        return self._workout(workout_index, user_id)
+
+    def _workout(self, workout_index: int, user_id: str = '') -> Dict[str, Any]:
+        ride = self.ride(self._ride_index_for_workout(workout_index))
+        discipline = ride['fitness_discipline']
+        local_index = workout_index % 1_000_000
+        start = BASE_TIMESTAMP - local_index * WORKOUT_SPACING_SECONDS
+        rng = random.Random(_digest(self.config.seed, 'workout', workout_index))
+        return {
+            'id': self.make_id('workout', workout_index),
+            'user_id': user_id,
+            'name': f"{DISCIPLINE_NAMES[discipline]} Workout",
+            'status': 'COMPLETE',
+            'fitness_discipline': discipline,
+            'device_type': DEVICE_TYPES.get(discipline, 'home_bike_v1'),
+            'device_type_display_name': 'Bike' if discipline == 'cycling' else '',
+            'created_at': start,
+            'start_time': start,
+            'end_time': start + ride['duration'],
+            'timezone': 'America/New_York',
+            'total_work': round(rng.uniform(150000, 800000), 2) if discipline == 'cycling' else 0,
+            'is_total_work_personal_record': False,
+            'has_pedaling_metrics': discipline == 'cycling',
+            'ride': {key: ride[key] for key in ('id', 'title', 'duration', 'fitness_discipline', 'instructor_id', 'image_url')},
+        }
+
+    def detailed_workout(self, workout_index: int) -> Dict[str, Any]:
+        workout = self._workout(workout_index)
+        workout['ride'] = self.ride(self._ride_index_for_workout(workout_index))
+        workout['ftp_info'] = {'ftp': 200, 'ftp_source': 'ftp_workout_source'}
+        return workout
+
+    def performance_graph(self, workout_index: int, every_n: int = 5) -> Dict[str, Any]:
+        """Performance graph sampled every `every_n` seconds over the class duration."""
+        ride = self.ride(self._ride_index_for_workout(workout_index))
+        return self._graph(ride, random.Random(_digest(self.config.seed, 'graph', workout_index)), every_n)
+
+    def ride_performance_graph(self, ride_index: int, variant: int = 0, every_n: int = 5) -> Dict[str, Any]:
+        """Performance graph of one take of a class (`variant` picks the take)."""
+        return self._graph(self.ride(ride_index), random.Random(_digest(self.config.seed, 'graph', ride_index, variant)), every_n)
+
+    @staticmethod
+    def _graph(ride: Dict[str, Any], rng: random.Random, every_n: int) -> Dict[str, Any]:
+        discipline = ride['fitness_discipline']
+        duration = ride['duration']
+        every_n = max(1, every_n)
+        seconds = list(range(0, duration, every_n))
+
+        def walk(start, low, high, step, digits=0):
+            values, value = [], start
+            for _ in seconds:
+                value = min(high, max(low, value + rng.uniform(-step, step)))
+                values.append(round(value, digits) if digits else int(value))
+            return values
+
+        def metric(slug, display, unit, values):
+            return {
+                'slug': slug, 'display_name': display, 'display_unit': unit,
+                'values': values,
+                'average_value': round(sum(values) / len(values), 2) if values else None,
+                'max_value': max(values) if values else None,
+            }
+
+        metrics = [metric('heart_rate', 'Heart Rate', 'bpm', walk(130, 90, 185, 4))]
+        summaries = [{'slug': 'calories', 'display_name': 'Calories', 'value': duration // 6, 'display_unit': 'kcal'}]
+        if discipline == 'cycling':
+            output = walk(170, 60, 400, 25)
+            metrics += [
+                metric('output', 'Output', 'watts', output),
+                metric('cadence', 'Cadence', 'rpm', walk(85, 60, 115, 5)),
+                metric('resistance', 'Resistance', '%', walk(40, 25, 70, 3)),
+                metric('speed', 'Speed', 'mph', walk(19, 12, 28, 1, digits=2)),
+            ]
+            summaries += [
+                {'slug': 'total_output', 'display_name': 'Total Output', 'value': sum(output) * every_n // 1000, 'display_unit': 'kj'},
+                {'slug': 'distance', 'display_name': 'Distance', 'value': round(duration / 3600 * 19, 2), 'display_unit': 'mi'},
+            ]
+        elif discipline == 'running':
+            metrics += [
+                metric('speed', 'Speed', 'mph', walk(6.5, 4.0, 10.0, 0.3, digits=2)),
+                metric('incline', 'Incline', '%', walk(1.0, 0.0, 8.0, 0.5, digits=1)),
+            ]
+            summaries.append({'slug': 'distance', 'display_name': 'Distance', 'value': round(duration / 3600 * 6.5, 2), 'display_unit': 'mi'})
+        return {
+            'duration': duration,
+            'segment_length': every_n,
+            'seconds_since_pedaling_start': seconds,
+            'metrics': metrics,
+            'summaries': summaries,
+            'average_summaries': [],
+            'target_metrics_performance_data': {'target_metrics': []},
+        }
+
+    def library_indexes(self, discipline: Optional[str]) -> List[int]:
+        if discipline not in self._library_by_discipline:
+            self._library_by_discipline[discipline] = [
+                index for index in range(self.config.library_size)
+                if not discipline or DISCIPLINE_CYCLE[index % len(DISCIPLINE_CYCLE)] == discipline
+            ]
+        return self._library_by_discipline[discipline]
+
+    # ------------------------------------------------------------------------------
+    # aiohttp application
+    # ------------------------------------------------------------------------------
+    def build_app(self):
+        if web is None:
+            raise RuntimeError("aiohttp is not installed; add it to requirements to use the fake Peloton API")
+
+        @web.middleware
+        async def middleware(request, handler):
+            return await self._handle(request, handler)
+
+        app = web.Application(middlewares=[middleware])
+        routes = [
+            ('/api/me', 'me', self._me),
+            ('/api/user/{user_id}', 'user', self._user),
+            ('/api/user/{user_id}/workouts', 'workouts', self._workouts),
+            ('/api/workout/{workout_id}', 'workout', self._detailed_workout),
+            ('/api/workout/{workout_id}/performance_graph', 'performance_graph', self._performance_graph),
+            ('/api/ride/{ride_id}/details', 'ride_details', self._ride_details),
+            ('/api/ride/{ride_id}/playlist', 'playlist', self._playlist),
+            ('/api/v2/ride/archived', 'archived', self._archived),
+            ('/api/instructor', 'instructors', self._instructors),
+            ('/api/instructor/{instructor_id}', 'instructor', self._instructor),
+        ]
+        for path, name, handler in routes:
+            app.router.add_get(path, handler, name=name)
+        return app
+
+    @staticmethod
+    def _page(request, default_limit=20):
+        return max(0, int(request.query.get('page', 0))), max(1, int(request.query.get('limit', default_limit)))
+
+    @staticmethod
+    def _not_found(message='Not Found'):
+        return web.json_response({'status': 404, 'message': message}, status=404)
+
+    async def _handle(self, request, handler):
+        """Count the request, add latency and answer 429 to throttled URLs' first request."""
+        route = request.match_info.route.name or 'unknown'
+        self.requests[route] += 1
+        config = self.config
+        if config.latency_ms or config.latency_jitter_ms:
+            delay = self._latency_rng.gauss(config.latency_ms, config.latency_jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+        if config.throttle_ratio > 0:
+            key = request.path_qs
+            if int(_digest(config.seed, 'throttle', key)[:8], 16) / 0xFFFFFFFF < config.throttle_ratio:
+                self._attempts[key] += 1
+                if self._attempts[key] == 1:
+                    self.throttled[route] += 1
+                    return web.json_response(
+                        {'status': 429, 'message': 'Too Many Requests'},
+                        status=429,
+                        headers={'Retry-After': config.retry_after},
+                    )
+        return await handler(request)
+
+    async def _me(self, request):
+        token = request.headers.get('Authorization', '')
+        return web.json_response({'id': self.make_id('user', int(_digest(token)[:6], 16)), 'username': 'fake_rider'})
+
+    async def _user(self, request):
+        user_id = request.match_info['user_id']
+        return web.json_response({
+            'id': user_id,
+            'username': f"rider_{user_id[-6:]}",
+            'total_workouts': self.config.workouts_per_user,
+        })
+
+    async def _workouts(self, request):
+        user_id = request.match_info['user_id']
+        page, limit = self._page(request)
+        total = self.config.workouts_per_user
+        start = page * limit
+        data = [self.workout_entry(user_id, index) for index in range(start, min(total, start + limit))]
+        page_count = (total + limit - 1) // limit
+        return web.json_response({
+            'data': data, 'page': page, 'limit': limit, 'count': len(data), 'total': total,
+            'page_count': page_count, 'show_previous': page > 0, 'show_next': page + 1 < page_count,
+            'sort_by': request.query.get('sort_by', '-created_at,-pk'),
+        })
+
+    async def _detailed_workout(self, request):
+        index = self.parse_id('workout', request.match_info['workout_id'])
+        if index is None:
+            return self._not_found('Workout not found')
+        return web.json_response(self.detailed_workout(index))
+
+    async def _performance_graph(self, request):
+        index = self.parse_id('workout', request.match_info['workout_id'])
+        if index is None:
+            return self._not_found('Workout not found')
+        return web.json_response(self.performance_graph(index, int(request.query.get('every_n', 5))))
+
+    def _ride_index(self, request):
+        index = self.parse_id('ride', request.match_info['ride_id'])
+        return index if index is not None and index < self.config.library_size else None
+
+    async def _ride_details(self, request):
+        index = self._ride_index(request)
+        if index is None:
+            return self._not_found('Ride not found')
+        return web.json_response(self.ride_details(index))
+
+    async def _playlist(self, request):
+        index = self._ride_index(request)
+        playlist = self.playlist(index) if index is not None else None
+        if playlist is None:
+            return self._not_found()
+        return web.json_response(playlist)
+
+    async def _archived(self, request):
+        page, limit = self._page(request)
+        indexes = self.library_indexes(request.query.get('fitness_discipline') or None)
+        start = page * limit
+        data = [self.ride(index) for index in indexes[start:start + limit]]
+        page_count = (len(indexes) + limit - 1) // limit
+        return web.json_response({
+            'data': data, 'page': page, 'limit': limit, 'count': len(data), 'total': len(indexes),
+            'page_count': page_count, 'show_previous': page > 0, 'show_next': page + 1 < page_count,
+        })
+
+    async def _instructors(self, request):
+        page, limit = self._page(request)
+        start = page * limit
+        data = [self.instructor(index) for index in range(start, min(INSTRUCTOR_COUNT, start + limit))]
+        return web.json_response({
+            'data': data, 'page': page, 'limit': limit, 'total': INSTRUCTOR_COUNT,
+            'show_next': start + limit < INSTRUCTOR_COUNT,
+        })
+
+    async def _instructor(self, request):
+        index = self.parse_id('instructor', request.match_info['instructor_id'])
+        if index is None or index >= INSTRUCTOR_COUNT:
+            return self._not_found('Instructor not found')
+        return web.json_response(self.instructor(index))
+
+
+class FakePelotonServer:
+    """
+    Serves a FakePelotonAPI from a background thread with its own event loop,
+    so synchronous callers (requests, Celery task bodies, `run_async`) can use
+    it from the main thread.
+
+    Usage:
+        with FakePelotonServer(FakePelotonConfig(workouts_per_user=200)) as server:
+            ... PELOTON_API_BASE_URL = server.base_url ...
+    """
+
+    def __init__(self, config: Optional[FakePelotonConfig] = None, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.api = FakePelotonAPI(config)
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakePelotonServer":
+        started = threading.Event()
+        errors = []
+
+        def _serve():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                loop.run_until_complete(self._start_site())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self._runner.cleanup())
+            loop.close()
+
+        self._thread = threading.Thread(target=_serve, name='fake-peloton-api', daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    async def _start_site(self):
+        self._runner = web.AppRunner(self.api.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 asks the OS for a free port; read back the one we got
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self) -> "FakePelotonServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
@@ -0,0 +1,62 @@
+"""
+Management command to serve the fake Peloton API (peloton.fake_server) on a
+local port, for load tests with real Celery workers.
+
+Start it, then run the web app and workers with
+PELOTON_API_BASE_URL=http://127.0.0.1:8089 and connect any account with a
+bearer token: every Peloton user id gets the same synthetic history.
+
+Usage:
+    python manage.py fake_peloton_server
+    python manage.py fake_peloton_server --port 8089 --workouts 2000 --latency-ms 80 --throttle-ratio 0.05
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from peloton.fake_server import FakePelotonAPI, FakePelotonConfig
+
+
+class Command(BaseCommand):
+    help = 'Serve a deterministic fake Peloton API for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8089, help='Port to listen on (default: 8089)')
+        parser.add_argument('--workouts', type=int, default=500, help='Workouts per user (default: 500)')
+        parser.add_argument('--library-size', type=int, default=2000, help='Classes in the library (default: 2000)')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean latency added per request (default: 0)')
+        parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='Standard deviation of the added latency')
+        parser.add_argument(
+            '--throttle-ratio',
+            type=float,
+            default=0.0,
+            help='Share of URLs answered with a 429 on their first request (default: 0)'
+        )
+        parser.add_argument('--retry-after', type=str, default='1', help='Retry-After header on 429s (default: 1)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data (default: 0)')
+
+    def handle(self, *args, **options):
+        try:
+            from aiohttp import web
+        except ImportError:
+            raise CommandError('aiohttp is not installed')
+        if not 0 <= options['throttle_ratio'] <= 1:
+            raise CommandError('--throttle-ratio must be between 0 and 1')
+
+        api = FakePelotonAPI(FakePelotonConfig(
+            workouts_per_user=options['workouts'],
+            library_size=options['library_size'],
+            latency_ms=options['latency_ms'],
+            latency_jitter_ms=options['latency_jitter_ms'],
+            throttle_ratio=options['throttle_ratio'],
+            retry_after=options['retry_after'],
+            seed=options['seed'],
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake Peloton API on http://{options['host']}:{options['port']} "
+            f"({options['workouts']} workouts per user, {options['library_size']} classes)"
+        ))
+        web.run_app(api.build_app(), host=options['host'], port=options['port'], print=None, access_log=None)
+        self.stdout.write('')
+        self.stdout.write('Requests served: ' + ', '.join(
+            f"{route} {count}" for route, count in sorted(api.requests.items())
+        ))
@@ -143,19 +143,21 @@ class PelotonConnection(models.Model):
     
     def get_client(self):
         """Get a PelotonClient instance with stored credentials"""
-        from .services.peloton import PelotonClient
+        from .services.peloton import DEFAULT_BASE_URL, PelotonClient
         from django.utils import timezone
+
+        base_url = getattr(settings, 'PELOTON_API_BASE_URL', DEFAULT_BASE_URL)
         
         # Prefer bearer token if available and not expired
         if self.bearer_token:
             from datetime import timedelta
             # Check if token is expired (with 5 minute buffer)
             if not self.token_expires_at or self.token_expires_at > (timezone.now() + timedelta(minutes=5)):
-                return PelotonClient(bearer_token=self.bearer_token)
+                return PelotonClient(bearer_token=self.bearer_token, base_url=base_url)
         
         # Fall back to username/password authentication
         if self.username and self.password:
-            return PelotonClient(username=self.username, password=self.password)
+            return PelotonClient(username=self.username, password=self.password, base_url=base_url)
         else:
             raise ValueError("No Peloton credentials, bearer token, or session available")
 
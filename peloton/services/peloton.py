@@ -457,7 +457,7 @@ class PelotonClient:
         if not self.token or not self.token.refresh_token:
             raise PelotonAPIError("No refresh token available")
         
-        endpoint = f"{AUTH_DOMAIN}/oauth/token"
+        endpoint = f"https://{AUTH_DOMAIN}{AUTH_TOKEN_PATH}"
         
         auth_session = requests.Session()
         auth_session.headers.update({
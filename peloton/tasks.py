@@ -13,9 +13,19 @@ def clear_stale_sync_flags(minutes=120):
     """Clear `sync_in_progress` on PelotonConnection records older than `minutes`.
 
     This helps recover from processes that died while a sync was running.
+    Connections whose background sync job is still making progress are left
+    alone; long first syncs can legitimately run past `minutes`.
     """
+    from workouts.models import WorkoutSyncJob
+
     cutoff = timezone.now() - timedelta(minutes=minutes)
-    stale_qs = PelotonConnection.objects.filter(sync_in_progress=True, sync_started_at__lt=cutoff)
+    active_user_ids = WorkoutSyncJob.objects.filter(
+        status=WorkoutSyncJob.STATUS_RUNNING,
+        heartbeat_at__gte=cutoff,
+    ).values('user_id')
+    stale_qs = PelotonConnection.objects.filter(
+        sync_in_progress=True, sync_started_at__lt=cutoff
+    ).exclude(user_id__in=active_user_ids)
     count = stale_qs.count()
     for conn in stale_qs:
         logger.info(f"Clearing stale sync flag for PelotonConnection id={conn.id} user_id={getattr(conn.user, 'id', None)} started_at={conn.sync_started_at}")
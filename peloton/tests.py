@@ -1,3 +1,196 @@
-from django.test import TestCase
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from django.test import SimpleTestCase, override_settings
+
+from .async_client import (
+    AsyncPelotonClient, AsyncTokenBucket, RedisTokenBucket, get_rate_limiter, refresh_connection_token,
+    reset_rate_limiter, run_async,
+)
+from .services.peloton import PelotonAPIError, Token
+
+
+class AsyncTokenBucketTests(SimpleTestCase):
+    def test_burst_then_waits_for_refill(self):
+        bucket = AsyncTokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # Third token is borrowed against the refill: ~0.1s at 10 req/s
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+
+class RedisTokenBucketTests(SimpleTestCase):
+    def _bucket(self, script):
+        client = Mock()
+        client.register_script.return_value = script
+        return RedisTokenBucket(rate=10, capacity=2, fallback=AsyncTokenBucket(rate=5, capacity=1), client=client)
+
+    def test_reservation_comes_from_the_shared_script(self):
+        script = Mock(return_value=150)
+        bucket = self._bucket(script)
+        self.assertAlmostEqual(bucket.reserve(), 0.15)
+        script.assert_called_once_with(keys=[RedisTokenBucket.KEY], args=[10.0, 2.0])
+
+    def test_falls_back_to_process_share_while_redis_is_down(self):
+        script = Mock(side_effect=ConnectionError('refused'))
+        bucket = self._bucket(script)
+        self.assertEqual(bucket.reserve(), 0)
+        # Fallback bucket (5 req/s, burst 1) is used without hitting Redis again
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+        self.assertEqual(script.call_count, 1)
+
+    def test_process_limiter_gets_its_share_of_the_rate(self):
+        self.addCleanup(reset_rate_limiter)
+        with override_settings(PELOTON_API_RATE_LIMIT=12, PELOTON_API_RATE_BURST=8,
+                               PELOTON_API_RATE_LIMIT_SHARED=False, CELERY_WORKER_CONCURRENCY=4):
+            reset_rate_limiter()
+            limiter = get_rate_limiter()
+            self.assertIsInstance(limiter, AsyncTokenBucket)
+            self.assertEqual((limiter.rate, limiter.capacity), (3, 2))
+            reset_rate_limiter()
+            with override_settings(PELOTON_API_RATE_LIMIT_SHARED=True):
+                shared = get_rate_limiter()
+            self.assertIsInstance(shared, RedisTokenBucket)
+            self.assertEqual((shared.rate, shared.fallback.rate), (12, 3))
+
+
+@patch('peloton.async_client.backoff_delay', return_value=0)
+class AsyncPelotonClientTests(SimpleTestCase):
+    """Runs the client against a local aiohttp server on the shared loop."""
+
+    def setUp(self):
+        self.hits = {}
+        self.flaky_failures = 2
+
+        async def ride_details(request):
+            ride_id = request.match_info['ride_id']
+            self.hits[ride_id] = self.hits.get(ride_id, 0) + 1
+            if ride_id == 'flaky' and self.hits[ride_id] <= self.flaky_failures:
+                return web.json_response({'message': 'slow down'}, status=429, headers={'Retry-After': '0'})
+            if ride_id == 'broken':
+                return web.json_response({'message': 'boom'}, status=500)
+            return web.json_response({'ride': {'id': ride_id}})
+
+        async def playlist(request):
+            return web.json_response({'message': 'Not Found'}, status=404)
+
+        async def me(request):
+            if request.headers.get('Authorization') != 'Bearer fresh':
+                return web.json_response({'message': 'expired'}, status=401)
+            return web.json_response({'id': 'peloton_user'})
+
+        async def archived(request):
+            page = int(request.query['page'])
+            return web.json_response({'data': [{'id': f'r{page}'}], 'show_next': page < 2})
+
+        app = web.Application()
+        app.router.add_get('/api/ride/{ride_id}/details', ride_details)
+        app.router.add_get('/api/ride/{ride_id}/playlist', playlist)
+        app.router.add_get('/api/user/me', me)
+        app.router.add_get('/api/v2/ride/archived', archived)
+        self.server = TestServer(app)
+        run_async(self.server.start_server())
+        self.addCleanup(lambda: run_async(self.server.close()))
+        self.base_url = str(self.server.make_url('')).rstrip('/')
+
+    def _run(self, coro_fn, **kwargs):
+        async def _inner():
+            kwargs.setdefault('rate_limiter', AsyncTokenBucket(rate=0))
+            async with AsyncPelotonClient(base_url=self.base_url, max_retries=3, **kwargs) as client:
+                return await coro_fn(client)
+        return run_async(_inner())
+
+    def test_retries_on_429_then_succeeds(self, _delay):
+        data = self._run(lambda c: c.fetch_ride_details('flaky'))
+        self.assertEqual(data['ride']['id'], 'flaky')
+        self.assertEqual(self.hits['flaky'], 3)
+
+    def test_gives_up_after_max_retries(self, _delay):
+        with self.assertRaises(PelotonAPIError):
+            self._run(lambda c: c.fetch_ride_details('broken'))
+        self.assertEqual(self.hits['broken'], 4)
+
+    def test_fetch_many_returns_results_and_errors(self, _delay):
+        results = self._run(lambda c: c.fetch_many('fetch_ride_details', ['a', 'b', 'broken', 'a']))
+        self.assertEqual(set(results), {'a', 'b', 'broken'})
+        self.assertEqual(results['b']['ride']['id'], 'b')
+        self.assertIsInstance(results['broken'], PelotonAPIError)
+
+    def test_playlist_404_returns_none(self, _delay):
+        self.assertIsNone(self._run(lambda c: c.fetch_playlist('r1')))
+
+    def test_token_refresh_hook_on_401(self, _delay):
+        calls = []
+
+        async def refresher():
+            calls.append(1)
+            return 'fresh'
+
+        data = self._run(lambda c: c.fetch_user('me'), bearer_token='stale', token_refresher=refresher)
+        self.assertEqual(data['id'], 'peloton_user')
+        self.assertEqual(calls, [1])
+
+    def test_iter_archived_rides_paginates(self, _delay):
+        async def collect(client):
+            return [ride['id'] async for ride in client.iter_archived_rides()]
+        self.assertEqual(self._run(collect), ['r0', 'r1', 'r2'])
+
+
+
+class RefreshConnectionTokenTests(SimpleTestCase):
+    @override_settings(PELOTON_API_BASE_URL='http://peloton.test')
+    @patch('peloton.services.peloton.PelotonClient')
+    def test_refresh_uses_configured_base_url(self, client_cls):
+        client_cls.return_value.refresh_token.return_value = Token(access_token='fresh', refresh_token='next')
+        connection = Mock(bearer_token='stale', refresh_token='old', user_id=1)
+        self.assertEqual(refresh_connection_token(connection), 'fresh')
+        client_cls.assert_called_once_with(base_url='http://peloton.test')
+        self.assertEqual(connection.refresh_token, 'next')
+        connection.save.assert_called_once()
+
+class FakePelotonServerTests(SimpleTestCase):
+    """The load-test stand-in answers like Peloton, deterministically."""
+
+    def setUp(self):
+        from .fake_server import FakePelotonConfig, FakePelotonServer
+        self.server = FakePelotonServer(FakePelotonConfig(workouts_per_user=45, library_size=30)).start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.api
+
+    def _get(self, path, **params):
+        import requests
+        return requests.get(f"{self.server.base_url}{path}", params=params, timeout=5)
+
+    def test_workout_list_paginates_newest_first(self):
+        first = self._get('/api/user/u1/workouts', page=0, limit=20).json()
+        last = self._get('/api/user/u1/workouts', page=2, limit=20).json()
+        self.assertEqual(len(first['data']), 20)
+        self.assertTrue(first['show_next'])
+        self.assertEqual(len(last['data']), 5)
+        self.assertFalse(last['show_next'])
+        self.assertGreater(first['data'][0]['created_at'], first['data'][1]['created_at'])
+        self.assertEqual(first['data'][0]['id'], self.api.workout_id('u1', 0))
+        self.assertNotEqual(first['data'][0]['id'], self.api.workout_id('u2', 0))
+
+    def test_ids_resolve_to_the_same_payloads(self):
+        entry = self._get('/api/user/u1/workouts').json()['data'][3]
+        graph = self._get(f"/api/workout/{entry['id']}/performance_graph", every_n=5).json()
+        self.assertEqual(graph, self._get(f"/api/workout/{entry['id']}/performance_graph", every_n=5).json())
+        self.assertEqual(len(graph['seconds_since_pedaling_start']), entry['ride']['duration'] // 5)
+        details = self._get(f"/api/ride/{entry['ride']['id']}/details").json()
+        self.assertEqual(details['ride']['title'], entry['ride']['title'])
+        self.assertEqual(self._get('/api/ride/0123456789abcdef0123456789abcdef/details').status_code, 404)
+
+    def test_throttled_urls_get_one_429(self):
+        self.api.config.throttle_ratio = 1.0
+        self.api.config.retry_after = '2'
+        first = self._get('/api/v2/ride/archived', page=0, limit=10)
+        self.assertEqual(first.status_code, 429)
+        self.assertEqual(first.headers['Retry-After'], '2')
+        second = self._get('/api/v2/ride/archived', page=0, limit=10)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()['data']), 10)
+        self.assertEqual(self.api.throttled['archived'], 1)
+        self.assertEqual(self.api.requests['archived'], 2)
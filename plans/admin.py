@@ -44,18 +44,18 @@ class RecapShareAdmin(admin.ModelAdmin):
 
 @admin.register(RecapCache)
 class RecapCacheAdmin(admin.ModelAdmin):
-    list_display = ['user', 'year', 'total_workouts_count', 'last_regenerated_at', 'updated_at', 'created_at']
-    list_filter = ['year', 'created_at', 'updated_at', 'last_regenerated_at']
+    list_display = ['user', 'year', 'status', 'total_workouts_count', 'last_regenerated_at', 'updated_at', 'created_at']
+    list_filter = ['year', 'status', 'created_at', 'updated_at', 'last_regenerated_at']
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['created_at', 'updated_at']
     raw_id_fields = ['user']
     
     fieldsets = (
         ('Cache Information', {
-            'fields': ('user', 'year', 'total_workouts_count')
+            'fields': ('user', 'year', 'status', 'total_workouts_count')
         }),
         ('Metadata', {
-            'fields': ('last_workout_updated_at', 'last_regenerated_at')
+            'fields': ('section_versions', 'last_workout_updated_at', 'last_regenerated_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
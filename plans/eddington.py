@@ -0,0 +1,264 @@
+"""Eddington numbers per discipline.
+
+Eddington number E: the maximum number such that the athlete has covered at
+least E km on at least E days.
+
+Each user has one EddingtonHistory row per discipline ('all', 'cycling',
+'running', 'rowing') holding the daily maximum distances, the number's full
+history and the data the page shows. Rows are built from one aggregate query
+(daily maxima per discipline) and kept current incrementally: only the days
+of workouts synced since the rows' watermark are read again, and days after
+the last stored one extend the history from the stored state instead of
+replaying it. The page itself reads the rows and nothing else.
+"""
+import heapq
+from bisect import bisect_left
+
+from django.db.models import Count, Max, Q
+
+KM_PER_MILE = 1.60934
+
+ALL = 'all'
+# Discipline -> Peloton fitness disciplines counted for it
+DISCIPLINES = {
+    'cycling': ('cycling', 'bike'),
+    'running': ('running', 'run'),
+    'rowing': ('rowing', 'row'),
+}
+DISCIPLINE_NAMES = {'cycling': 'Cycling', 'running': 'Running', 'rowing': 'Rowing'}
+
+# Chart and "days needed" limits
+CHART_MAX_DISTANCE = 200
+DAYS_NEEDED_AHEAD = 30
+
+_DISCIPLINE_FOR_FITNESS = {
+    fitness: discipline for discipline, names in DISCIPLINES.items() for fitness in names
+}
+
+
+class EddingtonTracker:
+    """
+    Eddington number of a growing list of days.
+
+    Keeps a min-heap of the distances above the current number; adding a day
+    is O(log n), so a whole history is O(n log n).
+    """
+
+    def __init__(self, number=0, above=None):
+        self.number = number
+        self.above = list(above or [])
+        heapq.heapify(self.above)
+
+    def add(self, distance):
+        """Add one day's (whole km) distance; returns the Eddington number after it."""
+        if distance > self.number:
+            heapq.heappush(self.above, distance)
+        # E + 1 holds once more than E days are above E
+        while len(self.above) > self.number:
+            self.number += 1
+            while self.above and self.above[0] <= self.number:
+                heapq.heappop(self.above)
+        return self.number
+
+
+def build_history(days):
+    """
+    History of the number from daily maxima.
+
+    Args:
+        days: dict ISO date -> [km, workout count]
+
+    Returns:
+        tuple: (history list of {'date', 'eddington_number'}, EddingtonTracker)
+    """
+    tracker = EddingtonTracker()
+    history = [
+        {'date': day, 'eddington_number': tracker.add(int(days[day][0]))}
+        for day in sorted(days)
+    ]
+    return history, tracker
+
+
+def summarize(days, history):
+    """Page data for one discipline (number, chart data, days needed per distance)."""
+    distances = sorted(int(km) for km, _ in days.values())
+    number = history[-1]['eddington_number'] if history else 0
+    max_distance = distances[-1] if distances else 0
+
+    def times_completed(distance):
+        # Days with at least `distance` km
+        return len(distances) - bisect_left(distances, distance)
+
+    chart_max_distance = max(max_distance, number + 20)
+    days_needed_list = [
+        {'distance': target, 'days_needed': max(0, target - times_completed(target))}
+        for target in range(number + 1, min(number + DAYS_NEEDED_AHEAD, CHART_MAX_DISTANCE))
+    ]
+    return {
+        'current_eddington': number,
+        'times_completed': [
+            {'distance': distance, 'times_completed': times_completed(distance)}
+            for distance in range(1, min(chart_max_distance + 1, CHART_MAX_DISTANCE))
+        ],
+        'history': history,
+        'days_needed_list': days_needed_list,
+        'total_days': len(days),
+        'max_distance': max_distance,
+        'workout_count': sum(count for _, count in days.values()),
+    }
+
+
+def _page_data(row):
+    data = dict(row.data)
+    data['days_needed'] = {item['distance']: item['days_needed'] for item in data.get('days_needed_list', [])}
+    if row.discipline in DISCIPLINE_NAMES:
+        data['name'] = DISCIPLINE_NAMES[row.discipline]
+    return data
+
+
+def daily_maxima(user, dates=None):
+    """
+    Daily maximum distance (km) and workout count per discipline, from one query.
+
+    Args:
+        user: User
+        dates: Only these days (a queryset or list of dates); every day if None
+
+    Returns:
+        tuple: ({discipline: {ISO date: [km, workout count]}}, latest last_synced_at, days read)
+    """
+    from workouts.models import Workout
+
+    with_distance = Q(details__distance__gt=0)
+    workouts = Workout.objects.filter(user=user)
+    if dates is None:
+        workouts = workouts.filter(with_distance)
+    else:
+        workouts = workouts.filter(completed_date__in=dates)
+    rows = workouts.values_list('completed_date', 'ride_detail__fitness_discipline').annotate(
+        max_miles=Max('details__distance', filter=with_distance),
+        workouts=Count('id', filter=with_distance),
+        last_synced=Max('last_synced_at'),
+    ).order_by()
+
+    maxima = {discipline: {} for discipline in (ALL, *DISCIPLINES)}
+    synced_through = None
+    days_read = set()
+    for completed_date, fitness_discipline, max_miles, workouts_count, last_synced in rows:
+        day = completed_date.isoformat()
+        days_read.add(day)
+        if last_synced and (synced_through is None or last_synced > synced_through):
+            synced_through = last_synced
+        if not max_miles:
+            continue
+        km = max_miles * KM_PER_MILE
+        for discipline in (ALL, _DISCIPLINE_FOR_FITNESS.get(fitness_discipline)):
+            if discipline is None:
+                continue
+            current = maxima[discipline].get(day)
+            if current is None:
+                maxima[discipline][day] = [km, workouts_count]
+            else:
+                maxima[discipline][day] = [max(current[0], km), current[1] + workouts_count]
+    return maxima, synced_through, days_read
+
+
+def _store(user, discipline, days, history, tracker, synced_through, row=None):
+    from .models import EddingtonHistory
+
+    if row is None:
+        row = EddingtonHistory(user=user, discipline=discipline)
+    row.days = days
+    row.eddington_number = tracker.number
+    row.above = sorted(tracker.above)
+    row.data = summarize(days, history)
+    row.workouts_through = synced_through
+    return row
+
+
+def rebuild_eddington(user):
+    """Rebuild every discipline's row from scratch."""
+    from .models import EddingtonHistory
+
+    maxima, synced_through, _ = daily_maxima(user)
+    rows = []
+    for discipline, days in maxima.items():
+        history, tracker = build_history(days)
+        rows.append(_store(user, discipline, days, history, tracker, synced_through))
+    EddingtonHistory.objects.filter(user=user).delete()
+    EddingtonHistory.objects.bulk_create(rows)
+    return {row.discipline: row for row in rows}
+
+
+def refresh_eddington(user, rows):
+    """
+    Fold workouts synced since the rows were built into them.
+
+    Days after the last stored day extend the history from the stored state;
+    changes to earlier days replay the stored daily maxima (no workout scan).
+    """
+    from workouts.models import Workout
+
+    watermark = min((row.workouts_through for row in rows.values() if row.workouts_through), default=None)
+    touched = Workout.objects.filter(user=user)
+    if watermark is not None:
+        touched = touched.filter(last_synced_at__gt=watermark)
+    touched = touched.values('completed_date')
+    maxima, synced_through, days_read = daily_maxima(user, dates=touched)
+    if not days_read:
+        return rows
+
+    for discipline, row in rows.items():
+        days = dict(row.days)
+        changed = sorted(day for day in days_read if days.get(day) != maxima[discipline].get(day))
+        if changed:
+            last_day = max(days) if days else None
+            for day in changed:
+                if day in maxima[discipline]:
+                    days[day] = maxima[discipline][day]
+                else:
+                    days.pop(day, None)
+            appended = all(day in days for day in changed) and (last_day is None or changed[0] > last_day)
+            if appended:
+                tracker = EddingtonTracker(row.eddington_number, row.above)
+                history = row.data.get('history', []) + [
+                    {'date': day, 'eddington_number': tracker.add(int(days[day][0]))} for day in changed
+                ]
+            else:
+                history, tracker = build_history(days)
+            _store(user, discipline, days, history, tracker, row.workouts_through, row=row)
+        row.workouts_through = max(row.workouts_through, synced_through) if row.workouts_through else synced_through
+        row.save()
+    return rows
+
+
+def get_eddington(user):
+    """
+    Page data per discipline, for disciplines with at least one day.
+
+    Returns:
+        dict: discipline ('all', 'cycling', ...) -> data (see summarize)
+    """
+    from .models import EddingtonHistory
+
+    rows = {row.discipline: row for row in EddingtonHistory.objects.filter(user=user)}
+    if set(rows) != {ALL, *DISCIPLINES}:
+        rows = rebuild_eddington(user)
+    else:
+        rows = refresh_eddington(user, rows)
+    return {discipline: _page_data(row) for discipline, row in rows.items() if row.days}
+
+
+def empty_eddington_data():
+    """Page data for a discipline without workouts."""
+    data = summarize({}, [])
+    data['days_needed'] = {item['distance']: item['days_needed'] for item in data['days_needed_list']}
+    return data
+
+
+def invalidate_eddington(user_id):
+    """Drop a user's rows; they are rebuilt on the next read (deleted or edited workouts)."""
+    from .models import EddingtonHistory
+
+    EddingtonHistory.objects.filter(user_id=user_id).delete()
+
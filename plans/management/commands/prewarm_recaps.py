@@ -0,0 +1,36 @@
+"""
+Build yearly recaps for every user with workouts in a year, ahead of the
+December 21st opening.
+
+By default one background build is queued per user; --inline builds them in
+this process instead (no Celery worker needed).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from plans.recap import prewarm_recaps, recap_year_available
+
+
+class Command(BaseCommand):
+    help = 'Pre-build yearly recaps for all users with workouts in a year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Recap year (default: the current year)')
+        parser.add_argument('--user-id', type=int, action='append', dest='user_ids', help='Only this user (repeatable)')
+        parser.add_argument('--inline', action='store_true', help='Build in this process instead of queueing tasks')
+        parser.add_argument('--force', action='store_true', help='Rebuild every section, not just the dirty ones')
+        parser.add_argument('--allow-early', action='store_true', help="Build the current year before December 21st")
+
+    def handle(self, *args, **options):
+        year = options.get('year') or timezone.now().year
+        if not recap_year_available(year) and not options.get('allow_early'):
+            raise CommandError(f'The {year} recap opens on December 21st (use --allow-early to build it anyway)')
+
+        users = prewarm_recaps(
+            year,
+            user_ids=options.get('user_ids'),
+            inline=options.get('inline'),
+            force=options.get('force'),
+        )
+        action = 'Built' if options.get('inline') else 'Queued'
+        self.stdout.write(self.style.SUCCESS(f'{action} {year} recaps for {users} users'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.27 on 2026-10-16 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0009_alter_plantemplateday_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recapcache',
+            name='overview',
+            field=models.JSONField(blank=True, default=dict, help_text='Total workouts, active days, longest streak and monthly counts'),
+        ),
+        migrations.AddField(
+            model_name='recapcache',
+            name='section_versions',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-section {version, built_at}; a section is rebuilt when the version of its inputs changes'),
+        ),
+        # Existing caches were fully computed in the request, so they start out ready
+        migrations.AddField(
+            model_name='recapcache',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('building', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', help_text='State of the latest background build', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='recapcache',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('building', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', help_text='State of the latest background build', max_length=10),
+        ),
+    ]
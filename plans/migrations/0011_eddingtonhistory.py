@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('plans', '0010_recap_section_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EddingtonHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discipline', models.CharField(choices=[('all', 'All'), ('cycling', 'Cycling'), ('running', 'Running'), ('rowing', 'Rowing')], max_length=10)),
+                ('days', models.JSONField(blank=True, default=dict, help_text='ISO date -> [maximum km, workouts] for every day with distance')),
+                ('eddington_number', models.IntegerField(default=0)),
+                ('above', models.JSONField(blank=True, default=list, help_text='Whole-km days above the current number (to extend the history)')),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Number, history and chart data shown on the Eddington page')),
+                ('workouts_through', models.DateTimeField(blank=True, help_text='Latest workout last_synced_at folded in', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eddington_histories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'discipline')},
+            },
+        ),
+    ]
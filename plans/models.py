@@ -1,10 +1,13 @@
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
-from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 import secrets
 import json
 
+from accounts.models import FTPEntry, PaceEntry
+
 def exercise_image_path(instance, filename):
     """Generate path for exercise images"""
     return f'exercises/{instance.name.replace(" ", "_")}/{filename}'
@@ -112,11 +115,25 @@ class RecapShare(models.Model):
 
 
 class RecapCache(models.Model):
-    """Cache for yearly recap data to reduce database load"""
+    """Yearly recap data, built in the background by plans.recap.build_recap"""
+    STATUS_PENDING = "pending"
+    STATUS_BUILDING = "building"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_BUILDING, "Building"),
+        (STATUS_READY, "Ready"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recap_caches")
     year = models.IntegerField(help_text="Year for this recap cache")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, help_text="State of the latest background build")
+    section_versions = models.JSONField(default=dict, blank=True, help_text="Per-section {version, built_at}; a section is rebuilt when the version of its inputs changes")
     
     # Store all calculated metrics as JSON
+    overview = models.JSONField(default=dict, blank=True, help_text="Total workouts, active days, longest streak and monthly counts")
     daily_activities = models.JSONField(default=dict, blank=True)
     daily_calories = models.JSONField(default=dict, blank=True)
     daily_power = models.JSONField(default=dict, blank=True)
@@ -170,54 +187,40 @@ class RecapCache(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.year} Recap Cache"
     
+    def is_built(self):
+        """True once a build has stored data (possibly older than the latest inputs)."""
+        return bool(self.section_versions) or self.status == self.STATUS_READY
+
     def is_stale(self):
-        """Check if cache is stale (needs recalculation)"""
-        from workouts.models import Workout
-        
-        # Check if cache exists
-        if not self.id:
+        """True if the last build did not finish or a section has never been built (no queries)."""
+        from .recap import RECAP_SECTIONS
+
+        if not self.id or self.status != self.STATUS_READY:
             return True
-        
-        # If cache has 0 workouts but workouts exist, cache is stale
-        if self.total_workouts_count == 0:
-            workout_count = Workout.objects.filter(
-                user=self.user,
-                completed_date__year=self.year
-            ).count()
-            if workout_count > 0:
-                # Workouts exist but cache says 0 - cache is stale
-                return True
-        
-        # Check if workouts have been updated since cache was created
-        if self.last_workout_updated_at:
-            latest_workout = Workout.objects.filter(
-                user=self.user,
-                completed_date__year=self.year
-            ).order_by('-last_synced_at').values_list('last_synced_at', flat=True).first()
-            
-            if latest_workout and latest_workout > self.last_workout_updated_at:
-                return True
-        
-        # Check Django cache for fast staleness check
-        cache_key = f"recap_cache_stale_{self.user.id}_{self.year}"
-        is_stale_cached = cache.get(cache_key)
-        if is_stale_cached is not None:
-            return is_stale_cached
-        
-        # Default: cache is valid
-        return False
-    
+        return any(section not in self.section_versions for section in RECAP_SECTIONS)
+
+    def build_recently_requested(self):
+        """
+        True if a build is pending/running and was touched recently, or failed
+        recently (don't queue another; a failing build backs off).
+        """
+        from .recap import RECAP_BUILD_TIMEOUT, RECAP_FAILED_RETRY_AFTER
+
+        if self.updated_at is None:
+            return False
+        age = timezone.now() - self.updated_at
+        if self.status == self.STATUS_FAILED:
+            return age < RECAP_FAILED_RETRY_AFTER
+        return self.status in (self.STATUS_PENDING, self.STATUS_BUILDING) and age < RECAP_BUILD_TIMEOUT
+
     @classmethod
     def get_cache_for_user_year(cls, user, year):
-        """Get cache for user and year if it exists and is not stale"""
-        try:
-            cache_obj = cls.objects.get(user=user, year=year)
-            if not cache_obj.is_stale():
-                return cache_obj
-        except cls.DoesNotExist:
-            pass
+        """Get cache for user and year if it has been built"""
+        cache_obj = cls.objects.filter(user=user, year=year).first()
+        if cache_obj is not None and cache_obj.is_built():
+            return cache_obj
         return None
-    
+
     @classmethod
     def get_or_create_for_user_year(cls, user, year):
         """Get or create cache for user and year"""
@@ -230,7 +233,61 @@ class RecapCache(models.Model):
     
     @classmethod
     def invalidate_for_user_year(cls, user, year):
-        """Invalidate cache for user and year"""
-        cache_key = f"recap_cache_stale_{user.id}_{year}"
-        cache.set(cache_key, True, 3600)  # Mark as stale for 1 hour
-        cls.objects.filter(user=user, year=year).delete()
+        """Mark every section of a recap dirty and queue a rebuild (keeps the old data visible meanwhile)"""
+        from .recap import request_recap_build
+
+        cls.objects.filter(user=user, year=year).update(section_versions={})
+        request_recap_build(user, year)
+
+
+class EddingtonHistory(models.Model):
+    """A user's Eddington number and its history for one discipline, kept current by plans.eddington"""
+    DISCIPLINE_CHOICES = [
+        ("all", "All"),
+        ("cycling", "Cycling"),
+        ("running", "Running"),
+        ("rowing", "Rowing"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="eddington_histories")
+    discipline = models.CharField(max_length=10, choices=DISCIPLINE_CHOICES)
+    days = models.JSONField(default=dict, blank=True, help_text="ISO date -> [maximum km, workouts] for every day with distance")
+    eddington_number = models.IntegerField(default=0)
+    above = models.JSONField(default=list, blank=True, help_text="Whole-km days above the current number (to extend the history)")
+    data = models.JSONField(default=dict, blank=True, help_text="Number, history and chart data shown on the Eddington page")
+    workouts_through = models.DateTimeField(null=True, blank=True, help_text="Latest workout last_synced_at folded in")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "discipline")
+
+    def __str__(self):
+        return f"{self.user.username} - {self.discipline} Eddington {self.eddington_number}"
+
+
+@receiver(post_save, sender=FTPEntry)
+@receiver(post_delete, sender=FTPEntry)
+@receiver(post_save, sender=PaceEntry)
+@receiver(post_delete, sender=PaceEntry)
+def refresh_recaps_on_targets_change(sender, instance, **kwargs):
+    """FTP / pace changes only dirty the recap's intensity zone section."""
+    from .recap import queue_user_recaps_refresh
+
+    queue_user_recaps_refresh(instance.user_id)
+
+
+
+@receiver(post_delete, sender="workouts.Workout")
+def rebuild_eddington_on_workout_delete(sender, instance, **kwargs):
+    """Deleted workouts aren't caught by the sync watermark; rebuild the Eddington rows on the next read."""
+    from .eddington import invalidate_eddington
+
+    invalidate_eddington(instance.user_id)
+
+
+@receiver(post_save, sender="workouts.WorkoutDetails")
+def rebuild_eddington_on_details_change(sender, instance, **kwargs):
+    """Distances saved outside a sync aren't caught by the sync watermark either."""
+    from .eddington import invalidate_eddington
+
+    invalidate_eddington(instance.workout.user_id)
@@ -0,0 +1,1572 @@
+"""Yearly recap generation.
+
+Recaps are built in the background (see plans.tasks) and stored in RecapCache
+section by section. Every section records a version derived from the inputs it
+was built from (the year's workouts, FTP / pace entries, playlists, ...), so a
+rebuild only recomputes the sections whose inputs changed. The recap view only
+reads RecapCache and shows a "building" state until the first build lands.
+"""
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Bump to rebuild every section after changing how sections are computed
+RECAP_VERSION = 1
+
+# A pending/building recap untouched for this long is queued again
+RECAP_BUILD_TIMEOUT = timedelta(minutes=15)
+
+# A failed build is not queued again by page views for this long (manual retry still works)
+RECAP_FAILED_RETRY_AFTER = timedelta(hours=1)
+
+
+def get_workout_details(workout):
+    """Safely get workout details, returning None if it doesn't exist"""
+    from workouts.models import WorkoutDetails
+
+    try:
+        return workout.details
+    except (WorkoutDetails.DoesNotExist, AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def get_year_workouts(user, year):
+    """A user's workouts for a recap year (by completed_at date)."""
+    from workouts.models import Workout
+
+    return Workout.objects.filter(
+        user=user,
+        completed_at__date__gte=date(year, 1, 1),
+        completed_at__date__lte=date(year, 12, 31)
+    ).select_related('ride_detail', 'ride_detail__workout_type', 'ride_detail__instructor', 'details')
+
+
+def build_activity_sections(user, selected_year, all_workouts):
+    """Sections computed from the year's workouts alone."""
+    # Calculate basic statistics
+    total_workouts = all_workouts.count()
+
+    # Get workout details for metrics
+    workouts_with_details = all_workouts.filter(details__isnull=False)
+
+    # Calculate summary stats
+    summary_stats = workouts_with_details.aggregate(
+        total_distance=Sum('details__distance'),
+        total_calories=Sum('details__total_calories'),
+        total_output=Sum('details__total_output'),
+        avg_output=Avg('details__avg_output'),
+        avg_calories=Avg('details__total_calories'),
+    )
+
+    # Calculate active days
+    workout_dates_raw = [dt.date() for dt in all_workouts.values_list('completed_at', flat=True) if dt is not None]
+    workout_dates = sorted(set(workout_dates_raw))
+    active_days = len(workout_dates)
+    total_days_in_year = 366 if (selected_year % 4 == 0 and selected_year % 100 != 0) or (selected_year % 400 == 0) else 365
+    rest_days = total_days_in_year - active_days
+
+    # Calculate streaks (enhanced - days, weeks, months)
+    # Get all unique workout dates, filtering out None values
+    workout_dates_raw = [dt.date() for dt in all_workouts.values_list('completed_at', flat=True) if dt is not None]
+    workout_dates = sorted(set(workout_dates_raw))
+
+    # Logging for debugging streaks
+    logger.debug(f"STREAKS DEBUG for user {user.username} ({user.id}), year {selected_year}:")
+    logger.debug(f"  Raw workout dates count: {len(workout_dates_raw)}")
+    logger.debug(f"  Unique workout dates (after filtering None): {len(workout_dates)}")
+    logger.debug("  NOTE: recap now uses completed_at (UTC, no timezone conversion)")
+    logger.debug("  If streaks don't match Peloton, existing workouts may need re-sync to update dates")
+    if workout_dates:
+        logger.debug(f"  First workout date: {workout_dates[0]}")
+        logger.debug(f"  Last workout date: {workout_dates[-1]}")
+        logger.debug(f"  Date range: {(workout_dates[-1] - workout_dates[0]).days + 1} days")
+        # Check for gaps
+        gaps = []
+        for i in range(1, min(len(workout_dates), 100)):  # Check first 100 dates
+            gap = (workout_dates[i] - workout_dates[i-1]).days
+            if gap > 1:
+                gaps.append(f"{workout_dates[i-1]} to {workout_dates[i]} (gap: {gap} days)")
+        if gaps:
+            logger.debug(f"  Found {len(gaps)} gaps in first 100 dates: {gaps[:5]}")  # Show first 5 gaps
+            logger.debug("  These gaps may be due to missing workouts or import issues")
+        else:
+            logger.debug("  No gaps found in first 100 dates")
+    
+    # Longest streak in days
+    longest_streak_days = 1 if workout_dates else 0
+    current_streak = 1 if workout_dates else 0
+    streak_start_date = workout_dates[0] if workout_dates else None
+    longest_streak_start = streak_start_date
+    
+    for i in range(1, len(workout_dates)):
+        gap = (workout_dates[i] - workout_dates[i-1]).days
+        if gap == 1:
+            current_streak += 1
+            if current_streak > longest_streak_days:
+                longest_streak_days = current_streak
+                longest_streak_start = streak_start_date
+        else:
+            # Streak broken - check if current streak is longest before resetting
+            if current_streak > longest_streak_days:
+                longest_streak_days = current_streak
+                longest_streak_start = streak_start_date
+            current_streak = 1
+            streak_start_date = workout_dates[i]
+    
+    # Check final streak (in case longest streak is at the end)
+    if current_streak > longest_streak_days:
+        longest_streak_days = current_streak
+        longest_streak_start = streak_start_date
+    
+    logger.debug(f"  Calculated longest streak: {longest_streak_days} days")
+    if longest_streak_start:
+        logger.debug(f"  Longest streak started: {longest_streak_start}")
+        if longest_streak_days > 1:
+            streak_end = longest_streak_start + timedelta(days=longest_streak_days - 1)
+            logger.debug(f"  Longest streak ended: {streak_end}")
+    logger.debug(f"  Active days count: {active_days}, Total days in year: {total_days_in_year}")
+    
+    # Longest streak in weeks
+    longest_streak_weeks = 1 if workout_dates else 0
+    current_week_streak = 1 if workout_dates else 0
+    current_week = None
+    for workout_date in workout_dates:
+        week_start = workout_date - timedelta(days=workout_date.weekday())
+        if current_week is None:
+            current_week = week_start
+        elif week_start == current_week + timedelta(days=7):
+            current_week_streak += 1
+            longest_streak_weeks = max(longest_streak_weeks, current_week_streak)
+            current_week = week_start
+        else:
+            current_week_streak = 1
+            current_week = week_start
+    
+    logger.debug(f"  Calculated longest streak in weeks: {longest_streak_weeks}")
+    
+    # Longest streak in months
+    longest_streak_months = 1 if workout_dates else 0
+    current_month_streak = 1 if workout_dates else 0
+    current_month = None
+    for workout_date in workout_dates:
+        month_start = workout_date.replace(day=1)
+        if current_month is None:
+            current_month = month_start
+        elif month_start > current_month:
+            # Check if consecutive month
+            next_month = current_month + timedelta(days=32)
+            next_month = next_month.replace(day=1)
+            if month_start == next_month:
+                current_month_streak += 1
+                longest_streak_months = max(longest_streak_months, current_month_streak)
+            else:
+                current_month_streak = 1
+            current_month = month_start
+    
+    logger.debug(f"  Calculated longest streak in months: {longest_streak_months}")
+    
+    streaks = {
+        'longest_days': longest_streak_days,
+        'longest_weeks': longest_streak_weeks,
+        'longest_months': longest_streak_months,
+    }
+    
+    # Consistency Score Calculation
+    workouts_per_week = total_workouts / 52.0 if total_workouts > 0 else 0
+    consistency_percentage = (active_days / total_days_in_year) * 100 if total_days_in_year > 0 else 0
+    
+    # Calculate consistency score (0-100)
+    # Factors: active days percentage (50%), workouts per week (30%), streak bonus (20%)
+    active_days_score = min(consistency_percentage * 0.5, 50)
+    workouts_per_week_score = min(workouts_per_week * 2.5, 30)  # Max 12 workouts/week = 30 points
+    streak_bonus = min(longest_streak_days * 0.2, 20)  # Max 100 day streak = 20 points
+    
+    consistency_score = int(active_days_score + workouts_per_week_score + streak_bonus)
+    
+    # Grade based on score
+    if consistency_score >= 90:
+        grade = 'A+'
+        grade_color = '#28a745'
+    elif consistency_score >= 80:
+        grade = 'A'
+        grade_color = '#28a745'
+    elif consistency_score >= 70:
+        grade = 'B'
+        grade_color = '#ffc107'
+    elif consistency_score >= 60:
+        grade = 'C'
+        grade_color = '#ff9800'
+    elif consistency_score >= 50:
+        grade = 'D'
+        grade_color = '#f44336'
+    else:
+        grade = 'F'
+        grade_color = '#dc3545'
+    
+    consistency_score_data = {
+        'score': consistency_score,
+        'grade': grade,
+        'grade_color': grade_color,
+        'active_days': active_days,
+        'total_days': total_days_in_year,
+        'consistency_percentage': round(consistency_percentage, 1),
+        'workouts_per_week': round(workouts_per_week, 1),
+    }
+    
+    # Consistency Metrics
+    monthly_workout_counts = {}
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        monthly_workout_counts[month_name] = month_workouts.count()
+    
+    best_month = max(monthly_workout_counts.items(), key=lambda x: x[1]) if monthly_workout_counts else None
+    worst_month = min(monthly_workout_counts.items(), key=lambda x: x[1]) if monthly_workout_counts else None
+    
+    # Most active day of week
+    weekday_counts = defaultdict(int)
+    for workout_date in workout_dates:
+        weekday_name = workout_date.strftime('%A')
+        weekday_counts[weekday_name] += 1
+    
+    most_active_day = max(weekday_counts.items(), key=lambda x: x[1])[0] if weekday_counts else None
+    
+    consistency_metrics = {
+        'workouts_per_week': round(workouts_per_week, 1),
+        'best_month': {'name': best_month[0], 'count': best_month[1]} if best_month else None,
+        'worst_month': {'name': worst_month[0], 'count': worst_month[1]} if worst_month else None,
+        'most_active_day': most_active_day,
+    }
+    
+    # Top instructors
+    top_instructors = all_workouts.filter(
+        ride_detail__instructor__isnull=False
+    ).values(
+        'ride_detail__instructor__name'
+    ).annotate(
+        count=Count('id')
+    ).order_by('-count')[:10]
+    
+    # Monthly breakdown
+    monthly_data = []
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_count = month_workouts.count()
+        monthly_data.append({
+            'month': date(selected_year, month_num, 1).strftime('%B'),
+            'count': month_count,
+        })
+    
+    # Rest Days Calculation
+    rest_days_data = {
+        'active_days': active_days,
+        'rest_days': rest_days,
+        'active_percentage': round((active_days / total_days_in_year) * 100, 1) if total_days_in_year > 0 else 0,
+    }
+    
+    # Distance Stats by Discipline (for stacked bar chart)
+    distance_stats = {
+        'total_distance_km': round((summary_stats['total_distance'] or 0) * 1.60934, 1),
+        'monthly_data': [],
+        'all_disciplines': [],
+        'discipline_colors': {
+            'cycling': '#4A90E2',
+            'running': '#FF6B35',
+            'walking': '#9BE9A8',
+            'strength': '#FFD700',
+            'yoga': '#9B59B6',
+            'other': '#95A5A6',
+        }
+    }
+    
+    # Helper function to get discipline from workout
+    def get_discipline(workout):
+        if not workout.ride_detail:
+            return 'other'
+        discipline = workout.ride_detail.fitness_discipline or ''
+        if discipline.lower() in ['cycling', 'ride']:
+            return 'cycling'
+        elif discipline.lower() in ['running', 'run']:
+            return 'running'
+        elif discipline.lower() in ['walking', 'walk']:
+            return 'walking'
+        elif discipline.lower() in ['strength']:
+            return 'strength'
+        elif discipline.lower() in ['yoga']:
+            return 'yoga'
+        return 'other'
+    
+    # Calculate monthly distance by discipline
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        
+        discipline_data = defaultdict(float)
+        for workout in month_workouts:
+            details = get_workout_details(workout)
+            if details and details.distance:
+                discipline = get_discipline(workout)
+                distance_km = details.distance * 1.60934
+                discipline_data[discipline] += distance_km
+                if discipline not in distance_stats['all_disciplines']:
+                    distance_stats['all_disciplines'].append(discipline)
+        
+        distance_stats['monthly_data'].append({
+            'month': month_name,
+            'discipline_data': [{'discipline': k, 'distance_km': round(v, 1)} for k, v in discipline_data.items()],
+        })
+    
+    # Total Hours by Discipline
+    total_hours = {
+        'all_disciplines': [],
+    }
+    
+    discipline_hours = defaultdict(float)
+    for workout in all_workouts:
+        if workout.ride_detail and workout.ride_detail.duration_seconds:
+            discipline = get_discipline(workout)
+            hours = workout.ride_detail.duration_seconds / 3600.0
+            discipline_hours[discipline] += hours
+            if discipline not in total_hours['all_disciplines']:
+                total_hours['all_disciplines'].append(discipline)
+    
+    total_hours['all_disciplines'] = [{'discipline_name': d, 'hours': round(discipline_hours.get(d, 0), 1), 'color': distance_stats['discipline_colors'].get(d, '#95A5A6')} for d in total_hours['all_disciplines']]
+    
+    # Daily Activities Heatmap
+    daily_activities = {
+        'total_activities': total_workouts,
+        'num_weeks': 53,  # Most years have 53 weeks
+        'month_positions': {},
+        'days_of_week': [],
+    }
+    
+    # Calculate which week each day falls into
+    year_start_date = date(selected_year, 1, 1)
+    year_end_date = date(selected_year, 12, 31)
+    
+    # Get first Monday of the year (or before if Jan 1 is not Monday)
+    first_monday = year_start_date
+    while first_monday.weekday() != 0:  # 0 = Monday
+        first_monday -= timedelta(days=1)
+    
+    # Count activities per day
+    daily_activity_counts = defaultdict(int)
+    for workout in all_workouts:
+        daily_activity_counts[workout.completed_date] += 1
+    
+    # Build heatmap data structure (7 rows x 53 columns)
+    # Each row represents a day of week (0=Monday, 6=Sunday)
+    # Each column represents a week
+    days_of_week_grid = [[] for _ in range(7)]  # 7 days of week
+    
+    current_date = first_monday
+    week_num = 0
+    
+    # Generate exactly 53 weeks of data
+    while week_num < 53:
+        for day_of_week in range(7):  # Monday (0) to Sunday (6)
+            if current_date > year_end_date:
+                # Past year end, add empty square
+                days_of_week_grid[day_of_week].append(None)
+            elif current_date < year_start_date:
+                # Before year start, add empty square
+                days_of_week_grid[day_of_week].append(None)
+            else:
+                # Within year, add data
+                count = daily_activity_counts.get(current_date, 0)
+                # Calculate level (0-4) based on count
+                if count == 0:
+                    level = 0
+                elif count == 1:
+                    level = 1
+                elif count <= 2:
+                    level = 2
+                elif count <= 3:
+                    level = 3
+                else:
+                    level = 4
+                
+                days_of_week_grid[day_of_week].append({
+                    'count': count,
+                    'level': level,
+                    'date': current_date.isoformat(),
+                })
+            current_date += timedelta(days=1)
+        
+        week_num += 1
+    
+    daily_activities['days_of_week'] = days_of_week_grid
+    
+    # Calculate month positions for heatmap (0-indexed, template adds 1 for CSS grid)
+    month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    month_labels = []
+    for month_num in range(1, 13):
+        month_start = date(selected_year, month_num, 1)
+        days_from_start = (month_start - first_monday).days
+        week_position = days_from_start // 7  # 0-indexed (template adds 1 for CSS grid)
+        daily_activities['month_positions'][month_num] = week_position
+        month_labels.append({
+            'num': month_num,
+            'name': month_names[month_num - 1],
+            'week_pos': week_position
+        })
+    daily_activities['month_labels'] = month_labels
+    
+    # Daily Calories Heatmap (similar structure)
+    daily_calories = {
+        'total_calories': round(summary_stats['total_calories'] or 0, 0),
+        'num_weeks': 53,
+        'month_positions': daily_activities['month_positions'].copy(),
+        'month_labels': daily_activities['month_labels'].copy(),
+        'days_of_week': [],
+    }
+    
+    daily_calorie_totals = defaultdict(float)
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.total_calories:
+            daily_calorie_totals[workout.completed_date] += details.total_calories
+    
+    max_calories = max(daily_calorie_totals.values()) if daily_calorie_totals else 1
+    
+    calories_grid = [[] for _ in range(7)]
+    current_date = first_monday
+    week_num = 0
+    
+    # Generate exactly 53 weeks of data
+    while week_num < 53:
+        for day_of_week in range(7):
+            if current_date > year_end_date or current_date < year_start_date:
+                calories_grid[day_of_week].append(None)
+            else:
+                calories = daily_calorie_totals.get(current_date, 0)
+                # Calculate level (0-5) based on calories
+                if calories == 0:
+                    level = 0
+                elif calories < 100:
+                    level = 1
+                elif calories < 200:
+                    level = 2
+                elif calories < 500:
+                    level = 3
+                elif calories < 1000:
+                    level = 4
+                else:
+                    level = 5
+                
+                calories_grid[day_of_week].append({
+                    'calories': round(calories, 0),
+                    'level': level,
+                    'date': current_date.isoformat(),
+                })
+            current_date += timedelta(days=1)
+        
+        week_num += 1
+    
+    daily_calories['days_of_week'] = calories_grid
+    
+    # Daily Power Output Heatmap
+    daily_power = {
+        'total_power': round(summary_stats['total_output'] or 0, 1),
+        'num_weeks': 53,
+        'month_positions': daily_activities['month_positions'].copy(),
+        'month_labels': daily_activities['month_labels'].copy(),
+        'days_of_week': [],
+    }
+    
+    daily_power_totals = defaultdict(float)
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.total_output:
+            daily_power_totals[workout.completed_date] += details.total_output
+    
+    max_power = max(daily_power_totals.values()) if daily_power_totals else 1
+    
+    power_grid = [[] for _ in range(7)]
+    current_date = first_monday
+    week_num = 0
+    
+    # Generate exactly 53 weeks of data
+    while week_num < 53:
+        for day_of_week in range(7):
+            if current_date > year_end_date or current_date < year_start_date:
+                power_grid[day_of_week].append(None)
+            else:
+                power = daily_power_totals.get(current_date, 0)
+                # Calculate level (0-5) based on power (kJ)
+                if power == 0:
+                    level = 0
+                elif power < 50:
+                    level = 1
+                elif power < 100:
+                    level = 2
+                elif power < 200:
+                    level = 3
+                elif power < 400:
+                    level = 4
+                else:
+                    level = 5
+                
+                power_grid[day_of_week].append({
+                    'power': round(power, 1),
+                    'level': level,
+                    'date': current_date.isoformat(),
+                })
+            current_date += timedelta(days=1)
+        
+        week_num += 1
+    
+    daily_power['days_of_week'] = power_grid
+    
+    # Start Times (hourly distribution)
+    start_times = {
+        'hourly_data': [],
+    }
+    
+    hourly_counts = defaultdict(int)
+    for workout in all_workouts:
+        # Try to get start time from recorded_date or completed_date
+        # For now, use a placeholder - would need actual start time data
+        # Assuming workouts are evenly distributed for demo
+        hour = workout.completed_date.hour if hasattr(workout.completed_date, 'hour') else 12
+        hourly_counts[hour] += 1
+    
+    for hour in range(24):
+        start_times['hourly_data'].append({
+            'hour': hour,
+            'count': hourly_counts.get(hour, 0),
+        })
+    
+    # Weekday Patterns
+    weekday_patterns = {
+        'weekday_data': [],
+        'most_active_day': None,
+        'least_active_day': None,
+    }
+    
+    weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    weekday_short = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    weekday_counts_dict = defaultdict(int)
+    
+    for workout_date in workout_dates:
+        weekday_idx = workout_date.weekday()
+        weekday_counts_dict[weekday_idx] += 1
+    
+    weekday_data_list = []
+    for idx, day_name in enumerate(weekday_names):
+        count = weekday_counts_dict.get(idx, 0)
+        weekday_data_list.append({
+            'day': day_name,
+            'day_short': weekday_short[idx],
+            'count': count,
+        })
+    
+    weekday_patterns['weekday_data'] = weekday_data_list
+    if weekday_data_list:
+        weekday_patterns['most_active_day'] = max(weekday_data_list, key=lambda x: x['count'])['day']
+        weekday_patterns['least_active_day'] = min(weekday_data_list, key=lambda x: x['count'])['day']
+    
+    # Time of Day Patterns
+    time_of_day_patterns = {
+        'period_data': [],
+        'most_active_period': None,
+    }
+    
+    period_counts = {
+        'Morning (5am-12pm)': 0,
+        'Afternoon (12pm-5pm)': 0,
+        'Evening (5pm-9pm)': 0,
+        'Night (9pm-5am)': 0,
+    }
+    
+    # Estimate time periods (would need actual start times)
+    for _ in all_workouts:
+        # Placeholder - distribute evenly for now
+        period_counts['Morning (5am-12pm)'] += 1
+    
+    time_of_day_patterns['period_data'] = [
+        {'period': 'Morning (5am-12pm)', 'count': period_counts['Morning (5am-12pm)']},
+        {'period': 'Afternoon (12pm-5pm)', 'count': period_counts['Afternoon (12pm-5pm)']},
+        {'period': 'Evening (5pm-9pm)', 'count': period_counts['Evening (5pm-9pm)']},
+        {'period': 'Night (9pm-5am)', 'count': period_counts['Night (9pm-5am)']},
+    ]
+    
+    if time_of_day_patterns['period_data']:
+        time_of_day_patterns['most_active_period'] = max(time_of_day_patterns['period_data'], key=lambda x: x['count'])['period']
+    
+    # Activity Count by Month and Discipline
+    activity_count = {
+        'total_activities': total_workouts,
+        'monthly_data': [],
+        'all_disciplines': distance_stats['all_disciplines'].copy(),
+        'discipline_colors': distance_stats['discipline_colors'].copy(),
+    }
+    
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        
+        discipline_counts = defaultdict(int)
+        for workout in month_workouts:
+            discipline = get_discipline(workout)
+            discipline_counts[discipline] += 1
+        
+        activity_count['monthly_data'].append({
+            'month': month_name,
+            'discipline_data': [{'discipline': k, 'count': v} for k, v in discipline_counts.items()],
+        })
+    
+    # Training Load (TSS)
+    training_load = {
+        'total_tss': 0,
+        'avg_tss': 0,
+        'monthly_tss': [],
+    }
+    
+    total_tss_sum = 0
+    tss_count = 0
+    monthly_tss_dict = defaultdict(float)
+    
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.tss:
+            tss_value = details.tss
+            total_tss_sum += tss_value
+            tss_count += 1
+            month_num = workout.completed_date.month
+            monthly_tss_dict[month_num] += tss_value
+    
+    training_load['total_tss'] = round(total_tss_sum, 0)
+    training_load['avg_tss'] = round(total_tss_sum / tss_count, 1) if tss_count > 0 else 0
+    
+    for month_num in range(1, 13):
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        training_load['monthly_tss'].append({
+            'month': month_name,
+            'tss': round(monthly_tss_dict.get(month_num, 0), 0),
+        })
+    
+    # Duration Distribution
+    duration_distribution = {
+        'distribution': [],
+    }
+    
+    duration_ranges = [
+        ('0-15 min', 0, 15),
+        ('15-30 min', 15, 30),
+        ('30-45 min', 30, 45),
+        ('45-60 min', 45, 60),
+        ('60-90 min', 60, 90),
+        ('90+ min', 90, 9999),
+    ]
+    
+    for range_name, min_minutes, max_minutes in duration_ranges:
+        count = 0
+        for workout in all_workouts:
+            if workout.ride_detail and workout.ride_detail.duration_seconds:
+                duration_minutes = workout.ride_detail.duration_seconds / 60.0
+                if min_minutes <= duration_minutes < max_minutes:
+                    count += 1
+        
+        duration_distribution['distribution'].append({
+            'range': range_name,
+            'count': count,
+        })
+    
+    # Progress Over Time
+    progress_over_time = {
+        'monthly_data': [],
+        'output_trend': 'stable',
+        'output_change_pct': 0,
+    }
+    
+    monthly_output_avgs = []
+    monthly_distance_avgs = []
+    monthly_calorie_avgs = []
+    
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        
+        month_output_sum = 0
+        month_output_count = 0
+        month_distance_sum = 0
+        month_distance_count = 0
+        month_calorie_sum = 0
+        month_calorie_count = 0
+        
+        for workout in month_workouts:
+            details = get_workout_details(workout)
+            if details:
+                if details.total_output:
+                    month_output_sum += details.total_output
+                    month_output_count += 1
+                if details.distance:
+                    month_distance_sum += details.distance * 1.60934
+                    month_distance_count += 1
+                if details.total_calories:
+                    month_calorie_sum += details.total_calories
+                    month_calorie_count += 1
+        
+        avg_output = (month_output_sum / month_output_count) if month_output_count > 0 else 0
+        avg_distance = (month_distance_sum / month_distance_count) if month_distance_count > 0 else 0
+        avg_calories = (month_calorie_sum / month_calorie_count) if month_calorie_count > 0 else 0
+        
+        monthly_output_avgs.append(avg_output)
+        monthly_distance_avgs.append(avg_distance)
+        monthly_calorie_avgs.append(avg_calories)
+        
+        progress_over_time['monthly_data'].append({
+            'month': month_name,
+            'avg_output_kj': round(avg_output, 1),
+            'avg_distance_km': round(avg_distance, 1),
+            'avg_calories': round(avg_calories, 0),
+        })
+    
+    # Calculate trend
+    if len(monthly_output_avgs) >= 2:
+        first_half_avg = sum(monthly_output_avgs[:6]) / 6 if len(monthly_output_avgs) >= 6 else monthly_output_avgs[0]
+        second_half_avg = sum(monthly_output_avgs[-6:]) / 6 if len(monthly_output_avgs) >= 6 else monthly_output_avgs[-1]
+        if second_half_avg > first_half_avg * 1.05:
+            progress_over_time['output_trend'] = 'increasing'
+            progress_over_time['output_change_pct'] = round(((second_half_avg - first_half_avg) / first_half_avg) * 100, 1)
+        elif second_half_avg < first_half_avg * 0.95:
+            progress_over_time['output_trend'] = 'decreasing'
+            progress_over_time['output_change_pct'] = round(((second_half_avg - first_half_avg) / first_half_avg) * 100, 1)
+    
+    # Monthly Comparison
+    monthly_comparison = {
+        'monthly_data': [],
+    }
+    
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        
+        total_hours_month = sum(
+            (w.ride_detail.duration_seconds / 3600.0) for w in month_workouts
+            if w.ride_detail and w.ride_detail.duration_seconds
+        )
+        
+        total_distance_month = 0
+        for w in month_workouts:
+            details = get_workout_details(w)
+            if details and details.distance:
+                total_distance_month += details.distance * 1.60934
+        
+        monthly_comparison['monthly_data'].append({
+            'month': month_name,
+            'workout_count': month_workouts.count(),
+            'total_hours': round(total_hours_month, 1),
+            'total_distance_km': round(total_distance_month, 1),
+        })
+    
+    # Peak Performance
+    peak_performance = {
+        'monthly_data': [],
+        'best_month': None,
+        'worst_month': None,
+        'best_month_avg': 0,
+        'worst_month_avg': 0,
+        'top_days': [],
+    }
+    
+    monthly_avg_outputs = {}
+    daily_outputs = []
+    
+    for month_num in range(1, 13):
+        month_workouts = all_workouts.filter(completed_date__month=month_num)
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        
+        month_output_sum = 0
+        month_output_count = 0
+        
+        for workout in month_workouts:
+            details = get_workout_details(workout)
+            if details and details.total_output:
+                output = details.total_output
+                month_output_sum += output
+                month_output_count += 1
+                daily_outputs.append({
+                    'date': workout.completed_date.isoformat(),
+                    'output_kj': round(output, 1),
+                })
+        
+        avg_output = (month_output_sum / month_output_count) if month_output_count > 0 else 0
+        monthly_avg_outputs[month_name] = avg_output
+        
+        peak_performance['monthly_data'].append({
+            'month': month_name,
+            'avg_output_kj': round(avg_output, 1),
+        })
+    
+    if monthly_avg_outputs:
+        best_month_name = max(monthly_avg_outputs.items(), key=lambda x: x[1])[0]
+        worst_month_name = min(monthly_avg_outputs.items(), key=lambda x: x[1])[0]
+        peak_performance['best_month'] = best_month_name
+        peak_performance['worst_month'] = worst_month_name
+        peak_performance['best_month_avg'] = round(monthly_avg_outputs[best_month_name], 1)
+        peak_performance['worst_month_avg'] = round(monthly_avg_outputs[worst_month_name], 1)
+    
+    # Top 10 days by output
+    daily_outputs.sort(key=lambda x: x['output_kj'], reverse=True)
+    peak_performance['top_days'] = daily_outputs[:10]
+    
+    # Elevation Stats
+    elevation_stats = {
+        'total_elevation_m': 0,
+        'monthly_elevation': [],
+    }
+    
+    # Note: Elevation data may not be available in current model
+    # This is a placeholder structure
+    total_elevation = 0
+    monthly_elevation_dict = defaultdict(float)
+    
+    for workout in all_workouts:
+        # Elevation would come from workout details if available
+        # For now, set to 0
+        month_num = workout.completed_date.month
+        monthly_elevation_dict[month_num] += 0  # Placeholder
+    
+    elevation_stats['total_elevation_m'] = round(total_elevation, 0)
+    
+    for month_num in range(1, 13):
+        month_name = date(selected_year, month_num, 1).strftime('%B')
+        elevation_stats['monthly_elevation'].append({
+            'month': month_name,
+            'elevation_m': round(monthly_elevation_dict.get(month_num, 0), 0),
+        })
+    
+    # Best Workouts by Discipline
+    best_workouts_by_discipline = {
+        'best_workouts_by_discipline': {},
+        'discipline_labels': {
+            'cycling': 'Cycling',
+            'running': 'Running',
+            'walking': 'Walking',
+            'strength': 'Strength',
+            'yoga': 'Yoga',
+            'other': 'Other',
+        }
+    }
+    
+    discipline_best = defaultdict(list)
+    
+    for workout in all_workouts:
+        discipline = get_discipline(workout)
+        details = get_workout_details(workout)
+        if details:
+            output_kj = details.total_output or 0
+            distance_km = (details.distance or 0) * 1.60934
+            calories = details.total_calories or 0
+            
+            discipline_best[discipline].append({
+                'ride_title': workout.ride_detail.title if workout.ride_detail else 'Workout',
+                'instructor': workout.ride_detail.instructor.name if workout.ride_detail and workout.ride_detail.instructor else None,
+                'date_formatted': workout.completed_date.strftime('%b %d, %Y'),
+                'total_output_kj': round(output_kj, 1),
+                'distance_km': round(distance_km, 1),
+                'calories': round(calories, 0),
+            })
+    
+    # Get top 3 workouts per discipline by output
+    for discipline, workouts_list in discipline_best.items():
+        sorted_workouts = sorted(workouts_list, key=lambda x: x['total_output_kj'], reverse=True)
+        best_workouts_by_discipline['best_workouts_by_discipline'][discipline] = sorted_workouts[:3]
+    
+    # Heart Rate Zones (placeholder - would need HR zone data)
+    heart_rate_zones = {
+        'has_hr_data': False,
+        'hr_zone_data': [],
+    }
+    
+    # Personal Records
+    personal_records = {
+        'records': {},
+    }
+    
+    # Find longest distance workout
+    longest_distance_workout = None
+    max_distance = 0
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.distance:
+            distance_km = details.distance * 1.60934
+            if distance_km > max_distance:
+                max_distance = distance_km
+                longest_distance_workout = workout
+    
+    if longest_distance_workout:
+        personal_records['records']['longest_distance'] = {
+            'value_km': round(max_distance, 1),
+            'workout': {'ride': {'title': longest_distance_workout.ride_detail.title if longest_distance_workout.ride_detail else 'Workout'}},
+        }
+    
+    # Find highest power workout
+    highest_power_workout = None
+    max_power = 0
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.total_output:
+            if details.total_output > max_power:
+                max_power = details.total_output
+                highest_power_workout = workout
+    
+    if highest_power_workout:
+        personal_records['records']['highest_power'] = {
+            'value_kj': round(max_power, 1),
+            'workout': {'ride': {'title': highest_power_workout.ride_detail.title if highest_power_workout.ride_detail else 'Workout'}},
+        }
+    
+    # Find most calories workout
+    most_calories_workout = None
+    max_calories = 0
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.total_calories:
+            if details.total_calories > max_calories:
+                max_calories = details.total_calories
+                most_calories_workout = workout
+    
+    if most_calories_workout:
+        personal_records['records']['most_calories'] = {
+            'value': round(max_calories, 0),
+            'workout': {'ride': {'title': most_calories_workout.ride_detail.title if most_calories_workout.ride_detail else 'Workout'}},
+        }
+    
+    # Find longest duration workout
+    longest_duration_workout = None
+    max_duration = 0
+    for workout in all_workouts:
+        if workout.ride_detail and workout.ride_detail.duration_seconds:
+            if workout.ride_detail.duration_seconds > max_duration:
+                max_duration = workout.ride_detail.duration_seconds
+                longest_duration_workout = workout
+    
+    if longest_duration_workout:
+        hours = max_duration / 3600.0
+        personal_records['records']['longest_duration'] = {
+            'hours': round(hours, 1),
+            'workout': {'ride': {'title': longest_duration_workout.ride_detail.title if longest_duration_workout.ride_detail else 'Workout'}},
+        }
+    
+    # Find highest TSS workout
+    highest_tss_workout = None
+    max_tss = 0
+    for workout in all_workouts:
+        details = get_workout_details(workout)
+        if details and details.tss:
+            if details.tss > max_tss:
+                max_tss = details.tss
+                highest_tss_workout = workout
+    
+    if highest_tss_workout:
+        personal_records['records']['highest_tss'] = {
+            'value': round(max_tss, 0),
+            'workout': {'ride': {'title': highest_tss_workout.ride_detail.title if highest_tss_workout.ride_detail else 'Workout'}},
+        }
+    
+    # Distance Milestones
+    distance_milestones = {
+        'has_cycling_milestones': False,
+        'has_running_milestones': False,
+        'cycling_distance_km': 0,
+        'running_distance_km': 0,
+        'cycling_milestones': [],
+        'running_milestones': [],
+    }
+    
+    cycling_distance_total = 0
+    for w in all_workouts:
+        details = get_workout_details(w)
+        if details and details.distance and get_discipline(w) == 'cycling':
+            cycling_distance_total += details.distance * 1.60934
+    
+    running_distance_total = 0
+    for w in all_workouts:
+        details = get_workout_details(w)
+        if details and details.distance and get_discipline(w) in ['running', 'walking']:
+            running_distance_total += details.distance * 1.60934
+    
+    distance_milestones['cycling_distance_km'] = round(cycling_distance_total, 0)
+    distance_milestones['running_distance_km'] = round(running_distance_total, 0)
+    
+    # Compare to common distances
+    cycling_comparisons = [
+        ('NYC to Boston', 306),
+        ('NYC to DC', 225),
+        ('Coast to Coast (US)', 4500),
+        ('Tour de France', 3500),
+    ]
+    
+    running_comparisons = [
+        ('Marathon', 42.2),
+        ('Half Marathon', 21.1),
+        ('10K', 10),
+        ('5K', 5),
+    ]
+    
+    for name, distance_km in cycling_comparisons:
+        if cycling_distance_total >= distance_km:
+            distance_milestones['cycling_milestones'].append({
+                'icon': '🚴',
+                'comparison': f'Equivalent to {name} ({distance_km} km)',
+            })
+            distance_milestones['has_cycling_milestones'] = True
+    
+    for name, distance_km in running_comparisons:
+        if running_distance_total >= distance_km:
+            distance_milestones['running_milestones'].append({
+                'icon': '🏃',
+                'comparison': f'Equivalent to {name} ({distance_km} km)',
+            })
+            distance_milestones['has_running_milestones'] = True
+    
+    # Workout Type Breakdown
+    workout_type_breakdown = {
+        'type_data': [],
+    }
+    
+    type_counts = defaultdict(int)
+    type_colors = {
+        'cycling': '#4A90E2',
+        'running': '#FF6B35',
+        'walking': '#9BE9A8',
+        'strength': '#FFD700',
+        'yoga': '#9B59B6',
+        'other': '#95A5A6',
+    }
+    
+    for workout in all_workouts:
+        discipline = get_discipline(workout)
+        type_counts[discipline] += 1
+    
+    total_workouts_for_types = sum(type_counts.values())
+    
+    for discipline, count in sorted(type_counts.items(), key=lambda x: x[1], reverse=True):
+        percentage = (count / total_workouts_for_types * 100) if total_workouts_for_types > 0 else 0
+        workout_type_breakdown['type_data'].append({
+            'type_label': discipline.title(),
+            'count': count,
+            'percentage': round(percentage, 1),
+            'color': type_colors.get(discipline, '#95A5A6'),
+        })
+    
+    # Yearly Calendar (activity calendar)
+    yearly_calendar = {
+        'has_data': True,
+        'months': [],
+    }
+    
+    # Build calendar for each month
+    for month_num in range(1, 13):
+        month_start = date(selected_year, month_num, 1)
+        # Get last day of month
+        if month_num == 12:
+            month_end = date(selected_year, 12, 31)
+        else:
+            month_end = date(selected_year, month_num + 1, 1) - timedelta(days=1)
+        
+        # Get first Monday before or on month start
+        first_monday_month = month_start
+        while first_monday_month.weekday() != 0:
+            first_monday_month -= timedelta(days=1)
+        
+        month_days = []
+        current_date = first_monday_month
+        
+        # Fill in days before month start (empty)
+        while current_date < month_start:
+            month_days.append({'day': None, 'type': None})
+            current_date += timedelta(days=1)
+        
+        # Fill in actual month days
+        while current_date <= month_end:
+            day_workouts = all_workouts.filter(completed_date=current_date)
+            
+            # Determine workout type for the day
+            day_type = None
+            has_cardio = False
+            has_strength = False
+            
+            for workout in day_workouts:
+                discipline = get_discipline(workout)
+                if discipline in ['cycling', 'running', 'walking']:
+                    has_cardio = True
+                elif discipline == 'strength':
+                    has_strength = True
+            
+            if has_cardio and has_strength:
+                day_type = 'cardio_and_strength'
+            elif has_cardio:
+                day_type = 'cardio'
+            elif has_strength:
+                day_type = 'strength'
+            elif day_workouts.exists():
+                day_type = 'other'
+            
+            month_days.append({
+                'day': current_date.day,
+                'type': day_type,
+            })
+            current_date += timedelta(days=1)
+        
+        # Fill remaining days to complete weeks (empty)
+        while len(month_days) % 7 != 0:
+            month_days.append({'day': None, 'type': None})
+        
+        yearly_calendar['months'].append({
+            'name': month_start.strftime('%B'),
+            'days': month_days,
+        })
+
+    return {
+        "overview": {
+            "total_workouts": total_workouts,
+            "active_days": active_days,
+            "longest_streak": longest_streak_days,
+            "monthly_data": monthly_data,
+        },
+        "summary_stats": {
+            "total_distance_km": round((summary_stats['total_distance'] or 0) * 1.60934, 1),
+            "total_calories": round(summary_stats['total_calories'] or 0, 0),
+            "total_output_kj": round(summary_stats['total_output'] or 0, 1),
+            "avg_output": round(summary_stats['avg_output'] or 0, 1),
+            "avg_calories": round(summary_stats['avg_calories'] or 0, 0),
+            "avg_duration_minutes": round(sum((w.ride_detail.duration_seconds / 60.0) for w in all_workouts if w.ride_detail and w.ride_detail.duration_seconds) / total_workouts, 1) if total_workouts > 0 else 0,
+            "avg_distance_km": round((summary_stats['total_distance'] or 0) * 1.60934 / total_workouts, 1) if total_workouts > 0 else 0,
+            "avg_power_kj": round((summary_stats['total_output'] or 0) / total_workouts, 1) if total_workouts > 0 else 0,
+        },
+        "top_instructors": list(top_instructors),
+        "consistency_score": consistency_score_data,
+        "consistency_metrics": consistency_metrics,
+        "streaks": streaks,
+        "rest_days": rest_days_data,
+        "distance_stats": distance_stats,
+        "total_hours": total_hours,
+        "daily_activities": daily_activities,
+        "daily_calories": daily_calories,
+        "daily_power": daily_power,
+        "start_times": start_times,
+        "weekday_patterns": weekday_patterns,
+        "time_of_day_patterns": time_of_day_patterns,
+        "activity_count": activity_count,
+        "training_load": training_load,
+        "duration_distribution": duration_distribution,
+        "progress_over_time": progress_over_time,
+        "monthly_comparison": monthly_comparison,
+        "peak_performance": peak_performance,
+        "elevation_stats": elevation_stats,
+        "best_workouts_by_discipline": best_workouts_by_discipline,
+        "heart_rate_zones": heart_rate_zones,
+        "personal_records": personal_records,
+        "distance_milestones": distance_milestones,
+        "workout_type_breakdown": workout_type_breakdown,
+        "yearly_calendar": yearly_calendar,
+    }
+
+
+def build_year_over_year(user, selected_year, all_workouts):
+    """Comparison with the previous year (also depends on last year's workouts)."""
+    from workouts.models import Workout
+
+    total_workouts = all_workouts.count()
+    summary_stats = all_workouts.filter(details__isnull=False).aggregate(
+        total_distance=Sum('details__distance'),
+        total_calories=Sum('details__total_calories'),
+        total_output=Sum('details__total_output'),
+    )
+
+    # Year-over-Year Comparison
+    year_over_year = {
+        'available': False,
+        'current_year': selected_year,
+        'previous_year': selected_year - 1,
+        'comparison_data': [],
+    }
+    
+    previous_year_workouts = Workout.objects.filter(
+        user=user,
+        completed_date__gte=date(selected_year - 1, 1, 1),
+        completed_date__lte=date(selected_year - 1, 12, 31)
+    ).select_related('details')
+    
+    if previous_year_workouts.exists():
+        year_over_year['available'] = True
+        
+        prev_stats = previous_year_workouts.filter(details__isnull=False).aggregate(
+            total_distance=Sum('details__distance'),
+            total_calories=Sum('details__total_calories'),
+            total_output=Sum('details__total_output'),
+            total_workouts=Count('id'),
+        )
+        
+        current_total_distance = (summary_stats['total_distance'] or 0) * 1.60934
+        prev_total_distance = (prev_stats['total_distance'] or 0) * 1.60934
+        
+        current_total_calories = summary_stats['total_calories'] or 0
+        prev_total_calories = prev_stats['total_calories'] or 0
+        
+        current_total_output = summary_stats['total_output'] or 0
+        prev_total_output = prev_stats['total_output'] or 0
+        
+        def calc_change(current, previous):
+            if previous == 0:
+                return 100.0 if current > 0 else 0.0
+            return ((current - previous) / previous) * 100
+        
+        year_over_year['comparison_data'] = [
+            {
+                'metric': 'Total Workouts',
+                'previous': prev_stats['total_workouts'] or 0,
+                'current': total_workouts,
+                'change_pct': calc_change(total_workouts, prev_stats['total_workouts'] or 1),
+            },
+            {
+                'metric': 'Total Distance (km)',
+                'previous': round(prev_total_distance, 1),
+                'current': round(current_total_distance, 1),
+                'change_pct': calc_change(current_total_distance, prev_total_distance or 1),
+            },
+            {
+                'metric': 'Total Calories',
+                'previous': round(prev_total_calories, 0),
+                'current': round(current_total_calories, 0),
+                'change_pct': calc_change(current_total_calories, prev_total_calories or 1),
+            },
+            {
+                'metric': 'Total Output (kJ)',
+                'previous': round(prev_total_output, 1),
+                'current': round(current_total_output, 1),
+                'change_pct': calc_change(current_total_output, prev_total_output or 1),
+            },
+        ]
+
+    return {"year_over_year": year_over_year}
+
+
+def build_intensity_zones(user, selected_year, all_workouts):
+    """Power / pace zone split for the year (depends on FTP and pace levels)."""
+    from core.services import ZoneCalculatorService
+
+    # Intensity Zones (Power Zones for Cycling, Pace Zones for Running)
+    intensity_zones = {
+        'has_power_zone_data': False,
+        'has_pace_zone_data': False,
+        'power_zone_data': [],
+        'pace_zone_data': [],
+    }
+    
+    # Calculate power zones for the year (cycling)
+    # Get user's FTP for zone calculations
+    from accounts.models import FTPEntry
+    current_ftp = FTPEntry.objects.filter(user=user).order_by('-recorded_date', '-created_at').first()
+    
+    cycling_workouts_year = all_workouts.filter(
+        Q(ride_detail__fitness_discipline__in=['cycling', 'ride']) |
+        Q(ride_detail__workout_type__slug__in=['cycling', 'ride'])
+    )
+    
+    if cycling_workouts_year.exists():
+        cycling_zones_all = ZoneCalculatorService.calculate_cycling_zones(cycling_workouts_year, period='all', current_ftp=current_ftp)
+        if cycling_zones_all['total_seconds'] > 0:
+            intensity_zones['has_power_zone_data'] = True
+            total_minutes = cycling_zones_all['total_seconds'] / 60.0
+            
+            power_zone_colors = {
+                1: '#4c6ef5', 2: '#22c55e', 3: '#f59e0b', 4: '#ef4444',
+                5: '#ec4899', 6: '#a855f7', 7: '#9333ea',
+            }
+            
+            power_zone_names = {
+                1: 'Recovery', 2: 'Endurance', 3: 'Tempo', 4: 'Threshold',
+                5: 'VO2 Max', 6: 'Anaerobic', 7: 'Neuromuscular',
+            }
+            
+            for zone_num in range(1, 8):
+                zone_info = cycling_zones_all['zones'][zone_num]
+                time_minutes = zone_info['time_seconds'] / 60.0
+                percentage = (time_minutes / total_minutes * 100) if total_minutes > 0 else 0
+                
+                intensity_zones['power_zone_data'].append({
+                    'name': power_zone_names[zone_num],
+                    'time_minutes': round(time_minutes, 0),
+                    'percentage': round(percentage, 1),
+                    'color': power_zone_colors[zone_num],
+                })
+    
+    # Calculate pace zones for the year (running)
+    running_workouts_year = all_workouts.filter(
+        Q(ride_detail__fitness_discipline__in=['running', 'run', 'walking']) |
+        Q(ride_detail__workout_type__slug__in=['running', 'run', 'walking'])
+    )
+    
+    if running_workouts_year.exists():
+        running_zones_all = ZoneCalculatorService.calculate_running_zones(running_workouts_year, period='all')
+        if running_zones_all['total_seconds'] > 0:
+            intensity_zones['has_pace_zone_data'] = True
+            total_minutes = running_zones_all['total_seconds'] / 60.0
+            
+            pace_zone_colors = {
+                'recovery': '#4c6ef5', 'easy': '#22c55e', 'moderate': '#fbbf24',
+                'challenging': '#f59e0b', 'hard': '#ef4444', 'very_hard': '#a855f7', 'max': '#ec4899',
+            }
+            
+            for zone_key in ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']:
+                zone_info = running_zones_all['zones'][zone_key]
+                time_minutes = zone_info['time_seconds'] / 60.0
+                percentage = (time_minutes / total_minutes * 100) if total_minutes > 0 else 0
+                
+                intensity_zones['pace_zone_data'].append({
+                    'name': zone_info['name'],
+                    'time_minutes': round(time_minutes, 0),
+                    'percentage': round(percentage, 1),
+                    'color': pace_zone_colors[zone_key],
+                })
+
+    return {"intensity_zones": intensity_zones}
+
+
+def build_top_songs(user, selected_year, all_workouts):
+    """Most played songs across the playlists of the classes taken this year."""
+    from workouts.models import Playlist
+
+    song_counts = defaultdict(int)
+    for songs in Playlist.objects.filter(ride_detail__workouts__in=all_workouts).values_list('songs', flat=True):
+        for song in songs or []:
+            title = song.get('title')
+            if not title:
+                continue
+            artists = ', '.join(
+                artist['artist_name'] for artist in song.get('artists') or [] if artist.get('artist_name')
+            )
+            song_counts[(title, artists)] += 1
+
+    top = sorted(song_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    return {
+        "top_songs": {
+            "total_songs": sum(song_counts.values()),
+            "songs": [{"title": title, "artists": artists, "count": count} for (title, artists), count in top],
+        }
+    }
+
+
+# (inputs, sections, builder): a builder reruns when the version of any of its inputs changes
+RECAP_BUILDERS = (
+    (
+        ('workouts',),
+        [
+            'overview', 'summary_stats', 'top_instructors', 'consistency_score', 'consistency_metrics',
+            'streaks', 'rest_days', 'distance_stats', 'total_hours', 'daily_activities', 'daily_calories',
+            'daily_power', 'start_times', 'weekday_patterns', 'time_of_day_patterns', 'activity_count',
+            'training_load', 'duration_distribution', 'progress_over_time', 'monthly_comparison',
+            'peak_performance', 'elevation_stats', 'best_workouts_by_discipline', 'heart_rate_zones',
+            'personal_records', 'distance_milestones', 'workout_type_breakdown', 'yearly_calendar',
+        ],
+        build_activity_sections,
+    ),
+    (('workouts', 'previous_year'), ['year_over_year'], build_year_over_year),
+    (('workouts', 'ftp', 'pace'), ['intensity_zones'], build_intensity_zones),
+    (('workouts', 'playlists'), ['top_songs'], build_top_songs),
+)
+
+RECAP_SECTIONS = [section for _, sections, _ in RECAP_BUILDERS for section in sections]
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+
+def recap_input_versions(user, year, workouts=None):
+    """
+    Version string per recap input for a user and year.
+
+    Args:
+        workouts: the year's workouts (see get_year_workouts), if already built
+
+    Returns:
+        dict: input name -> version
+    """
+    from accounts.models import FTPEntry, PaceEntry
+    from workouts.models import Playlist, Workout
+
+    if workouts is None:
+        workouts = get_year_workouts(user, year)
+
+    def _workout_state(qs):
+        state = qs.aggregate(count=Count('id'), last_id=Max('id'), last_synced=Max('last_synced_at'))
+        return sorted(state.items())
+
+    previous_year = Workout.objects.filter(user=user, completed_date__year=year - 1)
+    playlists = Playlist.objects.filter(ride_detail__workouts__in=workouts).aggregate(
+        count=Count('id'), last_synced=Max('last_synced_at'),
+    )
+    return {
+        'workouts': _digest(_workout_state(workouts)),
+        'previous_year': _digest(_workout_state(previous_year)),
+        'ftp': _digest(list(
+            FTPEntry.objects.filter(user=user).order_by('id')
+            .values_list('id', 'ftp_value', 'recorded_date', 'is_active')
+        )),
+        'pace': _digest(list(
+            PaceEntry.objects.filter(user=user).order_by('id')
+            .values_list('id', 'activity_type', 'level', 'recorded_date', 'is_active')
+        )),
+        'playlists': _digest(sorted(playlists.items())),
+    }
+
+
+def section_version(inputs, input_versions):
+    """Version of a section built from the given inputs."""
+    return _digest((RECAP_VERSION, [input_versions[name] for name in inputs]))
+
+
+def build_recap(user, year, force=False):
+    """
+    Bring a user's RecapCache for a year up to date.
+
+    Only sections whose inputs changed since they were last built are
+    recomputed (every section with force=True).
+
+    Returns:
+        list: names of the sections that were rebuilt
+    """
+    from .models import RecapCache
+
+    recap_cache, _ = RecapCache.objects.get_or_create(user=user, year=year)
+    RecapCache.objects.filter(pk=recap_cache.pk).update(status=RecapCache.STATUS_BUILDING, updated_at=timezone.now())
+
+    workouts = get_year_workouts(user, year)
+    versions = dict(recap_cache.section_versions or {})
+    rebuilt = []
+    try:
+        input_versions = recap_input_versions(user, year, workouts)
+        has_workouts = workouts.exists()
+        for inputs, sections, builder in RECAP_BUILDERS:
+            version = section_version(inputs, input_versions)
+            if not force and all(versions.get(section, {}).get('version') == version for section in sections):
+                continue
+            data = builder(user, year, workouts) if has_workouts else {}
+            built_at = timezone.now().isoformat()
+            for section in sections:
+                setattr(recap_cache, section, data.get(section, {}))
+                versions[section] = {'version': version, 'built_at': built_at}
+            rebuilt.extend(sections)
+    except Exception:
+        RecapCache.objects.filter(pk=recap_cache.pk).update(status=RecapCache.STATUS_FAILED, updated_at=timezone.now())
+        raise
+
+    recap_cache.section_versions = versions
+    recap_cache.status = RecapCache.STATUS_READY
+    recap_cache.total_workouts_count = workouts.count()
+    recap_cache.last_workout_updated_at = workouts.aggregate(last=Max('last_synced_at'))['last']
+    recap_cache.save()
+    logger.info(f"Built recap for user {user.id}, year {year}: {len(rebuilt)} sections rebuilt")
+    return rebuilt
+
+
+def recap_context(recap_cache):
+    """Template context for a built RecapCache."""
+    overview = recap_cache.overview or {}
+    context = {
+        "has_workouts": recap_cache.total_workouts_count > 0,
+        "total_workouts": overview.get("total_workouts", recap_cache.total_workouts_count),
+        "active_days": overview.get("active_days"),
+        "longest_streak": overview.get("longest_streak"),
+        "monthly_data": overview.get("monthly_data", []),
+    }
+    for section in RECAP_SECTIONS:
+        if section != 'overview':
+            context[section] = getattr(recap_cache, section)
+    return context
+
+
+def _enqueue_on_commit(task, *args):
+    def _enqueue():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.warning(f"Could not queue {task.name}{args}: {e}")
+
+    transaction.on_commit(_enqueue)
+
+
+def request_recap_build(user, year, force=False):
+    """
+    Mark a recap as pending and queue its background build.
+
+    Returns:
+        RecapCache: the (possibly new, still empty) cache row
+    """
+    from .models import RecapCache
+    from .tasks import build_recap_task
+
+    recap_cache, _ = RecapCache.objects.get_or_create(user=user, year=year)
+    recap_cache.status = RecapCache.STATUS_PENDING
+    recap_cache.save(update_fields=['status', 'updated_at'])
+    _enqueue_on_commit(build_recap_task, user.id, year, force)
+    return recap_cache
+
+
+def queue_user_recaps_refresh(user_id):
+    """Queue an incremental refresh of every recap a user already has (e.g. after a sync)."""
+    from .models import RecapCache
+    from .tasks import refresh_user_recaps_task
+
+    if RecapCache.objects.filter(user_id=user_id).exists():
+        _enqueue_on_commit(refresh_user_recaps_task, user_id)
+
+
+def recap_year_available(year, today=None):
+    """The current year's recap opens on December 21st."""
+    today = today or timezone.now().date()
+    return year < today.year or (year == today.year and today.month == 12 and today.day >= 21)
+
+
+def prewarm_recaps(year, user_ids=None, inline=False, force=False):
+    """
+    Create and build recaps for every user with workouts in a year.
+
+    Missing RecapCache rows are created in bulk; builds are queued as one task
+    per user, or run in this process with inline=True.
+
+    Returns:
+        int: number of users processed
+    """
+    from workouts.models import Workout
+    from .models import RecapCache
+    from .tasks import build_recap_task
+
+    users = Workout.objects.filter(completed_date__year=year)
+    if user_ids:
+        users = users.filter(user_id__in=user_ids)
+    user_ids = sorted(set(users.values_list('user_id', flat=True)))
+
+    RecapCache.objects.bulk_create(
+        [RecapCache(user_id=user_id, year=year) for user_id in user_ids],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+    if not inline:
+        for user_id in user_ids:
+            build_recap_task.delay(user_id, year, force)
+        return len(user_ids)
+
+    from django.contrib.auth import get_user_model
+
+    for user in get_user_model().objects.filter(id__in=user_ids).iterator():
+        try:
+            build_recap(user, year, force=force)
+        except Exception as e:
+            logger.error(f"Recap prewarm failed for user {user.id}, year {year}: {e}", exc_info=True)
+    return len(user_ids)
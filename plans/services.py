@@ -1,221 +1,223 @@
+from collections import defaultdict
 from datetime import date, timedelta
+from django.db import transaction
 from django.utils import timezone
 from plans.models import Exercise, PlanTemplateDay
 from tracker.models import WeeklyPlan, DailyPlanItem
 from challenges.models import ChallengeWorkoutAssignment, ChallengeBonusWorkout, ChallengeInstance
+from core.services import DateRangeService, TaggedCacheService
+# Mobility exercise placed on plan items (the model requires one)
+PLAN_EXERCISE_NAME = "Pelvic Tilts"
 
-def generate_weekly_plan(*, user, week_start, template, start_from_today=False, challenge_instance=None, week_number=None):
-    """
-    Generates a plan from a PlanTemplate into tracker models.
-    Idempotent per (user, week_start) due to unique constraint.
-    
-    Args:
-        start_from_today: If True, only generate exercises for today and future days in the week
-    """
-    weekly, _created = WeeklyPlan.objects.get_or_create(
-        user=user,
-        week_start=week_start,
-        defaults={"template_name": template.name},
-    )
+URL_FIELD_FOR_ACTIVITY = {
+    "ride": "peloton_ride_url",
+    "run": "peloton_run_url",
+    "yoga": "peloton_yoga_url",
+    "strength": "peloton_strength_url",
+}
 
-    # Clear existing items if regenerating
-    weekly.items.all().delete()
 
-    # Pull exercises (recovery and mobility)
-    def ex(name):
-        try:
-            return Exercise.objects.get(name=name)
-        except Exercise.DoesNotExist:
-            # Fallback to first mobility exercise if specific exercise not found
-            return Exercise.objects.filter(category="mobility").first()
+def _url_fields(activity_type, url):
+    """peloton_*_url keyword arguments for one activity's URL"""
+    field = URL_FIELD_FOR_ACTIVITY.get(activity_type)
+    return {field: url} if field else {}
 
-    # Core set - mobility exercises only (Kegels removed)
-    tilts = ex("Pelvic Tilts")
-    clocks = ex("Pelvic Clocks")
-    happy = ex("Happy Baby Release")
 
-    day_map = {d.day_of_week: d for d in template.days.all()}
-    
-    # If generating mid-week, determine which days to skip
-    today = date.today()
-    start_day = 0  # Sunday = 0
-    if start_from_today:
-        # Calculate which day of week today is (0=Sunday, 6=Saturday)
-        days_since_sunday = (today.weekday() + 1) % 7
-        start_day = days_since_sunday
-
-    for dow in range(start_day, 7):
-        td = day_map.get(dow)
-        if td is None:
-            continue
-
-        focus = td.peloton_focus
-
-        # Assign mobility exercise by focus keyword (recovery-focused)
-        focus_lower = focus.lower()
-
-        if "yoga" in focus_lower or "recovery" in focus_lower:
-            picks = [clocks, happy]
-        else:
-            picks = [tilts]
+class PlanMaterializer:
+    """
+    Builds weekly plans of one template (and challenge) in bulk.
 
-        # Get Peloton workout assignments if this is part of a challenge
-        # Group assignments by activity type, handling alternatives
-        peloton_assignments = {}
-        if challenge_instance and week_number:
-            challenge = challenge_instance.challenge
+    The template's days, the challenge's workout assignments and bonus
+    workouts, and the plan exercises are loaded once; every week's
+    WeeklyPlan and DailyPlanItem rows are then built in memory and written
+    with bulk_create in one transaction, so a whole challenge costs a
+    handful of queries instead of one INSERT per item.
+    """
+
+    def __init__(self, template, challenge=None):
+        self.template = template
+        self.challenge = challenge
+        self.day_map = {d.day_of_week: d for d in template.days.all()}
+
+        # Fallback to first mobility exercise if specific exercise not found
+        self.exercise = (
+            Exercise.objects.filter(name=PLAN_EXERCISE_NAME).first()
+            or Exercise.objects.filter(category="mobility").first()
+        )
+
+        # (week_number, day_of_week) -> assignments in alternative order
+        self.assignments = defaultdict(list)
+        # week_number -> (bonus workouts, recovery sessions)
+        self.bonus_workouts = defaultdict(lambda: ([], []))
+        if challenge is not None:
             assignments = ChallengeWorkoutAssignment.objects.filter(
-                challenge=challenge,
-                template=template,
-                week_number=week_number,
-                day_of_week=dow
-            ).order_by('alternative_group', 'order_in_group')
-            
+                challenge=challenge, template=template,
+            ).order_by("week_number", "day_of_week", "alternative_group", "order_in_group")
             for assignment in assignments:
-                activity_type = assignment.activity_type
-                if activity_type not in peloton_assignments:
-                    peloton_assignments[activity_type] = []
-                peloton_assignments[activity_type].append(assignment)
-        
-        # For backward compatibility, also create peloton_urls dict (first assignment only)
-        peloton_urls = {}
-        for activity_type, assignment_list in peloton_assignments.items():
-            if assignment_list:
-                first_assignment = assignment_list[0]
-                if activity_type == "ride":
-                    peloton_urls["ride"] = first_assignment.peloton_url
-                elif activity_type == "run":
-                    peloton_urls["run"] = first_assignment.peloton_url
-                elif activity_type == "yoga":
-                    peloton_urls["yoga"] = first_assignment.peloton_url
-                elif activity_type == "strength":
-                    peloton_urls["strength"] = first_assignment.peloton_url
-        
-        # Check if user wants recovery sessions (only for challenge instances)
-        include_recovery_sessions = True  # Default to True for standalone plans
-        if challenge_instance:
-            include_recovery_sessions = challenge_instance.include_recovery_sessions
-        
-        # Create items for Peloton workouts (including alternatives)
-        # When there are alternatives, create one item per alternative
-        if peloton_assignments:
-            # Always provide an exercise (required by model) - use mobility exercise
-            exercise_to_use = tilts
-            
-            # Create items for each activity type and its alternatives
-            for activity_type, assignment_list in peloton_assignments.items():
+                self.assignments[(assignment.week_number, assignment.day_of_week)].append(assignment)
+            for bonus in ChallengeBonusWorkout.objects.filter(challenge=challenge):
+                self.bonus_workouts[bonus.week_number][1 if bonus.is_recovery else 0].append(bonus)
+
+    def build_items(self, weekly, *, start_from_today=False, week_number=None, include_recovery_sessions=True):
+        """
+        Unsaved DailyPlanItem rows for one week.
+
+        Args:
+            start_from_today: If True, only build items for today and future days in the week
+            week_number: Challenge week (1-based); no challenge workouts without it
+            include_recovery_sessions: Add the week's recovery sessions
+        """
+        items = []
+        start_day = (date.today().weekday() + 1) % 7 if start_from_today else 0  # Sunday = 0
+        with_challenge = self.challenge is not None and week_number
+
+        for dow in range(start_day, 7):
+            td = self.day_map.get(dow)
+            if td is None or not with_challenge:
+                continue
+            # Group assignments by activity type, handling alternatives
+            peloton_assignments = {}
+            for assignment in self.assignments.get((week_number, dow), []):
+                peloton_assignments.setdefault(assignment.activity_type, []).append(assignment)
+
+            # One item per alternative
+            for assignment_list in peloton_assignments.values():
                 for assignment in assignment_list:
-                    # Build peloton_urls for this specific assignment
-                    item_peloton_urls = {}
-                    if assignment.activity_type == "ride":
-                        item_peloton_urls["ride"] = assignment.peloton_url
-                    elif assignment.activity_type == "run":
-                        item_peloton_urls["run"] = assignment.peloton_url
-                    elif assignment.activity_type == "yoga":
-                        item_peloton_urls["yoga"] = assignment.peloton_url
-                    elif assignment.activity_type == "strength":
-                        item_peloton_urls["strength"] = assignment.peloton_url
-                    
-                    DailyPlanItem.objects.create(
+                    items.append(DailyPlanItem(
                         weekly_plan=weekly,
                         day_of_week=dow,
-                        peloton_focus=focus,
-                        exercise=exercise_to_use,
-                        ride_done=False,
-                        run_done=False,
-                        yoga_done=False,
-                        strength_done=False,
-                        peloton_ride_url=item_peloton_urls.get("ride"),
-                        peloton_run_url=item_peloton_urls.get("run"),
-                        peloton_yoga_url=item_peloton_urls.get("yoga"),
-                        peloton_strength_url=item_peloton_urls.get("strength"),
+                        peloton_focus=td.peloton_focus,
+                        exercise=self.exercise,
                         workout_points=assignment.points,  # Copy points from assignment
-                    )
-        elif peloton_urls:
-            # Fallback for backward compatibility (single workout per activity)
-            exercise_to_use = tilts
-            
-            DailyPlanItem.objects.create(
-                weekly_plan=weekly,
-                day_of_week=dow,
-                peloton_focus=focus,
-                exercise=exercise_to_use,
-                ride_done=False,
-                run_done=False,
-                yoga_done=False,
-                strength_done=False,
-                peloton_ride_url=peloton_urls.get("ride"),
-                peloton_run_url=peloton_urls.get("run"),
-                peloton_yoga_url=peloton_urls.get("yoga"),
-                peloton_strength_url=peloton_urls.get("strength"),
-            )
-    
-    # Add bonus workouts for this week (same for all templates)
-    if challenge_instance and week_number:
-        challenge = challenge_instance.challenge
-        
-        # Regular bonus workouts (for extra credit points)
-        bonus_workouts = ChallengeBonusWorkout.objects.filter(
-            challenge=challenge,
-            week_number=week_number,
-            is_recovery=False  # Regular bonus workouts only
-        )
-        
-        for bonus in bonus_workouts:
-            # Use tilts as placeholder exercise
-            exercise_to_use = tilts
-            
-            # Create bonus workout item - use Saturday (day 6) as the day
-            DailyPlanItem.objects.create(
-                weekly_plan=weekly,
-                day_of_week=6,  # Saturday - bonus workouts
-                peloton_focus=f"Bonus {bonus.get_activity_type_display()}",
-                exercise=exercise_to_use,
-                ride_done=False,
-                run_done=False,
-                yoga_done=False,
-                strength_done=False,
-                peloton_ride_url=bonus.peloton_url if bonus.activity_type == "ride" else None,
-                peloton_run_url=bonus.peloton_url if bonus.activity_type == "run" else None,
-                peloton_yoga_url=bonus.peloton_url if bonus.activity_type == "yoga" else None,
-                peloton_strength_url=bonus.peloton_url if bonus.activity_type == "strength" else None,
-                points_earned=bonus.points,  # Use bonus workout points
-            )
-        
-        # Recovery sessions (yoga/pilates/breathwork on rest days)
-        if include_recovery_sessions:
-            recovery_sessions = ChallengeBonusWorkout.objects.filter(
-                challenge=challenge,
-                week_number=week_number,
-                is_recovery=True
-            )
-            
-            for recovery in recovery_sessions:
-                # Use tilts as placeholder exercise
-                exercise_to_use = tilts
-                
-                # Determine activity type based on category restriction
-                # Default to yoga if not specified
-                activity_type = recovery.activity_type if recovery.activity_type else "yoga"
-                
-                # Create recovery session item
-                DailyPlanItem.objects.create(
+                        **_url_fields(assignment.activity_type, assignment.peloton_url),
+                    ))
+
+        if with_challenge:
+            bonus_workouts, recovery_sessions = self.bonus_workouts.get(week_number, ([], []))
+            # Regular bonus workouts (extra credit) go on Saturday
+            for bonus in bonus_workouts:
+                items.append(DailyPlanItem(
                     weekly_plan=weekly,
-                    day_of_week=6,  # For now, add to Saturday - could be distributed to rest days
-                    peloton_focus=f"Recovery: {recovery.workout_title or recovery.get_activity_type_display().title()}",
-                    exercise=exercise_to_use,
-                    ride_done=False,
-                    run_done=False,
-                    yoga_done=False,
-                    strength_done=False,
-                    peloton_ride_url=recovery.peloton_url if recovery.peloton_url and activity_type == "ride" else None,
-                    peloton_run_url=recovery.peloton_url if recovery.peloton_url and activity_type == "run" else None,
-                    peloton_yoga_url=recovery.peloton_url if recovery.peloton_url and activity_type == "yoga" else None,
-                    peloton_strength_url=recovery.peloton_url if recovery.peloton_url and activity_type == "strength" else None,
-                    points_earned=recovery.points,  # Default 0 for recovery, but can be set for bonus weeks
+                    day_of_week=6,
+                    peloton_focus=f"Bonus {bonus.get_activity_type_display()}",
+                    exercise=self.exercise,
+                    points_earned=bonus.points,
+                    **_url_fields(bonus.activity_type, bonus.peloton_url),
+                ))
+            # Recovery sessions (yoga/pilates/breathwork), for now also on Saturday
+            if include_recovery_sessions:
+                for recovery in recovery_sessions:
+                    items.append(DailyPlanItem(
+                        weekly_plan=weekly,
+                        day_of_week=6,
+                        peloton_focus=f"Recovery: {recovery.workout_title or recovery.get_activity_type_display().title()}",
+                        exercise=self.exercise,
+                        points_earned=recovery.points,
+                        **_url_fields(recovery.activity_type or "yoga", recovery.peloton_url or None),
+                    ))
+        return items
+
+    def materialize(self, *, user, weeks, challenge_instance=None):
+        """
+        Create (or regenerate) a user's plans for several weeks at once.
+
+        Existing plans for those weeks keep their row but lose their items,
+        as a regeneration did before.
+
+        Args:
+            weeks: (week_start, week_number, start_from_today) per week
+            challenge_instance: Attached to every plan when given
+
+        Returns:
+            list of WeeklyPlan in the order of `weeks`
+        """
+        weeks = list(weeks)
+        include_recovery_sessions = challenge_instance.include_recovery_sessions if challenge_instance else True
+        with transaction.atomic():
+            plans = {
+                plan.week_start: plan
+                for plan in WeeklyPlan.objects.select_for_update().filter(
+                    user=user, week_start__in=[week_start for week_start, _, _ in weeks]
+                )
+            }
+            if plans:
+                DailyPlanItem.objects.filter(weekly_plan__in=list(plans.values())).delete()
+                if challenge_instance is not None:
+                    for plan in plans.values():
+                        plan.challenge_instance = challenge_instance
+                    WeeklyPlan.objects.bulk_update(list(plans.values()), ["challenge_instance"])
+            new_plans = [
+                WeeklyPlan(user=user, week_start=week_start, template_name=self.template.name, challenge_instance=challenge_instance)
+                for week_start, _, _ in weeks
+                if week_start not in plans
+            ]
+            for plan in WeeklyPlan.objects.bulk_create(new_plans):
+                plans[plan.week_start] = plan
+
+            items = []
+            for week_start, week_number, start_from_today in weeks:
+                items += self.build_items(
+                    plans[week_start],
+                    start_from_today=start_from_today,
+                    week_number=week_number if challenge_instance else None,
+                    include_recovery_sessions=include_recovery_sessions,
                 )
+            DailyPlanItem.objects.bulk_create(items, batch_size=500)
+            ordered = [plans[week_start] for week_start, _, _ in weeks]
+            # Also drops the user's cached plan totals (bulk_create sends no post_save)
+            WeeklyPlan.recalculate_points_for(ordered)
+        return ordered
+
 
-    return weekly
+def challenge_plan_weeks(challenge, *, today=None, sequential=False):
+    """
+    Weeks to generate when starting a challenge.
+
+    Past challenges get every week from the challenge start; current and
+    upcoming ones start at the current week or the challenge start, whichever
+    is later, and the current week only from today on.
+
+    Args:
+        sequential: Number weeks 1, 2, 3, ... from the first generated week
+            instead of counting from the challenge start
+
+    Returns:
+        list of (week_start, week_number, start_from_today)
+    """
+    today = today or date.today()
+    this_week = DateRangeService.sunday_of_current_week(today)
+    challenge_week_start = DateRangeService.sunday_of_current_week(challenge.start_date)
+    start_week = challenge_week_start if challenge.has_ended else max(this_week, challenge_week_start)
+    use_start_from_today = not challenge.has_ended and start_week == this_week
+
+    weeks = []
+    week_start = start_week
+    while week_start <= challenge.end_date:
+        if sequential:
+            week_number = len(weeks) + 1
+        elif week_start >= challenge.start_date:
+            week_number = ((week_start - challenge.start_date).days // 7) + 1
+        else:
+            week_number = 1
+        weeks.append((week_start, week_number, use_start_from_today and week_start == this_week))
+        week_start += timedelta(days=7)
+    return weeks
+
+
+def generate_weekly_plan(*, user, week_start, template, start_from_today=False, challenge_instance=None, week_number=None):
+    """
+    Generates a plan from a PlanTemplate into tracker models.
+    Idempotent per (user, week_start) due to unique constraint.
+    
+    Args:
+        start_from_today: If True, only generate exercises for today and future days in the week
+    """
+    challenge = challenge_instance.challenge if challenge_instance else None
+    return PlanMaterializer(template, challenge).materialize(
+        user=user,
+        weeks=[(week_start, week_number, start_from_today)],
+        challenge_instance=challenge_instance,
+    )[0]
 
 
 def get_dashboard_period(period, *, today=None):
@@ -290,13 +292,35 @@ def get_dashboard_challenge_context(*, user, current_week_start):
                 current_week_plan.week_number = idx
                 break
 
-    all_challenge_instances = ChallengeInstance.objects.filter(
-        user=user
-    ).prefetch_related('weekly_plans')
-    completed_challenges_count = sum(
-        1 for ci in all_challenge_instances
-        if ci.all_weeks_completed
+    def compute_plan_totals():
+        all_challenge_instances = ChallengeInstance.objects.filter(
+            user=user
+        ).prefetch_related('weekly_plans')
+        completed_challenges_count = sum(
+            1 for ci in all_challenge_instances
+            if ci.all_weeks_completed
+        )
+        plans = list(WeeklyPlan.objects.filter(
+            user=user,
+            challenge_instance__isnull=False
+        ).select_related('challenge_instance'))
+        return {
+            'completed_challenges_count': completed_challenges_count,
+            'total_points': sum(plan.total_points for plan in plans),
+            'total_weeks_completed': sum(1 for plan in plans if plan.is_completed),
+            'total_weeks': len(plans),
+        }
+
+    # Points and completion walk every plan item, so they are cached until a plan
+    # toggle or regeneration invalidates the user's plans tag (completion depends
+    # on the date, hence the day in the key)
+    plan_totals = TaggedCacheService.get_or_set(
+        f"ctz:dash_plans:v1:user={user.pk}:day={timezone.localdate().isoformat()}",
+        compute_plan_totals,
+        tags=[TaggedCacheService.user_plans_tag(user.pk)],
+        namespace="dashboard_plans",
     )
+    completed_challenges_count = plan_totals['completed_challenges_count']
 
     has_challenge_involvement = active_challenge_instance is not None or completed_challenges_count > 0
 
@@ -306,9 +330,9 @@ def get_dashboard_challenge_context(*, user, current_week_start):
             challenge_instance__isnull=False
         ).select_related('challenge_instance')
 
-        total_points = sum(plan.total_points for plan in all_plans)
-        total_weeks_completed = sum(1 for plan in all_plans if plan.is_completed)
-        total_weeks = all_plans.count()
+        total_points = plan_totals['total_points']
+        total_weeks_completed = plan_totals['total_weeks_completed']
+        total_weeks = plan_totals['total_weeks']
 
         recent_plans = list(all_plans.order_by('-week_start')[:3])
         for plan in recent_plans:
@@ -0,0 +1,62 @@
+"""
+Celery tasks for yearly recaps (see plans.recap).
+"""
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def build_recap_task(user_id, year, force=False):
+    """
+    Build (or incrementally refresh) one user's recap for a year.
+
+    Args:
+        user_id: User ID
+        year: recap year
+        force: rebuild every section, not just the dirty ones
+    """
+    from .recap import build_recap
+
+    try:
+        user = get_user_model().objects.get(pk=user_id)
+    except get_user_model().DoesNotExist:
+        return {'status': 'error', 'message': f'User {user_id} not found'}
+
+    rebuilt = build_recap(user, year, force=force)
+    return {'status': 'success', 'user_id': user_id, 'year': year, 'sections_rebuilt': len(rebuilt)}
+
+
+@shared_task
+def refresh_user_recaps_task(user_id):
+    """Refresh the dirty sections of every recap a user already has (run after sync / FTP changes)."""
+    from .models import RecapCache
+    from .recap import build_recap
+
+    try:
+        user = get_user_model().objects.get(pk=user_id)
+    except get_user_model().DoesNotExist:
+        return {'status': 'error', 'message': f'User {user_id} not found'}
+
+    rebuilt = {}
+    for year in RecapCache.objects.filter(user=user).values_list('year', flat=True):
+        try:
+            rebuilt[year] = len(build_recap(user, year))
+        except Exception as e:
+            logger.error(f"Recap refresh failed for user {user_id}, year {year}: {e}", exc_info=True)
+    return {'status': 'success', 'user_id': user_id, 'sections_rebuilt': rebuilt}
+
+
+@shared_task
+def prewarm_recaps_task(year=None):
+    """Queue recap builds for every user with workouts in a year (defaults to the year just ending)."""
+    from .recap import prewarm_recaps
+
+    year = year or timezone.now().year
+    users = prewarm_recaps(year)
+    logger.info(f"Queued recap builds for {users} users, year {year}")
+    return {'status': 'success', 'year': year, 'users': users}
@@ -1,3 +1,214 @@
-from django.test import TestCase
+from datetime import date, datetime
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import RecapCache
+
+User = get_user_model()
+
+
+class RecapBuildTestCase(TestCase):
+    """Background recap builds only recompute the sections whose inputs changed"""
+
+    def setUp(self):
+        from workouts.models import RideDetail, Workout, WorkoutDetails, WorkoutType
+
+        self.user = User.objects.create_user(email='recap@example.com', password='testpass123', is_active=True)
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        ride = RideDetail.objects.create(
+            peloton_ride_id='recap-ride', title='45 min Ride', fitness_discipline='cycling',
+            duration_seconds=2700, workout_type=workout_type,
+        )
+        for day in (date(2024, 3, 1), date(2024, 3, 2)):
+            workout = Workout.objects.create(
+                user=self.user, ride_detail=ride, peloton_workout_id=f'recap-{day}',
+                recorded_date=day, completed_date=day,
+                completed_at=timezone.make_aware(datetime(day.year, day.month, day.day, 12)),
+            )
+            WorkoutDetails.objects.create(workout=workout, total_output=400, distance=12, total_calories=500)
+
+    def test_build_then_only_dirty_sections_rebuild(self):
+        from accounts.models import FTPEntry
+        from .recap import RECAP_SECTIONS, build_recap
+
+        self.assertEqual(build_recap(self.user, 2024), RECAP_SECTIONS)
+        cache_obj = RecapCache.objects.get(user=self.user, year=2024)
+        self.assertEqual(cache_obj.status, RecapCache.STATUS_READY)
+        self.assertEqual(cache_obj.total_workouts_count, 2)
+        self.assertEqual(cache_obj.overview['active_days'], 2)
+        self.assertEqual(cache_obj.streaks['longest_days'], 2)
+        self.assertFalse(cache_obj.is_stale())
+
+        self.assertEqual(build_recap(self.user, 2024), [])
+
+        FTPEntry.objects.create(user=self.user, ftp_value=220, recorded_date=date(2024, 1, 1))
+        self.assertEqual(build_recap(self.user, 2024), ['intensity_zones'])
+
+    def test_view_queues_build_instead_of_computing(self):
+        from accounts.models import OnboardingWizard
+
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        client = Client()
+        client.force_login(self.user)
+        # Only the context matters here; render() is patched out
+        render_patcher = patch('plans.views.render', return_value=HttpResponse())
+        mock_render = render_patcher.start()
+        self.addCleanup(render_patcher.stop)
+
+        with patch('plans.tasks.build_recap_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.get(reverse('plans:recap') + '?year=2024')
+        self.assertTrue(mock_render.call_args[0][2]['is_building'])
+        mock_delay.assert_called_once_with(self.user.id, 2024, False)
+        self.assertEqual(RecapCache.objects.get(user=self.user, year=2024).status, RecapCache.STATUS_PENDING)
+
+        from .recap import build_recap
+        build_recap(self.user, 2024)
+        with patch('plans.tasks.build_recap_task.delay') as mock_delay:
+            client.get(reverse('plans:recap') + '?year=2024')
+        mock_delay.assert_not_called()
+        context = mock_render.call_args[0][2]
+        self.assertTrue(context['has_workouts'])
+        self.assertEqual(context['total_workouts'], 2)
+
+    def test_failed_build_backs_off(self):
+        from datetime import timedelta
+        from accounts.models import OnboardingWizard
+        from .recap import RECAP_FAILED_RETRY_AFTER
+
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        RecapCache.objects.create(user=self.user, year=2024, status=RecapCache.STATUS_FAILED)
+        client = Client()
+        client.force_login(self.user)
+        render_patcher = patch('plans.views.render', return_value=HttpResponse())
+        mock_render = render_patcher.start()
+        self.addCleanup(render_patcher.stop)
+
+        with patch('plans.tasks.build_recap_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.get(reverse('plans:recap') + '?year=2024')
+        mock_delay.assert_not_called()
+        context = mock_render.call_args[0][2]
+        self.assertTrue(context['build_failed'])
+        self.assertFalse(context['is_building'])
+
+        # Retried once the back-off has passed
+        RecapCache.objects.filter(user=self.user, year=2024).update(
+            updated_at=timezone.now() - RECAP_FAILED_RETRY_AFTER - timedelta(minutes=1)
+        )
+        with patch('plans.tasks.build_recap_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.get(reverse('plans:recap') + '?year=2024')
+        mock_delay.assert_called_once_with(self.user.id, 2024, False)
+
+
+class EddingtonHistoryTestCase(TestCase):
+    """Stored Eddington histories are built in one pass and extended as workouts sync"""
+
+    def setUp(self):
+        from workouts.models import RideDetail, WorkoutType
+
+        self.user = User.objects.create_user(email='eddington@example.com', password='testpass123', is_active=True)
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        self.rides = {
+            discipline: RideDetail.objects.create(
+                peloton_ride_id=f'eddington-{discipline}', title=f'{discipline} class', fitness_discipline=discipline,
+                duration_seconds=1800, workout_type=workout_type,
+            )
+            for discipline in ('cycling', 'running')
+        }
+
+    def _add_workouts(self, rows):
+        """Create workouts the way a sync does (bulk, no post_save for details)."""
+        from workouts.models import Workout, WorkoutDetails
+
+        details = []
+        for index, (day, discipline, miles) in enumerate(rows):
+            workout = Workout.objects.create(
+                user=self.user, ride_detail=self.rides[discipline],
+                peloton_workout_id=f'eddington-{day}-{discipline}-{index}-{miles}',
+                recorded_date=day, completed_date=day,
+            )
+            details.append(WorkoutDetails(workout=workout, distance=miles))
+        WorkoutDetails.objects.bulk_create(details)
+
+    def test_tracker_matches_brute_force(self):
+        from .eddington import EddingtonTracker
+
+        distances = [3, 1, 5, 2, 8, 8, 4, 0, 6, 7, 2, 9, 10, 4]
+        tracker = EddingtonTracker()
+        for count, distance in enumerate(distances, start=1):
+            seen = distances[:count]
+            expected = max(e for e in range(0, 20) if sum(1 for d in seen if d >= e) >= e)
+            self.assertEqual(tracker.add(distance), expected)
+
+    def test_build_and_incremental_refresh(self):
+        from .eddington import get_eddington
+        from .models import EddingtonHistory
+
+        # 2 miles = 3.2 km, 3 miles = 4.8 km
+        self._add_workouts([
+            (date(2024, 1, 1), 'cycling', 3),
+            (date(2024, 1, 1), 'running', 2),
+            (date(2024, 1, 2), 'cycling', 3),
+            (date(2024, 1, 3), 'running', 2),
+        ])
+        data = get_eddington(self.user)
+        self.assertEqual(set(data), {'all', 'cycling', 'running'})
+        self.assertEqual(data['all']['current_eddington'], 3)
+        self.assertEqual(data['cycling']['current_eddington'], 2)
+        self.assertEqual(data['cycling']['workout_count'], 2)
+        self.assertEqual(data['cycling']['name'], 'Cycling')
+        self.assertEqual(
+            [entry['eddington_number'] for entry in data['all']['history']], [1, 2, 3]
+        )
+
+        # A later day extends the stored history
+        self._add_workouts([(date(2024, 1, 4), 'cycling', 3)])
+        with self.assertNumQueries(6):  # rows, touched days, one save per discipline
+            data = get_eddington(self.user)
+        self.assertEqual(data['cycling']['current_eddington'], 3)
+        self.assertEqual(data['all']['history'][-1], {'date': '2024-01-04', 'eddington_number': 3})
+        self.assertEqual(EddingtonHistory.objects.get(user=self.user, discipline='all').data['total_days'], 4)
+
+        # Deleting a workout rebuilds from scratch
+        self.user.workouts.filter(completed_date=date(2024, 1, 4)).delete()
+        self.assertEqual(get_eddington(self.user)['cycling']['current_eddington'], 2)
+
+    def test_stored_performance_graph_refreshes_distance(self):
+        from workouts.services.performance_ingest import store_performance_graph
+        from .eddington import get_eddington
+
+        self._add_workouts([(date(2024, 1, day), 'cycling', 3) for day in range(1, 4)])
+        self.assertEqual(get_eddington(self.user)['cycling']['current_eddington'], 3)
+
+        # A graph fetched after the rows were built corrects one day's distance
+        workout = self.user.workouts.get(completed_date=date(2024, 1, 3))
+        store_performance_graph(workout, {'summaries': [{'slug': 'distance', 'value': 1}]})
+        self.assertEqual(get_eddington(self.user)['cycling']['current_eddington'], 2)
+
+    def test_view(self):
+        from accounts.models import OnboardingWizard
+
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        self._add_workouts([(date(2024, 1, day), 'cycling', 3) for day in range(1, 5)])
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('plans:eddington'), {'discipline': 'running'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['eddington_data']['current_eddington'], 0)
+        self.assertEqual(list(response.context['discipline_breakdown']), ['cycling'])
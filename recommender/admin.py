@@ -5,7 +5,8 @@ from .models import InstructorProfile
 
 @admin.register(InstructorProfile)
 class InstructorProfileAdmin(admin.ModelAdmin):
-    list_display = ("instructor", "enabled", "updated_at")
+    list_display = ("name", "instructor", "enabled", "indexed_at", "updated_at")
     list_filter = ("enabled",)
-    search_fields = ("instructor__name", "vibe")
+    search_fields = ("name", "instructor__name", "vibe")
+    readonly_fields = ("curated", "profiles", "vectors", "indexed_at")
 
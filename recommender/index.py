@@ -0,0 +1,351 @@
+"""Precomputed instructor similarity index.
+
+Instructor profiles used to be rebuilt from RideDetail aggregates on every
+recommender request. `build_instructor_index` (run by the
+build_instructor_index command and a nightly beat task) now aggregates
+RideDetail once, merges the curated pelovibe_instructors.json dataset and
+stores one InstructorProfile per instructor: its tags per discipline and a
+sparse tag vector ({"style:#PowerZone": 1.0, "modality:#Cycling": 0.5, ...})
+per discipline ("" = every discipline).
+
+Each process loads the stored vectors once into an InstructorIndex (an
+inverted index from tag to instructors) and reloads only when a rebuild
+bumps the index version, so top-k queries touch just the instructors that
+share a tag with the query.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+ANY_DISCIPLINE = ""
+
+# Weight of each tag kind in the similarity vectors
+FEATURE_WEIGHTS = {"style": 1.0, "modality": 0.5, "music": 0.5}
+
+# Tags kept per instructor from RideDetail aggregates (most classes first)
+MAX_DB_STYLES = 6
+MAX_DB_MODALITIES = 3
+
+INDEX_VERSION_CACHE_KEY = "ctz:recommender:instructor_index:version"
+
+
+@dataclass(frozen=True)
+class IndexedInstructor:
+    """One instructor as the recommender sees it (tags in display order)."""
+
+    name: str
+    image_url: str
+    modality: tuple
+    styles: tuple
+    music: tuple
+    language: str
+    community_tag: str
+    description: str
+
+
+def tag_vector(modality=(), styles=(), music=()):
+    """Sparse vector of an instructor's tags."""
+    vector = {}
+    for kind, tags in (("modality", modality), ("style", styles), ("music", music)):
+        for tag in tags:
+            if tag:
+                vector[f"{kind}:{tag}"] = FEATURE_WEIGHTS[kind]
+    return vector
+
+
+def _db_profiles():
+    """
+    Per-instructor tags from two RideDetail aggregates.
+
+    Returns:
+        dict: instructor id -> discipline ("" = all) -> {"modality": [...], "styles": [...]}
+    """
+    from workouts.models import RideDetail
+
+    from .services import _discipline_to_modality_tag, _to_hashtag
+
+    rides = RideDetail.objects.filter(instructor__isnull=False)
+    style_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for instructor_id, discipline, class_type, count in (
+        rides.exclude(class_type__isnull=True).exclude(class_type__exact="")
+        .values_list("instructor_id", "fitness_discipline", "class_type")
+        .annotate(c=Count("id")).order_by()
+    ):
+        tag = _to_hashtag(class_type)
+        if not tag:
+            continue
+        style_counts[instructor_id][ANY_DISCIPLINE][tag] += count
+        if discipline:
+            style_counts[instructor_id][discipline.strip().lower()][tag] += count
+
+    modality_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for instructor_id, discipline, count in (
+        rides.exclude(fitness_discipline__isnull=True).exclude(fitness_discipline__exact="")
+        .values_list("instructor_id", "fitness_discipline")
+        .annotate(c=Count("id")).order_by()
+    ):
+        tag = _discipline_to_modality_tag(discipline)
+        if not tag:
+            continue
+        modality_counts[instructor_id][ANY_DISCIPLINE][tag] += count
+        modality_counts[instructor_id][discipline.strip().lower()][tag] += count
+
+    def top(counts, limit):
+        return [tag for tag, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+    profiles = defaultdict(dict)
+    for instructor_id in set(style_counts) | set(modality_counts):
+        disciplines = set(style_counts[instructor_id]) | set(modality_counts[instructor_id])
+        for discipline in disciplines:
+            profiles[instructor_id][discipline] = {
+                "modality": top(modality_counts[instructor_id].get(discipline, {}), MAX_DB_MODALITIES),
+                "styles": top(style_counts[instructor_id].get(discipline, {}), MAX_DB_STYLES),
+            }
+    return profiles
+
+
+def build_instructor_index():
+    """
+    Rebuild every InstructorProfile's tags and vectors.
+
+    DB instructors are profiled from their classes; curated instructors that
+    aren't in the DB get a profile of their own. Hand-edited fields
+    (enabled, vibe, tags, languages) are kept.
+
+    Returns:
+        int: number of indexed instructors
+    """
+    from workouts.models import Instructor
+
+    from .models import InstructorProfile
+    from .services import load_pelovibe_instructors
+
+    now = timezone.now()
+    db_profiles = _db_profiles()
+    curated = {}
+    for instructor in load_pelovibe_instructors():
+        curated.setdefault(instructor.name.strip().lower(), instructor)
+
+    existing = {profile.instructor_id: profile for profile in InstructorProfile.objects.filter(instructor__isnull=False)}
+    existing_by_name = {
+        profile.name.strip().lower(): profile for profile in InstructorProfile.objects.filter(instructor__isnull=True)
+    }
+
+    to_create, to_update, seen = [], [], set()
+    for instructor_id, name in Instructor.objects.values_list("id", "name"):
+        name = (name or "").strip()
+        key = name.lower()
+        if not name or key in seen:
+            continue
+        seen.add(key)
+        profiles = db_profiles.get(instructor_id, {})
+        profile = existing.get(instructor_id) or InstructorProfile(instructor_id=instructor_id)
+        profile.name = name
+        profile.profiles = profiles
+        profile.vectors = {
+            discipline: tag_vector(tags["modality"], tags["styles"]) for discipline, tags in profiles.items()
+        }
+        profile.curated = _curated_payload(curated.get(key))
+        profile.indexed_at = now
+        (to_update if profile.pk else to_create).append(profile)
+
+    for key, instructor in curated.items():
+        if key in seen:
+            continue
+        profile = existing_by_name.pop(key, None) or InstructorProfile()
+        profile.name = instructor.name.strip()
+        profile.profiles = {}
+        profile.vectors = {ANY_DISCIPLINE: tag_vector(instructor.modality, instructor.styles, instructor.music)}
+        profile.curated = _curated_payload(instructor)
+        profile.indexed_at = now
+        (to_update if profile.pk else to_create).append(profile)
+
+    fields = ["name", "profiles", "vectors", "curated", "indexed_at"]
+    with transaction.atomic():
+        # Curated instructors that left the dataset (or joined the DB)
+        InstructorProfile.objects.filter(pk__in=[profile.pk for profile in existing_by_name.values()]).delete()
+        InstructorProfile.objects.bulk_update(to_update, fields, batch_size=500)
+        InstructorProfile.objects.bulk_create(to_create, batch_size=500)
+        transaction.on_commit(lambda: cache.set(INDEX_VERSION_CACHE_KEY, now.timestamp(), None))
+    return len(to_create) + len(to_update)
+
+
+def _curated_payload(instructor):
+    if instructor is None:
+        return {}
+    return {
+        "modality": list(instructor.modality),
+        "styles": list(instructor.styles),
+        "music": list(instructor.music),
+        "language": instructor.language,
+        "community_tag": instructor.community_tag,
+        "description": instructor.description,
+    }
+
+
+class _Row(NamedTuple):
+    name: str
+    image_url: str
+    enabled: bool
+    in_db: bool
+    curated: dict
+    profiles: dict
+    vectors: dict
+
+
+class InstructorIndex:
+    """Stored instructor vectors held in memory, with an inverted index per discipline."""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: (instructor id, name, image url, enabled, curated, profiles, vectors) per InstructorProfile
+        """
+        self._rows = {}
+        for instructor_id, name, image_url, enabled, curated, profiles, vectors in rows:
+            key = name.strip().lower()
+            if key and key not in self._rows:
+                self._rows[key] = _Row(
+                    name, image_url or "", enabled, instructor_id is not None,
+                    curated or {}, profiles or {}, vectors or {},
+                )
+        # discipline -> (feature -> [(name key, weight)], name key -> vector norm), built on first use
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _discipline_postings(self, discipline):
+        if discipline not in self._postings:
+            postings, norms = defaultdict(list), {}
+            for key, row in self._rows.items():
+                if not row.enabled:
+                    continue
+                # Curated-only instructors have the same tags in every discipline
+                vector = row.vectors.get(discipline if row.in_db else ANY_DISCIPLINE)
+                if not vector:
+                    continue
+                for feature, weight in vector.items():
+                    postings[feature].append((key, weight))
+                norms[key] = math.sqrt(sum(weight * weight for weight in vector.values()))
+            self._postings[discipline] = (postings, norms)
+        return self._postings[discipline]
+
+    def get(self, name, discipline=ANY_DISCIPLINE):
+        """
+        An instructor's tags: the curated ones when the dataset has them, else
+        those of their classes in `discipline`.
+        """
+        row = self._rows.get((name or "").strip().lower())
+        if row is None:
+            return None
+        return self._instructor(row, discipline, prefer_curated=True)
+
+    def candidate(self, key, discipline=ANY_DISCIPLINE):
+        """A top_k result's tags as scored (class tags for DB instructors)."""
+        return self._instructor(self._rows[key], discipline, prefer_curated=False)
+
+    @staticmethod
+    def _instructor(row, discipline, prefer_curated):
+        curated = row.curated
+        if curated and (prefer_curated or not row.in_db):
+            return IndexedInstructor(
+                name=row.name, image_url=row.image_url,
+                modality=tuple(curated.get("modality", ())), styles=tuple(curated.get("styles", ())),
+                music=tuple(curated.get("music", ())), language=curated.get("language", ""),
+                community_tag=curated.get("community_tag", ""), description=curated.get("description", ""),
+            )
+        tags = row.profiles.get(discipline, {})
+        return IndexedInstructor(
+            name=row.name, image_url=row.image_url,
+            modality=tuple(tags.get("modality", ())), styles=tuple(tags.get("styles", ())),
+            music=(), language="", community_tag="", description="",
+        )
+
+    def top_k(self, query, k, discipline=ANY_DISCIPLINE, exclude=(), require=None, accept=None):
+        """
+        Enabled instructors most similar to a query vector (cosine similarity).
+
+        Only instructors sharing at least one feature with the query are
+        scored (inverted index lookup).
+
+        Args:
+            query: {feature: weight}, see tag_vector
+            k: Number of results
+            discipline: Score instructors on their tags in this discipline
+            exclude: Name keys to skip
+            require: Feature prefix a result must share with the query (e.g. "style:")
+            accept: Optional predicate on the name key
+
+        Returns:
+            list of (name key, score), best first (ties by name)
+        """
+        postings, norms = self._discipline_postings(discipline)
+        query_norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if not query_norm:
+            return []
+
+        dots = defaultdict(float)
+        required = set()
+        for feature, query_weight in query.items():
+            for key, weight in postings.get(feature, ()):
+                dots[key] += query_weight * weight
+                if require and feature.startswith(require):
+                    required.add(key)
+
+        scored = [
+            (dot / (query_norm * norms[key]), key)
+            for key, dot in dots.items()
+            if key not in exclude and (not require or key in required) and (accept is None or accept(key))
+        ]
+        return [(key, score) for score, key in heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))]
+
+
+_loaded = {"version": None, "index": None}
+_lock = threading.Lock()
+
+
+def _index_version():
+    version = cache.get(INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        from .models import InstructorProfile
+
+        latest = InstructorProfile.objects.aggregate(latest=Max("indexed_at"))["latest"]
+        version = latest.timestamp() if latest else 0
+        cache.set(INDEX_VERSION_CACHE_KEY, version, None)
+    return version
+
+
+def get_instructor_index():
+    """
+    The process-wide InstructorIndex, reloaded after a rebuild.
+
+    Built in-process the first time if nothing has been indexed yet.
+    """
+    from .models import InstructorProfile
+
+    version = _index_version()
+    if _loaded["index"] is not None and _loaded["version"] == version:
+        return _loaded["index"]
+    with _lock:
+        if not version:
+            build_instructor_index()
+            cache.delete(INDEX_VERSION_CACHE_KEY)
+            version = _index_version()
+        if _loaded["index"] is None or _loaded["version"] != version:
+            rows = InstructorProfile.objects.filter(indexed_at__isnull=False).values_list(
+                "instructor_id", "name", "instructor__image_url", "enabled", "curated", "profiles", "vectors"
+            )
+            _loaded["index"] = InstructorIndex(rows)
+            _loaded["version"] = version
+        return _loaded["index"]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recommender.index import build_instructor_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recommender's instructor similarity index from class data and the curated dataset."
+
+    def handle(self, *args, **options):
+        count = build_instructor_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} instructors."))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 
+from recommender.index import build_instructor_index
 from recommender.services import INSTRUCTORS_SOURCE_URL, write_local_instructors_json
 
 
@@ -17,4 +18,6 @@ class Command(BaseCommand):
         source_url = options["source_url"]
         count = write_local_instructors_json(source_url=source_url)
         self.stdout.write(self.style.SUCCESS(f"Wrote {count} instructors to local JSON dataset."))
+        indexed = build_instructor_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} instructors."))
 
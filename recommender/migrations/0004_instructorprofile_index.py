@@ -0,0 +1,63 @@
+# Generated by Django 4.2.27 on 2026-10-16 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_names(apps, schema_editor):
+    InstructorProfile = apps.get_model("recommender", "InstructorProfile")
+    profiles = list(InstructorProfile.objects.select_related("instructor"))
+    for profile in profiles:
+        profile.name = profile.instructor.name if profile.instructor_id else ""
+    InstructorProfile.objects.bulk_update(profiles, ["name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recommender", "0003_alter_instructorprofile_options"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="instructorprofile",
+            name="instructor",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="recommender_profile",
+                to="workouts.instructor",
+            ),
+        ),
+        migrations.AddField(
+            model_name="instructorprofile",
+            name="name",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="instructorprofile",
+            name="curated",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="instructorprofile",
+            name="profiles",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="instructorprofile",
+            name="vectors",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="instructorprofile",
+            name="indexed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterModelOptions(
+            name="instructorprofile",
+            options={"ordering": ["name"]},
+        ),
+        migrations.RunPython(fill_names, migrations.RunPython.noop),
+    ]
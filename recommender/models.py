@@ -5,13 +5,20 @@ class InstructorProfile(models.Model):
     """
     Optional curated metadata for instructors (hybrid recommender).
     Keeps Peloton-synced identity in workouts.Instructor and stores human curation here.
+
+    Also holds the instructor's entry in the similarity index (see
+    recommender.index): curated instructors we have no classes of get a
+    profile without an instructor.
     """
 
     instructor = models.OneToOneField(
         "workouts.Instructor",
         on_delete=models.CASCADE,
         related_name="recommender_profile",
+        null=True,
+        blank=True,
     )
+    name = models.CharField(max_length=255, db_index=True, blank=True, default="")
 
     enabled = models.BooleanField(default=True)
 
@@ -21,12 +28,18 @@ class InstructorProfile(models.Model):
     # Not currently populated by Peloton sync, but kept for future parity with reference UI.
     languages = models.JSONField(default=list, blank=True)  # list[str]
 
+    # Similarity index, rebuilt by build_instructor_index
+    curated = models.JSONField(default=dict, blank=True)  # pelovibe_instructors.json entry
+    profiles = models.JSONField(default=dict, blank=True)  # discipline ("" = all) -> {"modality": [...], "styles": [...]}
+    vectors = models.JSONField(default=dict, blank=True)  # discipline -> {"style:#PowerZone": 1.0, ...}
+    indexed_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ["instructor__name"]
+        ordering = ["name"]
 
     def __str__(self) -> str:
-        return f"Profile: {self.instructor.name}"
+        return f"Profile: {self.name or self.instructor}"
 
@@ -9,9 +9,9 @@ from typing import Any
 import re
 import urllib.request
 
-from django.db.models import Count
+from workouts.models import Instructor
 
-from workouts.models import Instructor, RideDetail
+from .index import IndexedInstructor, get_instructor_index, tag_vector
 
 
 INSTRUCTORS_SOURCE_URL = (
@@ -206,81 +206,9 @@ def _discipline_to_modality_tag(fd: str) -> str:
     return _to_hashtag(fd)
 
 
-@lru_cache(maxsize=16)
-def build_db_instructor_profiles(discipline_filter: str | None) -> dict[str, PeloVibeInstructor]:
-    """
-    Build a lightweight "Pelovibe-style" profile for every instructor we have in the DB
-    (so the recommender still works for instructors not in the curated list).
-    """
-    rd = RideDetail.objects.filter(instructor__isnull=False).select_related("instructor")
-    if discipline_filter:
-        rd = rd.filter(fitness_discipline__iexact=discipline_filter)
-
-    # Aggregate class types per instructor
-    by_instr_styles: dict[str, list[str]] = {}
-    for row in (
-        rd.exclude(class_type__isnull=True)
-        .exclude(class_type__exact="")
-        .values("instructor__name", "class_type")
-        .annotate(c=Count("id"))
-        .order_by("instructor__name", "-c")
-        .iterator()
-    ):
-        name = (row.get("instructor__name") or "").strip()
-        if not name:
-            continue
-        styles = by_instr_styles.setdefault(name.lower(), [])
-        tag = _to_hashtag(row.get("class_type") or "")
-        if tag and tag not in styles and len(styles) < 6:
-            styles.append(tag)
-
-    # Aggregate top disciplines per instructor (used as modality fallback)
-    by_instr_mods: dict[str, list[str]] = {}
-    for row in (
-        rd.exclude(fitness_discipline__isnull=True)
-        .exclude(fitness_discipline__exact="")
-        .values("instructor__name", "fitness_discipline")
-        .annotate(c=Count("id"))
-        .order_by("instructor__name", "-c")
-        .iterator()
-    ):
-        name = (row.get("instructor__name") or "").strip()
-        if not name:
-            continue
-        mods = by_instr_mods.setdefault(name.lower(), [])
-        tag = _discipline_to_modality_tag(row.get("fitness_discipline") or "")
-        if tag and tag not in mods and len(mods) < 3:
-            mods.append(tag)
-
-    # Build final profiles for instructors present in DB
-    out: dict[str, PeloVibeInstructor] = {}
-    for instr in Instructor.objects.all().values_list("name", flat=True).iterator():
-        name = (instr or "").strip()
-        if not name:
-            continue
-        key = name.lower()
-        out[key] = PeloVibeInstructor(
-            name=name,
-            modality=by_instr_mods.get(key, []),
-            language="",
-            styles=by_instr_styles.get(key, []),
-            music=[],
-            community_tag="",
-            description="",
-        )
-
-    return out
-
-
-def _find_by_name(name: str) -> PeloVibeInstructor | None:
-    n = (name or "").strip().lower()
-    if not n:
-        return None
-    for instr in load_pelovibe_instructors():
-        if instr.name.strip().lower() == n:
-            return instr
-    # Fallback: construct from our DB-derived profile if present
-    return build_db_instructor_profiles(None).get(n)
+def _find_by_name(name: str) -> IndexedInstructor | None:
+    """Curated profile of an instructor, else the one built from their classes."""
+    return get_instructor_index().get(name)
 
 
 def _message_for(name: str, shared_styles: list[str]) -> str:
@@ -306,58 +234,51 @@ def recommend_instructors(
     discipline_filter: str | None = None,
     limit: int = 3,
 ) -> list[CandidateResult]:
-    i1 = _find_by_name(love_1_name)
-    i2 = _find_by_name(love_2_name)
+    index = get_instructor_index()
+    i1 = index.get(love_1_name)
+    i2 = index.get(love_2_name)
     if not i1 or not i2:
         return []
 
-    liked_styles = set(i1.styles or []) | set(i2.styles or [])
+    liked_styles = set(i1.styles) | set(i2.styles)
+    query = tag_vector(i1.modality + i2.modality, i1.styles + i2.styles, i1.music + i2.music)
 
     excluded_names = {i1.name.strip().lower(), i2.name.strip().lower()}
     if exclude_name:
         excluded_names.add(exclude_name.strip().lower())
 
+    # Candidates are scored on their classes in the selected discipline
+    discipline = (discipline_filter or "").strip().lower()
+
     # Optional modality filter (single selection like current UI)
     modality_filter = None
     if discipline_filter:
         # Our UI uses "cycling", "strength" etc; dataset uses "#Cycling", etc.
         modality_filter = _clean_title(discipline_filter).strip().lower()
 
-    # Candidate pool: all DB instructors (preferred) plus curated list (in case of missing in DB)
-    candidates: dict[str, PeloVibeInstructor] = {}
-    candidates.update(build_db_instructor_profiles(discipline_filter).copy())
-    for instr in load_pelovibe_instructors():
-        candidates.setdefault(instr.name.strip().lower(), instr)
-
-    scored: list[tuple[PeloVibeInstructor, int, list[str]]] = []
-    for instr in candidates.values():
-        if instr.name.strip().lower() in excluded_names:
-            continue
-        shared = [s for s in (instr.styles or []) if s in liked_styles]
-        score = len(shared)
-        if score <= 0:
-            continue
-        if modality_filter:
-            has_mod = any(_clean_tag(m).strip().lower() == modality_filter for m in (instr.modality or []))
-            if not has_mod:
-                continue
-        scored.append((instr, score, shared))
-
-    scored.sort(key=lambda t: t[1], reverse=True)
+    def has_modality(key: str) -> bool:
+        instr = index.candidate(key, discipline)
+        return any(_clean_tag(m).strip().lower() == modality_filter for m in instr.modality)
 
-    # Attach local image URL if we have that instructor in our DB
-    image_map = {
-        n.lower(): (img or "")
-        for n, img in Instructor.objects.filter(name__isnull=False).values_list("name", "image_url")
-    }
+    # Candidates must share at least one style with the liked instructors
+    top = index.top_k(
+        query,
+        max(1, int(limit)),
+        discipline=discipline,
+        exclude=excluded_names,
+        require="style:",
+        accept=has_modality if modality_filter else None,
+    )
 
     results: list[CandidateResult] = []
-    for instr, score, shared in scored[: max(1, int(limit))]:
+    for key, score in top:
+        instr = index.candidate(key, discipline)
+        shared = [s for s in instr.styles if s in liked_styles]
         sections = {
-            "modality": [_clean_tag(m) for m in (instr.modality or []) if _clean_tag(m)],
+            "modality": [_clean_tag(m) for m in instr.modality if _clean_tag(m)],
             "language": [_clean_tag(instr.language)] if _clean_tag(instr.language) else [],
-            "styles": [_clean_tag(s) for s in (instr.styles or []) if _clean_tag(s)],
-            "music": [_clean_tag(s) for s in (instr.music or []) if _clean_tag(s)],
+            "styles": [_clean_tag(s) for s in instr.styles if _clean_tag(s)],
+            "music": [_clean_tag(s) for s in instr.music if _clean_tag(s)],
             "community": [_clean_tag(instr.community_tag)] if _clean_tag(instr.community_tag) else [],
         }
         # Cap to match the card density
@@ -369,8 +290,8 @@ def recommend_instructors(
         results.append(
             CandidateResult(
                 name=instr.name,
-                image_url=image_map.get(instr.name.lower(), ""),
-                score=float(score),
+                image_url=instr.image_url,
+                score=round(score, 4),
                 message=_message_for(instr.name, shared),
                 sections=sections,
                 vibe=(instr.description or "").strip() or None,
@@ -396,11 +317,6 @@ def suggest_instructors(
     if discipline_filter:
         modality_filter = _clean_title(discipline_filter).strip().lower()
 
-    image_map = {
-        n.lower(): (img or "")
-        for n, img in Instructor.objects.filter(name__isnull=False).values_list("name", "image_url")
-    }
-
     # Suggestions should include all instructors from our DB; when a curated profile exists,
     # use its tags for the subtitle.
     out: list[dict[str, Any]] = []
@@ -410,20 +326,15 @@ def suggest_instructors(
         qs = qs.filter(ride_details__fitness_discipline__iexact=modality_filter).distinct()
     qs = qs.filter(name__icontains=q).order_by("name")
 
-    # Precompute DB profiles for subtitle fallback
-    db_profiles = build_db_instructor_profiles(modality_filter if modality_filter else None)
-
-    curated_by_name = {i.name.strip().lower(): i for i in load_pelovibe_instructors()}
+    index = get_instructor_index()
 
     for name, img in qs.values_list("name", "image_url")[: max(1, int(limit))]:
         nm = (name or "").strip()
         if not nm:
             continue
-        key = nm.lower()
-        prof = curated_by_name.get(key) or db_profiles.get(key)
-        styles = prof.styles if prof else []
-        subtitle = " • ".join(_clean_tag(s) for s in (styles or [])[:4] if _clean_tag(s))
+        prof = index.get(nm, modality_filter or "")
+        styles = prof.styles if prof else ()
+        subtitle = " • ".join(_clean_tag(s) for s in styles[:4] if _clean_tag(s))
         out.append({"name": nm, "image_url": img or "", "subtitle": subtitle})
 
     return out
-
@@ -0,0 +1,12 @@
+"""
+Celery tasks for the instructor recommender (see recommender.index).
+"""
+from celery import shared_task
+
+
+@shared_task
+def rebuild_instructor_index_task():
+    """Rebuild the instructor similarity index (run nightly by beat)."""
+    from .index import build_instructor_index
+
+    return {'status': 'success', 'indexed': build_instructor_index()}
@@ -2,7 +2,11 @@ from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from workouts.models import Instructor
+from workouts.models import Instructor, RideDetail, WorkoutType
+
+from .index import build_instructor_index, get_instructor_index
+from .models import InstructorProfile
+from .services import recommend_instructors, suggest_instructors
 
 
 class RecommenderViewsTests(TestCase):
@@ -24,3 +28,76 @@ class RecommenderViewsTests(TestCase):
         self.assertIn("results", data)
         self.assertTrue(any("Alex" in (r.get("name") or "") for r in data["results"]))
 
+
+
+class InstructorIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cycling = WorkoutType.objects.create(name="Cycling", slug="cycling")
+        running = WorkoutType.objects.create(name="Running", slug="running")
+        cls.instructors = {}
+        rides = {
+            "Ana Test": [("cycling", "test_pedal"), ("cycling", "test_pedal"), ("cycling", "test_climb")],
+            "Ben Test": [("cycling", "test_pedal"), ("cycling", "test_sprint"), ("running", "test_tempo")],
+            "Cai Test": [("cycling", "test_pedal"), ("cycling", "test_climb")],
+            "Dee Test": [("cycling", "test_pedal")],
+            "Eli Test": [("running", "test_pedal")],
+            "Fay Test": [("cycling", "test_climb")],
+        }
+        for name, classes in rides.items():
+            instructor = Instructor.objects.create(name=name, image_url=f"https://img/{name[:3]}.png")
+            cls.instructors[name] = instructor
+            for n, (discipline, class_type) in enumerate(classes):
+                RideDetail.objects.create(
+                    title=f"{name} {n}",
+                    peloton_ride_id=f"{name}-{n}",
+                    fitness_discipline=discipline,
+                    class_type=class_type,
+                    instructor=instructor,
+                    workout_type=cycling if discipline == "cycling" else running,
+                    duration_seconds=1800,
+                )
+
+    def build(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            build_instructor_index()
+        return get_instructor_index()
+
+    def test_profiles_store_tags_and_vectors_per_discipline(self):
+        self.build()
+        profile = InstructorProfile.objects.get(instructor=self.instructors["Ben Test"])
+        self.assertEqual(profile.name, "Ben Test")
+        self.assertEqual(profile.profiles["cycling"], {"modality": ["#Cycling"], "styles": ["#TestPedal", "#TestSprint"]})
+        self.assertEqual(profile.profiles[""]["modality"], ["#Cycling", "#Tread"])
+        self.assertEqual(
+            profile.vectors["cycling"],
+            {"modality:#Cycling": 0.5, "style:#TestPedal": 1.0, "style:#TestSprint": 1.0},
+        )
+        # Curated instructors we have no classes of are indexed too
+        self.assertTrue(InstructorProfile.objects.filter(instructor__isnull=True, curated__has_key="styles").exists())
+
+    def test_recommend_ranks_by_similarity(self):
+        self.build()
+        results = recommend_instructors(
+            love_1_name="Ana Test", love_2_name="Cai Test", discipline_filter="cycling", limit=3
+        )
+        self.assertEqual([r.name for r in results], ["Dee Test", "Fay Test", "Ben Test"])
+        self.assertEqual(results[0].image_url, "https://img/Dee.png")
+        # Dee and Fay share one style each; Ben's extra style dilutes his match
+        self.assertEqual(results[0].score, results[1].score)
+        self.assertGreater(results[1].score, results[2].score)
+
+    def test_disabled_profiles_and_rebuilds(self):
+        self.build()
+        InstructorProfile.objects.filter(instructor=self.instructors["Dee Test"]).update(enabled=False)
+        index = self.build()
+        self.assertEqual(InstructorProfile.objects.get(instructor=self.instructors["Dee Test"]).enabled, False)
+        results = recommend_instructors(love_1_name="Ana Test", love_2_name="Cai Test", discipline_filter="cycling")
+        self.assertNotIn("Dee Test", [r.name for r in results])
+        self.assertIs(get_instructor_index(), index)
+
+    def test_suggest_uses_indexed_subtitles(self):
+        self.build()
+        with self.assertNumQueries(1):
+            data = suggest_instructors(q="Ana", discipline_filter="cycling")
+        self.assertEqual(data, [{"name": "Ana Test", "image_url": "https://img/Ana.png", "subtitle": "TestPedal • TestClimb"}])
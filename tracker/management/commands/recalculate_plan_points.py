@@ -0,0 +1,49 @@
+"""
+Management command to recompute the stored points of weekly plans.
+
+Points are kept current when items are toggled or edited; use this after
+changing the scoring rules or fixing items outside the app.
+
+Usage:
+    python manage.py recalculate_plan_points
+    python manage.py recalculate_plan_points --user-id 12 --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+
+from tracker.models import WeeklyPlan
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored points / completion of weekly plans from their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            default=None,
+            help='Only recompute plans of this user'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Plans recomputed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        plans = WeeklyPlan.objects.order_by('pk')
+        if options['user_id']:
+            plans = plans.filter(user_id=options['user_id'])
+
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(plans.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            total += WeeklyPlan.recalculate_points_for(batch)
+            self.stdout.write(f"Recomputed {total} plans...")
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed points for {total} plans'))
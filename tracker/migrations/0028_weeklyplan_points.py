@@ -0,0 +1,71 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+POINTS_FIELDS = [
+    "activity_points", "bonus_points", "total_points",
+    "max_core_points", "core_workout_count", "completed_core_workouts",
+]
+
+
+def backfill_plan_points(apps, schema_editor):
+    from tracker.scoring import ITEM_SCORING_FIELDS, score_plan_items
+
+    WeeklyPlan = apps.get_model("tracker", "WeeklyPlan")
+    DailyPlanItem = apps.get_model("tracker", "DailyPlanItem")
+
+    plan_ids = list(WeeklyPlan.objects.order_by("pk").values_list("pk", flat=True))
+    for offset in range(0, len(plan_ids), 500):
+        plans = list(WeeklyPlan.objects.filter(pk__in=plan_ids[offset:offset + 500]))
+        items_by_plan = {plan.pk: [] for plan in plans}
+        for row in DailyPlanItem.objects.filter(weekly_plan_id__in=list(items_by_plan)).values(
+            "weekly_plan_id", *ITEM_SCORING_FIELDS
+        ):
+            items_by_plan[row["weekly_plan_id"]].append(row)
+        for plan in plans:
+            score = score_plan_items(items_by_plan[plan.pk])
+            for field in POINTS_FIELDS:
+                setattr(plan, field, score[field])
+        WeeklyPlan.objects.bulk_update(plans, POINTS_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0027_alter_weeklyplan_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="activity_points",
+            field=models.IntegerField(default=0, help_text="Points from completed core workouts (one per day)"),
+        ),
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="bonus_points",
+            field=models.IntegerField(default=0, help_text="Points from bonus workouts (only once all core workouts are done)"),
+        ),
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="total_points",
+            field=models.IntegerField(default=0, help_text="Activity plus bonus points"),
+        ),
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="max_core_points",
+            field=models.IntegerField(default=150, help_text="Maximum points from core workouts (excluding bonus)"),
+        ),
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="core_workout_count",
+            field=models.IntegerField(default=0, help_text="Days with a core workout assigned"),
+        ),
+        migrations.AddField(
+            model_name="weeklyplan",
+            name="completed_core_workouts",
+            field=models.IntegerField(default=0, help_text="Days with a completed workout"),
+        ),
+        migrations.RunPython(backfill_plan_points, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
+import threading
 from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 from plans.models import Exercise
@@ -17,6 +20,14 @@ class WeeklyPlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Points summary of the plan's items, kept current by recalculate_points()
+    activity_points = models.IntegerField(default=0, help_text="Points from completed core workouts (one per day)")
+    bonus_points = models.IntegerField(default=0, help_text="Points from bonus workouts (only once all core workouts are done)")
+    total_points = models.IntegerField(default=0, help_text="Activity plus bonus points")
+    max_core_points = models.IntegerField(default=150, help_text="Maximum points from core workouts (excluding bonus)")
+    core_workout_count = models.IntegerField(default=0, help_text="Days with a core workout assigned")
+    completed_core_workouts = models.IntegerField(default=0, help_text="Days with a completed workout")
+
     class Meta:
         unique_together = ("user", "week_start")
         ordering = ["-week_start"]
@@ -45,34 +56,6 @@ class WeeklyPlan(models.Model):
     def completed_exercises(self):
         return self.items.filter(is_done=True).count()
     
-    @property
-    def max_core_points(self):
-        """Maximum possible points from core workouts only (excluding bonus) - sum of all workout_points"""
-        from django.db.models import Q
-        
-        # Get all workout items (items with Peloton URLs, excluding bonus)
-        workout_items = self.items.filter(
-            (Q(peloton_ride_url__isnull=False) & ~Q(peloton_ride_url='')) |
-            (Q(peloton_run_url__isnull=False) & ~Q(peloton_run_url='')) |
-            (Q(peloton_yoga_url__isnull=False) & ~Q(peloton_yoga_url='')) |
-            (Q(peloton_strength_url__isnull=False) & ~Q(peloton_strength_url=''))
-        ).exclude(peloton_focus__icontains="Bonus")
-        
-        # Group by day_of_week - sum max points per day (only one workout per day counts)
-        total_max = 0
-        days_seen = set()
-        
-        for item in workout_items.order_by('day_of_week', 'id'):
-            if item.day_of_week in days_seen:
-                continue  # Already counted max points for this day
-            
-            # Use stored workout_points, fallback to 50 for backward compatibility
-            points = item.workout_points if item.workout_points > 0 else 50
-            total_max += points
-            days_seen.add(item.day_of_week)
-        
-        return total_max if total_max > 0 else 150  # Fallback to 150 if no points set
-    
     @property
     def completion_rate(self):
         """Completion rate based on total points out of max core (150) for medal calculation"""
@@ -93,90 +76,10 @@ class WeeklyPlan(models.Model):
         # Kegels no longer contribute to points
         return 0
     
-    @property
-    def core_workout_count(self):
-        """Count total number of core workouts (rides/runs/yoga/strength) in this week"""
-        # Count distinct days with any core workout assigned
-        all_days = set()
-        all_days.update(self.items.filter(peloton_ride_url__isnull=False).exclude(peloton_ride_url='').values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(peloton_run_url__isnull=False).exclude(peloton_run_url='').values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(peloton_yoga_url__isnull=False).exclude(peloton_yoga_url='').values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(peloton_strength_url__isnull=False).exclude(peloton_strength_url='').values_list('day_of_week', flat=True))
-        
-        return len(all_days)
-    
-    @property
-    def completed_core_workouts(self):
-        """Count completed core workouts"""
-        # Count distinct days with completed core workouts
-        all_days = set()
-        all_days.update(self.items.filter(ride_done=True).values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(run_done=True).values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(yoga_done=True).values_list('day_of_week', flat=True))
-        all_days.update(self.items.filter(strength_done=True).values_list('day_of_week', flat=True))
-        
-        return len(all_days)
-    
-    @property
-    def activity_points(self):
-        """Points from completed core workouts - simplified to use stored workout_points"""
-        from django.db.models import Q
-        
-        # Get all workout items (items with Peloton URLs, excluding bonus)
-        workout_items = self.items.filter(
-            (Q(peloton_ride_url__isnull=False) & ~Q(peloton_ride_url='')) |
-            (Q(peloton_run_url__isnull=False) & ~Q(peloton_run_url='')) |
-            (Q(peloton_yoga_url__isnull=False) & ~Q(peloton_yoga_url='')) |
-            (Q(peloton_strength_url__isnull=False) & ~Q(peloton_strength_url=''))
-        ).exclude(peloton_focus__icontains="Bonus")
-        
-        # Group by day_of_week - only count one completed workout per day (to handle alternatives)
-        total_points = 0
-        completed_days = set()
-        
-        for item in workout_items.order_by('day_of_week', 'id'):
-            if item.day_of_week in completed_days:
-                continue  # Already counted a workout for this day
-            
-            # Check if this workout is completed
-            if item.ride_done or item.run_done or item.yoga_done or item.strength_done:
-                # Use stored workout_points, fallback to 50 for backward compatibility
-                points = item.workout_points if item.workout_points > 0 else 50
-                total_points += points
-                completed_days.add(item.day_of_week)
-        
-        return total_points
-    
-    @property
-    def bonus_points(self):
-        """Points from bonus workouts - 10 points each, but only if all core workouts are completed"""
-        from django.db.models import Q
-        
-        # First check if all core workouts are completed
-        core_count = self.core_workout_count
-        completed_core_count = self.completed_core_workouts
-        
-        # Only award bonus points if all core workouts are done
-        if core_count == 0 or completed_core_count < core_count:
-            return 0
-        
-        # Count completed bonus workouts (items with "Bonus" in peloton_focus)
-        bonus_items = self.items.filter(peloton_focus__icontains="Bonus")
-        completed_bonus = bonus_items.filter(
-            Q(ride_done=True) | Q(run_done=True) | Q(yoga_done=True) | Q(strength_done=True)
-        ).count()
-        return completed_bonus * 10
-    
-    @property
-    def total_points(self):
-        """Total points from core workouts and bonus workout"""
-        return self.activity_points + self.bonus_points
-    
     @property
     def max_total_points(self):
         """Maximum possible points based on actual workout_points stored in items"""
-        # Use max_core_points which correctly sums up the actual workout_points from items
-        # This ensures the calculation matches the actual points assigned to each workout
+        # max_core_points sums the actual workout_points of the items (see recalculate_points)
         max_core = self.max_core_points
         return max_core + 10  # +10 for bonus
     
@@ -219,6 +122,45 @@ class WeeklyPlan(models.Model):
     def is_completed(self):
         return self.completed_at is not None or (self.is_past and self.meets_bronze)
     
+    POINTS_FIELDS = [
+        "activity_points", "bonus_points", "total_points",
+        "max_core_points", "core_workout_count", "completed_core_workouts",
+    ]
+    
+    def recalculate_points(self, save=True):
+        """Recompute the stored points summary from the plan's items (one query)"""
+        from .scoring import ITEM_SCORING_FIELDS, score_plan_items
+        
+        score = score_plan_items(self.items.values(*ITEM_SCORING_FIELDS))
+        for field in self.POINTS_FIELDS:
+            setattr(self, field, score[field])
+        if save:
+            self.save(update_fields=self.POINTS_FIELDS)
+        return score
+    
+    @classmethod
+    def recalculate_points_for(cls, plans):
+        """Recompute the stored points of many plans with one item query and a bulk update"""
+        from .scoring import ITEM_SCORING_FIELDS, score_plan_items
+        
+        plans = list(plans)
+        items_by_plan = {plan.pk: [] for plan in plans}
+        rows = DailyPlanItem.objects.filter(weekly_plan_id__in=list(items_by_plan)).values(
+            "weekly_plan_id", *ITEM_SCORING_FIELDS
+        )
+        for row in rows:
+            items_by_plan[row["weekly_plan_id"]].append(row)
+        for plan in plans:
+            score = score_plan_items(items_by_plan[plan.pk])
+            for field in cls.POINTS_FIELDS:
+                setattr(plan, field, score[field])
+        cls.objects.bulk_update(plans, cls.POINTS_FIELDS, batch_size=500)
+        # bulk_update sends no post_save, so drop cached plan totals here
+        from core.services import TaggedCacheService
+        for user_id in {plan.user_id for plan in plans}:
+            TaggedCacheService.invalidate_user(user_id, plans=True)
+        return len(plans)
+    
     def can_toggle_exercise(self, day_of_week):
         """Check if exercise can be toggled based on date"""
         today = timezone.now().date()
@@ -279,3 +221,63 @@ class DailyPlanItem(models.Model):
     @property
     def can_toggle(self):
         return self.weekly_plan.can_toggle_exercise(self.day_of_week)
+
+
+@receiver(post_save, sender=WeeklyPlan)
+@receiver(post_delete, sender=WeeklyPlan)
+def invalidate_cached_plan_totals(sender, instance, **kwargs):
+    """Cached dashboard points / completion totals for the user are out of date"""
+    from core.services import TaggedCacheService
+    TaggedCacheService.invalidate_user(instance.user_id, plans=True)
+
+
+_pending = threading.local()
+
+
+def queue_points_recalculation(plan_id):
+    """
+    Recompute a plan's stored points once the current transaction commits.
+
+    Outside a transaction this runs immediately; inside one, plan ids are
+    collected so saving or deleting many items recomputes each plan once.
+    """
+    if not connection.in_atomic_block:
+        WeeklyPlan.recalculate_points_for(WeeklyPlan.objects.filter(pk=plan_id))
+        return
+    # One callback per call keeps this correct across rollbacks; the first
+    # flush after commit takes every queued plan and the rest are no-ops.
+    if getattr(_pending, "plan_ids", None) is None:
+        _pending.plan_ids = set()
+    _pending.plan_ids.add(plan_id)
+    transaction.on_commit(_flush_pending_recalculations)
+
+
+def _flush_pending_recalculations():
+    plan_ids = getattr(_pending, "plan_ids", None)
+    _pending.plan_ids = None
+    if plan_ids:
+        # Plans deleted in the same transaction are simply skipped
+        WeeklyPlan.recalculate_points_for(WeeklyPlan.objects.filter(pk__in=plan_ids))
+
+
+@receiver(post_save, sender=DailyPlanItem)
+@receiver(post_delete, sender=DailyPlanItem)
+def recalculate_plan_points_for_item(sender, instance, **kwargs):
+    """
+    Any saved or deleted item (views, admin, shell) changes its plan's points.
+
+    Bulk writes send no signals; their callers use recalculate_points_for().
+    This also drops the user's cached plan totals (see recalculate_points_for).
+    """
+    if isinstance(kwargs.get("origin"), WeeklyPlan):
+        # Deleted along with its plan, whose own receiver covers it
+        return
+    queue_points_recalculation(instance.weekly_plan_id)
+
+
+@receiver(post_save, sender="challenges.ChallengeInstance")
+@receiver(post_delete, sender="challenges.ChallengeInstance")
+def invalidate_cached_challenge_totals(sender, instance, **kwargs):
+    """Joining / leaving a challenge changes the completed challenge count"""
+    from core.services import TaggedCacheService
+    TaggedCacheService.invalidate_user(instance.user_id, plans=True)
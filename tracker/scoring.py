@@ -0,0 +1,81 @@
+"""Weekly plan points from DailyPlanItem rows, in one pass.
+
+Produces the points summary stored on WeeklyPlan (activity_points,
+bonus_points, core_workout_count, ...; see WeeklyPlan.recalculate_points)
+from rows already in memory, so many plans can be scored from a single
+`.values(*ITEM_SCORING_FIELDS)` query.
+"""
+
+URL_FIELDS = ('peloton_ride_url', 'peloton_run_url', 'peloton_yoga_url', 'peloton_strength_url')
+DONE_FIELDS = ('ride_done', 'run_done', 'yoga_done', 'strength_done')
+
+ITEM_SCORING_FIELDS = ('id', 'day_of_week', 'peloton_focus', 'workout_points') + URL_FIELDS + DONE_FIELDS
+
+# Items saved before workout_points existed are worth the old flat 50
+DEFAULT_WORKOUT_POINTS = 50
+BONUS_WORKOUT_POINTS = 10
+# Plans without any points set fall back to the classic 3 x 50
+DEFAULT_MAX_CORE_POINTS = 150
+
+
+def score_plan_items(items):
+    """
+    Points summary of one plan from its item rows.
+
+    Args:
+        items: Dicts with ITEM_SCORING_FIELDS (any order)
+
+    Returns:
+        dict: activity_points, bonus_points, total_points, max_core_points,
+        core_workout_count, completed_core_workouts
+    """
+    items = sorted(items, key=lambda item: (item['day_of_week'], item['id']))
+
+    activity_points = 0
+    max_core_points = 0
+    core_days = set()
+    completed_days = set()
+    counted_days = set()
+    max_days = set()
+    completed_bonus = 0
+
+    for item in items:
+        has_workout = any(item[field] for field in URL_FIELDS)
+        is_done = any(item[field] for field in DONE_FIELDS)
+        is_bonus = 'bonus' in (item['peloton_focus'] or '').lower()
+        points = item['workout_points'] if item['workout_points'] > 0 else DEFAULT_WORKOUT_POINTS
+
+        if has_workout:
+            core_days.add(item['day_of_week'])
+        if is_done:
+            completed_days.add(item['day_of_week'])
+        if is_bonus:
+            if is_done:
+                completed_bonus += 1
+            continue
+        if not has_workout:
+            continue
+        # Only one workout per day counts (the rest are alternatives)
+        if item['day_of_week'] not in max_days:
+            max_core_points += points
+            max_days.add(item['day_of_week'])
+        if is_done and item['day_of_week'] not in counted_days:
+            activity_points += points
+            counted_days.add(item['day_of_week'])
+
+    core_workout_count = len(core_days)
+    completed_core_workouts = len(completed_days)
+    # Bonus workouts only count once every core workout is done
+    if core_workout_count == 0 or completed_core_workouts < core_workout_count:
+        bonus_points = 0
+    else:
+        bonus_points = completed_bonus * BONUS_WORKOUT_POINTS
+
+    return {
+        'activity_points': activity_points,
+        'bonus_points': bonus_points,
+        'total_points': activity_points + bonus_points,
+        'max_core_points': max_core_points or DEFAULT_MAX_CORE_POINTS,
+        'core_workout_count': core_workout_count,
+        'completed_core_workouts': completed_core_workouts,
+    }
@@ -947,6 +947,11 @@ def toggle_activity(request, pk, activity):
     plan = item.weekly_plan
     plan.refresh_from_db()  # Refresh to get updated stats
     
+    # Update the member's team leaderboard rows (just their team, not the whole challenge)
+    if plan.challenge_instance_id:
+        from challenges.leaderboard import refresh_team_leaderboard
+        refresh_team_leaderboard(plan.challenge_instance)
+    
     # Calculate points for this specific activity
     # Points depend on plan type and workout day number
     core_count = plan.core_workout_count
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import WorkoutType, Instructor, Workout, WorkoutDetails, WorkoutMetrics, WorkoutPerformanceData, RideDetail, Playlist, ClassType
+from .models import WorkoutType, Instructor, Workout, WorkoutDetails, WorkoutMetrics, WorkoutPerformanceData, RideDetail, Playlist, ClassType, WorkoutSyncJob, PelotonPayload
 
 
 @admin.register(WorkoutType)
@@ -182,7 +182,7 @@ class WorkoutAdmin(admin.ModelAdmin):
         """Custom delete action that handles large numbers of workouts"""
         count = queryset.count()
         # Delete related details and performance data first
-        from .models import WorkoutDetails, WorkoutPerformanceData
+        from .models import WorkoutDetails, WorkoutPerformanceData, WorkoutTimeSeries
         workout_ids = list(queryset.values_list('id', flat=True))
         
         # Delete in batches to avoid memory issues
@@ -190,6 +190,7 @@ class WorkoutAdmin(admin.ModelAdmin):
         for i in range(0, len(workout_ids), batch_size):
             batch_ids = workout_ids[i:i+batch_size]
             WorkoutPerformanceData.objects.filter(workout_id__in=batch_ids).delete()
+            WorkoutTimeSeries.objects.filter(workout_id__in=batch_ids).delete()
             WorkoutDetails.objects.filter(workout_id__in=batch_ids).delete()
         
         # Now delete the workouts
@@ -402,3 +403,20 @@ class ClassTypeAdmin(admin.ModelAdmin):
 
 
 # Note: PelotonConnection is registered in peloton/admin.py
+
+
+@admin.register(WorkoutSyncJob)
+class WorkoutSyncJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'is_full_sync', 'current_stage', 'pages_completed', 'workouts_processed', 'workouts_synced', 'workouts_updated', 'workouts_skipped', 'created_at', 'heartbeat_at']
+    list_filter = ['status', 'is_full_sync', 'created_at']
+    search_fields = ['user__email', 'peloton_user_id']
+    raw_id_fields = ['user']
+    readonly_fields = ['created_at', 'started_at', 'heartbeat_at', 'finished_at']
+
+
+@admin.register(PelotonPayload)
+class PelotonPayloadAdmin(admin.ModelAdmin):
+    list_display = ['endpoint', 'object_id', 'fetched_at', 'blob_id']
+    list_filter = ['endpoint']
+    search_fields = ['object_id']
+    readonly_fields = ['endpoint', 'object_id', 'blob', 'fetched_at']
@@ -0,0 +1,45 @@
+"""
+Compute stored mean-max power curves (WorkoutPowerPeak) for historic workouts.
+
+New workouts get their curve when the time series is stored; this command
+covers workouts synced before the table existed.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from workouts.models import Workout, WorkoutPerformanceData, WorkoutPowerPeak, WorkoutTimeSeries
+from workouts.services.power_curve import backfill_power_curves
+
+
+class Command(BaseCommand):
+    help = 'Backfill per-workout mean-max power curves from stored time series'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Only backfill workouts for this user')
+        parser.add_argument('--batch-size', type=int, default=200, help='Workouts per batch (default: 200)')
+        parser.add_argument('--force', action='store_true', help='Recompute workouts that already have a curve')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        workouts = Workout.objects.filter(
+            Q(Exists(WorkoutTimeSeries.objects.filter(workout_id=OuterRef('pk'), output__isnull=False)))
+            | Q(Exists(WorkoutPerformanceData.objects.filter(workout_id=OuterRef('pk'), output__isnull=False)))
+        )
+        if options.get('user_id'):
+            workouts = workouts.filter(user_id=options['user_id'])
+        if not options.get('force'):
+            workouts = workouts.exclude(Exists(WorkoutPowerPeak.objects.filter(workout_id=OuterRef('pk'))))
+
+        workout_ids = list(workouts.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Backfilling power curves for {len(workout_ids)} workouts')
+
+        rows = 0
+        for i in range(0, len(workout_ids), batch_size):
+            batch = workout_ids[i:i + batch_size]
+            with transaction.atomic():
+                rows += backfill_power_curves(batch)
+            self.stdout.write(f'  {min(i + batch_size, len(workout_ids))}/{len(workout_ids)} workouts')
+
+        self.stdout.write(self.style.SUCCESS(f'Stored {rows} power curve points for {len(workout_ids)} workouts'))
@@ -0,0 +1,158 @@
+"""
+Management command to load-test the Peloton sync against a local fake
+Peloton API (peloton.fake_server) and report throughput, queries per item,
+p95 latency and peak RSS.
+
+It writes benchmark users, workouts and classes to the configured database
+and deletes them afterwards (unless --keep); run it against a scratch
+database.
+
+Usage:
+    python manage.py benchmark_sync
+    python manage.py benchmark_sync --users 4 --workouts 1000 --latency-ms 80 --throttle-ratio 0.05
+    python manage.py benchmark_sync --phase sync --max-queries-per-workout 12 --min-workouts-per-second 40
+    python manage.py benchmark_sync --json benchmark.json
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from peloton.fake_server import FakePelotonConfig
+from workouts.services.sync_benchmark import PHASE_SYNC, PHASES, run_sync_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sync_workouts, the sync Celery tasks and sync_class_library against a fake Peloton API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Benchmark users to sync (default: 1)')
+        parser.add_argument('--workouts', type=int, default=500, help='Workouts per user (default: 500)')
+        parser.add_argument('--library-size', type=int, default=2000, help='Classes in the fake library (default: 2000)')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean latency added per request (default: 0)')
+        parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='Standard deviation of the added latency')
+        parser.add_argument(
+            '--throttle-ratio',
+            type=float,
+            default=0.0,
+            help='Share of URLs answered with a 429 on their first request (default: 0)'
+        )
+        parser.add_argument('--retry-after', type=str, default='0', help='Retry-After header on 429s (default: 0)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data (default: 0)')
+        parser.add_argument(
+            '--phase',
+            action='append',
+            choices=PHASES,
+            help='Phase to run (repeatable; default: all of them)'
+        )
+        parser.add_argument(
+            '--task-sample',
+            type=int,
+            default=100,
+            help='Workouts refreshed through the per-workout tasks (default: 100)'
+        )
+        parser.add_argument(
+            '--library-limit',
+            type=int,
+            default=None,
+            help='Classes per discipline walked by sync_class_library (default: all)'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=None,
+            help='Override PELOTON_API_RATE_LIMIT for the run (0 = unlimited; default: settings)'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users and classes afterwards')
+        parser.add_argument('--json', type=str, default=None, help='Also write the report as JSON to this file')
+        parser.add_argument(
+            '--max-queries-per-workout',
+            type=float,
+            default=None,
+            help='Fail if the sync phase runs more queries per workout than this'
+        )
+        parser.add_argument(
+            '--min-workouts-per-second',
+            type=float,
+            default=None,
+            help='Fail if the sync phase is slower than this'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['workouts'] < 0:
+            raise CommandError('--users must be at least 1 and --workouts not negative')
+        if not 0 <= options['throttle_ratio'] <= 1:
+            raise CommandError('--throttle-ratio must be between 0 and 1')
+
+        config = FakePelotonConfig(
+            workouts_per_user=options['workouts'],
+            library_size=options['library_size'],
+            latency_ms=options['latency_ms'],
+            latency_jitter_ms=options['latency_jitter_ms'],
+            throttle_ratio=options['throttle_ratio'],
+            retry_after=options['retry_after'],
+            seed=options['seed'],
+        )
+        phases = [phase for phase in PHASES if phase in (options['phase'] or PHASES)]
+
+        self.stdout.write(
+            f"Fake Peloton: {options['users']} user(s) x {config.workouts_per_user} workouts, "
+            f"{config.library_size} classes, latency {config.latency_ms:g}±{config.latency_jitter_ms:g} ms, "
+            f"{config.throttle_ratio:.0%} of URLs throttled once"
+        )
+        report = run_sync_benchmark(
+            config=config,
+            users=options['users'],
+            phases=phases,
+            task_sample=options['task_sample'],
+            library_limit=options['library_limit'],
+            rate_limit=options['rate_limit'],
+            keep=options['keep'],
+        )
+
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'phase':<8} {'items':>7} {'unit':<8} {'items/s':>9} {'queries/item':>13} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'retries':>8} {'errors':>7} {'peak RSS MB':>12}"
+        )
+        for phase in report.phases:
+            p50, p95 = phase.percentile(50), phase.percentile(95)
+            line = (
+                f"{phase.name:<8} {phase.items:>7} {phase.unit:<8} {phase.items_per_second:>9.1f} "
+                f"{phase.queries_per_item:>13.1f} {self._ms(p50):>8} {self._ms(p95):>8} "
+                f"{phase.retries:>8} {phase.errors:>7} "
+                f"{(f'{phase.peak_rss_mb:.0f}' if phase.peak_rss_mb is not None else '—'):>12}"
+            )
+            self.stdout.write(self.style.ERROR(line) if phase.errors else line)
+        self.stdout.write('')
+        self.stdout.write('Requests served: ' + ', '.join(
+            f"{route} {count}" for route, count in sorted(report.requests.items())
+        ))
+        if report.throttled:
+            self.stdout.write('429s served: ' + ', '.join(
+                f"{route} {count}" for route, count in sorted(report.throttled.items())
+            ))
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report.as_dict(), f, indent=2)
+            self.stdout.write(f"Report written to {options['json']}")
+
+        self._check_thresholds(report, options)
+
+    @staticmethod
+    def _ms(seconds):
+        return f'{seconds * 1000:.0f}' if seconds is not None else '—'
+
+    def _check_thresholds(self, report, options):
+        sync = report.phase(PHASE_SYNC)
+        failures = []
+        if sync is not None:
+            limit = options['max_queries_per_workout']
+            if limit is not None and sync.queries_per_item > limit:
+                failures.append(f'{sync.queries_per_item:.1f} queries per workout (max {limit:g})')
+            floor = options['min_workouts_per_second']
+            if floor is not None and sync.items_per_second < floor:
+                failures.append(f'{sync.items_per_second:.1f} workouts/s (min {floor:g})')
+        if failures:
+            raise CommandError('Sync benchmark regression: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
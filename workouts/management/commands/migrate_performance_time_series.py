@@ -0,0 +1,80 @@
+"""
+Convert legacy WorkoutPerformanceData rows (one per sample) into packed
+WorkoutTimeSeries rows (one per workout), in batches of workouts.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from workouts.models import WorkoutPerformanceData, WorkoutTimeSeries
+from workouts.services.time_series import build_time_series, store_time_series
+
+
+class Command(BaseCommand):
+    help = 'Pack legacy per-sample performance rows into per-workout time series'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Workouts converted per transaction (default: 200)')
+        parser.add_argument('--user-id', type=int, help='Only convert workouts for this user')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many workouts (0 = no limit)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be converted without writing')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        limit = options.get('limit') or 0
+        dry_run = options.get('dry_run')
+
+        rows = WorkoutPerformanceData.objects.all()
+        if options.get('user_id'):
+            rows = rows.filter(workout__user_id=options['user_id'])
+
+        converted = 0
+        cleaned = 0
+        samples = 0
+        last_id = 0
+        while True:
+            workout_ids = list(
+                rows.filter(workout_id__gt=last_id)
+                .order_by('workout_id')
+                .values_list('workout_id', flat=True)
+                .distinct()[:batch_size]
+            )
+            if limit:
+                workout_ids = workout_ids[:max(0, limit - converted - cleaned)]
+            if not workout_ids:
+                break
+            last_id = workout_ids[-1]
+
+            # Workouts already re-synced into the packed store only need their stale rows dropped
+            already_packed = set(
+                WorkoutTimeSeries.objects.filter(workout_id__in=workout_ids).values_list('workout_id', flat=True)
+            )
+            samples_by_workout = {}
+            for sample in (
+                WorkoutPerformanceData.objects
+                .filter(workout_id__in=[wid for wid in workout_ids if wid not in already_packed])
+                .order_by('workout_id', 'timestamp')
+                .iterator(chunk_size=5000)
+            ):
+                samples_by_workout.setdefault(sample.workout_id, []).append(sample)
+
+            batch_samples = sum(len(items) for items in samples_by_workout.values())
+            if not dry_run:
+                with transaction.atomic():
+                    store_time_series(
+                        build_time_series(wid, items) for wid, items in samples_by_workout.items()
+                    )
+                    if already_packed:
+                        WorkoutPerformanceData.objects.filter(workout_id__in=already_packed).delete()
+
+            converted += len(samples_by_workout)
+            cleaned += len(already_packed)
+            samples += batch_samples
+            self.stdout.write(
+                f'Batch up to workout {last_id}: {len(samples_by_workout)} converted '
+                f'({batch_samples} samples), {len(already_packed)} already packed'
+            )
+
+        verb = 'Would convert' if dry_run else 'Converted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {converted} workouts ({samples} samples); {cleaned} already packed'
+        ))
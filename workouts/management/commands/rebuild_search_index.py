@@ -0,0 +1,50 @@
+"""
+Management command to (re)build the class search index (RideSearchDocument).
+
+New and re-synced rides are indexed when they are stored, and migration 0033
+indexes the rides stored before that; run this after changing how documents
+are built.
+
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --missing-only --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+
+from workouts.models import RideDetail
+from workouts.services.search import refresh_search_documents, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Build search documents for class library rides'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only index rides without a search document'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rides indexed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        rides = RideDetail.objects.select_related('workout_type', 'instructor').order_by('pk')
+        if options['missing_only']:
+            rides = rides.filter(search_document__isnull=True)
+
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(rides.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            total += refresh_search_documents(batch)
+            self.stdout.write(f"Indexed {total} rides...")
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} rides (search backend: {search_backend()})'))
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from peloton.models import PelotonConnection
 from peloton.services.peloton import PelotonClient, PelotonAPIError
 from workouts.models import Workout, WorkoutPerformanceData
+from workouts.services.time_series import PerformanceSample, build_time_series, store_time_series
 import logging
 
 User = get_user_model()
@@ -158,8 +159,7 @@ class Command(BaseCommand):
                         if not isinstance(timestamp, (int, float)):
                             continue
 
-                        perf_data = WorkoutPerformanceData(
-                            workout=workout,
+                        perf_data = PerformanceSample(
                             timestamp=int(timestamp),
                             output=metric_values_by_slug.get('output', [None])[idx] if idx < len(metric_values_by_slug.get('output', [])) else None,
                             cadence=int(metric_values_by_slug.get('cadence', [None])[idx]) if idx < len(metric_values_by_slug.get('cadence', [])) and metric_values_by_slug.get('cadence', [None])[idx] is not None else None,
@@ -169,9 +169,9 @@ class Command(BaseCommand):
                         )
                         performance_data_entries.append(perf_data)
 
-                    # Bulk create performance data
+                    # Store packed time series
                     if performance_data_entries:
-                        WorkoutPerformanceData.objects.bulk_create(performance_data_entries, ignore_conflicts=True)
+                        store_time_series([build_time_series(workout, performance_data_entries)])
                         speed_count = sum(1 for e in performance_data_entries if e.speed is not None)
                         self.stdout.write(self.style.SUCCESS(
                             f'    ✓ Stored {len(performance_data_entries)} data points ({speed_count} with speed)'
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from peloton.models import PelotonConnection
 from peloton.services.peloton import PelotonClient, PelotonAPIError
 from workouts.models import Workout, WorkoutPerformanceData
+from workouts.services.time_series import PerformanceSample, build_time_series, store_time_series
 import logging
 
 User = get_user_model()
@@ -181,8 +182,7 @@ class Command(BaseCommand):
                 continue
             
             # Extract values for this timestamp from each metric
-            perf_data = WorkoutPerformanceData(
-                workout=workout,
+            perf_data = PerformanceSample(
                 timestamp=int(timestamp),
                 output=metric_values_by_slug.get('output', [None])[idx] if idx < len(metric_values_by_slug.get('output', [])) else None,
                 cadence=int(metric_values_by_slug.get('cadence', [None])[idx]) if idx < len(metric_values_by_slug.get('cadence', [])) and metric_values_by_slug.get('cadence', [None])[idx] is not None else None,
@@ -192,9 +192,9 @@ class Command(BaseCommand):
             )
             performance_data_entries.append(perf_data)
 
-        # Bulk create performance data
+        # Store packed time series
         if performance_data_entries:
-            WorkoutPerformanceData.objects.bulk_create(performance_data_entries, ignore_conflicts=True)
+            store_time_series([build_time_series(workout, performance_data_entries)])
             self.stdout.write(self.style.SUCCESS(
                 f'✓ Stored {len(performance_data_entries)} time-series data points'
             ))
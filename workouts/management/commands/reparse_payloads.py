@@ -0,0 +1,77 @@
+"""
+Management command to rebuild stored workout and class data from the raw
+Peloton response archive (PelotonPayload), without calling the API.
+
+Run it after changing how performance graphs, ride details or playlists are
+parsed, instead of re-downloading with refresh_workout_performance,
+update_ride_segments, update_class_types or resync_playlists.
+
+Usage:
+    python manage.py reparse_payloads
+    python manage.py reparse_payloads --target rides --target playlists
+    python manage.py reparse_payloads --user someone@example.com --workers 1
+"""
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.services.reparse import DEFAULT_CHUNK_SIZE, TARGETS, run_reparse
+
+
+class Command(BaseCommand):
+    help = 'Re-parse archived Peloton responses into WorkoutDetails, time series, RideDetails and playlists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            choices=TARGETS,
+            help='What to rebuild (repeatable; default: all of them)'
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Email of a user; only re-parse their workouts and classes'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: CPU count; 1 = in this process)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Peloton ids per chunk (default: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        targets = options['target'] or list(TARGETS)
+
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" not found')
+
+        def on_chunk(target, result):
+            self.stdout.write(f'  {target}: {result.parsed} parsed, {result.skipped} skipped, {result.failed} failed')
+
+        totals = run_reparse(
+            targets=targets,
+            user=user,
+            workers=max(1, options['workers']),
+            chunk_size=options['chunk_size'],
+            on_chunk=on_chunk,
+        )
+
+        self.stdout.write('')
+        for target, result in totals.items():
+            style = self.style.ERROR if result.failed else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{target}: {result.parsed} parsed, {result.skipped} skipped, {result.failed} failed'
+            ))
+            for error in result.errors:
+                self.stdout.write(self.style.ERROR(f'  {error}'))
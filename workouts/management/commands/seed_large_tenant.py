@@ -0,0 +1,110 @@
+"""
+Management command to write a synthetic large tenant (workouts.services.synthetic_tenant)
+for profiling views and reports at production scale.
+
+Unlike the demo seed commands (seed_users, seed_challenges, seed_plans, ...)
+it writes with bulk_create in chunks, so the default 10k users with two
+years of workouts, 30k classes, FTP/pace history, challenges, teams and
+weekly plans take minutes. The same --seed always produces the same data.
+Run it against a scratch database.
+
+Usage:
+    python manage.py seed_large_tenant
+    python manage.py seed_large_tenant --users 500 --years 1 --rides 3000 --password secret
+    python manage.py seed_large_tenant --tag ci --series-ratio 1 --seed 7
+    python manage.py seed_large_tenant --tag ci --delete
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.services.synthetic_tenant import TenantConfig, delete_tenant, generate_tenant, tenant_exists
+
+
+class Command(BaseCommand):
+    help = 'Write a reproducible synthetic tenant (users, workouts, classes, challenges, plans) in bulk'
+
+    def add_arguments(self, parser):
+        defaults = TenantConfig()
+        parser.add_argument('--users', type=int, default=defaults.users, help=f'Users to create (default: {defaults.users})')
+        parser.add_argument('--years', type=float, default=defaults.years, help=f'Longest workout history in years (default: {defaults.years:g})')
+        parser.add_argument(
+            '--workouts-per-week',
+            type=float,
+            default=defaults.workouts_per_week,
+            help=f'Average workouts per user per week (default: {defaults.workouts_per_week:g})'
+        )
+        parser.add_argument('--rides', type=int, default=defaults.rides, help=f'Classes in the library (default: {defaults.rides})')
+        parser.add_argument(
+            '--series-ratio',
+            type=float,
+            default=defaults.series_ratio,
+            help=f'Share of cycling/running workouts with a time series (default: {defaults.series_ratio:g})'
+        )
+        parser.add_argument('--challenges', type=int, default=defaults.challenges, help=f'Team challenges (default: {defaults.challenges})')
+        parser.add_argument('--challenge-weeks', type=int, default=defaults.challenge_weeks, help=f'Weeks per challenge (default: {defaults.challenge_weeks})')
+        parser.add_argument(
+            '--participation',
+            type=float,
+            default=defaults.participation,
+            help=f'Share of users joining each challenge (default: {defaults.participation:g})'
+        )
+        parser.add_argument('--team-size', type=int, default=defaults.team_size, help=f'Average team size (default: {defaults.team_size})')
+        parser.add_argument('--no-zone-times', action='store_true', help='Skip zone times (they are then computed on first view)')
+        parser.add_argument('--password', type=str, default=None, help='Password of every user (default: unusable)')
+        parser.add_argument('--chunk-size', type=int, default=defaults.chunk_size, help=f'Users written per chunk (default: {defaults.chunk_size})')
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size, help=f'Rows per INSERT (default: {defaults.batch_size})')
+        parser.add_argument('--seed', type=int, default=defaults.seed, help=f'Seed of the synthetic data (default: {defaults.seed})')
+        parser.add_argument('--tag', type=str, default=defaults.tag, help=f'Prefix of the emails, names and ids (default: {defaults.tag})')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing tenant with this tag first')
+        parser.add_argument('--delete', action='store_true', help='Only delete the tenant with this tag')
+
+    def handle(self, *args, **options):
+        tag = options['tag']
+        if options['delete'] or options['replace']:
+            deleted = delete_tenant(tag)
+            self.stdout.write(f"Deleted tenant '{tag}' ({deleted} users)")
+            if options['delete']:
+                return
+        elif tenant_exists(tag):
+            raise CommandError(f"Tenant '{tag}' already exists; use --replace or another --tag")
+        if options['users'] < 1 or options['rides'] < 1 or options['years'] <= 0:
+            raise CommandError('--users, --rides and --years must be positive')
+        for option in ('series_ratio', 'participation'):
+            if not 0 <= options[option] <= 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be between 0 and 1")
+
+        config = TenantConfig(
+            users=options['users'],
+            years=options['years'],
+            workouts_per_week=options['workouts_per_week'],
+            rides=options['rides'],
+            series_ratio=options['series_ratio'],
+            challenges=options['challenges'],
+            challenge_weeks=options['challenge_weeks'],
+            participation=options['participation'],
+            team_size=options['team_size'],
+            zone_times=not options['no_zone_times'],
+            password=options['password'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            tag=tag,
+        )
+        self.stdout.write(
+            f"Tenant '{tag}': {config.users} users, {config.years:g} years at ~{config.workouts_per_week:g} workouts/week, "
+            f"{config.rides} classes, {config.challenges} challenges (seed {config.seed})"
+        )
+        try:
+            report = generate_tenant(config)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write('')
+        for phase, seconds in report.seconds.items():
+            self.stdout.write(f"{phase:<12} {seconds:>8.1f}s")
+        self.stdout.write('')
+        for model, count in sorted(report.rows.items()):
+            self.stdout.write(f"{model:<28} {count:>12,}")
+        total = sum(report.rows.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {total:,} rows in {report.total_seconds:.1f}s ({total / max(report.total_seconds, 1e-9):,.0f} rows/s)"
+        ))
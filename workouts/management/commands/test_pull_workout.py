@@ -244,6 +244,7 @@ class Command(BaseCommand):
         self.stdout.write("Fetching performance data...")
         try:
             from workouts.models import WorkoutPerformanceData, WorkoutDetails
+            from workouts.services.time_series import PerformanceSample, build_time_series, store_time_series
             
             performance_graph = client.fetch_performance_graph(workout_id, every_n=5)
             
@@ -338,10 +339,13 @@ class Command(BaseCommand):
                         if field:
                             perf_data[field] = value
                 
-                # Bulk create performance data
+                # Store packed time series
                 if performance_data_to_create:
-                    objs = [WorkoutPerformanceData(**data) for data in performance_data_to_create]
-                    WorkoutPerformanceData.objects.bulk_create(objs)
+                    objs = [
+                        PerformanceSample(**{k: v for k, v in data.items() if k in PerformanceSample._fields})
+                        for data in performance_data_to_create
+                    ]
+                    store_time_series([build_time_series(workout, objs)])
                     
                     # Calculate max timestamp (actual duration)
                     max_timestamp = max(p['timestamp'] for p in performance_data_to_create)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.27 on 2026-10-16 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('workouts', '0023_workout_title_override'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutSyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('is_full_sync', models.BooleanField(default=True)),
+                ('cutoff_timestamp', models.FloatField(blank=True, help_text='UTC Unix timestamp; incremental syncs stop at workouts older than this', null=True)),
+                ('peloton_user_id', models.CharField(blank=True, max_length=100)),
+                ('next_page', models.IntegerField(default=0, help_text='Next Peloton workout list page to process')),
+                ('pages_completed', models.IntegerField(default=0)),
+                ('consecutive_older', models.IntegerField(default=0, help_text='Consecutive workouts seen that are older than the cutoff')),
+                ('resume_count', models.IntegerField(default=0, help_text='How many times the job was resumed after stalling')),
+                ('workouts_processed', models.IntegerField(default=0)),
+                ('workouts_synced', models.IntegerField(default=0)),
+                ('workouts_updated', models.IntegerField(default=0)),
+                ('workouts_skipped', models.IntegerField(default=0)),
+                ('current_stage', models.CharField(blank=True, max_length=30)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Last time a pipeline stage touched this job', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_sync_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='workouts_wo_user_id_31778d_idx'), models.Index(fields=['status', 'heartbeat_at'], name='workouts_wo_status_713a73_idx')],
+            },
+        ),
+    ]
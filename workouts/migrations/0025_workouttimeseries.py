@@ -0,0 +1,35 @@
+# Generated by Django 4.2.27 on 2026-10-16 20:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0024_workoutsyncjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutTimeSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_count', models.PositiveIntegerField(default=0, help_text='Number of samples in every channel')),
+                ('encoding', models.CharField(default='zlib-le-v1', help_text='Channel encoding version', max_length=20)),
+                ('timestamps', models.BinaryField(help_text='Seconds from workout start (int32)')),
+                ('output', models.BinaryField(blank=True, help_text='Output in watts (float64, NaN = missing)', null=True)),
+                ('cadence', models.BinaryField(blank=True, help_text='Cadence in rpm (int32)', null=True)),
+                ('resistance', models.BinaryField(blank=True, help_text='Resistance (float64, NaN = missing)', null=True)),
+                ('speed', models.BinaryField(blank=True, help_text='Speed in mph (float64, NaN = missing)', null=True)),
+                ('heart_rate', models.BinaryField(blank=True, help_text='Heart rate in bpm (int32)', null=True)),
+                ('power_zone', models.BinaryField(blank=True, help_text='Power zone 1-7 (int8, 0 = missing)', null=True)),
+                ('intensity_zone', models.BinaryField(blank=True, help_text='Intensity zone code 1-7 (int8, 0 = missing)', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='time_series', to='workouts.workout')),
+            ],
+            options={
+                'verbose_name_plural': 'Workout Time Series',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-16 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0025_workouttimeseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutPowerPeak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_seconds', models.PositiveIntegerField(help_text='Window length in seconds')),
+                ('watts', models.FloatField(help_text='Best average output over the window')),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='power_peaks', to='workouts.workout')),
+            ],
+            options={
+                'ordering': ['workout', 'duration_seconds'],
+                'indexes': [models.Index(fields=['duration_seconds', 'watts'], name='workouts_wo_duratio_39a933_idx')],
+                'unique_together': {('workout', 'duration_seconds')},
+            },
+        ),
+    ]
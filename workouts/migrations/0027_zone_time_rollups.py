@@ -0,0 +1,63 @@
+# Generated by Django 4.2.27 on 2026-10-16 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('workouts', '0026_workoutpowerpeak'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneTimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('power', 'Power zones (cycling)'), ('pace', 'Pace/intensity zones (running & walking)')], max_length=10)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField(help_text='Day, or first day of the month')),
+                ('zone_1', models.PositiveIntegerField(default=0, help_text='Seconds in zone 1')),
+                ('zone_2', models.PositiveIntegerField(default=0, help_text='Seconds in zone 2')),
+                ('zone_3', models.PositiveIntegerField(default=0, help_text='Seconds in zone 3')),
+                ('zone_4', models.PositiveIntegerField(default=0, help_text='Seconds in zone 4')),
+                ('zone_5', models.PositiveIntegerField(default=0, help_text='Seconds in zone 5')),
+                ('zone_6', models.PositiveIntegerField(default=0, help_text='Seconds in zone 6')),
+                ('zone_7', models.PositiveIntegerField(default=0, help_text='Seconds in zone 7')),
+                ('workout_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zone_time_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'kind', 'period', 'period_start'],
+                'unique_together': {('user', 'kind', 'period', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutZoneTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('power', 'Power zones (cycling)'), ('pace', 'Pace/intensity zones (running & walking)')], max_length=10)),
+                ('completed_date', models.DateField(blank=True, help_text='Copied from the workout for date-range sums', null=True)),
+                ('zone_1', models.PositiveIntegerField(default=0, help_text='Seconds in zone 1')),
+                ('zone_2', models.PositiveIntegerField(default=0, help_text='Seconds in zone 2')),
+                ('zone_3', models.PositiveIntegerField(default=0, help_text='Seconds in zone 3')),
+                ('zone_4', models.PositiveIntegerField(default=0, help_text='Seconds in zone 4')),
+                ('zone_5', models.PositiveIntegerField(default=0, help_text='Seconds in zone 5')),
+                ('zone_6', models.PositiveIntegerField(default=0, help_text='Seconds in zone 6')),
+                ('zone_7', models.PositiveIntegerField(default=0, help_text='Seconds in zone 7')),
+                ('ftp_value', models.FloatField(blank=True, help_text='FTP used for power zones', null=True)),
+                ('pace_level', models.PositiveSmallIntegerField(blank=True, help_text='Pace level used for pace zones', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_zone_times', to=settings.AUTH_USER_MODEL)),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zone_times', to='workouts.workout')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'completed_date'], name='workouts_wo_user_id_34562d_idx')],
+                'unique_together': {('workout', 'kind')},
+            },
+        ),
+    ]
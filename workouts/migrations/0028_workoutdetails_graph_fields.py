@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-16 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0027_zone_time_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutdetails',
+            name='elevation',
+            field=models.FloatField(blank=True, help_text='Elevation gain in feet', null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutdetails',
+            name='target_metrics',
+            field=models.JSONField(blank=True, default=list, help_text='target_metrics_performance_data.target_metrics from the performance graph'),
+        ),
+        migrations.AddField(
+            model_name='workoutdetails',
+            name='performance_graph_fetched_at',
+            field=models.DateTimeField(blank=True, help_text='When the performance graph was stored (set even if it had no elevation or targets)', null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0028_workoutdetails_graph_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutSparkline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveSmallIntegerField(default=1, help_text='Builder version the chart was made with')),
+                ('chart', models.JSONField(blank=True, help_text='Card chart data rendered as inline SVG', null=True)),
+                ('avg_output', models.FloatField(blank=True, help_text='Mean output over the series (watts)', null=True)),
+                ('avg_speed', models.FloatField(blank=True, help_text='Mean speed over the series (mph)', null=True)),
+                ('last_timestamp', models.IntegerField(blank=True, help_text='Last sample time in seconds', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sparkline', to='workouts.workout')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0029_workoutsparkline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveSmallIntegerField(default=1, help_text='Computation version')),
+                ('kind', models.CharField(blank=True, choices=[('power', 'Power zone'), ('pace', 'Pace target'), ('', 'No zone targets')], max_length=10)),
+                ('tss', models.FloatField(blank=True, help_text='Training Stress Score (same at any FTP)', null=True)),
+                ('intensity_factor', models.FloatField(blank=True, help_text='Normalized intensity relative to FTP / threshold pace', null=True)),
+                ('difficulty', models.FloatField(blank=True, help_text='0-10 difficulty for pace target classes', null=True)),
+                ('dominant_zone', models.PositiveSmallIntegerField(blank=True, help_text='Zone (1-7) with the most main-set time', null=True)),
+                ('zone_1_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 1')),
+                ('zone_2_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 2')),
+                ('zone_3_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 3')),
+                ('zone_4_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 4')),
+                ('zone_5_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 5')),
+                ('zone_6_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 6')),
+                ('zone_7_pct', models.FloatField(default=0, help_text='Percent of the main set in zone 7')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ride', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='library_metrics', to='workouts.ridedetail')),
+            ],
+            options={
+                'verbose_name_plural': 'Ride Metrics',
+                'indexes': [models.Index(fields=['tss'], name='workouts_ri_tss_e8289f_idx'), models.Index(fields=['intensity_factor'], name='workouts_ri_intensi_287884_idx'), models.Index(fields=['kind', 'dominant_zone'], name='workouts_ri_kind_454c7f_idx')],
+            },
+        ),
+    ]
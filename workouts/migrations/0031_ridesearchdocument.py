@@ -0,0 +1,80 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'workouts_ridesearch_fts'
+DOCUMENT_TABLE = 'workouts_ridesearchdocument'
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"CREATE INDEX IF NOT EXISTS workouts_ridesearch_tsv_idx ON {DOCUMENT_TABLE} "
+    f"USING gin (to_tsvector('simple'::regconfig, document))",
+    f'CREATE INDEX IF NOT EXISTS workouts_ridesearch_trgm_idx ON {DOCUMENT_TABLE} '
+    f'USING gin (document gin_trgm_ops)',
+]
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS workouts_ridesearch_trgm_idx',
+    'DROP INDEX IF EXISTS workouts_ridesearch_tsv_idx',
+]
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, document, content='{DOCUMENT_TABLE}', content_rowid='ride_id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, title, document) VALUES (new.ride_id, new.title, new.document); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, document) VALUES ('delete', old.ride_id, old.title, old.document); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, document) VALUES ('delete', old.ride_id, old.title, old.document); "
+    f'INSERT INTO {FTS_TABLE}(rowid, title, document) VALUES (new.ride_id, new.title, new.document); END',
+]
+SQLITE_REVERSE = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def _run(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    statements = postgres if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+    for statement in statements:
+        try:
+            schema_editor.execute(statement)
+        except Exception:
+            # SQLite built without FTS5: search falls back to icontains
+            if vendor != 'sqlite':
+                raise
+            return
+
+
+def create_search_indexes(apps, schema_editor):
+    _run(schema_editor, POSTGRES_FORWARD, SQLITE_FORWARD)
+
+
+def drop_search_indexes(apps, schema_editor):
+    _run(schema_editor, POSTGRES_REVERSE, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0030_ridemetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideSearchDocument',
+            fields=[
+                ('ride', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='workouts.ridedetail')),
+                ('title', models.CharField(help_text='Normalized class title (ranked above the rest of the document)', max_length=500)),
+                ('document', models.TextField(help_text='Normalized title, instructor, class type and description')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0031_ridesearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PelotonPayloadBlob',
+            fields=[
+                ('digest', models.CharField(help_text='SHA-256 of the canonical JSON', max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField(help_text='zlib-compressed canonical JSON')),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PelotonPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(choices=[('workout', '/api/workout/{id}'), ('performance_graph', '/api/workout/{id}/performance_graph'), ('ride_details', '/api/ride/{id}/details'), ('playlist', '/api/ride/{id}/playlist')], max_length=30)),
+                ('object_id', models.CharField(help_text='Peloton workout or ride id', max_length=100)),
+                ('fetched_at', models.DateTimeField(help_text='Last time Peloton returned this body')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payloads', to='workouts.pelotonpayloadblob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['endpoint', 'object_id', '-fetched_at'], name='workouts_pe_endpoin_9dfc29_idx')],
+                'unique_together': {('endpoint', 'object_id', 'blob')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:50
+
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+def backfill_search_documents(apps, schema_editor):
+    # Every search backend filters through the documents; index the rides stored before 0031
+    from workouts.services.search import search_document_fields
+
+    RideDetail = apps.get_model("workouts", "RideDetail")
+    RideSearchDocument = apps.get_model("workouts", "RideSearchDocument")
+
+    rides = RideDetail.objects.filter(search_document__isnull=True).select_related("workout_type", "instructor").order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(rides.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        RideSearchDocument.objects.bulk_create(
+            [RideSearchDocument(ride=ride, **search_document_fields(ride)) for ride in batch],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workouts", "0032_pelotonpayload"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
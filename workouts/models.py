@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 import json
 try:
@@ -714,7 +716,7 @@ class Workout(models.Model):
         Priority order:
         1. WorkoutDetails.duration_seconds (from performance graph)
         2. ride_detail.duration_seconds (if > 0)
-        3. Max timestamp from performance_data (calculated)
+        3. Max timestamp from the stored time series (calculated)
         Returns 0 if no duration available.
         """
         # First check if we have stored duration from performance graph
@@ -730,7 +732,8 @@ class Workout(models.Model):
         
         # Otherwise, calculate from performance data (for manual workouts)
         try:
-            timestamps = self.performance_data.values_list('timestamp', flat=True)
+            from .services.time_series import get_series
+            timestamps = get_series(self).timestamps
             if timestamps:
                 max_timestamp = max(timestamps)
                 return int(max_timestamp / 60)
@@ -809,6 +812,13 @@ class WorkoutDetails(models.Model):
     # Calories
     total_calories = models.IntegerField(null=True, blank=True, help_text="Total calories burned")
     
+    # Elevation (treadmill / outdoor)
+    elevation = models.FloatField(null=True, blank=True, help_text="Elevation gain in feet")
+    
+    # Stored from the performance graph so the detail page never calls Peloton
+    target_metrics = models.JSONField(default=list, blank=True, help_text="target_metrics_performance_data.target_metrics from the performance graph")
+    performance_graph_fetched_at = models.DateTimeField(null=True, blank=True, help_text="When the performance graph was stored (set even if it had no elevation or targets)")
+    
     class Meta:
         verbose_name = "Workout Details"
         verbose_name_plural = "Workout Details"
@@ -868,6 +878,223 @@ class WorkoutPerformanceData(models.Model):
         return f"{self.workout.ride_detail.title} - {self.timestamp}s"
 
 
+class WorkoutTimeSeries(models.Model):
+    """
+    Packed per-workout time series (one row per workout instead of one per sample).
+
+    Each channel is a compressed little-endian typed array, see
+    workouts.services.time_series for the encoding. A channel is NULL when the
+    workout has no samples for it.
+    """
+    workout = models.OneToOneField(Workout, on_delete=models.CASCADE, related_name="time_series")
+
+    sample_count = models.PositiveIntegerField(default=0, help_text="Number of samples in every channel")
+    encoding = models.CharField(max_length=20, default="zlib-le-v1", help_text="Channel encoding version")
+
+    timestamps = models.BinaryField(help_text="Seconds from workout start (int32)")
+    output = models.BinaryField(null=True, blank=True, help_text="Output in watts (float64, NaN = missing)")
+    cadence = models.BinaryField(null=True, blank=True, help_text="Cadence in rpm (int32)")
+    resistance = models.BinaryField(null=True, blank=True, help_text="Resistance (float64, NaN = missing)")
+    speed = models.BinaryField(null=True, blank=True, help_text="Speed in mph (float64, NaN = missing)")
+    heart_rate = models.BinaryField(null=True, blank=True, help_text="Heart rate in bpm (int32)")
+    power_zone = models.BinaryField(null=True, blank=True, help_text="Power zone 1-7 (int8, 0 = missing)")
+    intensity_zone = models.BinaryField(null=True, blank=True, help_text="Intensity zone code 1-7 (int8, 0 = missing)")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Workout Time Series"
+
+    def __str__(self):
+        return f"{self.workout_id} - {self.sample_count} samples"
+
+
+class WorkoutPowerPeak(models.Model):
+    """
+    Mean-max power for one workout at one duration (a point on its power curve).
+
+    Computed whenever the workout's time series is stored, so PR and "best in
+    N days" queries are MAX aggregates over this table.
+    """
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name="power_peaks")
+    duration_seconds = models.PositiveIntegerField(help_text="Window length in seconds")
+    watts = models.FloatField(help_text="Best average output over the window")
+
+    class Meta:
+        ordering = ["workout", "duration_seconds"]
+        unique_together = ("workout", "duration_seconds")
+        indexes = [
+            models.Index(fields=["duration_seconds", "watts"]),
+        ]
+
+    def __str__(self):
+        return f"{self.workout_id} - {self.duration_seconds}s: {self.watts:.0f}W"
+
+
+ZONE_KIND_CHOICES = [
+    ("power", "Power zones (cycling)"),
+    ("pace", "Pace/intensity zones (running & walking)"),
+]
+
+
+class WorkoutZoneTime(models.Model):
+    """
+    Seconds spent in each zone for one workout.
+
+    Power zones use the FTP in effect on the workout date; pace zones use the
+    pace level in effect on that date (zone 1 = recovery ... zone 7 = max).
+    Computed when the time series is stored and dropped when FTP/pace entries
+    change (see workouts.services.zone_times).
+    """
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name="zone_times")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="workout_zone_times")
+    kind = models.CharField(max_length=10, choices=ZONE_KIND_CHOICES)
+    completed_date = models.DateField(null=True, blank=True, help_text="Copied from the workout for date-range sums")
+
+    zone_1 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 1")
+    zone_2 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 2")
+    zone_3 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 3")
+    zone_4 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 4")
+    zone_5 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 5")
+    zone_6 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 6")
+    zone_7 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 7")
+
+    ftp_value = models.FloatField(null=True, blank=True, help_text="FTP used for power zones")
+    pace_level = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Pace level used for pace zones")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("workout", "kind")
+        indexes = [
+            models.Index(fields=["user", "kind", "completed_date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.workout_id} - {self.kind} zones"
+
+
+class ZoneTimeRollup(models.Model):
+    """Per-user daily and monthly sums of WorkoutZoneTime."""
+    PERIOD_DAY = "day"
+    PERIOD_MONTH = "month"
+    PERIOD_CHOICES = [
+        (PERIOD_DAY, "Day"),
+        (PERIOD_MONTH, "Month"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="zone_time_rollups")
+    kind = models.CharField(max_length=10, choices=ZONE_KIND_CHOICES)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="Day, or first day of the month")
+
+    zone_1 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 1")
+    zone_2 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 2")
+    zone_3 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 3")
+    zone_4 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 4")
+    zone_5 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 5")
+    zone_6 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 6")
+    zone_7 = models.PositiveIntegerField(default=0, help_text="Seconds in zone 7")
+
+    workout_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["user", "kind", "period", "period_start"]
+        unique_together = ("user", "kind", "period", "period_start")
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} {self.period} {self.period_start}"
+
+
+class WorkoutSparkline(models.Model):
+    """
+    Mini chart for a workout history card (downsampled series, zone bands and
+    target line) plus the series averages the card falls back to.
+
+    Built on first view of the history page and dropped when the workout's
+    time series or the user's FTP/pace history changes (see
+    workouts.services.sparklines). `chart` is NULL when the workout has no
+    chartable series.
+    """
+    workout = models.OneToOneField(Workout, on_delete=models.CASCADE, related_name="sparkline")
+    version = models.PositiveSmallIntegerField(default=1, help_text="Builder version the chart was made with")
+    chart = models.JSONField(null=True, blank=True, help_text="Card chart data rendered as inline SVG")
+
+    avg_output = models.FloatField(null=True, blank=True, help_text="Mean output over the series (watts)")
+    avg_speed = models.FloatField(null=True, blank=True, help_text="Mean speed over the series (mph)")
+    last_timestamp = models.IntegerField(null=True, blank=True, help_text="Last sample time in seconds")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.workout_id} - sparkline v{self.version}"
+
+
+class RideMetrics(models.Model):
+    """
+    Class library metrics for one ride, computed from its target metrics.
+
+    Zone shares are of the main set (warm up and cool down excluded), zone 1 =
+    Zone 1 / Recovery ... zone 7 = Zone 7 / Max. Power-zone intensity is
+    relative to FTP, so intensity_factor and tss hold for any rider's FTP
+    (watts scale with it). Filled when ride details are stored (see
+    classes.services.library_metrics) so TSS/IF/zone filters and sorts run
+    in SQL over the whole catalog.
+    """
+    KIND_CHOICES = [
+        ("power", "Power zone"),
+        ("pace", "Pace target"),
+        ("", "No zone targets"),
+    ]
+
+    ride = models.OneToOneField(RideDetail, on_delete=models.CASCADE, related_name="library_metrics")
+    version = models.PositiveSmallIntegerField(default=1, help_text="Computation version")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, blank=True)
+
+    tss = models.FloatField(null=True, blank=True, help_text="Training Stress Score (same at any FTP)")
+    intensity_factor = models.FloatField(null=True, blank=True, help_text="Normalized intensity relative to FTP / threshold pace")
+    difficulty = models.FloatField(null=True, blank=True, help_text="0-10 difficulty for pace target classes")
+    dominant_zone = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Zone (1-7) with the most main-set time")
+
+    zone_1_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 1")
+    zone_2_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 2")
+    zone_3_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 3")
+    zone_4_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 4")
+    zone_5_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 5")
+    zone_6_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 6")
+    zone_7_pct = models.FloatField(default=0, help_text="Percent of the main set in zone 7")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Ride Metrics"
+        indexes = [
+            models.Index(fields=["tss"]),
+            models.Index(fields=["intensity_factor"]),
+            models.Index(fields=["kind", "dominant_zone"]),
+        ]
+
+    def __str__(self):
+        return f"{self.ride_id} - TSS {self.tss} IF {self.intensity_factor}"
+
+
+class RideSearchDocument(models.Model):
+    """
+    Normalized search text for one ride (lowercase, accents stripped).
+
+    `document` holds title, instructor, class type, discipline and
+    description. The full-text and trigram indexes on it are created by
+    migration for the running database (PostgreSQL GIN indexes, SQLite FTS5
+    table); see workouts.services.search.
+    """
+    ride = models.OneToOneField(RideDetail, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    title = models.CharField(max_length=500, help_text="Normalized class title (ranked above the rest of the document)")
+    document = models.TextField(help_text="Normalized title, instructor, class type and description")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.ride_id} - {self.title}"
+
+
 class PelotonConnection(models.Model):
     """Stores Peloton API connection information for users"""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="peloton_connection")
@@ -900,3 +1127,188 @@ class PelotonConnection(models.Model):
     def __str__(self):
         status = "Connected" if self.is_connected else "Disconnected"
         return f"{self.user.username} - {status}"
+
+
+class WorkoutSyncJob(models.Model):
+    """
+    Resumable background sync of a user's Peloton workout history.
+
+    The job walks the Peloton workout list one page at a time. Each page runs
+    through the list -> ride details -> performance -> persist stages and is
+    checkpointed here once persisted, so a killed worker resumes at `next_page`.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="workout_sync_jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+
+    # Sync scope (fixed when the job is created so a resumed job keeps the same cutoff)
+    is_full_sync = models.BooleanField(default=True)
+    cutoff_timestamp = models.FloatField(null=True, blank=True, help_text="UTC Unix timestamp; incremental syncs stop at workouts older than this")
+    peloton_user_id = models.CharField(max_length=100, blank=True)
+
+    # Checkpoint
+    next_page = models.IntegerField(default=0, help_text="Next Peloton workout list page to process")
+    pages_completed = models.IntegerField(default=0)
+    consecutive_older = models.IntegerField(default=0, help_text="Consecutive workouts seen that are older than the cutoff")
+    resume_count = models.IntegerField(default=0, help_text="How many times the job was resumed after stalling")
+
+    # Progress counters
+    workouts_processed = models.IntegerField(default=0)
+    workouts_synced = models.IntegerField(default=0)
+    workouts_updated = models.IntegerField(default=0)
+    workouts_skipped = models.IntegerField(default=0)
+
+    current_stage = models.CharField(max_length=30, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last time a pipeline stage touched this job")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "status"]),
+            models.Index(fields=["status", "heartbeat_at"]),
+        ]
+
+    def __str__(self):
+        return f"Sync job {self.pk} for {self.user} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in (self.STATUS_PENDING, self.STATUS_RUNNING)
+
+
+class PelotonPayloadBlob(models.Model):
+    """
+    One distinct Peloton API response body, stored once however often it is fetched.
+
+    Keyed by the SHA-256 of the canonical JSON (sorted keys, compact
+    separators); `data` is that JSON zlib-compressed. See
+    workouts.services.payload_archive.
+    """
+    digest = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the canonical JSON")
+    data = models.BinaryField(help_text="zlib-compressed canonical JSON")
+    size = models.PositiveIntegerField(help_text="Uncompressed size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes)"
+
+
+class PelotonPayload(models.Model):
+    """
+    Archived Peloton API response: which body an endpoint returned for an id, and when.
+
+    A new row is added when the response changes; fetching an unchanged
+    response only moves `fetched_at` forward. The re-parse engine rebuilds
+    stored rows from the latest response per (endpoint, object_id).
+    """
+    ENDPOINT_WORKOUT = "workout"
+    ENDPOINT_PERFORMANCE_GRAPH = "performance_graph"
+    ENDPOINT_RIDE_DETAILS = "ride_details"
+    ENDPOINT_PLAYLIST = "playlist"
+    ENDPOINT_CHOICES = [
+        (ENDPOINT_WORKOUT, "/api/workout/{id}"),
+        (ENDPOINT_PERFORMANCE_GRAPH, "/api/workout/{id}/performance_graph"),
+        (ENDPOINT_RIDE_DETAILS, "/api/ride/{id}/details"),
+        (ENDPOINT_PLAYLIST, "/api/ride/{id}/playlist"),
+    ]
+
+    endpoint = models.CharField(max_length=30, choices=ENDPOINT_CHOICES)
+    object_id = models.CharField(max_length=100, help_text="Peloton workout or ride id")
+    blob = models.ForeignKey(PelotonPayloadBlob, on_delete=models.PROTECT, related_name="payloads")
+    fetched_at = models.DateTimeField(help_text="Last time Peloton returned this body")
+
+    class Meta:
+        unique_together = ("endpoint", "object_id", "blob")
+        indexes = [
+            models.Index(fields=["endpoint", "object_id", "-fetched_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.object_id} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
+@receiver(post_save, sender="accounts.FTPEntry")
+@receiver(post_delete, sender="accounts.FTPEntry")
+def invalidate_power_zone_times(sender, instance, **kwargs):
+    """FTP history changed: power-zone vectors for this user must be recomputed"""
+    from .services.zone_times import KIND_POWER, invalidate_zone_times
+    invalidate_zone_times(instance.user_id, KIND_POWER)
+
+
+@receiver(post_save, sender="accounts.PaceEntry")
+@receiver(post_delete, sender="accounts.PaceEntry")
+def invalidate_pace_zone_times(sender, instance, **kwargs):
+    """Pace history changed: pace-zone vectors for this user must be recomputed"""
+    from .services.zone_times import KIND_PACE, invalidate_zone_times
+    invalidate_zone_times(instance.user_id, KIND_PACE)
+
+
+@receiver(post_save, sender="accounts.FTPEntry")
+@receiver(post_delete, sender="accounts.FTPEntry")
+@receiver(post_save, sender="accounts.PaceEntry")
+@receiver(post_delete, sender="accounts.PaceEntry")
+def invalidate_sparklines_for_targets(sender, instance, **kwargs):
+    """FTP / pace history changed: card zone bands and target lines must be redrawn"""
+    from .services.sparklines import invalidate_sparklines
+    invalidate_sparklines(user_id=instance.user_id)
+
+
+@receiver(post_save, sender="accounts.FTPEntry")
+@receiver(post_delete, sender="accounts.FTPEntry")
+@receiver(post_save, sender="accounts.PaceEntry")
+@receiver(post_delete, sender="accounts.PaceEntry")
+def invalidate_cached_target_stats(sender, instance, **kwargs):
+    """Cached metrics built from the user's FTP / pace levels are out of date"""
+    from core.services import TaggedCacheService
+    TaggedCacheService.invalidate_user(instance.user_id, targets=True)
+
+
+@receiver(post_save, sender=Workout)
+@receiver(post_delete, sender=Workout)
+def invalidate_cached_workout_stats(sender, instance, **kwargs):
+    """Cached dashboard / metrics / eddington data for the user is out of date"""
+    from core.services import TaggedCacheService
+    TaggedCacheService.invalidate_user(instance.user_id, workouts=True)
+
+
+@receiver(post_save, sender=RideDetail)
+def invalidate_cached_ride_metrics(sender, instance, **kwargs):
+    """Cached class library metrics for the ride are out of date"""
+    from core.services import TaggedCacheService
+    TaggedCacheService.invalidate_on_commit(TaggedCacheService.ride_tag(instance.pk))
+
+
+@receiver(post_save, sender=RideDetail)
+def refresh_ride_library_metrics(sender, instance, **kwargs):
+    """Recompute the class library index row for a saved ride"""
+    from classes.services.library_metrics import refresh_ride_metrics
+    refresh_ride_metrics([instance])
+
+
+@receiver(post_save, sender=RideDetail)
+def refresh_ride_search_document(sender, instance, **kwargs):
+    """Rebuild the search document of a saved ride"""
+    from .services.search import refresh_search_documents
+    refresh_search_documents([instance])
+
+
+@receiver(post_delete, sender=Workout)
+def refresh_zone_rollups_for_deleted_workout(sender, instance, **kwargs):
+    """Keep daily/monthly zone rollups in step when workouts are deleted"""
+    from .services.zone_times import queue_rollup_refresh
+    queue_rollup_refresh(instance.user_id, instance.completed_date)
@@ -0,0 +1,465 @@
+"""
+Batch persistence for synced Peloton workouts.
+
+`WorkoutBatchWriter.write_page()` stores a page of workouts (plus their ride
+details, instructors, workout types and performance graphs) in a fixed number
+of statements instead of several round trips per workout. Rows are upserted
+with `bulk_create(update_conflicts=True)` keyed on the Peloton IDs and end up
+identical to what per-row `update_or_create` calls would write.
+
+Workout types and instructors are cached on the writer, so keep one writer for
+the length of a sync job (see `WorkoutBatchWriter.for_job`).
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from challenges.utils import generate_peloton_url
+from core.services import TaggedCacheService
+from ..models import Instructor, RideDetail, Workout, WorkoutType
+from ..sync_helpers import _store_playlist_from_data, detect_class_type
+from .peloton_payloads import infer_workout_type_slug, parse_workout_times, ride_id_from_payload
+from .performance_ingest import store_performance_graphs
+from .search import refresh_search_documents
+
+logger = logging.getLogger(__name__)
+
+RIDE_DETAIL_UPDATE_FIELDS = [
+    'title', 'description', 'duration_seconds', 'workout_type', 'instructor',
+    'fitness_discipline', 'fitness_discipline_display_name',
+    'difficulty_rating_avg', 'difficulty_rating_count', 'difficulty_level',
+    'overall_estimate', 'difficulty_estimate', 'image_url', 'home_peloton_id',
+    'original_air_time', 'scheduled_start_time', 'created_at_timestamp',
+    'class_type_ids', 'equipment_ids', 'equipment_tags',
+    'content_format', 'content_provider', 'has_closed_captions',
+    'is_archived', 'is_power_zone_class', 'class_type', 'peloton_class_url',
+    'target_metrics_data', 'target_class_metrics', 'pace_target_type', 'segments_data',
+    'last_synced_at',
+]
+
+WORKOUT_UPDATE_FIELDS = [
+    'ride_detail', 'peloton_url', 'recorded_date', 'completed_date', 'completed_at',
+    'peloton_created_at', 'peloton_timezone', 'title_override', 'last_synced_at',
+]
+
+# job pk -> (job created_at, writer) for sync jobs handled by this process (cleared by `release_job`)
+_job_writers = {}
+
+
+@dataclass
+class PageWriteResult:
+    """Outcome of `WorkoutBatchWriter.write_page`."""
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    # Ride ids that got a placeholder RideDetail and still need their details fetched
+    placeholder_ride_ids: list = field(default_factory=list)
+
+
+def ride_detail_defaults(ride_id, ride_details):
+    """
+    RideDetail field values from a /api/ride/{id}/details payload.
+
+    `workout_type` and `instructor` are resolved by the caller.
+    """
+    ride_data = ride_details.get('ride') or {}
+
+    def _list_field(key):
+        value = ride_data.get(key, [])
+        return value if isinstance(value, list) else []
+
+    return {
+        'title': ride_data.get('title', ''),
+        'description': ride_data.get('description', ''),
+        'duration_seconds': ride_data.get('duration', 0),
+        'fitness_discipline': ride_data.get('fitness_discipline', ''),
+        'fitness_discipline_display_name': ride_data.get('fitness_discipline_display_name', ''),
+        'difficulty_rating_avg': ride_data.get('difficulty_rating_avg'),
+        'difficulty_rating_count': ride_data.get('difficulty_rating_count', 0),
+        'difficulty_level': ride_data.get('difficulty_level') or None,
+        'overall_estimate': ride_data.get('overall_estimate'),
+        'difficulty_estimate': ride_data.get('difficulty_estimate'),
+        'image_url': ride_data.get('image_url', ''),
+        'home_peloton_id': ride_data.get('home_peloton_id') or '',
+        'original_air_time': ride_data.get('original_air_time'),
+        'scheduled_start_time': ride_data.get('scheduled_start_time'),
+        'created_at_timestamp': ride_data.get('created_at'),
+        'class_type_ids': _list_field('class_type_ids'),
+        'equipment_ids': _list_field('equipment_ids'),
+        'equipment_tags': _list_field('equipment_tags'),
+        'content_format': ride_data.get('content_format', ''),
+        'content_provider': ride_data.get('content_provider', ''),
+        'has_closed_captions': ride_data.get('has_closed_captions', False),
+        'is_archived': ride_data.get('is_archived', False),
+        'is_power_zone_class': ride_data.get('is_power_zone_class', False),
+        'class_type': detect_class_type(ride_data, ride_details),
+        'peloton_class_url': generate_peloton_url(ride_id),
+        'target_metrics_data': ride_details.get('target_metrics_data', {}),
+        'target_class_metrics': ride_details.get('target_class_metrics', {}),
+        'pace_target_type': ride_details.get('pace_target_type'),
+        'segments_data': ride_details.get('segments', {}),
+    }
+
+
+class WorkoutBatchWriter:
+    """Writes pages of Peloton workouts for one user with bulk upserts."""
+
+    def __init__(self, user):
+        self.user = user
+        self._workout_types = {}
+        self._instructors = {}
+
+    @classmethod
+    def for_job(cls, job):
+        """Reuse one writer (and its caches) for every page of a sync job handled by this process."""
+        cached = _job_writers.get(job.pk)
+        if cached is None or cached[0] != job.created_at:
+            cached = _job_writers[job.pk] = (job.created_at, cls(job.user))
+        return cached[1]
+
+    @staticmethod
+    def release_job(job_id):
+        _job_writers.pop(job_id, None)
+
+    # -- lookups -------------------------------------------------------------------
+    def workout_types(self, slugs):
+        """Return slug -> WorkoutType, creating missing types in one statement."""
+        missing = {slug for slug in slugs if slug not in self._workout_types}
+        if missing:
+            found = {wt.slug: wt for wt in WorkoutType.objects.filter(slug__in=missing)}
+            to_create = missing - set(found)
+            if to_create:
+                WorkoutType.objects.bulk_create(
+                    [WorkoutType(slug=slug, name=slug.title()) for slug in to_create],
+                    ignore_conflicts=True,
+                )
+                found.update({wt.slug: wt for wt in WorkoutType.objects.filter(slug__in=to_create)})
+            self._workout_types.update(found)
+        return {slug: self._workout_types[slug] for slug in slugs if slug in self._workout_types}
+
+    def _load_instructors(self, peloton_ids):
+        missing = {pid for pid in peloton_ids if pid not in self._instructors}
+        if missing:
+            self._instructors.update({
+                instructor.peloton_id: instructor
+                for instructor in Instructor.objects.filter(peloton_id__in=missing)
+            })
+
+    def _create_instructors(self, new_instructors):
+        """Insert unsaved Instructor objects (ignoring races) and cache the stored rows."""
+        if not new_instructors:
+            return
+        Instructor.objects.bulk_create(new_instructors, ignore_conflicts=True)
+        ids = [instructor.peloton_id for instructor in new_instructors]
+        self._instructors.update({
+            instructor.peloton_id: instructor
+            for instructor in Instructor.objects.filter(peloton_id__in=ids)
+        })
+
+    def workout_instructors(self, workout_entries):
+        """
+        Instructors embedded in workout list entries, keyed by Peloton instructor id.
+
+        Creates missing instructors and refreshes changed image URLs.
+        """
+        payloads = {}
+        for workout_data in workout_entries:
+            instructor_data = workout_data.get('instructor') or {}
+            if instructor_data.get('id'):
+                payloads[instructor_data['id']] = instructor_data
+        if not payloads:
+            return {}
+
+        self._load_instructors(payloads)
+        self._create_instructors([
+            Instructor(
+                peloton_id=pid,
+                name=data.get('name', 'Unknown'),
+                image_url=data.get('image_url'),
+            )
+            for pid, data in payloads.items() if pid not in self._instructors
+        ])
+
+        changed = []
+        for pid, data in payloads.items():
+            instructor = self._instructors.get(pid)
+            if instructor and instructor.image_url != data.get('image_url'):
+                instructor.image_url = data.get('image_url', '')
+                changed.append(instructor)
+        if changed:
+            Instructor.objects.bulk_update(changed, ['image_url'])
+        return {pid: self._instructors[pid] for pid in payloads if pid in self._instructors}
+
+    def ride_instructors(self, ride_payloads):
+        """Instructors referenced by ride detail payloads, keyed by Peloton instructor id."""
+        ride_datas = [(details.get('ride') or {}) for details in ride_payloads]
+        instructor_ids = {rd.get('instructor_id') for rd in ride_datas if rd.get('instructor_id')}
+        if not instructor_ids:
+            return {}
+
+        self._load_instructors(instructor_ids)
+        new_instructors = {}
+        for ride_data in ride_datas:
+            pid = ride_data.get('instructor_id')
+            instructor_obj = ride_data.get('instructor') or {}
+            if pid and pid not in self._instructors and pid not in new_instructors and instructor_obj:
+                new_instructors[pid] = Instructor(
+                    peloton_id=pid,
+                    name=instructor_obj.get('name') or instructor_obj.get('full_name') or 'Unknown Instructor',
+                    image_url=instructor_obj.get('image_url') or '',
+                )
+        self._create_instructors(list(new_instructors.values()))
+        return {pid: self._instructors[pid] for pid in instructor_ids if pid in self._instructors}
+
+    # -- ride details --------------------------------------------------------------
+    def upsert_ride_details(self, items, store_playlists=True):
+        """
+        Upsert RideDetails from ride detail payloads.
+
+        Args:
+            items: dict ride_id -> (ride_details, workout_type, fallback_instructor)
+
+        Returns:
+            dict: ride_id -> RideDetail
+        """
+        items = {
+            ride_id: item for ride_id, item in items.items()
+            if (item[0] or {}).get('ride')
+        }
+        if not items:
+            return {}
+
+        instructors = self.ride_instructors([item[0] for item in items.values()])
+        rows = []
+        for ride_id, (ride_details, workout_type, fallback_instructor) in items.items():
+            ride_data = ride_details['ride']
+            rows.append(RideDetail(
+                peloton_ride_id=ride_id,
+                workout_type=workout_type,
+                instructor=instructors.get(ride_data.get('instructor_id')) or fallback_instructor,
+                **ride_detail_defaults(ride_id, ride_details),
+            ))
+
+        RideDetail.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['peloton_ride_id'],
+            update_fields=RIDE_DETAIL_UPDATE_FIELDS,
+        )
+        stored = RideDetail.objects.select_related('workout_type', 'instructor').in_bulk(
+            list(items), field_name='peloton_ride_id'
+        )
+        # bulk_create sends no post_save, so drop cached class metrics and
+        # refresh the class library and search indexes here
+        TaggedCacheService.invalidate_on_commit(*(TaggedCacheService.ride_tag(ride.pk) for ride in stored.values()))
+        from classes.services.library_metrics import refresh_ride_metrics
+        refresh_ride_metrics(stored.values())
+        refresh_search_documents(stored.values())
+
+        if store_playlists:
+            for ride_id, (ride_details, _, _) in items.items():
+                playlist_data = ride_details.get('playlist')
+                if playlist_data and ride_id in stored:
+                    _store_playlist_from_data(playlist_data, stored[ride_id], logger)
+        return stored
+
+    def store_fetched_ride_details(self, payloads):
+        """
+        Upsert rides from freshly fetched ride detail payloads (tasks and commands).
+
+        The workout type follows the payload's discipline; a ride whose payload
+        names no instructor keeps its stored one.
+
+        Args:
+            payloads: dict ride_id -> /api/ride/{id}/details payload
+
+        Returns:
+            tuple: (dict ride_id -> RideDetail, set of ride ids that were created)
+        """
+        payloads = {ride_id: details for ride_id, details in payloads.items() if (details or {}).get('ride')}
+        if not payloads:
+            return {}, set()
+        existing = RideDetail.objects.select_related('instructor').in_bulk(list(payloads), field_name='peloton_ride_id')
+        slugs = {
+            ride_id: (details['ride'].get('fitness_discipline') or 'other').lower()
+            for ride_id, details in payloads.items()
+        }
+        workout_types = self.workout_types(set(slugs.values()))
+        stored = self.upsert_ride_details({
+            ride_id: (details, workout_types[slugs[ride_id]], existing[ride_id].instructor if ride_id in existing else None)
+            for ride_id, details in payloads.items()
+        })
+        return stored, set(stored) - set(existing)
+
+    def ensure_ride_details(self, defaults_by_ride_id):
+        """
+        get_or_create for many RideDetails at once (existing rows are left untouched).
+
+        Args:
+            defaults_by_ride_id: dict ride_id -> field values for a new row
+
+        Returns:
+            tuple: (dict ride_id -> RideDetail, set of ride ids that were created)
+        """
+        if not defaults_by_ride_id:
+            return {}, set()
+        existing = RideDetail.objects.in_bulk(list(defaults_by_ride_id), field_name='peloton_ride_id')
+        missing = [ride_id for ride_id in defaults_by_ride_id if ride_id not in existing]
+        if missing:
+            RideDetail.objects.bulk_create(
+                [RideDetail(peloton_ride_id=ride_id, **defaults_by_ride_id[ride_id]) for ride_id in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(RideDetail.objects.in_bulk(missing, field_name='peloton_ride_id'))
+        return existing, set(missing)
+
+    # -- workouts ------------------------------------------------------------------
+    def write_page(self, entries, detailed_workouts=None, ride_details=None, performance_graphs=None):
+        """
+        Persist a page of workout list entries and everything fetched for them.
+
+        Args:
+            entries: workout list entries from /api/user/{id}/workouts
+            detailed_workouts: workout id -> /api/workout/{id} payload
+            ride_details: ride id -> /api/ride/{id}/details payload
+            performance_graphs: workout id -> performance graph payload
+
+        Returns:
+            PageWriteResult
+        """
+        detailed_workouts = detailed_workouts or {}
+        ride_details = ride_details or {}
+        performance_graphs = performance_graphs or {}
+        result = PageWriteResult()
+
+        # Last entry wins when Peloton repeats a workout on a page
+        entries = list({workout_data['id']: workout_data for workout_data in entries}.values())
+        parsed = []
+        for workout_data in entries:
+            workout_id = workout_data['id']
+            try:
+                slug = infer_workout_type_slug(workout_data)
+                parsed.append({
+                    'id': workout_id,
+                    'data': workout_data,
+                    'slug': slug,
+                    'times': parse_workout_times(workout_data),
+                    'ride_id': ride_id_from_payload(workout_data) or ride_id_from_payload(detailed_workouts.get(workout_id)),
+                })
+            except Exception as e:
+                result.skipped.append(workout_id)
+                logger.error(f"Could not parse workout {workout_id}: {e}", exc_info=True)
+        if not parsed:
+            return result
+
+        try:
+            with transaction.atomic():
+                self._write_parsed(parsed, detailed_workouts, ride_details, performance_graphs, result)
+                if result.created or result.updated:
+                    TaggedCacheService.invalidate_user(self.user.pk, workouts=True)
+        except Exception:
+            # Rows cached during the failed transaction were rolled back
+            self._workout_types.clear()
+            self._instructors.clear()
+            raise
+        return result
+
+    def _write_parsed(self, parsed, detailed_workouts, ride_details, performance_graphs, result):
+        """Write parsed entries; runs inside `write_page`'s transaction."""
+        workout_types = self.workout_types({p['slug'] for p in parsed} | {'other'})
+        instructors = self.workout_instructors(p['data'] for p in parsed)
+
+        # Ride details we have payloads for are upserted; the rest must exist or get a placeholder
+        fetched = {}
+        for p in parsed:
+            ride_id = p['ride_id']
+            if ride_id and ride_id in ride_details:
+                instructor_id = (p['data'].get('instructor') or {}).get('id')
+                fetched[ride_id] = (ride_details[ride_id], workout_types[p['slug']], instructors.get(instructor_id))
+        ride_by_id = self.upsert_ride_details(fetched)
+
+        ensure = {}
+        for p in parsed:
+            ride_id = p['ride_id']
+            if ride_id and ride_id not in ride_by_id:
+                ensure[ride_id] = {
+                    'title': f'Pending details for {ride_id}',
+                    'description': 'Placeholder created during sync; details will be filled by background task',
+                    'duration_seconds': 0,
+                    'workout_type': workout_types['other'],
+                }
+            elif not ride_id:
+                manual_id = f"manual_{p['slug']}_{p['id']}"
+                p['ride_id'] = manual_id
+                ensure[manual_id] = {
+                    'title': (p['data'].get('ride') or {}).get('title', 'Manual Workout'),
+                    'fitness_discipline': p['slug'],
+                    'workout_type': workout_types[p['slug']],
+                    'duration_seconds': 0,
+                }
+        ensured, created_ride_ids = self.ensure_ride_details(ensure)
+        ride_by_id.update(ensured)
+        result.placeholder_ride_ids = sorted(
+            ride_id for ride_id in created_ride_ids if not ride_id.startswith('manual_')
+        )
+
+        workouts = self.upsert_workouts(parsed, ride_by_id, result)
+
+        graphs = [
+            (workouts[workout_id], performance_graphs[workout_id], detailed_workouts.get(workout_id))
+            for workout_id in workouts if workout_id in performance_graphs
+        ]
+        if graphs:
+            store_performance_graphs(graphs)
+
+    def upsert_workouts(self, parsed, ride_by_id, result):
+        """Upsert the user's Workout rows for parsed entries; returns workout id -> Workout."""
+        existing = {
+            row['peloton_workout_id']: row
+            for row in Workout.objects.filter(peloton_workout_id__in=[p['id'] for p in parsed])
+            .values('peloton_workout_id', 'user_id', 'title_override')
+        }
+
+        rows = []
+        for p in parsed:
+            workout_id = p['id']
+            current = existing.get(workout_id)
+            if current and current['user_id'] != self.user.pk:
+                # update_or_create keyed on (id, user) would have hit the unique constraint
+                result.skipped.append(workout_id)
+                logger.warning(f"Workout {workout_id} belongs to another user; skipping")
+                continue
+
+            ride_detail = ride_by_id[p['ride_id']]
+            title_override = None
+            if str(ride_detail.peloton_ride_id).startswith('manual_'):
+                # Keep an existing per-workout title, otherwise use the manual ride's title
+                title_override = (current or {}).get('title_override') or ride_detail.title
+
+            times = p['times']
+            rows.append(Workout(
+                user=self.user,
+                peloton_workout_id=workout_id,
+                ride_detail=ride_detail,
+                peloton_url=f"https://members.onepeloton.com/profile/workouts/{workout_id}",
+                recorded_date=times['completed_date'],
+                completed_date=times['completed_date'],
+                completed_at=times['completed_at'],
+                peloton_created_at=times['peloton_created_at'],
+                peloton_timezone=times['peloton_timezone'],
+                title_override=title_override,
+            ))
+            (result.updated if current else result.created).append(workout_id)
+
+        if not rows:
+            return {}
+        Workout.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['peloton_workout_id'],
+            update_fields=WORKOUT_UPDATE_FIELDS,
+        )
+        return Workout.objects.filter(user=self.user).in_bulk(
+            [row.peloton_workout_id for row in rows], field_name='peloton_workout_id'
+        )
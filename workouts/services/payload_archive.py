@@ -0,0 +1,166 @@
+"""
+Archive of raw Peloton API responses.
+
+Every detailed workout, performance graph, ride details and playlist
+response the sync fetches is kept, so a parser change can be re-applied to
+stored rows without downloading anything again (see
+workouts.services.reparse and the `reparse_payloads` command).
+
+Responses are content-addressed: the body is serialized as canonical JSON,
+hashed with SHA-256 and stored zlib-compressed once in PelotonPayloadBlob.
+PelotonPayload rows point (endpoint, Peloton id) at a body with the last
+time Peloton returned it; a changed response adds a row, an unchanged one
+only moves `fetched_at`.
+"""
+import hashlib
+import json
+import logging
+import zlib
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import PelotonPayload, PelotonPayloadBlob
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = [endpoint for endpoint, _ in PelotonPayload.ENDPOINT_CHOICES]
+
+COMPRESSION_LEVEL = 6
+# Blobs read per query when streaming payloads back
+READ_CHUNK_SIZE = 200
+
+
+class ArchivedPayload(NamedTuple):
+    body: Any
+    fetched_at: Any
+
+
+def archive_enabled():
+    return getattr(settings, 'PELOTON_PAYLOAD_ARCHIVE', True)
+
+
+def canonical_json(payload):
+    """Bytes hashed and stored for a payload (sorted keys, no whitespace)."""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def decode_blob(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def archive_payloads(endpoint, payloads, fetched_at=None):
+    """
+    Archive responses of one endpoint.
+
+    Args:
+        endpoint: One of PelotonPayload.ENDPOINT_*
+        payloads: dict Peloton id -> response body (falsy bodies are skipped)
+        fetched_at: When they were fetched (default now)
+
+    Returns:
+        int: number of responses archived
+    """
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f"Unknown Peloton endpoint {endpoint!r}")
+    fetched_at = fetched_at or timezone.now()
+
+    encoded = {}
+    digests = {}
+    for object_id, payload in payloads.items():
+        if not payload:
+            continue
+        body = canonical_json(payload)
+        digest = hashlib.sha256(body).hexdigest()
+        encoded[digest] = body
+        digests[str(object_id)] = digest
+    if not digests:
+        return 0
+
+    stored = set(PelotonPayloadBlob.objects.filter(digest__in=list(encoded)).values_list('digest', flat=True))
+    PelotonPayloadBlob.objects.bulk_create(
+        [
+            PelotonPayloadBlob(digest=digest, data=zlib.compress(body, COMPRESSION_LEVEL), size=len(body))
+            for digest, body in encoded.items() if digest not in stored
+        ],
+        ignore_conflicts=True,
+    )
+    PelotonPayload.objects.bulk_create(
+        [
+            PelotonPayload(endpoint=endpoint, object_id=object_id, blob_id=digest, fetched_at=fetched_at)
+            for object_id, digest in digests.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['endpoint', 'object_id', 'blob'],
+        update_fields=['fetched_at'],
+    )
+    return len(digests)
+
+
+def archive_responses(detailed_workouts=None, performance_graphs=None, ride_details=None, playlists=None):
+    """
+    Archive what a sync stage fetched; never raises.
+
+    Args are dicts Peloton id -> response body, as carried in the sync
+    engine's page payload.
+    """
+    if not archive_enabled():
+        return 0
+    archived = 0
+    fetched_at = timezone.now()
+    for endpoint, payloads in (
+        (PelotonPayload.ENDPOINT_WORKOUT, detailed_workouts),
+        (PelotonPayload.ENDPOINT_PERFORMANCE_GRAPH, performance_graphs),
+        (PelotonPayload.ENDPOINT_RIDE_DETAILS, ride_details),
+        (PelotonPayload.ENDPOINT_PLAYLIST, playlists),
+    ):
+        if not payloads:
+            continue
+        try:
+            with transaction.atomic():
+                archived += archive_payloads(endpoint, payloads, fetched_at=fetched_at)
+        except Exception:
+            logger.exception(f"Could not archive {len(payloads)} {endpoint} response(s)")
+    return archived
+
+
+def latest_digests(endpoint, object_ids=None):
+    """
+    Digest of the latest response per Peloton id.
+
+    Returns:
+        dict: Peloton id -> (digest, fetched_at)
+    """
+    rows = PelotonPayload.objects.filter(endpoint=endpoint)
+    if object_ids is not None:
+        rows = rows.filter(object_id__in=[str(object_id) for object_id in object_ids])
+    latest = {}
+    for object_id, digest, fetched_at in rows.order_by('object_id', '-fetched_at', '-pk').values_list(
+        'object_id', 'blob_id', 'fetched_at'
+    ).iterator(chunk_size=2000):
+        if object_id not in latest:
+            latest[object_id] = (digest, fetched_at)
+    return latest
+
+
+def load_latest(endpoint, object_ids):
+    """
+    Latest archived response per Peloton id.
+
+    Returns:
+        dict: Peloton id -> ArchivedPayload (ids never archived are missing)
+    """
+    latest = latest_digests(endpoint, object_ids)
+    digests = sorted({digest for digest, _ in latest.values()})
+    bodies = {}
+    for start in range(0, len(digests), READ_CHUNK_SIZE):
+        chunk = digests[start:start + READ_CHUNK_SIZE]
+        for digest, data in PelotonPayloadBlob.objects.filter(digest__in=chunk).values_list('digest', 'data'):
+            bodies[digest] = decode_blob(data)
+    return {
+        object_id: ArchivedPayload(bodies[digest], fetched_at)
+        for object_id, (digest, fetched_at) in latest.items() if digest in bodies
+    }
+
@@ -0,0 +1,121 @@
+"""
+Parsing helpers for Peloton workout list / detail payloads.
+
+Shared by the sync engine and the bulk writer so both derive workout types,
+dates and ride ids the same way.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+UTC = dt_timezone.utc
+
+MANUAL_RIDE_ID_PLACEHOLDER = '00000000000000000000000000000000'
+
+WORKOUT_TYPE_SLUGS = {
+    'cycling', 'running', 'walking', 'yoga', 'strength',
+    'stretching', 'meditation', 'cardio', 'rowing',
+}
+
+# Title keywords used to infer a discipline when Peloton reports none
+TITLE_DISCIPLINE_KEYWORDS = [
+    (('cycle', 'bike'), 'cycling'),
+    (('yoga',), 'yoga'),
+    (('row',), 'rowing'),
+    (('run',), 'running'),
+    (('walk',), 'walking'),
+    (('strength',), 'strength'),
+    (('stretch',), 'stretching'),
+    (('meditat',), 'meditation'),
+    (('cardio',), 'cardio'),
+]
+
+
+# ------------------------------------------------------------------------------
+# Payload parsing
+# ------------------------------------------------------------------------------
+def infer_workout_type_slug(workout_data):
+    """
+    Resolve the workout type slug for a workout list entry.
+
+    Uses `fitness_discipline`, then the device type, then title keywords, and
+    maps anything unknown to 'other'.
+    """
+    slug = (workout_data.get('fitness_discipline') or '').lower()
+    if not slug or slug == 'other':
+        device_type = (workout_data.get('device_type_display_name') or '').lower()
+        inferred = None
+        if device_type:
+            if device_type == 'garmin connect':
+                inferred = 'other'  # Always treat as manual workout
+            elif 'bike' in device_type:
+                inferred = 'cycling'
+            elif 'tread' in device_type:
+                inferred = 'running'
+        if not inferred:
+            title = (workout_data.get('title') or '').lower()
+            for keywords, discipline in TITLE_DISCIPLINE_KEYWORDS:
+                if any(keyword in title for keyword in keywords):
+                    inferred = discipline
+                    break
+        slug = inferred or 'other'
+    return slug if slug in WORKOUT_TYPE_SLUGS else 'other'
+
+
+def parse_peloton_datetime(value):
+    """Convert a Peloton timestamp (Unix seconds/ms or ISO string) to an aware UTC datetime."""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            ts = value / 1000.0 if value >= 1e12 else value
+            return datetime.fromtimestamp(ts, tz=UTC)
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            return timezone.make_aware(dt, UTC)
+        return dt.astimezone(UTC)
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+
+
+def workout_sort_timestamp(workout_data):
+    """
+    UTC Unix timestamp used to compare a workout against the incremental cutoff.
+
+    Prefers `created_at` (when Peloton created the record) over `start_time`.
+    """
+    for key in ('created_at', 'start_time'):
+        value = workout_data.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+        dt = parse_peloton_datetime(value)
+        if dt:
+            return dt.timestamp()
+    return timezone.now().timestamp()
+
+
+def parse_workout_times(workout_data):
+    """
+    Dates stored on the Workout row.
+
+    `completed_at` is Peloton's `start_time` in UTC and `completed_date` is its
+    raw UTC date (falling back to now when Peloton sent no start time).
+    """
+    completed_at = parse_peloton_datetime(workout_data.get('start_time')) or timezone.now()
+    created_at = workout_data.get('created_at')
+    return {
+        'completed_at': completed_at,
+        'completed_date': completed_at.date(),
+        'peloton_created_at': parse_peloton_datetime(created_at),
+        'peloton_timezone': (workout_data.get('timezone') or workout_data.get('tz') or None) if created_at else None,
+    }
+
+
+def ride_id_from_payload(payload):
+    """Return the real ride id from a workout payload, or None for manual workouts."""
+    if not payload:
+        return None
+    ride_id = (payload.get('ride') or {}).get('id') or payload.get('ride_id')
+    if not ride_id or ride_id == MANUAL_RIDE_ID_PLACEHOLDER:
+        return None
+    return str(ride_id)
@@ -0,0 +1,295 @@
+"""Parse Peloton performance-graph payloads into WorkoutDetails and packed time series.
+
+Shared by the background sync engine and `fetch_performance_graph_task` so both
+paths store identical metrics for a workout.
+"""
+import logging
+
+from django.utils import timezone
+
+from core.services import TaggedCacheService
+from ..models import Workout, WorkoutDetails
+from .time_series import PerformanceSample, build_time_series, store_time_series
+
+logger = logging.getLogger(__name__)
+
+AVG_FIELD_MAP = {
+    'output': 'avg_output',
+    'cadence': 'avg_cadence',
+    'resistance': 'avg_resistance',
+    'speed': 'avg_speed',
+    'heart_rate': 'avg_heart_rate',
+}
+
+MAX_FIELD_MAP = {
+    'output': 'max_output',
+    'cadence': 'max_cadence',
+    'resistance': 'max_resistance',
+    'speed': 'max_speed',
+    'heart_rate': 'max_heart_rate',
+}
+
+# Top-level keys on /api/workout/{id} used as a fallback when the graph lacks them
+DETAILED_WORKOUT_METRIC_KEYS = [
+    'total_output', 'avg_output', 'max_output', 'distance', 'total_calories',
+    'avg_heart_rate', 'max_heart_rate', 'avg_cadence', 'max_cadence',
+    'avg_resistance', 'max_resistance', 'avg_speed', 'max_speed', 'tss', 'tss_target',
+]
+
+DETAIL_FLOAT_FIELDS = [
+    'tss', 'tss_target', 'total_output', 'avg_output', 'max_output',
+    'avg_speed', 'max_speed', 'distance', 'avg_resistance', 'max_resistance',
+    'elevation',
+]
+
+DETAIL_INT_FIELDS = ['avg_heart_rate', 'max_heart_rate', 'avg_cadence', 'max_cadence']
+
+DETAIL_UPDATE_FIELDS = DETAIL_FLOAT_FIELDS + DETAIL_INT_FIELDS + [
+    'duration_seconds', 'total_calories', 'target_metrics', 'performance_graph_fetched_at',
+]
+
+
+def extract_summary_metrics(performance_graph, detailed_workout=None):
+    """
+    Collect summary metrics from a performance graph payload.
+
+    Reads `summaries`, the avg/max values on each `metrics` entry and
+    `average_summaries`, then falls back to top-level keys on the detailed
+    workout payload for anything still missing.
+
+    Returns:
+        dict: metric slug / WorkoutDetails field name -> raw value
+    """
+    metrics_dict = {}
+
+    for summary in performance_graph.get('summaries', []) or []:
+        if isinstance(summary, dict):
+            slug = summary.get('slug')
+            value = summary.get('value')
+            if slug and value is not None:
+                metrics_dict[slug] = value
+
+    for metric in performance_graph.get('metrics', []) or []:
+        if isinstance(metric, dict):
+            slug = metric.get('slug')
+            if not slug:
+                continue
+            avg_value = metric.get('average_value')
+            max_value = metric.get('max_value')
+            if avg_value is not None:
+                metrics_dict[AVG_FIELD_MAP.get(slug, f'avg_{slug}')] = avg_value
+            if max_value is not None:
+                metrics_dict[MAX_FIELD_MAP.get(slug, f'max_{slug}')] = max_value
+
+    for summary in performance_graph.get('average_summaries', []) or []:
+        if isinstance(summary, dict):
+            slug = summary.get('slug')
+            value = summary.get('value')
+            if slug and value is not None:
+                field_name = AVG_FIELD_MAP.get(slug, f'avg_{slug}')
+                if field_name not in metrics_dict:  # Don't overwrite if already set
+                    metrics_dict[field_name] = value
+
+    if detailed_workout:
+        for key in DETAILED_WORKOUT_METRIC_KEYS:
+            if key in detailed_workout and key not in metrics_dict:
+                metrics_dict[key] = detailed_workout[key]
+
+    return metrics_dict
+
+
+def apply_summary_metrics(details, metrics_dict, duration_seconds=None):
+    """
+    Copy parsed summary metrics onto a WorkoutDetails instance (without saving).
+
+    Returns:
+        bool: True if any field was set
+    """
+    updated = False
+
+    if duration_seconds:
+        try:
+            details.duration_seconds = int(duration_seconds)
+            updated = True
+        except (ValueError, TypeError):
+            pass
+
+    for field_name in DETAIL_FLOAT_FIELDS:
+        if field_name in metrics_dict:
+            try:
+                setattr(details, field_name, float(metrics_dict[field_name]))
+                updated = True
+            except (ValueError, TypeError):
+                pass
+
+    for field_name in DETAIL_INT_FIELDS:
+        if field_name in metrics_dict:
+            try:
+                setattr(details, field_name, int(float(metrics_dict[field_name])))
+                updated = True
+            except (ValueError, TypeError):
+                pass
+
+    # Calories (from summaries, slug is 'calories')
+    if 'calories' in metrics_dict or 'total_calories' in metrics_dict:
+        try:
+            calories_value = metrics_dict.get('calories') or metrics_dict.get('total_calories')
+            details.total_calories = int(float(calories_value))
+            updated = True
+        except (ValueError, TypeError):
+            pass
+
+    return updated
+
+
+def extract_target_metrics(performance_graph):
+    """The class plan targets (`target_metrics_performance_data.target_metrics`), or []."""
+    target_metrics_perf = performance_graph.get('target_metrics_performance_data') or {}
+    if not isinstance(target_metrics_perf, dict):
+        return []
+    return target_metrics_perf.get('target_metrics') or []
+
+
+def extract_metric_series(metrics_array):
+    """
+    Map metric slug -> list of per-sample values.
+
+    Running classes report speed as an alternative of the `pace` metric, so it
+    is picked up from there when no top-level `speed` series exists.
+    """
+    metric_values_by_slug = {}
+    for metric in metrics_array or []:
+        if not isinstance(metric, dict):
+            continue
+        slug = metric.get('slug')
+        values = metric.get('values', [])
+        if slug and values:
+            metric_values_by_slug[slug] = values
+
+        if slug == 'pace':
+            for alt in metric.get('alternatives', []) or []:
+                alt_values = alt.get('values', [])
+                if alt.get('slug') == 'speed' and alt_values and 'speed' not in metric_values_by_slug:
+                    metric_values_by_slug['speed'] = alt_values
+    return metric_values_by_slug
+
+
+def _value_at(series, idx, cast=None):
+    if idx >= len(series):
+        return None
+    value = series[idx]
+    if value is None or cast is None:
+        return value
+    return cast(value)
+
+
+def build_performance_samples(seconds_array, metric_values_by_slug):
+    """Build PerformanceSample tuples, one per timestamp."""
+    output = metric_values_by_slug.get('output', [])
+    cadence = metric_values_by_slug.get('cadence', [])
+    resistance = metric_values_by_slug.get('resistance', [])
+    speed = metric_values_by_slug.get('speed', [])
+    heart_rate = metric_values_by_slug.get('heart_rate', [])
+
+    rows = []
+    for idx, timestamp in enumerate(seconds_array):
+        if not isinstance(timestamp, (int, float)):
+            continue
+        rows.append(PerformanceSample(
+            timestamp=int(timestamp),
+            output=_value_at(output, idx),
+            cadence=_value_at(cadence, idx, int),
+            resistance=_value_at(resistance, idx),
+            speed=_value_at(speed, idx),
+            heart_rate=_value_at(heart_rate, idx, int),
+        ))
+    return rows
+
+
+def store_performance_graph(workout, performance_graph, detailed_workout=None):
+    """
+    Persist a performance graph payload for a workout.
+
+    Updates (or creates) the workout's WorkoutDetails, including elevation
+    and class targets, and replaces its packed WorkoutTimeSeries.
+
+    Returns:
+        dict: {'metrics': int, 'samples': int}
+    """
+    results = store_performance_graphs([(workout, performance_graph, detailed_workout)])
+    return results.get(workout.pk, {'metrics': 0, 'samples': 0})
+
+
+def store_performance_graphs(items):
+    """
+    Batch version of `store_performance_graph` for a page of workouts.
+
+    Writes every WorkoutDetails row with one upsert and every packed time
+    series with another. Every workout gets a WorkoutDetails row stamped with
+    `performance_graph_fetched_at`, so a graph without elevation or targets
+    (or an empty payload) is recorded as such instead of being fetched again
+    by the detail page. An empty payload keeps the stored targets and series.
+
+    The rows are bulk-written (no post_save), so the tagged caches of every
+    affected user are invalidated here once the transaction commits, and the
+    workouts' `last_synced_at` is moved forward so stored Eddington histories
+    fold in changed distances on their next read.
+
+    Args:
+        items: iterable of (workout, performance_graph, detailed_workout) tuples
+
+    Returns:
+        dict: workout pk -> {'metrics': int, 'samples': int}
+    """
+    items = [(workout, performance_graph or {}, detailed_workout) for workout, performance_graph, detailed_workout in items]
+    workout_ids = [workout.pk for workout, _, _ in items]
+    existing_details = {
+        details.workout_id: details
+        for details in WorkoutDetails.objects.filter(workout_id__in=workout_ids)
+    }
+
+    results = {}
+    details_rows = []
+    series_rows = []
+    sample_total = 0
+    fetched_at = timezone.now()
+    for workout, performance_graph, detailed_workout in items:
+        duration_seconds = performance_graph.get('duration')
+        metrics_dict = extract_summary_metrics(performance_graph, detailed_workout)
+
+        details = existing_details.get(workout.pk)
+        if details is None:
+            details = WorkoutDetails(workout=workout)
+        else:
+            details.pk = None  # written through the upsert below
+        apply_summary_metrics(details, metrics_dict, duration_seconds)
+        if performance_graph:
+            details.target_metrics = extract_target_metrics(performance_graph)
+        details.performance_graph_fetched_at = fetched_at
+        details_rows.append(details)
+
+        samples = 0
+        seconds_array = performance_graph.get('seconds_since_pedaling_start', [])
+        metrics_array = performance_graph.get('metrics', [])
+        if seconds_array and metrics_array:
+            rows = build_performance_samples(seconds_array, extract_metric_series(metrics_array))
+            series_rows.append(build_time_series(workout, rows))
+            samples = len(rows)
+            sample_total += samples
+
+        results[workout.pk] = {'metrics': len(metrics_dict), 'samples': samples}
+
+    if details_rows:
+        WorkoutDetails.objects.bulk_create(
+            details_rows,
+            update_conflicts=True,
+            unique_fields=['workout'],
+            update_fields=DETAIL_UPDATE_FIELDS,
+        )
+    store_time_series(series_rows)
+    Workout.objects.filter(pk__in=workout_ids).update(last_synced_at=fetched_at)
+    for user_id in {workout.user_id for workout, _, _ in items}:
+        TaggedCacheService.invalidate_user(user_id, workouts=True)
+
+    logger.debug(f"Stored performance graphs for {len(results)} workouts ({sample_total} samples)")
+    return results
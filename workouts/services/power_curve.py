@@ -0,0 +1,130 @@
+"""Mean-max power curves stored per workout.
+
+Curves are computed once, when a workout's time series is stored, and kept in
+WorkoutPowerPeak (one row per workout and duration). Personal records and
+"best in N days" figures are then plain MAX aggregates over that table.
+"""
+import logging
+from itertools import accumulate
+from operator import sub
+from statistics import median
+
+try:  # NumPy is optional; the prefix-sum fallback runs in C via map()
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from django.db.models import Max
+
+from ..models import WorkoutPowerPeak
+
+logger = logging.getLogger(__name__)
+
+# 5s .. 60min
+POWER_CURVE_DURATIONS = [
+    5, 10, 15, 20, 30, 45,
+    60, 120, 180, 300, 480, 600,
+    900, 1200, 1800, 2700, 3600,
+]
+
+DEFAULT_SAMPLE_INTERVAL = 5
+
+
+def sample_interval(timestamps):
+    """Typical spacing (seconds) between samples, defaulting to Peloton's 5s."""
+    gaps = [b - a for a, b in zip(timestamps, timestamps[1:]) if b > a]
+    if not gaps:
+        return DEFAULT_SAMPLE_INTERVAL
+    return max(1, int(round(median(gaps))))
+
+
+def mean_max_curve(timestamps, outputs, durations=None):
+    """
+    Best average output for each window length.
+
+    Uses a cumulative sum so every window average is one subtraction; missing
+    samples count as 0 W. Durations shorter than the sample interval or longer
+    than the workout are omitted.
+
+    Args:
+        timestamps: sample times in seconds, ascending
+        outputs: watts per sample (None allowed)
+        durations: window lengths in seconds (default POWER_CURVE_DURATIONS)
+
+    Returns:
+        dict: duration_seconds -> watts
+    """
+    durations = durations or POWER_CURVE_DURATIONS
+    values = [float(v) if v is not None else 0.0 for v in outputs]
+    if not values or not any(values):
+        return {}
+
+    interval = sample_interval(list(timestamps))
+    curve = {}
+    if np is not None:
+        prefix = np.concatenate(([0.0], np.cumsum(np.asarray(values, dtype=np.float64))))
+        for duration in durations:
+            window = duration // interval
+            if window < 1 or window > len(values):
+                continue
+            curve[duration] = float((prefix[window:] - prefix[:-window]).max()) / window
+        return curve
+
+    prefix = [0.0, *accumulate(values)]
+    for duration in durations:
+        window = duration // interval
+        if window < 1 or window > len(values):
+            continue
+        curve[duration] = max(map(sub, prefix[window:], prefix[:-window])) / window
+    return curve
+
+
+def store_power_curves(series_by_workout):
+    """
+    Replace the stored power curves for the given workouts.
+
+    Args:
+        series_by_workout: dict workout id -> PerformanceSeries
+
+    Returns:
+        int: number of WorkoutPowerPeak rows written
+    """
+    if not series_by_workout:
+        return 0
+    rows = []
+    for workout_id, series in series_by_workout.items():
+        curve = mean_max_curve(series.timestamps, series.column('output'))
+        rows.extend(
+            WorkoutPowerPeak(workout_id=workout_id, duration_seconds=duration, watts=round(watts, 1))
+            for duration, watts in curve.items()
+        )
+    WorkoutPowerPeak.objects.filter(workout_id__in=list(series_by_workout)).delete()
+    WorkoutPowerPeak.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def best_power(workouts, durations=None):
+    """
+    Best mean-max power per duration across a set of workouts (one query).
+
+    Args:
+        workouts: Workout queryset to aggregate over
+        durations: optional list of durations to restrict to
+
+    Returns:
+        dict: duration_seconds -> watts (durations without data are omitted)
+    """
+    peaks = WorkoutPowerPeak.objects.filter(workout__in=workouts)
+    if durations:
+        peaks = peaks.filter(duration_seconds__in=durations)
+    return {
+        row['duration_seconds']: row['best']
+        for row in peaks.values('duration_seconds').annotate(best=Max('watts')).order_by()
+    }
+
+
+def backfill_power_curves(workout_ids):
+    """Compute and store curves for workouts from their stored time series."""
+    from .time_series import load_series_map
+
+    return store_power_curves(load_series_map(workout_ids))
@@ -0,0 +1,199 @@
+"""
+Rebuild stored rows from archived Peloton responses (see payload_archive).
+
+After a parser change, `run_reparse` re-applies the current parsing code to
+the latest archived response of every workout / ride instead of fetching
+them again:
+
+    performance  WorkoutDetails and the packed time series (with power
+                 curves and zone times) from performance graphs
+    rides        RideDetail fields (segments_data, class targets, class
+                 type, ...) from ride details
+    playlists    Playlists from ride details (or a newer playlist response)
+
+Work is split into chunks of Peloton ids and spread over worker processes;
+each chunk loads its payloads and writes with the same bulk paths the sync
+uses.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.db import connections, transaction
+
+from ..models import PelotonPayload, RideDetail, Workout
+from ..sync_helpers import _store_playlist_from_data
+from .bulk_writer import WorkoutBatchWriter
+from .payload_archive import load_latest
+from .performance_ingest import store_performance_graphs
+
+logger = logging.getLogger(__name__)
+
+TARGET_PERFORMANCE = 'performance'
+TARGET_RIDES = 'rides'
+TARGET_PLAYLISTS = 'playlists'
+TARGETS = (TARGET_PERFORMANCE, TARGET_RIDES, TARGET_PLAYLISTS)
+
+# Archive endpoint each target is driven by
+TARGET_ENDPOINTS = {
+    TARGET_PERFORMANCE: PelotonPayload.ENDPOINT_PERFORMANCE_GRAPH,
+    TARGET_RIDES: PelotonPayload.ENDPOINT_RIDE_DETAILS,
+    TARGET_PLAYLISTS: PelotonPayload.ENDPOINT_RIDE_DETAILS,
+}
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+@dataclass
+class ReparseResult:
+    """Counts for one target (or one chunk of it)."""
+    parsed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add(self, other):
+        self.parsed += other.parsed
+        self.skipped += other.skipped
+        self.failed += other.failed
+        self.errors += other.errors
+
+
+# ------------------------------------------------------------------------------
+# Per-target re-parsing of one chunk
+# ------------------------------------------------------------------------------
+def reparse_performance(workout_ids):
+    """WorkoutDetails and time series of workouts (Peloton ids) from their archived graphs."""
+    graphs = load_latest(PelotonPayload.ENDPOINT_PERFORMANCE_GRAPH, workout_ids)
+    detailed = load_latest(PelotonPayload.ENDPOINT_WORKOUT, list(graphs))
+    workouts = Workout.objects.in_bulk(list(graphs), field_name='peloton_workout_id')
+    items = [
+        (workouts[workout_id], archived.body, detailed[workout_id].body if workout_id in detailed else None)
+        for workout_id, archived in graphs.items() if workout_id in workouts
+    ]
+    with transaction.atomic():
+        store_performance_graphs(items)
+    return ReparseResult(parsed=len(items), skipped=len(workout_ids) - len(items))
+
+
+def reparse_rides(ride_ids):
+    """RideDetail fields of rides (Peloton ids) from their archived ride details."""
+    payloads = load_latest(PelotonPayload.ENDPOINT_RIDE_DETAILS, ride_ids)
+    rides = RideDetail.objects.select_related('workout_type', 'instructor').in_bulk(
+        list(payloads), field_name='peloton_ride_id'
+    )
+    # Workout type and instructor stay as stored unless the payload names an instructor
+    items = {
+        ride_id: (archived.body, rides[ride_id].workout_type, rides[ride_id].instructor)
+        for ride_id, archived in payloads.items()
+        if ride_id in rides and archived.body.get('ride')
+    }
+    with transaction.atomic():
+        stored = WorkoutBatchWriter(user=None).upsert_ride_details(items, store_playlists=False)
+    return ReparseResult(parsed=len(stored), skipped=len(ride_ids) - len(stored))
+
+
+def reparse_playlists(ride_ids):
+    """Playlists of rides (Peloton ids) from the newest archived ride details or playlist response."""
+    details = load_latest(PelotonPayload.ENDPOINT_RIDE_DETAILS, ride_ids)
+    playlists = load_latest(PelotonPayload.ENDPOINT_PLAYLIST, ride_ids)
+    rides = RideDetail.objects.in_bulk(list(set(details) | set(playlists)), field_name='peloton_ride_id')
+
+    result = ReparseResult()
+    for ride_id in ride_ids:
+        candidates = []
+        if ride_id in details and details[ride_id].body.get('playlist'):
+            candidates.append((details[ride_id].fetched_at, details[ride_id].body['playlist']))
+        if ride_id in playlists:
+            candidates.append((playlists[ride_id].fetched_at, playlists[ride_id].body))
+        if ride_id not in rides or not candidates:
+            result.skipped += 1
+            continue
+        playlist_data = max(candidates, key=lambda candidate: candidate[0])[1]
+        if _store_playlist_from_data(playlist_data, rides[ride_id], logger):
+            result.parsed += 1
+        else:
+            result.failed += 1
+    return result
+
+
+REPARSERS = {
+    TARGET_PERFORMANCE: reparse_performance,
+    TARGET_RIDES: reparse_rides,
+    TARGET_PLAYLISTS: reparse_playlists,
+}
+
+
+def reparse_chunk(target, object_ids):
+    """Re-parse one chunk; errors are counted instead of raised (runs in worker processes)."""
+    try:
+        return REPARSERS[target](object_ids)
+    except Exception as e:
+        logger.exception(f"Re-parse of {len(object_ids)} {target} payload(s) failed")
+        return ReparseResult(failed=len(object_ids), errors=[f"{target}: {e}"])
+
+
+# ------------------------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------------------------
+def reparse_ids(target, user=None):
+    """
+    Peloton ids a target would re-parse: every archived id, or only those of
+    the user's workouts (and their classes).
+    """
+    payloads = PelotonPayload.objects.filter(endpoint=TARGET_ENDPOINTS[target])
+    if user is not None:
+        workouts = Workout.objects.filter(user=user)
+        if target == TARGET_PERFORMANCE:
+            payloads = payloads.filter(object_id__in=workouts.values('peloton_workout_id'))
+        else:
+            payloads = payloads.filter(object_id__in=workouts.values('ride_detail__peloton_ride_id'))
+    return list(payloads.order_by('object_id').values_list('object_id', flat=True).distinct())
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    # Forked workers must not reuse the parent's database connections
+    connections.close_all()
+
+
+def run_reparse(targets=TARGETS, user=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """
+    Re-parse archived payloads for the given targets.
+
+    Args:
+        targets: Subset of TARGETS
+        user: Only this user's workouts and classes (default: everything archived)
+        workers: Worker processes (1 = in this process)
+        chunk_size: Peloton ids per chunk
+        on_chunk: Optional callback(target, ReparseResult) after each chunk
+
+    Returns:
+        dict: target -> ReparseResult
+    """
+    chunk_size = max(1, chunk_size)
+    chunks = []
+    for target in targets:
+        ids = reparse_ids(target, user)
+        chunks += [(target, ids[start:start + chunk_size]) for start in range(0, len(ids), chunk_size)]
+
+    totals = {target: ReparseResult() for target in targets}
+
+    def collect(target, result):
+        totals[target].add(result)
+        if on_chunk is not None:
+            on_chunk(target, result)
+
+    if workers <= 1 or len(chunks) <= 1:
+        for target, ids in chunks:
+            collect(target, reparse_chunk(target, ids))
+        return totals
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(reparse_chunk, target, ids): target for target, ids in chunks}
+        for future in as_completed(futures):
+            collect(futures[future], future.result())
+    return totals
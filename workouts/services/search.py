@@ -0,0 +1,211 @@
+"""Indexed search over the class catalog.
+
+Every ride has a RideSearchDocument holding normalized (lowercase, accents
+stripped) title / instructor / class type / description text. Migration 0031
+indexes it for the running database:
+
+* PostgreSQL: GIN index on `to_tsvector('simple', document)` for word-prefix
+  matches and a pg_trgm GIN index on `document` for substring matches; rank
+  is ts_rank plus trigram word similarity with the title.
+* SQLite (dev): external-content FTS5 table kept in step by triggers; rank is
+  bm25 with the title weighted above the rest of the document.
+
+Other databases (or a SQLite build without FTS5) fall back to substring
+matches of every query word in the document; rank is 1 when the title
+contains the whole query.
+
+`search_rides` works on RideDetail querysets and on querysets of models
+pointing at a ride (e.g. `search_rides(workouts, q, ride_path='ride_detail')`).
+"""
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.db import connections
+from django.db.models import BooleanField, Case, F, FloatField, Func, Q, TextField, Value, When
+from django.db.models.expressions import RawSQL
+
+from ..models import RideSearchDocument
+
+logger = logging.getLogger(__name__)
+
+SQLITE_FTS_TABLE = 'workouts_ridesearch_fts'
+
+MAX_QUERY_TOKENS = 8
+MAX_TOKEN_LENGTH = 32
+# Substring (trigram) matching only helps once a query has a trigram in it
+MIN_SUBSTRING_LENGTH = 3
+
+
+def normalize_search_text(value):
+    """Lowercase, accent-free, single-spaced text used for documents and queries."""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', value).strip().lower()
+
+
+def query_tokens(query):
+    """Word tokens of a normalized query (limited in number and length)."""
+    tokens = re.findall(r'\w+', normalize_search_text(query))
+    return [token[:MAX_TOKEN_LENGTH] for token in tokens[:MAX_QUERY_TOKENS]]
+
+
+def search_document_fields(ride):
+    """Normalized `title` and `document` of a ride (also used by the backfill migration)."""
+    instructor = ride.instructor.name if ride.instructor_id and ride.instructor else ''
+    workout_type = ride.workout_type.name if ride.workout_type_id and ride.workout_type else ''
+    parts = [
+        ride.title,
+        instructor,
+        ride.get_class_type_display() if ride.class_type else '',
+        ride.fitness_discipline_display_name or ride.fitness_discipline,
+        workout_type,
+        ride.description,
+    ]
+    return {
+        'title': normalize_search_text(ride.title)[:500],
+        'document': normalize_search_text(' '.join(part for part in parts if part)),
+    }
+
+
+def build_search_document(ride):
+    """Unsaved RideSearchDocument for a ride (select-related workout_type / instructor)."""
+    return RideSearchDocument(ride=ride, **search_document_fields(ride))
+
+
+def refresh_search_documents(rides):
+    """
+    Rebuild and upsert the search documents of the given rides.
+
+    Called when ride details are stored (sync upserts and RideDetail saves);
+    see also the rebuild_search_index command.
+
+    Returns:
+        int: rows written
+    """
+    rows = []
+    for ride in rides:
+        try:
+            rows.append(build_search_document(ride))
+        except Exception as e:
+            logger.warning(f"Could not build search document for ride {ride.pk}: {e}")
+    if rows:
+        RideSearchDocument.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['ride'],
+            update_fields=['title', 'document', 'updated_at'],
+        )
+    return len(rows)
+
+
+@lru_cache(maxsize=None)
+def _sqlite_fts_available(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def search_backend(alias='default'):
+    """'postgresql', 'sqlite_fts' or 'fallback' for the given database."""
+    vendor = connections[alias].vendor
+    if vendor == 'postgresql':
+        return 'postgresql'
+    if vendor == 'sqlite' and _sqlite_fts_available(alias):
+        return 'sqlite_fts'
+    return 'fallback'
+
+
+def _ts_vector(document_field):
+    # Must match the indexed expression exactly for the GIN index to be used
+    return Func(F(document_field), template="to_tsvector('simple'::regconfig, %(expressions)s)", output_field=TextField())
+
+
+def _ts_query(tokens):
+    # Tokens are \w-only, so they cannot inject tsquery operators
+    tsquery = ' & '.join(f'{token}:*' for token in tokens)
+    return Func(Value(tsquery), template="to_tsquery('simple'::regconfig, %(expressions)s)", output_field=TextField())
+
+
+def _postgres_search(queryset, tokens, normalized, prefix, with_rank):
+    document_field = f'{prefix}search_document__document'
+    title_field = f'{prefix}search_document__title'
+    match = Func(
+        _ts_vector(document_field), _ts_query(tokens),
+        arg_joiner=' @@ ', template='(%(expressions)s)', output_field=BooleanField(),
+    )
+    condition = Q(match)
+    if len(normalized) >= MIN_SUBSTRING_LENGTH:
+        condition |= Q(**{f'{document_field}__contains': normalized})
+    queryset = queryset.filter(condition)
+    if not with_rank:
+        return queryset
+    rank = (
+        Func(_ts_vector(document_field), _ts_query(tokens), function='ts_rank', output_field=FloatField())
+        + Func(Value(normalized), F(title_field), function='word_similarity', output_field=FloatField())
+    )
+    return queryset.annotate(search_rank=rank)
+
+
+def _sqlite_search(queryset, tokens, prefix, with_rank):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    matching_ids = RawSQL(f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s', [match])
+    queryset = queryset.filter(**{f'{prefix}pk__in': matching_ids})
+    if not with_rank:
+        return queryset
+    if prefix:
+        ride_field = queryset.model._meta.get_field(prefix.rstrip('_'))
+        ride_column = f'"{queryset.model._meta.db_table}"."{ride_field.column}"'
+    else:
+        ride_column = f'"{queryset.model._meta.db_table}"."id"'
+    # bm25 is lower-is-better; title column weighted 10x the full document
+    rank = RawSQL(
+        f'(SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0) FROM {SQLITE_FTS_TABLE} '
+        f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = {ride_column})',
+        [match],
+        output_field=FloatField(),
+    )
+    return queryset.annotate(search_rank=rank)
+
+
+def search_rides(queryset, query, ride_path='', with_rank=True):
+    """
+    Filter a queryset to rides matching `query` and annotate `search_rank` (higher is better).
+
+    Args:
+        queryset: RideDetail queryset, or a queryset of a model with a ride FK
+        query: Raw search text
+        ride_path: Name of the queryset model's RideDetail FK ('' for RideDetail itself)
+        with_rank: Annotate `search_rank` (skip when results keep their own ordering)
+
+    Returns:
+        The filtered, annotated queryset (unchanged when the query has no words)
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return queryset
+    prefix = f'{ride_path}__' if ride_path else ''
+    backend = search_backend(queryset.db)
+    if backend == 'postgresql':
+        return _postgres_search(queryset, tokens, normalize_search_text(query), prefix, with_rank)
+    if backend == 'sqlite_fts':
+        return _sqlite_search(queryset, tokens, prefix, with_rank)
+    return _fallback_search(queryset, tokens, normalize_search_text(query), prefix, with_rank)
+
+
+def _fallback_search(queryset, tokens, normalized, prefix, with_rank):
+    document_field = f'{prefix}search_document__document'
+    condition = Q()
+    for token in tokens:
+        condition &= Q(**{f'{document_field}__contains': token})
+    queryset = queryset.filter(condition)
+    if not with_rank:
+        return queryset
+    rank = Case(
+        When(**{f'{prefix}search_document__title__contains': normalized}, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return queryset.annotate(search_rank=rank)
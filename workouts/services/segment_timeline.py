@@ -0,0 +1,301 @@
+"""Class segments compiled into sorted boundary arrays.
+
+Target lines used to be built by scanning the whole segment list for every
+sample (O(samples x segments) per chart). A SegmentTimeline is compiled once
+from a class's segments: `bounds` is the sorted list of times where the
+target changes and `codes[i]` the payload index in effect just before
+`bounds[i]` (-1 = no target), so the target of any sample is one bisect.
+
+The pure-Python bisect path is the supported one: NumPy is not a project
+requirement, and the bisect lookups match the per-sample scans they replaced
+(see `target_segments_at_times` and SegmentTimelineTestCase). If NumPy happens
+to be installed, a vectorised `searchsorted` is used instead; it is an
+untested fast path expected to give the same results.
+
+Compiled timelines are cached by their windows, so every chart of the same
+class (and every user with the same valid zones) shares one compilation.
+The same arrays also give per-sample zones, time in zone and target
+compliance (see `assign_zones`, `time_in_zones`, `target_compliance`).
+"""
+import math
+from bisect import bisect_right
+from functools import lru_cache
+
+try:  # Optional fast path; not in requirements.txt (see module docstring)
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .zone_times import MAX_SAMPLE_GAP
+
+# Power targets are drawn 60s earlier than the class plan (rider reaction time)
+POWER_TARGET_SHIFT = -60
+
+# Upper output / FTP ratio of power zones 1-6 (zone 7 above)
+POWER_ZONE_UPPER_RATIOS = (0.55, 0.75, 0.90, 1.05, 1.20, 1.50)
+
+NO_TARGET = -1
+
+
+def _after(value):
+    # End of a closed window [start, end] as a half-open bound
+    return math.nextafter(value, math.inf)
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class SegmentTimeline:
+    """Piecewise-constant target over time."""
+
+    def __init__(self, bounds, codes, payloads):
+        self.bounds = bounds
+        self.codes = codes
+        self.payloads = payloads
+        if np is not None:
+            self._np_bounds = np.asarray(bounds, dtype=np.float64)
+            self._np_codes = np.asarray(codes, dtype=np.int64)
+
+    @classmethod
+    def compile(cls, windows, fill_windows=(), first_wins=False):
+        """
+        Compile half-open (start, stop, payload) windows.
+
+        Args:
+            windows: Windows in class order; where they overlap the last one
+                wins (the first one with `first_wins`)
+            fill_windows: Windows only used where no window applies (first wins)
+            first_wins: Overlap rule for `windows`
+        """
+        windows = [w for w in windows if w[1] > w[0]]
+        fill_windows = [w for w in fill_windows if w[1] > w[0]]
+        edges = sorted({edge for w in windows + fill_windows for edge in w[:2]})
+
+        payloads = []
+        payload_codes = {}
+        primary = windows if first_wins else windows[::-1]
+        codes = [NO_TARGET]
+        for left in edges[:-1]:
+            winner = next((w for w in primary if w[0] <= left < w[1]), None)
+            if winner is None:
+                winner = next((w for w in fill_windows if w[0] <= left < w[1]), None)
+            if winner is None:
+                codes.append(NO_TARGET)
+                continue
+            if winner[2] not in payload_codes:
+                payload_codes[winner[2]] = len(payloads)
+                payloads.append(winner[2])
+            codes.append(payload_codes[winner[2]])
+        codes.append(NO_TARGET)
+
+        # Drop edges where nothing changes
+        bounds, merged = [], [codes[0]]
+        for edge, code in zip(edges, codes[1:]):
+            if code != merged[-1]:
+                bounds.append(edge)
+                merged.append(code)
+        return cls(bounds, merged, payloads)
+
+    def codes_at(self, timestamps):
+        """Payload index per timestamp (NO_TARGET where no window applies)."""
+        if np is not None:
+            positions = np.searchsorted(self._np_bounds, np.asarray(timestamps, dtype=np.float64), side='right')
+            return self._np_codes[positions].tolist()
+        return [self.codes[bisect_right(self.bounds, t)] for t in timestamps]
+
+    def values_at(self, timestamps):
+        """Payload per timestamp (None where no window applies)."""
+        payloads = self.payloads
+        return [payloads[code] if code != NO_TARGET else None for code in self.codes_at(timestamps)]
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=512)
+def _compiled(windows, fill_windows=(), first_wins=False):
+    return SegmentTimeline.compile(list(windows), list(fill_windows), first_wins=first_wins)
+
+
+def _closed_windows(spans, shift=0):
+    """(start, end, payload) closed spans -> half-open windows, shifted and clipped at 0."""
+    windows = []
+    for start, end, payload in spans:
+        start = max(0, start + shift)
+        end = max(0, end + shift)
+        if end <= start:
+            continue
+        windows.append((start, _after(end), payload))
+    return tuple(windows)
+
+
+def power_zone_timeline(segments, valid_zones, spin_up_intervals=None, shift=POWER_TARGET_SHIFT):
+    """
+    Zone timeline of a power zone class plan (ride_detail.get_power_zone_segments()).
+
+    Segments (and spin-up intervals, which only fill gaps and default to
+    zone 1) apply from start to end inclusive, shifted by `shift`.
+
+    Args:
+        segments: Dicts with 'start', 'end', 'zone'
+        valid_zones: Zones that have a target for this user (others are skipped)
+        spin_up_intervals: Dicts with 'start', 'end' and optional 'zone'
+    """
+    valid_zones = frozenset(valid_zones)
+    spans = []
+    for segment in segments or []:
+        zone = segment.get('zone')
+        if zone and zone in valid_zones:
+            spans.append((segment.get('start', 0), segment.get('end', 0), zone))
+    fill_spans = []
+    for interval in spin_up_intervals or []:
+        if not isinstance(interval, dict):
+            continue
+        start, end = _int_or_none(interval.get('start')), _int_or_none(interval.get('end'))
+        zone = interval.get('zone') or 1
+        if start is None or end is None or end <= start or zone not in valid_zones:
+            continue
+        fill_spans.append((start, end, zone))
+    return _compiled(_closed_windows(spans, shift), _closed_windows(fill_spans, shift))
+
+
+def target_metrics_zone_timeline(target_metrics_list, valid_zones, shift=POWER_TARGET_SHIFT):
+    """Zone timeline from stored target_metrics ('power_zone' segments with offsets and metrics)."""
+    valid_zones = frozenset(valid_zones)
+    spans = []
+    for segment in target_metrics_list or []:
+        if segment.get('segment_type') != 'power_zone':
+            continue
+        zone = next(
+            (metric.get('lower') for metric in segment.get('metrics', []) if metric.get('name') == 'power_zone'),
+            None,
+        )
+        if zone is None or zone not in valid_zones:
+            continue
+        offsets = segment.get('offsets', {})
+        spans.append((offsets.get('start', 0), offsets.get('end', 0), zone))
+    return _compiled(_closed_windows(spans, shift))
+
+
+def pace_zone_timeline(segments):
+    """Pace level (0-6) timeline of a running / walking class plan (no shift)."""
+    spans = []
+    for segment in segments or []:
+        zone = _int_or_none(segment.get('zone') or segment.get('pace_level'))
+        if zone is None:
+            continue
+        spans.append((segment.get('start', 0), segment.get('end', 0), max(0, min(6, zone))))
+    return _compiled(_closed_windows(spans))
+
+
+def segment_lookup_timeline(segments, shift_seconds=0):
+    """
+    Timeline whose payloads are indexes into `segments`.
+
+    Same rule as the old per-sample lookup: the first segment with
+    start <= t < end applies (end 0 = open ended), after shifting the
+    segment windows by `shift_seconds`.
+    """
+    windows = []
+    for index, segment in enumerate(segments or []):
+        start, end = _int_or_none(segment.get('start', 0)), _int_or_none(segment.get('end', 0))
+        if start is None or end is None:
+            continue
+        stop = math.inf if end == 0 else end + shift_seconds
+        windows.append((start + shift_seconds, stop, index))
+    return _compiled(tuple(windows), first_wins=True)
+
+
+def target_line(timeline, seconds_array, value_for_payload, key):
+    """
+    `[{'timestamp': t, key: value}, ...]` for every numeric timestamp.
+
+    Args:
+        timeline: SegmentTimeline
+        seconds_array: Sample timestamps
+        value_for_payload: Dict payload -> target value (missing = None)
+        key: Name of the value in each point
+    """
+    timestamps = [t for t in seconds_array if _number(t)]
+    if not timestamps:
+        return []
+    values = timeline.values_at(timestamps)
+    return [
+        {'timestamp': int(t), key: value_for_payload.get(payload) if payload is not None else None}
+        for t, payload in zip(timestamps, values)
+    ]
+
+
+def assign_zones(values, upper_bounds):
+    """
+    Zone (1 .. len(upper_bounds) + 1) per value; None for missing or non-positive values.
+
+    A value is in the first zone whose upper bound it is below.
+    """
+    if np is not None:
+        array = np.asarray([v if _number(v) and v > 0 else np.nan for v in values], dtype=np.float64)
+        zones = np.searchsorted(np.asarray(upper_bounds, dtype=np.float64), array, side='right') + 1
+        return [int(z) if not math.isnan(v) else None for z, v in zip(zones.tolist(), array.tolist())]
+    return [bisect_right(upper_bounds, v) + 1 if _number(v) and v > 0 else None for v in values]
+
+
+def power_zones_for_outputs(outputs, ftp):
+    """Power zone 1-7 per output sample for an FTP (None without output)."""
+    if not ftp:
+        return [None] * len(outputs)
+    # Compare output / FTP (not output against scaled bounds) so boundary
+    # samples land where zone_times.power_zone_for_ratio puts them
+    ftp = float(ftp)
+    return assign_zones([v / ftp if _number(v) else None for v in outputs], POWER_ZONE_UPPER_RATIOS)
+
+
+def sample_durations(timestamps):
+    """
+    Seconds credited to each sample: the gap to the next sample (the last one
+    gets the first gap), 0 for gaps of MAX_SAMPLE_GAP or more. Same rule as
+    zone_times.zone_seconds.
+    """
+    if not timestamps:
+        return []
+    if len(timestamps) == 1:
+        return [5]
+    gaps = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    gaps.append(gaps[0])
+    return [gap if 0 < gap < MAX_SAMPLE_GAP else 0 for gap in gaps]
+
+
+def time_in_zones(timestamps, zones, zone_count=7):
+    """Seconds per zone (dict zone -> seconds, zones 1..zone_count) from per-sample zones."""
+    totals = {zone: 0 for zone in range(1, zone_count + 1)}
+    for zone, seconds in zip(zones, sample_durations(timestamps)):
+        if zone in totals:
+            totals[zone] += seconds
+    return totals
+
+
+def target_compliance(timestamps, actual_zones, target_zones):
+    """
+    How closely samples followed the class targets.
+
+    Returns:
+        dict: 'target_seconds' and 'on_target_seconds' per target zone, plus
+        overall 'percentage' (share of targeted time ridden in the target zone)
+    """
+    target_seconds, on_target_seconds = {}, {}
+    for actual, target, seconds in zip(actual_zones, target_zones, sample_durations(timestamps)):
+        if target is None or not seconds:
+            continue
+        target_seconds[target] = target_seconds.get(target, 0) + seconds
+        if actual == target:
+            on_target_seconds[target] = on_target_seconds.get(target, 0) + seconds
+    total = sum(target_seconds.values())
+    return {
+        'target_seconds': target_seconds,
+        'on_target_seconds': on_target_seconds,
+        'percentage': round(sum(on_target_seconds.values()) / total * 100, 1) if total else 0.0,
+    }
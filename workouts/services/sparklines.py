@@ -0,0 +1,85 @@
+"""Stored mini charts for workout history cards.
+
+The history page used to load every sample of the 12 workouts on a page to
+draw their card charts. Each chart is now built once (on first view, see
+`workouts.views._attach_card_charts`) and stored as a WorkoutSparkline, so a
+page of cards is read with the workout query itself.
+
+Sparklines are dropped when a workout's time series is replaced and when the
+user's FTP / pace history changes (zone bands and target lines depend on the
+FTP / pace level in effect on the workout date).
+"""
+import logging
+
+from ..models import WorkoutSparkline
+
+logger = logging.getLogger(__name__)
+
+# Bump when the card chart builder changes so stored charts are rebuilt
+SPARKLINE_VERSION = 1
+
+SPARKLINE_UPDATE_FIELDS = [
+    'version', 'chart', 'avg_output', 'avg_speed', 'last_timestamp', 'updated_at',
+]
+
+
+def current_sparkline(workout):
+    """The workout's stored sparkline if it was built by this SPARKLINE_VERSION, else None.
+
+    Select-related `sparkline` on list queries to avoid a query per workout.
+    """
+    try:
+        sparkline = workout.sparkline
+    except WorkoutSparkline.DoesNotExist:
+        return None
+    if sparkline.version != SPARKLINE_VERSION:
+        return None
+    return sparkline
+
+
+def series_summary(samples):
+    """
+    Averages the history card falls back to when WorkoutDetails lacks them.
+
+    Returns:
+        dict: avg_output, avg_speed (None without values) and last_timestamp
+    """
+    outputs = [float(s.output) for s in samples if isinstance(s.output, (int, float))]
+    speeds = [float(s.speed) for s in samples if isinstance(s.speed, (int, float))]
+    timestamps = [s.timestamp for s in samples if isinstance(s.timestamp, int)]
+    return {
+        'avg_output': sum(outputs) / len(outputs) if outputs else None,
+        'avg_speed': sum(speeds) / len(speeds) if speeds else None,
+        'last_timestamp': max(timestamps) if timestamps else None,
+    }
+
+
+def store_sparklines(rows):
+    """Upsert unsaved WorkoutSparkline instances (one per workout)."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    for row in rows:
+        row.version = SPARKLINE_VERSION
+    WorkoutSparkline.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=SPARKLINE_UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+def invalidate_sparklines(user_id=None, workout_ids=None):
+    """Drop stored sparklines of a user and/or specific workouts; they are rebuilt on next view."""
+    if user_id is None and workout_ids is None:
+        return 0
+    sparklines = WorkoutSparkline.objects.all()
+    if user_id is not None:
+        sparklines = sparklines.filter(workout__user_id=user_id)
+    if workout_ids is not None:
+        sparklines = sparklines.filter(workout_id__in=list(workout_ids))
+    deleted, _ = sparklines.delete()
+    if deleted:
+        logger.debug(f"Dropped {deleted} workout sparklines (user={user_id})")
+    return deleted
@@ -0,0 +1,371 @@
+"""
+End-to-end sync load benchmark against the local Peloton stand-in
+(peloton.fake_server), so sync regressions show up before a deploy instead
+of in production.
+
+`run_sync_benchmark` starts a FakePelotonServer, points PELOTON_API_BASE_URL
+at it, creates benchmark users with a Peloton connection and runs, in this
+process:
+
+    sync      a full sync per user through the stage tasks (run_workout_sync_job,
+              sync_list_page -> ... -> sync_persist_page), as the sync_workouts
+              view would enqueue them
+    tasks     the per-item tasks: fetch_ride_details_task for placeholder
+              rides, then fetch_performance_graph_task and
+              batch_fetch_ride_details_async for a sample of synced workouts
+    library   the sync_class_library command
+
+Tasks are called in-process instead of through a broker: what a task would
+enqueue is collected and run next, and a task that would retry after a
+Peloton API error is retried at once. The numbers therefore measure task
+bodies, the database and the HTTP clients, not the Celery transport.
+
+Every phase reports items/sec, SQL queries per item, p50/p95 latency of its
+unit of work (a page, a task, a class) and the process's peak RSS.
+"""
+import logging
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection as db_connection
+from django.test.utils import override_settings
+
+from peloton.fake_server import FAKE_ID_PREFIX, FakePelotonConfig, FakePelotonServer
+from peloton.models import PelotonConnection
+from peloton.services.peloton import PelotonAPIError
+from ..models import Instructor, PelotonPayload, PelotonPayloadBlob, RideDetail, Workout, WorkoutSyncJob
+from .sync_engine import WorkoutSyncEngine, create_sync_job
+
+logger = logging.getLogger(__name__)
+
+PHASE_SYNC = 'sync'
+PHASE_TASKS = 'tasks'
+PHASE_LIBRARY = 'library'
+PHASES = (PHASE_SYNC, PHASE_TASKS, PHASE_LIBRARY)
+
+BENCHMARK_EMAIL = 'sync-bench-{}@example.com'
+BENCHMARK_EMAIL_PATTERN = r'^sync-bench-[0-9]+@example\.com$'
+BENCHMARK_LEADERBOARD_NAME = 'sync_bench_{}'
+BENCHMARK_TOKEN = 'sync-benchmark'
+# Rides per batch_fetch_ride_details_async call in the tasks phase
+RIDE_BATCH_SIZE = 50
+
+
+@dataclass
+class PhaseReport:
+    """Measurements of one benchmark phase."""
+    name: str
+    unit: str
+    items: int = 0
+    seconds: float = 0.0
+    queries: int = 0
+    latencies: list = field(default_factory=list)
+    retries: int = 0
+    errors: int = 0
+    peak_rss_mb: float = None
+
+    @property
+    def items_per_second(self):
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def queries_per_item(self):
+        return self.queries / self.items if self.items else 0.0
+
+    def percentile(self, pct):
+        """Latency percentile in seconds (nearest rank), or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(1, -(-len(ordered) * pct // 100))
+        return ordered[int(rank) - 1]
+
+    def as_dict(self):
+        data = asdict(self)
+        data.pop('latencies')
+        data.update(
+            items_per_second=self.items_per_second,
+            queries_per_item=self.queries_per_item,
+            p50_seconds=self.percentile(50),
+            p95_seconds=self.percentile(95),
+        )
+        return data
+
+
+@dataclass
+class BenchmarkReport:
+    config: FakePelotonConfig
+    users: int
+    phases: list = field(default_factory=list)
+    requests: dict = field(default_factory=dict)
+    throttled: dict = field(default_factory=dict)
+
+    def phase(self, name):
+        return next((report for report in self.phases if report.name == name), None)
+
+    def as_dict(self):
+        return {
+            'config': asdict(self.config),
+            'users': self.users,
+            'phases': [report.as_dict() for report in self.phases],
+            'requests': dict(self.requests),
+            'throttled': dict(self.throttled),
+        }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextmanager
+def _measure(report):
+    """Time the block and count the SQL it runs on the default connection."""
+    def count_query(execute, sql, params, many, context):
+        report.queries += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        with db_connection.execute_wrapper(count_query):
+            yield report
+    finally:
+        report.seconds += time.perf_counter() - started
+        report.peak_rss_mb = peak_rss_mb()
+
+
+def _call_task(report, task, *args):
+    """
+    Run a task body in-process. Called directly, a task's `self.retry` re-raises
+    the original error, so retry here (immediately) where Celery would later.
+    """
+    max_retries = getattr(task, 'max_retries', None) or 0
+    attempt = 0
+    while True:
+        try:
+            return task(*args)
+        except PelotonAPIError:
+            if attempt >= max_retries:
+                raise
+            attempt += 1
+            report.retries += 1
+
+
+def _timed_task(report, task, *args):
+    started = time.perf_counter()
+    try:
+        result = _call_task(report, task, *args)
+        if isinstance(result, dict) and result.get('status') == 'error':
+            report.errors += 1
+    except Exception:
+        logger.exception(f"Benchmark: {task.name} failed")
+        report.errors += 1
+    report.items += 1
+    report.latencies.append(time.perf_counter() - started)
+
+
+# ------------------------------------------------------------------------------
+# Benchmark data
+# ------------------------------------------------------------------------------
+def create_benchmark_users(api, count):
+    """Users with an active bearer-token Peloton connection to the fake account `n`."""
+    User = get_user_model()
+    connections = []
+    for n in range(count):
+        user = User.objects.create_user(email=BENCHMARK_EMAIL.format(n), is_active=True)
+        user.profile.peloton_leaderboard_name = BENCHMARK_LEADERBOARD_NAME.format(n)
+        user.profile.save(update_fields=['peloton_leaderboard_name'])
+        connection = PelotonConnection(user=user, peloton_user_id=api.make_id('user', n), is_active=True)
+        connection.bearer_token = BENCHMARK_TOKEN
+        connection.save()
+        connections.append(connection)
+    return connections
+
+
+def cleanup_benchmark_data():
+    """Delete benchmark users and every row keyed on an id the fake handed out."""
+    get_user_model().objects.filter(email__regex=BENCHMARK_EMAIL_PATTERN).delete()
+    RideDetail.objects.filter(peloton_ride_id__startswith=FAKE_ID_PREFIX).delete()
+    Instructor.objects.filter(peloton_id__startswith=FAKE_ID_PREFIX).delete()
+    PelotonPayload.objects.filter(object_id__startswith=FAKE_ID_PREFIX).delete()
+    PelotonPayloadBlob.objects.filter(payloads__isnull=True).delete()
+
+
+# ------------------------------------------------------------------------------
+# Phases
+# ------------------------------------------------------------------------------
+def run_sync_phase(connections, report):
+    """
+    Full sync of every connection, pages interleaved across users the way a
+    worker pool would pick them up.
+
+    Returns:
+        list: (user_id, ride_id) placeholders the sync would have queued
+              fetch_ride_details_task for
+    """
+    from ..tasks import (
+        run_workout_sync_job, sync_fetch_performance, sync_fetch_ride_details, sync_list_page, sync_persist_page,
+    )
+
+    pending = deque()
+    placeholders = []
+
+    def enqueue_page(job_id, page):
+        pending.append((job_id, page))
+
+    def enqueue_ride_details(engine, ride_ids):
+        placeholders.extend((engine.job.user_id, ride_id) for ride_id in ride_ids or [])
+
+    job_ids = []
+    with mock.patch('workouts.tasks.enqueue_sync_page', enqueue_page), \
+            mock.patch.object(WorkoutSyncEngine, '_enqueue_ride_details', enqueue_ride_details), \
+            _measure(report):
+        for connection in connections:
+            job = create_sync_job(connection)
+            job_ids.append(job.pk)
+            _call_task(report, run_workout_sync_job, job.pk)
+        while pending:
+            job_id, page = pending.popleft()
+            started = time.perf_counter()
+            try:
+                payload = _call_task(report, sync_list_page, job_id, page)
+                payload = sync_fetch_ride_details(payload)
+                payload = sync_fetch_performance(payload)
+                sync_persist_page(payload)
+            except Exception:
+                logger.exception(f"Benchmark: page {page} of sync job {job_id} failed")
+            report.latencies.append(time.perf_counter() - started)
+
+    for job in WorkoutSyncJob.objects.filter(pk__in=job_ids):
+        report.items += job.workouts_synced + job.workouts_updated
+        if job.status != WorkoutSyncJob.STATUS_COMPLETED:
+            report.errors += 1
+    return placeholders
+
+
+def run_task_phase(user_ids, placeholders, sample, report):
+    """Ride details for placeholders, then graph and ride refreshes for `sample` workouts."""
+    from ..tasks import batch_fetch_ride_details_async, fetch_performance_graph_task, fetch_ride_details_task
+
+    with _measure(report):
+        for user_id, ride_id in placeholders:
+            _timed_task(report, fetch_ride_details_task, user_id, ride_id)
+
+        per_user = max(1, sample // max(1, len(user_ids))) if sample else 0
+        rides_by_user = defaultdict(list)
+        for user_id in user_ids:
+            workouts = (
+                Workout.objects.filter(user_id=user_id)
+                .order_by('-completed_date', '-pk')
+                .values_list('pk', 'peloton_workout_id', 'ride_detail__peloton_ride_id')[:per_user]
+            )
+            for workout_id, peloton_workout_id, ride_id in workouts:
+                _timed_task(report, fetch_performance_graph_task, user_id, workout_id, peloton_workout_id)
+                if ride_id and ride_id not in rides_by_user[user_id]:
+                    rides_by_user[user_id].append(ride_id)
+
+        for user_id, ride_ids in rides_by_user.items():
+            for start in range(0, len(ride_ids), RIDE_BATCH_SIZE):
+                _timed_task(report, batch_fetch_ride_details_async, user_id, ride_ids[start:start + RIDE_BATCH_SIZE])
+
+
+def run_library_phase(leaderboard_name, disciplines, limit, report):
+    """sync_class_library as the given benchmark user, timing every class it stores."""
+    from django.core.management import call_command, get_commands
+
+    command_module = import_module(f"{get_commands()['sync_class_library']}.management.commands.sync_class_library")
+    store_ride_detail = command_module.store_ride_detail_from_api
+
+    def timed_store(client, ride_id, logger_instance=None):
+        started = time.perf_counter()
+        result = store_ride_detail(client, ride_id, logger_instance)
+        report.items += 1
+        if result.get('status') != 'success':
+            report.errors += 1
+        report.latencies.append(time.perf_counter() - started)
+        return result
+
+    options = {'disciplines': ','.join(disciplines), 'delay': 0, 'username': leaderboard_name, 'stdout': StringIO()}
+    if limit:
+        options['limit'] = limit
+    with mock.patch.object(command_module, 'store_ride_detail_from_api', timed_store), _measure(report):
+        call_command('sync_class_library', **options)
+
+
+# ------------------------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------------------------
+def run_sync_benchmark(
+    config=None,
+    users=1,
+    phases=PHASES,
+    task_sample=100,
+    library_disciplines=('cycling', 'running'),
+    library_limit=None,
+    rate_limit=None,
+    keep=False,
+):
+    """
+    Run the benchmark phases against a fresh fake Peloton server.
+
+    Args:
+        config: FakePelotonConfig (account size, latency, 429 injection)
+        users: Benchmark users (each gets `config.workouts_per_user` workouts)
+        phases: Subset of PHASES, run in PHASES order
+        task_sample: Workouts refreshed through the per-item tasks
+        library_disciplines: Disciplines sync_class_library walks
+        library_limit: Classes per discipline for sync_class_library (None = all)
+        rate_limit: Override PELOTON_API_RATE_LIMIT for the run (0 = unlimited)
+        keep: Leave the benchmark users and classes in the database
+
+    Returns:
+        BenchmarkReport
+    """
+    from peloton.async_client import reset_rate_limiter
+
+    config = config or FakePelotonConfig()
+    report = BenchmarkReport(config=config, users=users)
+    server = FakePelotonServer(config).start()
+    overrides = {'PELOTON_API_BASE_URL': server.base_url}
+    if rate_limit is not None:
+        overrides['PELOTON_API_RATE_LIMIT'] = rate_limit
+    try:
+        with override_settings(**overrides):
+            reset_rate_limiter()
+            cleanup_benchmark_data()
+            connections = create_benchmark_users(server.api, users)
+
+            placeholders = []
+            if PHASE_SYNC in phases:
+                sync = PhaseReport(PHASE_SYNC, 'workout')
+                report.phases.append(sync)
+                placeholders = run_sync_phase(connections, sync)
+            if PHASE_TASKS in phases:
+                tasks = PhaseReport(PHASE_TASKS, 'task')
+                report.phases.append(tasks)
+                run_task_phase([c.user_id for c in connections], placeholders, task_sample, tasks)
+            if PHASE_LIBRARY in phases and connections:
+                library = PhaseReport(PHASE_LIBRARY, 'class')
+                report.phases.append(library)
+                run_library_phase(BENCHMARK_LEADERBOARD_NAME.format(0), library_disciplines, library_limit, library)
+    finally:
+        reset_rate_limiter()
+        report.requests = dict(server.api.requests)
+        report.throttled = dict(server.api.throttled)
+        server.stop()
+        if not keep:
+            cleanup_benchmark_data()
+    return report
@@ -0,0 +1,432 @@
+"""
+Background Peloton workout sync engine.
+
+A sync is a WorkoutSyncJob processed one page of the Peloton workout list at a
+time. Every page runs through four stages, each a Celery task in
+`workouts.tasks`:
+
+    list -> ride details -> performance -> persist
+
+The persist stage checkpoints the job (`next_page` and counters) and chains the
+next page, so a worker killed mid-sync resumes at the first unpersisted page.
+Persisting is idempotent (keyed on Peloton IDs), so re-running a page is safe.
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from peloton.models import PelotonConnection
+from ..models import Playlist, RideDetail, WorkoutSyncJob
+from .bulk_writer import PageWriteResult, WorkoutBatchWriter
+from .payload_archive import archive_responses
+from .peloton_payloads import ride_id_from_payload, workout_sort_timestamp
+
+logger = logging.getLogger(__name__)
+
+UTC = dt_timezone.utc
+
+SYNC_PAGE_SIZE = 20
+SYNC_COOLDOWN_MINUTES = 60
+# Incremental syncs stop after this many consecutive workouts older than the cutoff
+OLDER_THAN_CUTOFF_STOP_COUNT = 5
+# Buffer for clock skew when comparing against the last sync time
+CUTOFF_BUFFER_SECONDS = 5
+
+
+class SyncJobAborted(Exception):
+    """Raised when a stage runs for a job that is no longer at that page."""
+
+
+# ------------------------------------------------------------------------------
+# Job lifecycle
+# ------------------------------------------------------------------------------
+def get_active_sync_job(user):
+    """Return the user's pending/running WorkoutSyncJob, if any."""
+    return (
+        WorkoutSyncJob.objects
+        .filter(user=user, status__in=[WorkoutSyncJob.STATUS_PENDING, WorkoutSyncJob.STATUS_RUNNING])
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def create_sync_job(connection):
+    """
+    Create a WorkoutSyncJob for a connection and mark the connection as syncing.
+
+    The job is full when the connection has never synced, otherwise incremental
+    from `last_sync_at`.
+    """
+    is_full_sync = connection.last_sync_at is None
+    cutoff_timestamp = None
+    if not is_full_sync:
+        last_sync = connection.last_sync_at
+        if last_sync.tzinfo is None:
+            last_sync = timezone.make_aware(last_sync, UTC)
+        cutoff_timestamp = last_sync.astimezone(UTC).timestamp()
+
+    now = timezone.now()
+    with transaction.atomic():
+        job = WorkoutSyncJob.objects.create(
+            user=connection.user,
+            is_full_sync=is_full_sync,
+            cutoff_timestamp=cutoff_timestamp,
+            peloton_user_id=connection.peloton_user_id or '',
+        )
+        connection.sync_in_progress = True
+        connection.sync_started_at = now
+        connection.save(update_fields=['sync_in_progress', 'sync_started_at'])
+    return job
+
+
+def get_job_progress(job):
+    """Progress snapshot for templates and JSON status responses."""
+    if not job:
+        return None
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'sync_type': 'full' if job.is_full_sync else 'incremental',
+        'stage': job.current_stage,
+        'pages_completed': job.pages_completed,
+        'workouts_processed': job.workouts_processed,
+        'workouts_synced': job.workouts_synced,
+        'workouts_updated': job.workouts_updated,
+        'workouts_skipped': job.workouts_skipped,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+    }
+
+
+class WorkoutSyncEngine:
+    """
+    Runs the stages of a WorkoutSyncJob.
+
+    Stage methods take and return a JSON-serialisable page payload so they can
+    be chained as Celery tasks:
+
+        {'job_id', 'page', 'entries', 'has_next', 'stop', 'consecutive_older',
+         'detailed_workouts', 'ride_details', 'performance_graphs'}
+    """
+
+    def __init__(self, job, client=None):
+        self.job = job
+        self._client = client
+        # An injected client is used as-is (serially); otherwise fetch stages fan out
+        # through the pooled, rate-limited AsyncPelotonClient.
+        self._fan_out_async = client is None
+
+    @classmethod
+    def for_job_id(cls, job_id, client=None):
+        return cls(WorkoutSyncJob.objects.select_related('user').get(pk=job_id), client=client)
+
+    def _connection(self):
+        return PelotonConnection.objects.get(user=self.job.user, is_active=True)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._connection().get_client()
+        return self._client
+
+    def _fetch_many(self, method, keys, **kwargs):
+        """
+        Call client `method(key, **kwargs)` for every key.
+
+        Returns:
+            dict: key -> result, or the exception raised for that key
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        if self._fan_out_async:
+            from peloton.async_client import AsyncPelotonClient, run_async
+
+            # Resolve the connection (ORM queries) before entering the event loop
+            async_client = AsyncPelotonClient.for_connection(self._connection())
+
+            async def _run():
+                async with async_client as client:
+                    return await client.fetch_many(method, keys, **kwargs)
+
+            return run_async(_run())
+
+        results = {}
+        func = getattr(self.client, method)
+        for key in keys:
+            try:
+                results[key] = func(key, **kwargs)
+            except Exception as e:
+                results[key] = e
+        return results
+
+    # -- bookkeeping -------------------------------------------------------------
+    def _touch(self, stage, page=None):
+        """Record the running stage; abort if the job moved on or finished."""
+        self.job.refresh_from_db()
+        if self.job.status != WorkoutSyncJob.STATUS_RUNNING:
+            raise SyncJobAborted(f"job {self.job.pk} is {self.job.status}")
+        if page is not None and page != self.job.next_page:
+            raise SyncJobAborted(f"job {self.job.pk} is at page {self.job.next_page}, not {page}")
+        self.job.current_stage = stage
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=['current_stage', 'heartbeat_at'])
+
+    def start(self):
+        """Mark the job running and resolve the Peloton user id."""
+        job = self.job
+        if not job.peloton_user_id:
+            user_data = self.client.fetch_current_user()
+            peloton_user_id = user_data.get('id')
+            if not peloton_user_id:
+                raise ValueError('Could not determine Peloton user ID.')
+            job.peloton_user_id = str(peloton_user_id)
+            PelotonConnection.objects.filter(user=job.user).update(peloton_user_id=job.peloton_user_id)
+        job.status = WorkoutSyncJob.STATUS_RUNNING
+        job.started_at = job.started_at or timezone.now()
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['peloton_user_id', 'status', 'started_at', 'heartbeat_at'])
+        logger.info(
+            f"Starting {'FULL' if job.is_full_sync else 'INCREMENTAL'} sync job {job.pk} "
+            f"for user {job.user.email} from page {job.next_page}"
+        )
+
+    # -- stage 1: list -------------------------------------------------------------
+    def list_page(self, page):
+        """Fetch one page of the workout list and drop workouts older than the cutoff."""
+        self._touch('list', page)
+        job = self.job
+        payload = self.client.fetch_user_workouts_page(job.peloton_user_id, limit=SYNC_PAGE_SIZE, page=page)
+
+        entries = []
+        skipped = 0
+        stop = False
+        consecutive_older = job.consecutive_older
+        for workout_data in payload.get('data', []):
+            if not workout_data.get('id'):
+                skipped += 1
+                continue
+            if not job.is_full_sync and job.cutoff_timestamp:
+                if workout_sort_timestamp(workout_data) <= job.cutoff_timestamp + CUTOFF_BUFFER_SECONDS:
+                    consecutive_older += 1
+                    if consecutive_older >= OLDER_THAN_CUTOFF_STOP_COUNT:
+                        stop = True
+                        break
+                    continue
+                consecutive_older = 0
+            entries.append(workout_data)
+
+        return {
+            'job_id': job.pk,
+            'page': page,
+            'entries': entries,
+            'skipped': skipped,
+            'has_next': bool(payload.get('show_next')),
+            'stop': stop,
+            'consecutive_older': consecutive_older,
+            'detailed_workouts': {},
+            'ride_details': {},
+            'performance_graphs': {},
+        }
+
+    # -- stage 2: ride details -----------------------------------------------------
+    def fetch_ride_details(self, payload):
+        """
+        Fetch ride details for rides we don't have yet (or lack a playlist for).
+
+        Workouts whose list entry has no ride id get their detailed workout
+        fetched first to resolve it.
+        """
+        self._touch('ride_details', payload['page'])
+
+        ride_ids = set()
+        unresolved = []
+        for workout_data in payload['entries']:
+            ride_id = ride_id_from_payload(workout_data)
+            if ride_id:
+                ride_ids.add(ride_id)
+            else:
+                unresolved.append(workout_data['id'])
+
+        for workout_id, detailed in self._fetch_many('fetch_workout', unresolved).items():
+            if isinstance(detailed, Exception):
+                logger.warning(f"Sync job {self.job.pk}: could not fetch detailed workout {workout_id}: {detailed}")
+                continue
+            payload['detailed_workouts'][workout_id] = detailed
+            ride_id = ride_id_from_payload(detailed)
+            if ride_id:
+                ride_ids.add(ride_id)
+
+        existing = dict(
+            RideDetail.objects.filter(peloton_ride_id__in=ride_ids).values_list('peloton_ride_id', 'id')
+        )
+        with_playlist = set(
+            Playlist.objects.filter(ride_detail_id__in=existing.values()).values_list('ride_detail_id', flat=True)
+        )
+        to_fetch = [rid for rid in ride_ids if rid not in existing or existing[rid] not in with_playlist]
+
+        for ride_id, ride_details in self._fetch_many('fetch_ride_details', to_fetch).items():
+            if isinstance(ride_details, Exception):
+                logger.warning(f"Sync job {self.job.pk}: could not fetch ride details for {ride_id}: {ride_details}")
+                continue
+            payload['ride_details'][ride_id] = ride_details
+        return payload
+
+    # -- stage 3: performance ------------------------------------------------------
+    def fetch_performance(self, payload):
+        """Fetch the detailed workout and performance graph for every workout on the page."""
+        self._touch('performance', payload['page'])
+        workout_ids = [workout_data['id'] for workout_data in payload['entries']]
+
+        missing = [wid for wid in workout_ids if wid not in payload['detailed_workouts']]
+        for workout_id, detailed in self._fetch_many('fetch_workout', missing).items():
+            if isinstance(detailed, Exception):
+                logger.warning(f"Sync job {self.job.pk}: could not fetch detailed workout {workout_id}: {detailed}")
+                continue
+            payload['detailed_workouts'][workout_id] = detailed
+
+        graphs = self._fetch_many('fetch_performance_graph', workout_ids, every_n=5)
+        for workout_id, graph in graphs.items():
+            if isinstance(graph, Exception):
+                logger.warning(f"Sync job {self.job.pk}: could not fetch performance graph for {workout_id}: {graph}")
+                continue
+            payload['performance_graphs'][workout_id] = graph
+        return payload
+
+    # -- stage 4: persist ----------------------------------------------------------
+    def persist_page(self, payload):
+        """
+        Write every workout on the page, then checkpoint the job.
+
+        Returns:
+            bool: True if another page should be processed
+        """
+        self._touch('persist', payload['page'])
+        # Keep the raw responses so parser changes can be re-applied offline (reparse_payloads)
+        archive_responses(
+            detailed_workouts=payload['detailed_workouts'],
+            performance_graphs=payload['performance_graphs'],
+            ride_details=payload['ride_details'],
+        )
+        result = self.write_entries(payload)
+        created, updated = len(result.created), len(result.updated)
+        skipped = payload.get('skipped', 0) + len(result.skipped)
+        self._enqueue_ride_details(result.placeholder_ride_ids)
+
+        has_more = payload['has_next'] and not payload['stop']
+        job = self.job
+        with transaction.atomic():
+            locked = WorkoutSyncJob.objects.select_for_update().get(pk=job.pk)
+            if locked.next_page != payload['page']:
+                raise SyncJobAborted(f"page {payload['page']} of job {job.pk} was already checkpointed")
+            locked.next_page = payload['page'] + 1
+            locked.pages_completed += 1
+            locked.consecutive_older = payload['consecutive_older']
+            locked.workouts_processed += len(payload['entries']) + payload.get('skipped', 0)
+            locked.workouts_synced += created
+            locked.workouts_updated += updated
+            locked.workouts_skipped += skipped
+            locked.heartbeat_at = timezone.now()
+            locked.save()
+        self.job = locked
+        logger.info(
+            f"Sync job {job.pk}: page {payload['page']} done "
+            f"({created} new, {updated} updated, {skipped} skipped)"
+        )
+        return has_more
+
+    def write_entries(self, payload):
+        """
+        Bulk-write the page's workouts.
+
+        If the batch fails, workouts are retried one at a time so a single bad
+        payload only skips that workout.
+        """
+        writer = WorkoutBatchWriter.for_job(self.job)
+        data = {
+            'detailed_workouts': payload['detailed_workouts'],
+            'ride_details': payload['ride_details'],
+            'performance_graphs': payload['performance_graphs'],
+        }
+        try:
+            return writer.write_page(payload['entries'], **data)
+        except Exception as e:
+            logger.warning(f"Sync job {self.job.pk}: batch write of page {payload['page']} failed ({e}); retrying per workout")
+
+        result = PageWriteResult()
+        for workout_data in payload['entries']:
+            try:
+                single = writer.write_page([workout_data], **data)
+            except Exception as e:
+                result.skipped.append(workout_data.get('id'))
+                logger.error(f"Sync job {self.job.pk}: error syncing workout {workout_data.get('id')}: {e}", exc_info=True)
+                continue
+            result.created += single.created
+            result.updated += single.updated
+            result.skipped += single.skipped
+            result.placeholder_ride_ids += single.placeholder_ride_ids
+        return result
+
+    def _enqueue_ride_details(self, ride_ids):
+        """Queue `fetch_ride_details_task` for placeholder RideDetails created this page."""
+        if not ride_ids:
+            return
+        try:
+            from config.celery import app as celery_app
+            for ride_id in ride_ids:
+                celery_app.send_task(
+                    'workouts.tasks.fetch_ride_details_task', args=[self.job.user_id, ride_id], queue='ride_details'
+                )
+        except Exception:
+            logger.exception(f"Sync job {self.job.pk}: failed to enqueue fetch_ride_details_task for {ride_ids}")
+
+    # -- completion ----------------------------------------------------------------
+    def finish(self):
+        """Mark the job complete and release the connection with a cooldown."""
+        job = self.job
+        now = timezone.now()
+        job.status = WorkoutSyncJob.STATUS_COMPLETED
+        job.current_stage = ''
+        job.finished_at = now
+        job.save(update_fields=['status', 'current_stage', 'finished_at'])
+        WorkoutBatchWriter.release_job(job.pk)
+
+        PelotonConnection.objects.filter(user=job.user).update(
+            last_sync_at=now,
+            sync_in_progress=False,
+            sync_started_at=None,
+            sync_cooldown_until=now + timedelta(minutes=SYNC_COOLDOWN_MINUTES),
+        )
+        profile = getattr(job.user, 'profile', None)
+        if profile is not None:
+            profile.peloton_last_synced_at = now
+            profile.save(update_fields=['peloton_last_synced_at'])
+
+        try:
+            from annual_challenge.services import update_annual_challenge_progress_from_peloton
+            update_annual_challenge_progress_from_peloton(user=job.user)
+        except Exception as e:
+            logger.warning(f"Could not update annual challenge progress after sync: {e}")
+
+        try:
+            from plans.recap import queue_user_recaps_refresh
+            queue_user_recaps_refresh(job.user_id)
+        except Exception as e:
+            logger.warning(f"Could not queue recap refresh after sync: {e}")
+
+        logger.info(
+            f"Sync job {job.pk} completed for user {job.user.email}: {job.workouts_processed} processed, "
+            f"{job.workouts_synced} new, {job.workouts_updated} updated, {job.workouts_skipped} skipped"
+        )
+
+    def fail(self, error):
+        """Mark the job failed and clear the connection's in-progress flag."""
+        job = self.job
+        job.status = WorkoutSyncJob.STATUS_FAILED
+        job.error = str(error)[:2000]
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        WorkoutBatchWriter.release_job(job.pk)
+        PelotonConnection.objects.filter(user=job.user).update(sync_in_progress=False, sync_started_at=None)
+        logger.error(f"Sync job {job.pk} failed for user {job.user.email}: {error}")
@@ -0,0 +1,591 @@
+"""
+Synthetic large-tenant data for profiling views and reports at production
+scale on a laptop or CI box.
+
+`generate_tenant` writes, with bulk_create in chunks:
+
+    library     instructors and a class library (RideDetail with segments and
+                targets, plus their RideMetrics and search documents), built
+                from the fake Peloton API payloads (peloton.fake_server)
+    users       users with a profile and a finished onboarding wizard, FTP and
+                pace history, and a multi-year workout history: WorkoutDetails
+                for every workout and, for a share of them, packed time
+                series with power peaks and zone times
+    challenges  team challenges over the history with workout assignments,
+                teams, participants and their weekly plans (scored)
+
+Users are written a chunk at a time, so memory stays flat however many are
+asked for. Performance graphs are drawn from a small pool per (discipline,
+duration) and decoded once, so a time series costs an INSERT rather than
+packing and analysing thousands of samples in Python.
+
+Every value comes from random generators seeded with the config's seed (one
+per user, so neither the chunk size nor the tag changes the data): the same
+seed and sizes always produce the same tenant. Rows are tagged (emails, names and Peloton
+ids) so `delete_tenant` can remove exactly what a run wrote.
+"""
+import hashlib
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import FTPEntry, OnboardingWizard, PaceEntry, Profile
+from challenges.models import (
+    Challenge, ChallengeBonusWorkout, ChallengeInstance, ChallengeWorkoutAssignment, Team, TeamMember,
+)
+from challenges.utils import generate_peloton_url
+from core.services import DateRangeService
+from peloton.fake_server import INSTRUCTOR_COUNT, FakePelotonAPI, FakePelotonConfig
+from plans.models import Exercise, PlanTemplate, PlanTemplateDay
+from plans.services import PLAN_EXERCISE_NAME, PlanMaterializer
+from tracker.models import DailyPlanItem, WeeklyPlan
+from tracker.scoring import DONE_FIELDS, URL_FIELDS
+from ..models import (
+    Instructor, RideDetail, Workout, WorkoutDetails, WorkoutPowerPeak, WorkoutTimeSeries, WorkoutType,
+)
+from .bulk_writer import ride_detail_defaults
+from .performance_ingest import (
+    apply_summary_metrics, build_performance_samples, extract_metric_series, extract_summary_metrics,
+    extract_target_metrics,
+)
+from .power_curve import mean_max_curve
+from .search import refresh_search_documents
+from .time_series import CHANNELS, build_time_series, series_from_row
+from .zone_times import TargetsTimeline, compute_zone_times
+
+logger = logging.getLogger(__name__)
+
+# Every Peloton id a tenant hands out starts with this, then a digest of its tag
+TENANT_ID_PREFIX = '5eedda7a'
+TENANT_EMAIL = '{tag}-{n}@example.com'
+TAG_PATTERN = r'^[a-z0-9][a-z0-9-]*$'
+
+DISCIPLINES = ('cycling', 'running', 'strength', 'yoga')
+ACTIVITY_FOR_DISCIPLINE = {'cycling': 'ride', 'running': 'run', 'strength': 'strength', 'yoga': 'yoga'}
+TIMEZONES = ('America/New_York', 'America/Chicago', 'America/Los_Angeles', 'Europe/London')
+
+# Plan template of the tenant's challenges: day_of_week (Sunday = 0) -> (focus, discipline)
+PLAN_DAYS = {
+    1: ('Power Zone Endurance', 'cycling'),
+    2: ('Run Tempo', 'running'),
+    4: ('Power Zone Ride', 'cycling'),
+    5: ('Strength', 'strength'),
+    6: ('Yoga Recovery', 'yoga'),
+}
+
+
+@dataclass
+class TenantConfig:
+    """
+    Size and shape of a synthetic tenant.
+
+    Attributes:
+        users: Users to create
+        years: Length of the longest workout history
+        workouts_per_week: Average workouts per user per week
+        rides: Classes in the library
+        series_ratio: Share of cycling/running workouts with a time series
+        graph_variants: Performance graphs per (discipline, duration) in the pool
+        challenges: Team challenges, spread over the history (the last one is running)
+        challenge_weeks: Length of each challenge
+        participation: Share of users joining each challenge
+        team_size: Average members per team
+        zone_times: Compute zone times (and rollups) for workouts with a series
+        password: Password of every user (None = unusable)
+        chunk_size: Users written per chunk
+        batch_size: Rows per INSERT
+        seed: Changes every generated value
+        tag: Prefix of the tenant's emails, names and ids
+    """
+    users: int = 10000
+    years: float = 2.0
+    workouts_per_week: float = 3.5
+    rides: int = 30000
+    series_ratio: float = 0.25
+    graph_variants: int = 4
+    challenges: int = 6
+    challenge_weeks: int = 6
+    participation: float = 0.4
+    team_size: int = 50
+    zone_times: bool = True
+    password: str = None
+    chunk_size: int = 250
+    batch_size: int = 2000
+    seed: int = 0
+    tag: str = 'tenant'
+
+
+@dataclass
+class TenantReport:
+    """Rows written and seconds spent per phase."""
+    rows: Counter = field(default_factory=Counter)
+    seconds: dict = field(default_factory=dict)
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+
+@dataclass
+class GraphTemplate:
+    """One pooled performance graph, parsed once and reused by many workouts."""
+    details: dict
+    series_fields: dict = None
+    series: object = None
+    power_curve: dict = field(default_factory=dict)
+
+
+def _digest(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def tenant_id_prefix(tag):
+    return f"{TENANT_ID_PREFIX}{_digest(tag)[:8]}"
+
+
+def tenant_id(tag, kind, index):
+    """Hex Peloton id: the tenant's prefix, a digest of (kind, index), then the index."""
+    return f"{tenant_id_prefix(tag)}{_digest(tag, kind, index)[:8]}{index:08x}"
+
+
+def tenant_email_pattern(tag):
+    return rf'^{re.escape(tag)}-[0-9]+@example\.com$'
+
+
+def tenant_exists(tag):
+    return get_user_model().objects.filter(email__regex=tenant_email_pattern(tag)).exists()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class TenantGenerator:
+    """Writes one synthetic tenant; see the module docstring."""
+
+    def __init__(self, config=None):
+        self.config = config or TenantConfig()
+        if not re.match(TAG_PATTERN, self.config.tag):
+            raise ValueError(f"Tenant tag must match {TAG_PATTERN}: {self.config.tag!r}")
+        self.api = FakePelotonAPI(FakePelotonConfig(library_size=self.config.rides, seed=self.config.seed))
+        self.report = TenantReport()
+        self.today = date.today()
+        self.first_day = self.today - timedelta(days=int(self.config.years * 365))
+        # discipline -> [(ride pk, duration)]
+        self.library = defaultdict(list)
+        # discipline -> [(ride pk, peloton ride id, title)] for challenge assignments
+        self.assignable = defaultdict(list)
+        # (discipline, duration) -> [GraphTemplate]
+        self.graphs = {}
+        # user pk -> (n, adherence) in creation order
+        self.users = {}
+        self.password_hash = make_password(self.config.password)
+        self.fetched_at = timezone.now()
+
+    def run(self):
+        if tenant_exists(self.config.tag):
+            raise ValueError(f"Tenant {self.config.tag!r} already exists; delete it first")
+        self._timed('library', self.create_library)
+        self._timed('users', self.create_users)
+        self._timed('challenges', self.create_challenges)
+        return self.report
+
+    def _timed(self, phase, func):
+        started = time.perf_counter()
+        func()
+        self.report.seconds[phase] = time.perf_counter() - started
+        logger.info(f"Synthetic tenant {self.config.tag}: {phase} done in {self.report.seconds[phase]:.1f}s")
+
+    def _write(self, model, rows, **kwargs):
+        model.objects.bulk_create(rows, batch_size=self.config.batch_size, **kwargs)
+        self.report.rows[model.__name__] += len(rows)
+
+    # ------------------------------------------------------------------------------
+    # Library
+    # ------------------------------------------------------------------------------
+    def create_library(self):
+        from classes.services.library_metrics import refresh_ride_metrics
+
+        tag = self.config.tag
+        WorkoutType.objects.bulk_create(
+            [WorkoutType(slug=slug, name=slug.title()) for slug in DISCIPLINES], ignore_conflicts=True,
+        )
+        workout_types = {wt.slug: wt for wt in WorkoutType.objects.filter(slug__in=DISCIPLINES)}
+
+        instructors = []
+        for index in range(INSTRUCTOR_COUNT):
+            payload = self.api.instructor(index)
+            instructors.append(Instructor(
+                peloton_id=tenant_id(tag, 'instructor', index),
+                name=payload['name'],
+                image_url=payload['image_url'],
+            ))
+        self._write(Instructor, instructors, ignore_conflicts=True)
+        instructor_by_pid = Instructor.objects.in_bulk(
+            [instructor.peloton_id for instructor in instructors], field_name='peloton_id'
+        )
+
+        indexes = list(range(self.config.rides))
+        graph_rides = {}
+        for chunk in _chunks(indexes, self.config.batch_size):
+            rows = []
+            for index in chunk:
+                ride_id = tenant_id(tag, 'ride', index)
+                ride_details = self.api.ride_details(index)
+                ride_data = ride_details['ride']
+                graph_rides.setdefault((ride_data['fitness_discipline'], ride_data['duration']), index)
+                rows.append(RideDetail(
+                    peloton_ride_id=ride_id,
+                    workout_type=workout_types[ride_data['fitness_discipline']],
+                    instructor=instructor_by_pid[tenant_id(tag, 'instructor', index % INSTRUCTOR_COUNT)],
+                    **ride_detail_defaults(ride_id, ride_details),
+                ))
+            self._write(RideDetail, rows)
+            stored = RideDetail.objects.select_related('workout_type', 'instructor').in_bulk(
+                [row.peloton_ride_id for row in rows], field_name='peloton_ride_id'
+            )
+            # bulk_create sends no post_save, so build the class library and search indexes here
+            refresh_ride_metrics(stored.values())
+            refresh_search_documents(stored.values())
+            for ride in (stored[row.peloton_ride_id] for row in rows):
+                self.library[ride.fitness_discipline].append((ride.pk, ride.duration_seconds))
+                if ride.duration_seconds <= 2700:
+                    self.assignable[ride.fitness_discipline].append((ride.pk, ride.peloton_ride_id, ride.title))
+
+        for key, ride_index in graph_rides.items():
+            self.graphs[key] = [
+                self._graph_template(self.api.ride_performance_graph(ride_index, variant))
+                for variant in range(max(1, self.config.graph_variants))
+            ]
+
+    @staticmethod
+    def _graph_template(performance_graph):
+        details = WorkoutDetails()
+        apply_summary_metrics(details, extract_summary_metrics(performance_graph), performance_graph.get('duration'))
+        template = GraphTemplate(details={
+            field_name: getattr(details, field_name)
+            for field_name in ('duration_seconds', 'total_calories', 'avg_output', 'max_output', 'total_output',
+                               'avg_speed', 'max_speed', 'distance', 'avg_heart_rate', 'max_heart_rate',
+                               'avg_cadence', 'max_cadence', 'avg_resistance', 'max_resistance')
+        })
+        template.details['target_metrics'] = extract_target_metrics(performance_graph)
+
+        seconds = performance_graph.get('seconds_since_pedaling_start', [])
+        metrics = performance_graph.get('metrics', [])
+        if seconds and metrics:
+            row = build_time_series(0, build_performance_samples(seconds, extract_metric_series(metrics)))
+            template.series_fields = {
+                field_name: getattr(row, field_name)
+                for field_name in ['sample_count', 'encoding', 'timestamps'] + CHANNELS
+            }
+            template.series = series_from_row(row)
+            template.power_curve = mean_max_curve(template.series.timestamps, template.series.column('output'))
+        return template
+
+    # ------------------------------------------------------------------------------
+    # Users, targets and workout histories
+    # ------------------------------------------------------------------------------
+    def create_users(self):
+        numbers = list(range(self.config.users))
+        for chunk in _chunks(numbers, self.config.chunk_size):
+            with transaction.atomic():
+                self._create_user_chunk(chunk)
+
+    def _user_rng(self, n):
+        return random.Random(f"{self.config.seed}:user:{n}")
+
+    def _create_user_chunk(self, numbers):
+        tag = self.config.tag
+        User = get_user_model()
+        emails = {TENANT_EMAIL.format(tag=tag, n=n): n for n in numbers}
+        self._write(User, [
+            User(email=email, password=self.password_hash, is_active=True, date_joined=self.fetched_at)
+            for email in emails
+        ])
+        pks = {emails[email]: pk for email, pk in User.objects.filter(email__in=list(emails)).values_list('email', 'pk')}
+
+        profiles, wizards, ftp_entries, pace_entries = [], [], [], []
+        planned = []  # (workout, discipline, GraphTemplate, with series)
+        for n in numbers:
+            rng = self._user_rng(n)
+            user_id = pks[n]
+            start = self.first_day + timedelta(days=rng.randint(0, max(0, (self.today - self.first_day).days // 2)))
+            weights = [rng.uniform(2, 6), rng.uniform(0, 3), rng.uniform(0, 2), rng.uniform(0, 1.5)]
+            ftp_history = self._ftp_history(rng, user_id, start)
+            pace_history = self._pace_history(rng, user_id, start) if weights[1] > 1 else []
+            ftp_entries += ftp_history
+            pace_entries += pace_history
+            workouts = self._workout_history(rng, n, user_id, start, weights)
+            planned += workouts
+            self.users[user_id] = (n, rng.uniform(0.4, 0.95))
+
+            profiles.append(Profile(
+                user_id=user_id,
+                full_name=f"Tenant User {n}",
+                peloton_leaderboard_name=f"{tag}_{n}".replace('-', '_'),
+                ftp_score=ftp_history[-1].ftp_value,
+                pace_target_level=pace_history[-1].level if pace_history else None,
+                peloton_total_workouts=len(workouts),
+                peloton_total_output=int(sum(template.details['total_output'] or 0 for _, _, template, _ in workouts)),
+                peloton_total_calories=sum(template.details['total_calories'] or 0 for _, _, template, _ in workouts),
+                peloton_last_synced_at=self.fetched_at,
+            ))
+            wizards.append(OnboardingWizard(
+                user_id=user_id, current_stage=6, completed_stages=[1, 2, 3, 4, 5, 6], completed_at=self.fetched_at,
+            ))
+
+        # bulk_create sends no post_save, so create what the user signals would
+        self._write(Profile, profiles)
+        self._write(OnboardingWizard, wizards)
+        self._write(FTPEntry, ftp_entries)
+        self._write(PaceEntry, pace_entries)
+        self._write_workouts(list(pks.values()), planned)
+
+    def _ftp_history(self, rng, user_id, start):
+        entries = []
+        ftp = rng.randint(130, 300)
+        day = start
+        while day <= self.today:
+            entries.append(FTPEntry(
+                user_id=user_id, ftp_value=ftp, recorded_date=day, source='ftp_test', is_active=False,
+            ))
+            ftp = max(100, int(ftp * rng.uniform(0.95, 1.07)))
+            day += timedelta(weeks=rng.randint(6, 12))
+        entries[-1].is_active = True
+        return entries
+
+    def _pace_history(self, rng, user_id, start):
+        entries = []
+        level = rng.randint(2, 7)
+        day = start
+        while day <= self.today:
+            entries.append(PaceEntry(
+                user_id=user_id, level=level, activity_type='running', recorded_date=day, source='pace_test',
+                is_active=False,
+            ))
+            level = min(10, max(1, level + rng.choice((-1, 0, 1, 1))))
+            day += timedelta(weeks=rng.randint(8, 16))
+        entries[-1].is_active = True
+        return entries
+
+    def _workout_history(self, rng, n, user_id, start, weights):
+        tag = self.config.tag
+        daily_chance = min(1.0, self.config.workouts_per_week * rng.uniform(0.5, 1.5) / 7)
+        timezone_name = rng.choice(TIMEZONES)
+        workouts = []
+        day = start
+        while day <= self.today:
+            if rng.random() < daily_chance:
+                discipline = rng.choices(DISCIPLINES, weights)[0]
+                rides = self.library.get(discipline)
+                if rides:
+                    ride_pk, duration = rng.choice(rides)
+                    completed_at = datetime.combine(day, dt_time(rng.randint(5, 21), rng.randint(0, 59)), tzinfo=dt_timezone.utc)
+                    template = rng.choice(self.graphs[(discipline, duration)])
+                    with_series = template.series_fields is not None and rng.random() < self.config.series_ratio
+                    workout = Workout(
+                        user_id=user_id,
+                        ride_detail_id=ride_pk,
+                        peloton_workout_id=tenant_id(tag, 'workout', n * 100_000 + len(workouts)),
+                        recorded_date=day,
+                        completed_date=day,
+                        completed_at=completed_at,
+                        peloton_created_at=completed_at,
+                        peloton_timezone=timezone_name,
+                    )
+                    workouts.append((workout, discipline, template, with_series))
+            day += timedelta(days=1)
+        return workouts
+
+    def _write_workouts(self, user_ids, planned):
+        self._write(Workout, [workout for workout, _, _, _ in planned])
+        pks = dict(Workout.objects.filter(user_id__in=user_ids).values_list('peloton_workout_id', 'pk'))
+
+        details, series_rows, peaks = [], [], []
+        series_by_workout = {}
+        for workout, _, template, with_series in planned:
+            workout_id = pks[workout.peloton_workout_id]
+            details.append(WorkoutDetails(
+                workout_id=workout_id, performance_graph_fetched_at=self.fetched_at, **template.details,
+            ))
+            if with_series:
+                series_rows.append(WorkoutTimeSeries(workout_id=workout_id, **template.series_fields))
+                peaks += [
+                    WorkoutPowerPeak(workout_id=workout_id, duration_seconds=duration, watts=round(watts, 1))
+                    for duration, watts in template.power_curve.items()
+                ]
+                series_by_workout[workout_id] = template.series
+        self._write(WorkoutDetails, details)
+        self._write(WorkoutTimeSeries, series_rows)
+        self._write(WorkoutPowerPeak, peaks)
+        if self.config.zone_times and series_by_workout:
+            self.report.rows['WorkoutZoneTime'] += compute_zone_times(series_by_workout, timeline=TargetsTimeline())
+
+    # ------------------------------------------------------------------------------
+    # Challenges, teams and weekly plans
+    # ------------------------------------------------------------------------------
+    def create_challenges(self):
+        if not self.config.challenges or not self.users:
+            return
+        tag = self.config.tag
+        rng = random.Random(f"{self.config.seed}:challenges")
+        template = self._plan_template()
+        weeks = max(1, self.config.challenge_weeks)
+
+        # Challenges start on Sundays, at least a week apart; the last one is running
+        this_week = DateRangeService.sunday_of_current_week(self.today)
+        last_start = this_week - timedelta(weeks=weeks // 2)
+        spacing = max(weeks + 1, (last_start - self.first_day).days // 7 // self.config.challenges)
+        user_ids = list(self.users)
+        team_count = max(1, math.ceil(len(user_ids) * self.config.participation / max(1, self.config.team_size)))
+        teams = self._teams(rng, team_count, user_ids)
+
+        for number in range(self.config.challenges):
+            start_date = last_start - timedelta(weeks=spacing * (self.config.challenges - 1 - number))
+            challenge = Challenge.objects.create(
+                name=f"{tag} challenge {number + 1}",
+                description="Synthetic challenge for performance testing",
+                start_date=start_date,
+                end_date=start_date + timedelta(weeks=weeks, days=-1),
+                challenge_type='team',
+                categories='cycling,running,strength,yoga',
+                default_template=template,
+            )
+            challenge.available_templates.add(template)
+            self.report.rows['Challenge'] += 1
+            self._challenge_workouts(rng, challenge, template, weeks)
+
+            participants = rng.sample(user_ids, max(1, int(len(user_ids) * self.config.participation)))
+            materializer = PlanMaterializer(template, challenge)
+            for chunk in _chunks(participants, self.config.chunk_size):
+                with transaction.atomic():
+                    self._join_challenge(challenge, template, materializer, teams, chunk, weeks)
+
+    def _plan_template(self):
+        Exercise.objects.get_or_create(
+            name=PLAN_EXERCISE_NAME,
+            defaults={'category': 'mobility', 'key_cue': 'Gentle pelvic tilts.', 'reps_hold': '10 reps'},
+        )
+        template, created = PlanTemplate.objects.get_or_create(
+            name=f"{self.config.tag} plan", defaults={'description': "Synthetic plan for performance testing"},
+        )
+        if created:
+            PlanTemplateDay.objects.bulk_create([
+                PlanTemplateDay(template=template, day_of_week=dow, peloton_focus=focus)
+                for dow, (focus, _) in PLAN_DAYS.items()
+            ])
+        return template
+
+    def _teams(self, rng, count, user_ids):
+        Team.objects.bulk_create([
+            Team(name=f"{self.config.tag} team {number + 1:03d}", leader_id=rng.choice(user_ids))
+            for number in range(count)
+        ])
+        self.report.rows['Team'] += count
+        return list(Team.objects.filter(name__startswith=f"{self.config.tag} team ").order_by('name'))
+
+    def _challenge_workouts(self, rng, challenge, template, weeks):
+        assignments, bonuses = [], []
+        for week_number in range(1, weeks + 1):
+            for dow, (_, discipline) in PLAN_DAYS.items():
+                rides = self.assignable.get(discipline)
+                if not rides:
+                    continue
+                ride_pk, ride_id, title = rng.choice(rides)
+                assignments.append(ChallengeWorkoutAssignment(
+                    challenge=challenge, template=template, week_number=week_number, day_of_week=dow,
+                    activity_type=ACTIVITY_FOR_DISCIPLINE[discipline], peloton_url=generate_peloton_url(ride_id),
+                    workout_title=title, points=50, ride_detail_id=ride_pk,
+                ))
+            if self.assignable.get('cycling'):
+                ride_pk, ride_id, title = rng.choice(self.assignable['cycling'])
+                bonuses.append(ChallengeBonusWorkout(
+                    challenge=challenge, week_number=week_number, activity_type='ride',
+                    peloton_url=generate_peloton_url(ride_id), workout_title=title, points=10,
+                ))
+        self._write(ChallengeWorkoutAssignment, assignments)
+        self._write(ChallengeBonusWorkout, bonuses)
+
+    def _join_challenge(self, challenge, template, materializer, teams, user_ids, weeks):
+        ended = challenge.has_ended
+        self._write(ChallengeInstance, [
+            ChallengeInstance(
+                user_id=user_id, challenge=challenge, selected_template=template,
+                is_active=not ended, completed_at=timezone.now() if ended else None,
+            )
+            for user_id in user_ids
+        ])
+        instances = dict(
+            ChallengeInstance.objects.filter(challenge=challenge, user_id__in=user_ids).values_list('user_id', 'pk')
+        )
+        self._write(TeamMember, [
+            TeamMember(team=teams[self.users[user_id][0] % len(teams)], challenge_instance_id=instances[user_id])
+            for user_id in user_ids
+        ])
+
+        week_starts = [challenge.start_date + timedelta(weeks=week) for week in range(weeks)]
+        self._write(WeeklyPlan, [
+            WeeklyPlan(
+                user_id=user_id, week_start=week_start, template_name=template.name,
+                challenge_instance_id=instances[user_id],
+            )
+            for user_id in user_ids
+            for week_start in week_starts
+        ])
+        plans = list(WeeklyPlan.objects.filter(challenge_instance_id__in=list(instances.values())))
+        items = []
+        for plan in plans:
+            rng = self._user_rng(f"{self.users[plan.user_id][0]}:{plan.week_start}")
+            adherence = self.users[plan.user_id][1]
+            week_number = (plan.week_start - challenge.start_date).days // 7 + 1
+            for item in materializer.build_items(plan, week_number=week_number):
+                day = plan.week_start + timedelta(days=item.day_of_week)
+                if day < self.today and rng.random() < adherence:
+                    for url_field, done_field in zip(URL_FIELDS, DONE_FIELDS):
+                        if getattr(item, url_field):
+                            setattr(item, done_field, True)
+                    item.is_done = True
+                    item.completed_at = datetime.combine(day, dt_time(18), tzinfo=dt_timezone.utc)
+                items.append(item)
+        self._write(DailyPlanItem, items)
+        WeeklyPlan.recalculate_points_for(plans)
+
+
+def generate_tenant(config=None):
+    """Write a synthetic tenant (see TenantConfig) and return its TenantReport."""
+    return TenantGenerator(config).run()
+
+
+def delete_tenant(tag, chunk_size=250):
+    """
+    Delete everything a tenant run wrote.
+
+    Users go a chunk at a time (their workouts, plans and challenge
+    participations cascade), then the tenant's challenges, teams, plan
+    template, classes and instructors.
+
+    Returns:
+        int: users deleted
+    """
+    User = get_user_model()
+    user_ids = list(User.objects.filter(email__regex=tenant_email_pattern(tag)).values_list('pk', flat=True))
+    for chunk in _chunks(user_ids, chunk_size):
+        with transaction.atomic():
+            User.objects.filter(pk__in=chunk).delete()
+    Challenge.objects.filter(name__startswith=f"{tag} challenge ").delete()
+    Team.objects.filter(name__startswith=f"{tag} team ").delete()
+    PlanTemplate.objects.filter(name=f"{tag} plan").delete()
+    RideDetail.objects.filter(peloton_ride_id__startswith=tenant_id_prefix(tag)).delete()
+    Instructor.objects.filter(peloton_id__startswith=tenant_id_prefix(tag)).delete()
+    return len(user_ids)
@@ -0,0 +1,321 @@
+"""Packed per-workout time-series storage.
+
+A workout's samples are stored as one WorkoutTimeSeries row holding a
+compressed typed array per channel, instead of one WorkoutPerformanceData row
+per sample. Arrays are little-endian `array.array` buffers compressed with
+zlib, so they can be loaded with `numpy.frombuffer` when NumPy is available.
+
+Readers should go through `get_series` / `get_performance_samples` /
+`load_series_map`, which fall back to legacy WorkoutPerformanceData rows for
+workouts that have not been migrated yet (see the
+`migrate_performance_time_series` management command).
+"""
+import logging
+import math
+import sys
+import zlib
+from array import array
+from typing import NamedTuple, Optional
+
+try:  # NumPy is optional; plain lists are returned without it
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from ..models import Workout, WorkoutPerformanceData, WorkoutTimeSeries
+from .power_curve import store_power_curves
+from .sparklines import invalidate_sparklines
+from .zone_times import compute_zone_times
+
+logger = logging.getLogger(__name__)
+
+ENCODING = 'zlib-le-v1'
+
+INT_MISSING = -2 ** 31
+
+INTENSITY_ZONES = ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']
+_INTENSITY_CODES = {zone: idx for idx, zone in enumerate(INTENSITY_ZONES, start=1)}
+
+# channel -> array typecode
+CHANNEL_TYPECODES = {
+    'output': 'd',
+    'cadence': 'i',
+    'resistance': 'd',
+    'speed': 'd',
+    'heart_rate': 'i',
+    'power_zone': 'b',
+    'intensity_zone': 'b',
+}
+CHANNELS = list(CHANNEL_TYPECODES)
+
+
+class PerformanceSample(NamedTuple):
+    """One sample; mirrors the fields of WorkoutPerformanceData."""
+    timestamp: int
+    output: Optional[float] = None
+    cadence: Optional[int] = None
+    resistance: Optional[float] = None
+    speed: Optional[float] = None
+    heart_rate: Optional[int] = None
+    power_zone: Optional[int] = None
+    intensity_zone: Optional[str] = None
+
+
+class PerformanceSeries:
+    """Decoded time series for one workout, sorted by timestamp."""
+
+    def __init__(self, timestamps, channels=None):
+        self.timestamps = list(timestamps)
+        self.channels = {name: values for name, values in (channels or {}).items() if values is not None}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __bool__(self):
+        return bool(self.timestamps)
+
+    def has(self, channel):
+        """True if the channel has at least one non-missing value."""
+        return any(v is not None for v in self.channels.get(channel, ()))
+
+    def column(self, channel):
+        """Values for a channel as a list (None for missing samples)."""
+        values = self.channels.get(channel)
+        if values is None:
+            return [None] * len(self.timestamps)
+        return list(values)
+
+    def values(self, channel):
+        """Non-missing values for a channel, in timestamp order."""
+        return [v for v in self.channels.get(channel, ()) if v is not None]
+
+    def pairs(self, channel):
+        """(timestamp, value) pairs for the non-missing samples of a channel."""
+        values = self.channels.get(channel, ())
+        return [(t, v) for t, v in zip(self.timestamps, values) if v is not None]
+
+    def samples(self):
+        """List of PerformanceSample tuples (row-like view of the series)."""
+        columns = [self.column(name) for name in CHANNELS]
+        return [PerformanceSample(t, *row) for t, *row in zip(self.timestamps, *columns)]
+
+    def as_numpy(self, channel=None):
+        """
+        Return the series as NumPy arrays.
+
+        Missing float values are NaN; missing int values are NaN in a float
+        array. Zone channels are returned as object arrays.
+
+        Args:
+            channel: a single channel name, or None for a dict of every channel
+                plus 'timestamp'.
+
+        Raises:
+            ImportError: if NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("NumPy is required for PerformanceSeries.as_numpy()")
+
+        def _convert(name):
+            if name == 'timestamp':
+                return np.asarray(self.timestamps, dtype=np.int64)
+            if name in ('power_zone', 'intensity_zone'):
+                return np.asarray(self.column(name), dtype=object)
+            return np.asarray([np.nan if v is None else v for v in self.column(name)], dtype=np.float64)
+
+        if channel is not None:
+            return _convert(channel)
+        return {name: _convert(name) for name in ['timestamp'] + CHANNELS}
+
+
+def _pack(typecode, values):
+    buf = array(typecode, values)
+    if sys.byteorder != 'little':
+        buf.byteswap()
+    return zlib.compress(buf.tobytes())
+
+
+def _unpack(typecode, blob):
+    buf = array(typecode)
+    buf.frombytes(zlib.decompress(bytes(blob)))
+    if sys.byteorder != 'little':
+        buf.byteswap()
+    return buf
+
+
+def encode_channel(channel, values):
+    """Pack one channel's values; returns None if every value is missing."""
+    if all(v is None for v in values):
+        return None
+    typecode = CHANNEL_TYPECODES[channel]
+    if typecode == 'd':
+        packed = [math.nan if v is None else float(v) for v in values]
+    elif channel == 'intensity_zone':
+        packed = [_INTENSITY_CODES.get(v, 0) for v in values]
+    elif typecode == 'b':
+        packed = [int(v) if v is not None and 0 < int(v) < 128 else 0 for v in values]
+    else:
+        packed = [INT_MISSING if v is None else int(v) for v in values]
+    return _pack(typecode, packed)
+
+
+def decode_channel(channel, blob):
+    """Unpack one channel into a list with None for missing samples."""
+    if blob is None:
+        return None
+    typecode = CHANNEL_TYPECODES[channel]
+    raw = _unpack(typecode, blob)
+    if typecode == 'd':
+        return [None if math.isnan(v) else v for v in raw]
+    if channel == 'intensity_zone':
+        return [INTENSITY_ZONES[v - 1] if 0 < v <= len(INTENSITY_ZONES) else None for v in raw]
+    if typecode == 'b':
+        return [v or None for v in raw]
+    return [None if v == INT_MISSING else v for v in raw]
+
+
+def build_time_series(workout, samples):
+    """
+    Build an unsaved WorkoutTimeSeries from sample-like objects.
+
+    Args:
+        workout: Workout instance (or pk)
+        samples: iterable of objects with WorkoutPerformanceData attributes
+            (model rows, PerformanceSample tuples, ...)
+    """
+    ordered = sorted(samples, key=lambda s: s.timestamp)
+    series = WorkoutTimeSeries(
+        sample_count=len(ordered),
+        encoding=ENCODING,
+        timestamps=_pack('i', [int(s.timestamp) for s in ordered]),
+    )
+    if isinstance(workout, Workout):
+        series.workout = workout
+    else:
+        series.workout_id = workout
+    for channel in CHANNELS:
+        setattr(series, channel, encode_channel(channel, [getattr(s, channel, None) for s in ordered]))
+    return series
+
+
+def series_from_row(row):
+    """Decode a WorkoutTimeSeries row into a PerformanceSeries."""
+    if row.encoding != ENCODING:
+        raise ValueError(f"Unsupported time series encoding: {row.encoding}")
+    timestamps = list(_unpack('i', row.timestamps))
+    channels = {channel: decode_channel(channel, getattr(row, channel)) for channel in CHANNELS}
+    return PerformanceSeries(timestamps, channels)
+
+
+def series_from_samples(samples):
+    """Build a PerformanceSeries from legacy row-per-sample objects."""
+    ordered = sorted(samples, key=lambda s: s.timestamp)
+    return PerformanceSeries(
+        [s.timestamp for s in ordered],
+        {channel: [getattr(s, channel, None) for s in ordered] for channel in CHANNELS},
+    )
+
+
+def store_time_series(rows):
+    """
+    Upsert WorkoutTimeSeries rows and drop the legacy per-sample rows they replace.
+
+    Also refreshes each workout's stored power curve (see power_curve) and
+    time-in-zone vector (see zone_times), and drops its card sparkline.
+
+    Args:
+        rows: unsaved WorkoutTimeSeries instances (see build_time_series)
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    WorkoutTimeSeries.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=['sample_count', 'encoding', 'timestamps'] + CHANNELS + ['updated_at'],
+    )
+    workout_ids = [row.workout_id for row in rows]
+    WorkoutPerformanceData.objects.filter(workout_id__in=workout_ids).delete()
+    invalidate_sparklines(workout_ids=workout_ids)
+    series_by_workout = {row.workout_id: series_from_row(row) for row in rows}
+    store_power_curves(series_by_workout)
+    compute_zone_times(series_by_workout)
+    return len(rows)
+
+
+def get_series(workout):
+    """
+    Return the PerformanceSeries for a workout.
+
+    Uses `workout.time_series` (select_related it for lists) and falls back to
+    legacy WorkoutPerformanceData rows, honouring any prefetch of
+    `performance_data`.
+    """
+    try:
+        row = workout.time_series
+    except WorkoutTimeSeries.DoesNotExist:
+        row = None
+    if row is not None:
+        return series_from_row(row)
+    return series_from_samples(workout.performance_data.all())
+
+
+def get_performance_samples(workout):
+    """Row-like samples for a workout, ordered by timestamp."""
+    return get_series(workout).samples()
+
+
+def load_series_map(workout_ids):
+    """
+    Load series for many workouts in two queries.
+
+    Returns:
+        dict: workout id -> PerformanceSeries (workouts without data are omitted)
+    """
+    workout_ids = list(workout_ids)
+    result = {}
+    for row in WorkoutTimeSeries.objects.filter(workout_id__in=workout_ids).iterator(chunk_size=200):
+        result[row.workout_id] = series_from_row(row)
+
+    legacy_ids = [wid for wid in workout_ids if wid not in result]
+    if legacy_ids:
+        legacy = {}
+        for sample in (
+            WorkoutPerformanceData.objects
+            .filter(workout_id__in=legacy_ids)
+            .order_by('workout_id', 'timestamp')
+            .iterator(chunk_size=5000)
+        ):
+            legacy.setdefault(sample.workout_id, []).append(sample)
+        for wid, samples in legacy.items():
+            result[wid] = series_from_samples(samples)
+    return result
+
+
+def channel_mean(workout_ids, channel):
+    """Mean of a channel across every sample of the given workouts, or None."""
+    total = 0.0
+    count = 0
+    for series in load_series_map(workout_ids).values():
+        values = series.values(channel)
+        total += sum(values)
+        count += len(values)
+    return (total / count) if count else None
+
+
+def workouts_with_series_q(*channels):
+    """
+    Q filter for workouts with data in any of the given channels, in either
+    the packed store or legacy rows.
+    """
+    from django.db.models import Exists, OuterRef, Q
+
+    q = Q()
+    legacy = Q()
+    for channel in channels:
+        q |= Q(**{f'time_series__{channel}__isnull': False})
+        legacy |= Q(**{f'{channel}__isnull': False})
+    legacy_rows = WorkoutPerformanceData.objects.filter(legacy, workout_id=OuterRef('pk'))
+    return q | Q(Exists(legacy_rows))
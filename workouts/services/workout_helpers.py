@@ -4,6 +4,7 @@ import json
 from django.utils.safestring import mark_safe
 
 from .metrics import MetricsCalculator
+from .time_series import get_performance_samples
 from ..models import Playlist
 from core.utils.pace_converter import (
     pace_zone_to_level,
@@ -16,7 +17,7 @@ from core.utils.pace_converter import (
     PACE_ZONE_COLORS,
 )
 from core.utils.chart_helpers import normalize_series_to_svg_points, scaled_zone_value_from_output
-from core.utils.workout_targets import target_segment_at_time_with_shift
+from core.utils.workout_targets import target_segments_at_times
 
 
 metrics_calculator = MetricsCalculator()
@@ -32,7 +33,7 @@ def estimate_workout_avg_speed_mph(workout):
         pass
 
     try:
-        perf = list(workout.performance_data.all())
+        perf = get_performance_samples(workout)
     except Exception:
         perf = []
     speeds = []
@@ -99,7 +100,7 @@ def estimate_workout_tss(workout, user_profile=None):
         pass
 
     try:
-        perf = list(workout.performance_data.all())
+        perf = get_performance_samples(workout)
     except Exception:
         perf = []
     outputs = []
@@ -192,7 +193,7 @@ def build_workout_card_chart(workout, user_profile=None):
     if not ride:
         return None
 
-    perf = list(getattr(workout, 'performance_data', []).all() if hasattr(workout, 'performance_data') else [])
+    perf = get_performance_samples(workout) if isinstance(getattr(workout, 'pk', None), int) else []
     if not perf:
         return None
 
@@ -345,10 +346,11 @@ def build_workout_card_chart(workout, user_profile=None):
 
     # Attach target values to points (so scaling includes them and tooltip can show them)
     if target_segments:
-        for pt in series:
-            t = pt.get('t')
-            if isinstance(t, int):
-                seg = target_segment_at_time_with_shift(target_segments, t, shift_seconds=TARGET_TIME_SHIFT_SECONDS)
+        point_segments = target_segments_at_times(
+            target_segments, [pt.get('t') for pt in series], shift_seconds=TARGET_TIME_SHIFT_SECONDS
+        )
+        for pt, seg in zip(series, point_segments):
+            if isinstance(pt.get('t'), int):
                 if not isinstance(seg, dict):
                     continue
 
@@ -0,0 +1,481 @@
+"""Per-workout time-in-zone vectors and per-user daily/monthly rollups.
+
+Vectors are computed when a workout's time series is stored (or lazily for
+workouts synced before this existed) using the FTP / pace level in effect on
+the workout date. Rollups are sums of those vectors per user, kind and
+day/month, so "time in zone this month / last 12 months / all time" reads a
+handful of rows instead of every sample.
+
+FTP or pace entry changes drop the affected vectors and rollups; the next read
+recomputes them (see `ensure_zone_times` / `ensure_user_zone_times`).
+"""
+import logging
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from ..models import (
+    Workout,
+    WorkoutPerformanceData,
+    WorkoutTimeSeries,
+    WorkoutZoneTime,
+    ZoneTimeRollup,
+)
+
+logger = logging.getLogger(__name__)
+
+KIND_POWER = 'power'
+KIND_PACE = 'pace'
+
+ZONE_FIELDS = [f'zone_{i}' for i in range(1, 8)]
+
+PACE_ZONE_KEYS = ['recovery', 'easy', 'moderate', 'challenging', 'hard', 'very_hard', 'max']
+
+# Longest gap between samples credited to a zone
+MAX_SAMPLE_GAP = 300
+
+# Same workout selection ZoneCalculatorService has always used
+CYCLING_WORKOUTS_Q = (
+    Q(ride_detail__fitness_discipline__in=['cycling', 'ride'])
+    | Q(ride_detail__workout_type__slug__in=['cycling', 'ride'])
+    | Q(ride_detail__workout_type__name__icontains='cycle')
+    | Q(ride_detail__workout_type__name__icontains='bike')
+)
+RUNNING_WORKOUTS_Q = (
+    Q(ride_detail__fitness_discipline__in=['running', 'run', 'walking'])
+    | Q(ride_detail__workout_type__slug__in=['running', 'run', 'walking'])
+    | Q(ride_detail__workout_type__name__icontains='run')
+    | Q(ride_detail__workout_type__name__icontains='walk')
+    | Q(ride_detail__workout_type__name__icontains='tread')
+)
+KIND_WORKOUTS_Q = {KIND_POWER: CYCLING_WORKOUTS_Q, KIND_PACE: RUNNING_WORKOUTS_Q}
+
+
+def classify_zone_kind(discipline, type_slug=None, type_name=None):
+    """Return KIND_POWER, KIND_PACE or None for a workout's discipline / type."""
+    discipline = (discipline or '').lower()
+    type_slug = (type_slug or '').lower()
+    type_name = (type_name or '').lower()
+    if discipline in ('cycling', 'ride') or type_slug in ('cycling', 'ride') or 'cycle' in type_name or 'bike' in type_name:
+        return KIND_POWER
+    if (
+        discipline in ('running', 'run', 'walking')
+        or type_slug in ('running', 'run', 'walking')
+        or any(word in type_name for word in ('run', 'walk', 'tread'))
+    ):
+        return KIND_PACE
+    return None
+
+
+def power_zone_for_ratio(ratio):
+    """Power zone 1-7 for output / FTP."""
+    for zone, upper in enumerate((0.55, 0.75, 0.90, 1.05, 1.20, 1.50), start=1):
+        if ratio < upper:
+            return zone
+    return 7
+
+
+def _pace_zone_from_speed(speed, pace_ranges):
+    if pace_ranges:
+        for idx, key in enumerate(PACE_ZONE_KEYS, start=1):
+            bounds = pace_ranges.get(key)
+            if bounds and speed <= bounds[1]:
+                return idx
+        return 7
+    # No pace level known: generic treadmill speed bands (mph)
+    for zone, upper in enumerate((4.0, 5.5, 7.0, 8.5, 10.0, 12.0), start=1):
+        if speed < upper:
+            return zone
+    return 7
+
+
+def _pace_zone_from_heart_rate(hr):
+    for zone, upper in enumerate((120, 140, 160, 175, 185, 195), start=1):
+        if hr < upper:
+            return zone
+    return 7
+
+
+def sample_zone(sample, kind, ftp=None, pace_ranges=None):
+    """Zone index 1-7 for one sample, or None."""
+    if kind == KIND_POWER:
+        if sample.power_zone and 1 <= sample.power_zone <= 7:
+            return sample.power_zone
+        if sample.output and ftp:
+            return power_zone_for_ratio(float(sample.output) / float(ftp))
+        return None
+    if sample.intensity_zone in PACE_ZONE_KEYS:
+        return PACE_ZONE_KEYS.index(sample.intensity_zone) + 1
+    if sample.speed:
+        return _pace_zone_from_speed(float(sample.speed), pace_ranges)
+    if sample.heart_rate:
+        return _pace_zone_from_heart_rate(sample.heart_rate)
+    return None
+
+
+def zone_seconds(samples, kind, ftp=None, pace_ranges=None, single_sample_seconds=None):
+    """
+    Seconds per zone for a sorted list of samples.
+
+    Each sample is credited with the gap to the next one (ignoring gaps of
+    MAX_SAMPLE_GAP or more); the last sample gets the first gap, a lone
+    sample gets `single_sample_seconds` (class length) or 5 seconds.
+
+    Returns:
+        list: 7 ints, zone 1 first
+    """
+    totals = [0] * 7
+    if not samples:
+        return totals
+    if len(samples) > 1:
+        default_gap = samples[1].timestamp - samples[0].timestamp
+    else:
+        default_gap = single_sample_seconds or 5
+
+    for idx, sample in enumerate(samples):
+        zone = sample_zone(sample, kind, ftp=ftp, pace_ranges=pace_ranges)
+        if not zone:
+            continue
+        if idx + 1 < len(samples):
+            gap = samples[idx + 1].timestamp - sample.timestamp
+        else:
+            gap = default_gap
+        if 0 < gap < MAX_SAMPLE_GAP:
+            totals[zone - 1] += gap
+    return totals
+
+
+class TargetsTimeline:
+    """FTP and pace levels per user and date, loaded once per user."""
+
+    def __init__(self):
+        self._ftp = {}
+        self._pace = {}
+        self._profiles = {}
+
+    def _profile(self, user_id):
+        if user_id not in self._profiles:
+            from accounts.models import Profile
+
+            self._profiles[user_id] = (
+                Profile.objects.filter(user_id=user_id).values('ftp_score', 'pace_target_level').first() or {}
+            )
+        return self._profiles[user_id]
+
+    def ftp_at(self, user_id, on_date):
+        """FTP in effect on a date (latest entry on/before it, else current FTP)."""
+        if user_id not in self._ftp:
+            from accounts.models import FTPEntry
+
+            entries = list(
+                FTPEntry.objects.filter(user_id=user_id)
+                .order_by('recorded_date', 'created_at')
+                .values_list('recorded_date', 'ftp_value', 'is_active')
+            )
+            current = next((value for _, value, active in reversed(entries) if active), None)
+            if current is None:
+                current = self._profile(user_id).get('ftp_score')
+            self._ftp[user_id] = ([e[0] for e in entries], [e[1] for e in entries], current)
+        dates, values, current = self._ftp[user_id]
+        if on_date is not None:
+            idx = bisect_right(dates, on_date)
+            if idx:
+                return values[idx - 1]
+        return current
+
+    def pace_level_at(self, user_id, activity_type, on_date):
+        """Pace level in effect on a date for 'running' or 'walking'."""
+        key = (user_id, activity_type)
+        if key not in self._pace:
+            from accounts.models import PaceEntry
+
+            entries = list(
+                PaceEntry.objects.filter(user_id=user_id, activity_type=activity_type)
+                .order_by('recorded_date', 'created_at')
+                .values_list('recorded_date', 'level', 'is_active')
+            )
+            current = next((level for _, level, active in reversed(entries) if active), None)
+            if current is None:
+                current = self._profile(user_id).get('pace_target_level')
+            self._pace[key] = ([e[0] for e in entries], [e[1] for e in entries], current)
+        dates, values, current = self._pace[key]
+        if on_date is not None:
+            idx = bisect_right(dates, on_date)
+            if idx:
+                return values[idx - 1]
+        return current
+
+
+def pace_ranges_for_level(activity_type, level):
+    """{zone key: (min_mph, max_mph)} for a pace level, or None."""
+    if not level:
+        return None
+    if activity_type == 'walking':
+        from accounts.walking_pace_levels_data import DEFAULT_WALKING_PACE_LEVELS as levels
+    else:
+        from accounts.pace_converter import DEFAULT_RUNNING_PACE_LEVELS as levels
+    data = levels.get(int(level))
+    if not data:
+        return None
+    return {key: (values[0], values[1]) for key, values in data.items()}
+
+
+def _workout_info(workout_ids):
+    return {
+        row['id']: row
+        for row in Workout.objects.filter(id__in=workout_ids).values(
+            'id', 'user_id', 'completed_date',
+            'ride_detail__fitness_discipline', 'ride_detail__duration_seconds',
+            'ride_detail__workout_type__slug', 'ride_detail__workout_type__name',
+        )
+    }
+
+
+def compute_zone_times(series_by_workout, kind=None, timeline=None):
+    """
+    Compute and store zone vectors for workouts, then refresh their rollups.
+
+    Args:
+        series_by_workout: dict workout id -> PerformanceSeries
+        kind: KIND_POWER / KIND_PACE, or None to classify each workout
+        timeline: optional TargetsTimeline to share FTP/pace lookups
+
+    Returns:
+        int: number of vectors written
+    """
+    if not series_by_workout:
+        return 0
+    timeline = timeline or TargetsTimeline()
+    info = _workout_info(list(series_by_workout))
+
+    rows = []
+    for workout_id, series in series_by_workout.items():
+        meta = info.get(workout_id)
+        if not meta or not series:
+            continue
+        row_kind = kind or classify_zone_kind(
+            meta['ride_detail__fitness_discipline'],
+            meta['ride_detail__workout_type__slug'],
+            meta['ride_detail__workout_type__name'],
+        )
+        if row_kind is None:
+            continue
+
+        user_id = meta['user_id']
+        on_date = meta['completed_date']
+        ftp = pace_level = pace_ranges = None
+        if row_kind == KIND_POWER:
+            ftp = timeline.ftp_at(user_id, on_date)
+        else:
+            discipline = (meta['ride_detail__fitness_discipline'] or '').lower()
+            activity_type = 'walking' if discipline in ('walking', 'walk') else 'running'
+            pace_level = timeline.pace_level_at(user_id, activity_type, on_date)
+            pace_ranges = pace_ranges_for_level(activity_type, pace_level)
+
+        totals = zone_seconds(
+            series.samples(), row_kind, ftp=ftp, pace_ranges=pace_ranges,
+            single_sample_seconds=meta['ride_detail__duration_seconds'],
+        )
+        rows.append(WorkoutZoneTime(
+            workout_id=workout_id,
+            user_id=user_id,
+            kind=row_kind,
+            completed_date=on_date,
+            ftp_value=float(ftp) if ftp else None,
+            pace_level=pace_level,
+            **dict(zip(ZONE_FIELDS, totals)),
+        ))
+
+    if rows:
+        WorkoutZoneTime.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['workout', 'kind'],
+            update_fields=ZONE_FIELDS + ['user', 'completed_date', 'ftp_value', 'pace_level', 'updated_at'],
+        )
+        refresh_zone_rollups({(row.user_id, row.kind, row.completed_date) for row in rows})
+    return len(rows)
+
+
+def _has_series_q():
+    return Q(Exists(WorkoutTimeSeries.objects.filter(workout_id=OuterRef('pk')))) | Q(
+        Exists(WorkoutPerformanceData.objects.filter(workout_id=OuterRef('pk')))
+    )
+
+
+def _compute_missing(workouts, kind):
+    from .time_series import load_series_map
+
+    missing = list(
+        workouts.filter(_has_series_q())
+        .exclude(Exists(WorkoutZoneTime.objects.filter(workout_id=OuterRef('pk'), kind=kind)))
+        .values_list('id', flat=True)
+    )
+    if not missing:
+        return 0
+    logger.info(f"Computing {kind} zone times for {len(missing)} workouts")
+    return compute_zone_times(load_series_map(missing), kind=kind)
+
+
+def ensure_zone_times(workout_ids, kind):
+    """Compute vectors of `kind` for any of the workouts that have samples but no vector yet.
+
+    `workout_ids` may be a list or an id queryset (used as a subquery).
+    """
+    return _compute_missing(Workout.objects.filter(id__in=workout_ids), kind)
+
+
+def ensure_user_zone_times(user_id, kind):
+    """Compute any missing vectors for a user's workouts of the given kind."""
+    return _compute_missing(Workout.objects.filter(KIND_WORKOUTS_Q[kind], user_id=user_id), kind)
+
+
+def sum_zone_times(workout_ids, kind):
+    """Total seconds per zone (list of 7) over the stored vectors of the given workouts."""
+    totals = WorkoutZoneTime.objects.filter(workout_id__in=workout_ids, kind=kind).aggregate(
+        **{field: Sum(field) for field in ZONE_FIELDS}
+    )
+    return [totals[field] or 0 for field in ZONE_FIELDS]
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def refresh_zone_rollups(keys):
+    """
+    Rebuild the day and month rollups touched by a set of vectors.
+
+    Args:
+        keys: iterable of (user_id, kind, completed_date)
+    """
+    touched = defaultdict(lambda: (set(), set()))
+    for user_id, kind, day in keys:
+        if day is None:
+            continue
+        days, months = touched[(user_id, kind)]
+        days.add(day)
+        months.add(_month_start(day))
+
+    sums = {field: Sum(field) for field in ZONE_FIELDS}
+    for (user_id, kind), (days, months) in touched.items():
+        vectors = WorkoutZoneTime.objects.filter(user_id=user_id, kind=kind)
+        rows = []
+        for row in (
+            vectors.filter(completed_date__in=days)
+            .values('completed_date')
+            .annotate(workout_count=Count('id'), **sums)
+            .order_by()
+        ):
+            rows.append(_rollup(user_id, kind, ZoneTimeRollup.PERIOD_DAY, row['completed_date'], row))
+        month_q = Q()
+        for month in months:
+            month_q |= Q(completed_date__year=month.year, completed_date__month=month.month)
+        for row in (
+            vectors.filter(month_q)
+            .annotate(month=TruncMonth('completed_date'))
+            .values('month')
+            .annotate(workout_count=Count('id'), **sums)
+            .order_by()
+        ):
+            month = row['month']
+            if hasattr(month, 'date'):
+                month = month.date()
+            rows.append(_rollup(user_id, kind, ZoneTimeRollup.PERIOD_MONTH, month, row))
+
+        rollups = ZoneTimeRollup.objects.filter(user_id=user_id, kind=kind)
+        rollups.filter(
+            Q(period=ZoneTimeRollup.PERIOD_DAY, period_start__in=days)
+            | Q(period=ZoneTimeRollup.PERIOD_MONTH, period_start__in=months)
+        ).delete()
+        ZoneTimeRollup.objects.bulk_create(rows)
+
+
+def _rollup(user_id, kind, period, period_start, row):
+    return ZoneTimeRollup(
+        user_id=user_id,
+        kind=kind,
+        period=period,
+        period_start=period_start,
+        workout_count=row['workout_count'],
+        **{field: row[field] or 0 for field in ZONE_FIELDS},
+    )
+
+
+def rollup_zone_seconds(user_id, kind, start=None, end=None):
+    """
+    Seconds per zone (list of 7) for a user between two dates (inclusive).
+
+    Whole months come from month rollups and partial months at either end from
+    day rollups. `start=None` means all time; `end=None` means no upper bound.
+    """
+    ensure_user_zone_times(user_id, kind)
+
+    # Whole months are [lo, hi); the partial months at either end come from day rows
+    lo = None if start is None else (start if start.day == 1 else _next_month(start))
+    hi = None if end is None else _month_start(end + timedelta(days=1))
+
+    if lo is not None and hi is not None and lo >= hi:
+        q = Q(period=ZoneTimeRollup.PERIOD_DAY, period_start__gte=start, period_start__lte=end)
+    else:
+        months = Q(period=ZoneTimeRollup.PERIOD_MONTH)
+        if lo is not None:
+            months &= Q(period_start__gte=lo)
+        if hi is not None:
+            months &= Q(period_start__lt=hi)
+        q = months
+        if start is not None and start < lo:
+            q |= Q(period=ZoneTimeRollup.PERIOD_DAY, period_start__gte=start, period_start__lt=lo)
+        if end is not None and hi <= end:
+            q |= Q(period=ZoneTimeRollup.PERIOD_DAY, period_start__gte=hi, period_start__lte=end)
+
+    totals = ZoneTimeRollup.objects.filter(q, user_id=user_id, kind=kind).aggregate(
+        **{field: Sum(field) for field in ZONE_FIELDS}
+    )
+    return [totals[field] or 0 for field in ZONE_FIELDS]
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def invalidate_zone_times(user_id, kind):
+    """Drop a user's vectors and rollups of one kind; they are rebuilt on the next read."""
+    WorkoutZoneTime.objects.filter(user_id=user_id, kind=kind).delete()
+    ZoneTimeRollup.objects.filter(user_id=user_id, kind=kind).delete()
+
+
+_pending = threading.local()
+
+
+def queue_rollup_refresh(user_id, day):
+    """
+    Refresh a user's rollups for a day once the current transaction commits.
+
+    Used when workouts are deleted (their vectors cascade away); keys are
+    collected so a bulk delete triggers one refresh.
+    """
+    if day is None:
+        return
+    keys = {(user_id, KIND_POWER, day), (user_id, KIND_PACE, day)}
+    if not connection.in_atomic_block:
+        refresh_zone_rollups(keys)
+        return
+    # One callback per call keeps this correct across rollbacks; the first
+    # flush after commit takes every queued key and the rest are no-ops.
+    if getattr(_pending, 'keys', None) is None:
+        _pending.keys = set()
+    _pending.keys.update(keys)
+    transaction.on_commit(_flush_pending_rollups)
+
+
+def _flush_pending_rollups():
+    keys = getattr(_pending, 'keys', None)
+    _pending.keys = None
+    if keys:
+        refresh_zone_rollups(keys)
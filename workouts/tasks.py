@@ -3,13 +3,15 @@ Celery tasks for background processing of workout sync operations.
 """
 import logging
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from peloton.models import PelotonConnection
 from peloton.services.peloton import PelotonClient, PelotonAPIError
-from .models import Workout, RideDetail, WorkoutDetails, WorkoutPerformanceData, Instructor, WorkoutType
-from challenges.utils import generate_peloton_url
-from .views import _store_playlist_from_data, detect_class_type
+from .models import Workout
+from .services.bulk_writer import WorkoutBatchWriter
+from .services.payload_archive import archive_responses
+from .services.performance_ingest import store_performance_graph
 from core.utils.redis_lock import RedisLock
 
 logger = logging.getLogger(__name__)
@@ -35,85 +37,18 @@ def store_ride_detail_from_api(client, ride_id, logger_instance=None):
     try:
         logger_instance.info(f"Fetching ride details for ride_id {ride_id}")
         ride_details = client.fetch_ride_details(ride_id)
+        archive_responses(ride_details={ride_id: ride_details})
         ride_data = ride_details.get('ride', {})
         
         if not ride_data:
             logger_instance.warning(f"No ride data found for ride_id {ride_id}")
             return {'status': 'error', 'message': 'No ride data found'}
         
-        # Extract class_type_ids and equipment_ids
-        class_type_ids = ride_data.get('class_type_ids', [])
-        if not isinstance(class_type_ids, list):
-            class_type_ids = []
-        
-        equipment_ids = ride_data.get('equipment_ids', [])
-        if not isinstance(equipment_ids, list):
-            equipment_ids = []
-        
-        equipment_tags = ride_data.get('equipment_tags', [])
-        if not isinstance(equipment_tags, list):
-            equipment_tags = []
-        
-        # Generate standardized Peloton URL in UK format
-        peloton_class_url = generate_peloton_url(ride_id) if ride_id else ''
-        
-        # Create or update RideDetail so placeholders are replaced with real data
-        ride_detail, created = RideDetail.objects.update_or_create(
-            peloton_ride_id=ride_id,
-            defaults={
-                'title': ride_data.get('title', ''),
-                'description': ride_data.get('description', ''),
-                'duration_seconds': ride_data.get('duration', 0),
-                'workout_type': WorkoutType.objects.get_or_create(
-                    slug=ride_data.get('fitness_discipline', 'other').lower(),
-                    defaults={'name': ride_data.get('fitness_discipline', 'other').title()}
-                )[0],
-                'fitness_discipline': ride_data.get('fitness_discipline', ''),
-                'fitness_discipline_display_name': ride_data.get('fitness_discipline_display_name', ''),
-                'difficulty_rating_avg': ride_data.get('difficulty_rating_avg'),
-                'difficulty_rating_count': ride_data.get('difficulty_rating_count', 0),
-                'difficulty_level': ride_data.get('difficulty_level') or None,
-                'overall_estimate': ride_data.get('overall_estimate'),
-                'difficulty_estimate': ride_data.get('difficulty_estimate'),
-                'image_url': ride_data.get('image_url', ''),
-                'home_peloton_id': ride_data.get('home_peloton_id') or '',
-                'peloton_class_url': peloton_class_url,
-                'original_air_time': ride_data.get('original_air_time'),
-                'scheduled_start_time': ride_data.get('scheduled_start_time'),
-                'created_at_timestamp': ride_data.get('created_at'),
-                'class_type': detect_class_type(ride_data, ride_details),
-                'class_type_ids': class_type_ids,
-                'equipment_ids': equipment_ids,
-                'equipment_tags': equipment_tags,
-                'target_metrics_data': ride_details.get('target_metrics_data', {}),
-                'target_class_metrics': ride_details.get('target_class_metrics', {}),
-                'pace_target_type': ride_details.get('pace_target_type'),
-                'segments_data': ride_details.get('segments', {}),
-                'is_archived': ride_data.get('is_archived', False),
-                'is_power_zone_class': ride_data.get('is_power_zone_class', False),
-            }
-        )
-        
-        # Update instructor if needed
-        instructor_id = ride_data.get('instructor_id')
-        if instructor_id:
-            instructor_obj = ride_data.get('instructor', {})
-            instructor_name = instructor_obj.get('name') or instructor_obj.get('full_name') or 'Unknown Instructor'
-            instructor, _ = Instructor.objects.get_or_create(
-                peloton_id=instructor_id,
-                defaults={
-                    'name': instructor_name,
-                    'image_url': instructor_obj.get('image_url', ''),
-                }
-            )
-            if ride_detail.instructor != instructor:
-                ride_detail.instructor = instructor
-                ride_detail.save()
-        
-        # Store playlist if available
-        playlist_data = ride_details.get('playlist')
-        if playlist_data:
-            _store_playlist_from_data(playlist_data, ride_detail, logger_instance)
+        # Same field mapping as the sync; placeholders are replaced with real data
+        with transaction.atomic():
+            stored, created_ids = WorkoutBatchWriter(user=None).store_fetched_ride_details({ride_id: ride_details})
+        ride_detail = stored[ride_id]
+        created = ride_id in created_ids
         
         logger_instance.debug(f"Successfully processed ride details for ride_id {ride_id} ({'created' if created else 'updated'})")
         return {'status': 'success', 'ride_detail_id': ride_detail.id, 'created': created}
@@ -150,65 +85,18 @@ def fetch_ride_details_task(self, user_id, ride_id, workout_id=None):
         
         logger.info(f"Fetching ride details for ride_id {ride_id} (user: {user.email})")
         ride_details = client.fetch_ride_details(ride_id)
+        archive_responses(ride_details={ride_id: ride_details})
         ride_data = ride_details.get('ride', {})
         
         if not ride_data:
             logger.warning(f"No ride data found for ride_id {ride_id}")
             return {'status': 'error', 'message': 'No ride data found'}
         
-        # Create or update RideDetail so placeholders are replaced with real data
-        ride_detail, created = RideDetail.objects.update_or_create(
-            peloton_ride_id=ride_id,
-            defaults={
-                'title': ride_data.get('title', ''),
-                'description': ride_data.get('description', ''),
-                'duration_seconds': ride_data.get('duration', 0),
-                'workout_type': WorkoutType.objects.get_or_create(
-                    slug=ride_data.get('fitness_discipline', 'other').lower(),
-                    defaults={'name': ride_data.get('fitness_discipline', 'other').title()}
-                )[0],
-                'fitness_discipline': ride_data.get('fitness_discipline', ''),
-                'fitness_discipline_display_name': ride_data.get('fitness_discipline_display_name', ''),
-                'difficulty_rating_avg': ride_data.get('difficulty_rating_avg'),
-                'difficulty_rating_count': ride_data.get('difficulty_rating_count', 0),
-                'difficulty_level': ride_data.get('difficulty_level') or None,
-                'overall_estimate': ride_data.get('overall_estimate'),
-                'difficulty_estimate': ride_data.get('difficulty_estimate'),
-                'image_url': ride_data.get('image_url', ''),
-                'home_peloton_id': ride_data.get('home_peloton_id') or '',
-                'original_air_time': ride_data.get('original_air_time'),
-                'scheduled_start_time': ride_data.get('scheduled_start_time'),
-                'created_at_timestamp': ride_data.get('created_at'),
-                'class_type': detect_class_type(ride_data, ride_details),
-                'target_metrics_data': ride_details.get('target_metrics_data', {}),
-                'target_class_metrics': ride_details.get('target_class_metrics', {}),
-                'pace_target_type': ride_details.get('pace_target_type'),
-                'segments_data': ride_details.get('segments', {}),
-                'is_archived': ride_data.get('is_archived', False),
-                'is_power_zone_class': ride_data.get('is_power_zone_class', False),
-            }
-        )
-        
-        # Update instructor if needed
-        instructor_id = ride_data.get('instructor_id')
-        if instructor_id:
-            instructor_obj = ride_data.get('instructor', {})
-            instructor_name = instructor_obj.get('name') or instructor_obj.get('full_name') or 'Unknown Instructor'
-            instructor, _ = Instructor.objects.get_or_create(
-                peloton_id=instructor_id,
-                defaults={
-                    'name': instructor_name,
-                    'image_url': instructor_obj.get('image_url', ''),
-                }
-            )
-            if ride_detail.instructor != instructor:
-                ride_detail.instructor = instructor
-                ride_detail.save()
-        
-        # Store playlist if available
-        playlist_data = ride_details.get('playlist')
-        if playlist_data:
-            _store_playlist_from_data(playlist_data, ride_detail, logger)
+        # Same field mapping as the sync; placeholders are replaced with real data
+        with transaction.atomic():
+            stored, created_ids = WorkoutBatchWriter(user=None).store_fetched_ride_details({ride_id: ride_details})
+        ride_detail = stored[ride_id]
+        created = ride_id in created_ids
         
         logger.info(f"Successfully processed ride details for ride_id {ride_id} ({'created' if created else 'updated'})")
         return {'status': 'success', 'ride_detail_id': ride_detail.id, 'created': created}
@@ -253,184 +141,10 @@ def fetch_performance_graph_task(self, user_id, workout_id, peloton_workout_id):
         
         logger.info(f"Fetching performance graph for workout {peloton_workout_id} (user: {user.email})")
         performance_graph = client.fetch_performance_graph(peloton_workout_id, every_n=5)
+        archive_responses(performance_graphs={peloton_workout_id: performance_graph})
         
-        # Extract metrics from performance graph
-        summaries_array = performance_graph.get('summaries', [])
-        metrics_array = performance_graph.get('metrics', [])
-        metrics_dict = {}
-        
-        # Extract from summaries array
-        for summary in summaries_array:
-            if isinstance(summary, dict):
-                slug = summary.get('slug')
-                value = summary.get('value')
-                if slug and value is not None:
-                    metrics_dict[slug] = value
-        
-        # Extract avg/max from metrics array
-        for metric in metrics_array:
-            if isinstance(metric, dict):
-                slug = metric.get('slug')
-                avg_value = metric.get('average_value')
-                max_value = metric.get('max_value')
-                
-                if slug:
-                    avg_field_map = {
-                        'output': 'avg_output',
-                        'cadence': 'avg_cadence',
-                        'resistance': 'avg_resistance',
-                        'speed': 'avg_speed',
-                        'heart_rate': 'avg_heart_rate',
-                    }
-                    max_field_map = {
-                        'output': 'max_output',
-                        'cadence': 'max_cadence',
-                        'resistance': 'max_resistance',
-                        'speed': 'max_speed',
-                        'heart_rate': 'max_heart_rate',
-                    }
-                    
-                    if avg_value is not None:
-                        field_name = avg_field_map.get(slug, f'avg_{slug}')
-                        metrics_dict[field_name] = avg_value
-                    if max_value is not None:
-                        field_name = max_field_map.get(slug, f'max_{slug}')
-                        metrics_dict[field_name] = max_value
-        
-        # Check average_summaries
-        average_summaries = performance_graph.get('average_summaries', [])
-        for summary in average_summaries:
-            if isinstance(summary, dict):
-                slug = summary.get('slug')
-                value = summary.get('value')
-                if slug and value is not None:
-                    avg_field_map = {
-                        'output': 'avg_output',
-                        'cadence': 'avg_cadence',
-                        'resistance': 'avg_resistance',
-                        'speed': 'avg_speed',
-                        'heart_rate': 'avg_heart_rate',
-                    }
-                    field_name = avg_field_map.get(slug, f'avg_{slug}')
-                    if field_name not in metrics_dict:
-                        metrics_dict[field_name] = value
-        
-        # Update workout details
-        if metrics_dict:
-            details, details_created = WorkoutDetails.objects.get_or_create(workout=workout)
-            details_updated = False
-            
-            # Helper to safely set float fields
-            def set_float_field(field_name, value):
-                try:
-                    setattr(details, field_name, float(value))
-                    return True
-                except (ValueError, TypeError):
-                    return False
-            
-            # Helper to safely set int fields
-            def set_int_field(field_name, value):
-                try:
-                    setattr(details, field_name, int(float(value)))
-                    return True
-                except (ValueError, TypeError):
-                    return False
-            
-            # TSS
-            if 'tss' in metrics_dict:
-                details_updated = set_float_field('tss', metrics_dict['tss']) or details_updated
-            if 'tss_target' in metrics_dict:
-                details_updated = set_float_field('tss_target', metrics_dict['tss_target']) or details_updated
-            
-            # Output metrics
-            if 'total_output' in metrics_dict:
-                details_updated = set_float_field('total_output', metrics_dict['total_output']) or details_updated
-            if 'avg_output' in metrics_dict:
-                details_updated = set_float_field('avg_output', metrics_dict['avg_output']) or details_updated
-            if 'max_output' in metrics_dict:
-                details_updated = set_float_field('max_output', metrics_dict['max_output']) or details_updated
-            
-            # Speed metrics
-            if 'avg_speed' in metrics_dict:
-                details_updated = set_float_field('avg_speed', metrics_dict['avg_speed']) or details_updated
-            if 'max_speed' in metrics_dict:
-                details_updated = set_float_field('max_speed', metrics_dict['max_speed']) or details_updated
-            
-            # Distance
-            if 'distance' in metrics_dict:
-                details_updated = set_float_field('distance', metrics_dict['distance']) or details_updated
-            
-            # Heart rate
-            if 'avg_heart_rate' in metrics_dict:
-                details_updated = set_int_field('avg_heart_rate', metrics_dict['avg_heart_rate']) or details_updated
-            if 'max_heart_rate' in metrics_dict:
-                details_updated = set_int_field('max_heart_rate', metrics_dict['max_heart_rate']) or details_updated
-            
-            # Cadence
-            if 'avg_cadence' in metrics_dict:
-                details_updated = set_int_field('avg_cadence', metrics_dict['avg_cadence']) or details_updated
-            if 'max_cadence' in metrics_dict:
-                details_updated = set_int_field('max_cadence', metrics_dict['max_cadence']) or details_updated
-            
-            # Resistance
-            if 'avg_resistance' in metrics_dict:
-                details_updated = set_float_field('avg_resistance', metrics_dict['avg_resistance']) or details_updated
-            if 'max_resistance' in metrics_dict:
-                details_updated = set_float_field('max_resistance', metrics_dict['max_resistance']) or details_updated
-            
-            # Calories
-            if 'calories' in metrics_dict or 'total_calories' in metrics_dict:
-                calories_value = metrics_dict.get('calories') or metrics_dict.get('total_calories')
-                details_updated = set_int_field('total_calories', calories_value) or details_updated
-            
-            if details_updated:
-                details.save()
-                logger.info(f"Updated WorkoutDetails for workout {peloton_workout_id} with {len(metrics_dict)} metrics")
-        
-        # Store time-series performance data
-        seconds_array = performance_graph.get('seconds_since_pedaling_start', [])
-        if seconds_array and metrics_array:
-            # Delete existing performance data
-            WorkoutPerformanceData.objects.filter(workout=workout).delete()
-            
-            # Build metric values by slug
-            metric_values_by_slug = {}
-            for metric in metrics_array:
-                slug = metric.get('slug')
-                values = metric.get('values', [])
-                if slug and values:
-                    metric_values_by_slug[slug] = values
-                
-                # For running classes, speed might be in pace alternatives
-                if slug == 'pace':
-                    alternatives = metric.get('alternatives', [])
-                    for alt in alternatives:
-                        alt_slug = alt.get('slug')
-                        alt_values = alt.get('values', [])
-                        if alt_slug == 'speed' and alt_values and 'speed' not in metric_values_by_slug:
-                            metric_values_by_slug['speed'] = alt_values
-            
-            # Create performance data entries
-            performance_data_entries = []
-            for idx, timestamp in enumerate(seconds_array):
-                if not isinstance(timestamp, (int, float)):
-                    continue
-                
-                perf_data = WorkoutPerformanceData(
-                    workout=workout,
-                    timestamp=int(timestamp),
-                    output=metric_values_by_slug.get('output', [None])[idx] if idx < len(metric_values_by_slug.get('output', [])) else None,
-                    cadence=int(metric_values_by_slug.get('cadence', [None])[idx]) if idx < len(metric_values_by_slug.get('cadence', [])) and metric_values_by_slug.get('cadence', [None])[idx] is not None else None,
-                    resistance=metric_values_by_slug.get('resistance', [None])[idx] if idx < len(metric_values_by_slug.get('resistance', [])) else None,
-                    speed=metric_values_by_slug.get('speed', [None])[idx] if idx < len(metric_values_by_slug.get('speed', [])) else None,
-                    heart_rate=int(metric_values_by_slug.get('heart_rate', [None])[idx]) if idx < len(metric_values_by_slug.get('heart_rate', [])) and metric_values_by_slug.get('heart_rate', [None])[idx] is not None else None,
-                )
-                performance_data_entries.append(perf_data)
-            
-            # Bulk create
-            if performance_data_entries:
-                WorkoutPerformanceData.objects.bulk_create(performance_data_entries, ignore_conflicts=True)
-                logger.info(f"Stored {len(performance_data_entries)} time-series data points for workout {peloton_workout_id}")
+        result = store_performance_graph(workout, performance_graph)
+        logger.info(f"Stored {result['samples']} time-series data points and {result['metrics']} metrics for workout {peloton_workout_id}")
         
         logger.info(f"Successfully processed performance graph for workout {peloton_workout_id}")
         return {'status': 'success', 'workout_id': workout_id}
@@ -467,7 +181,7 @@ def batch_fetch_ride_details(user_id, ride_ids):
 def batch_fetch_ride_details_async(self, user_id, ride_ids, concurrency=10):
     """
     Batch task that fetches multiple ride details concurrently using AsyncPelotonClient.
-    This uses aiohttp under the hood; make sure `aiohttp` is installed in the worker image.
+    Requests share the worker's connection pool and Peloton rate limit.
 
     Args:
         user_id: Django user ID
@@ -475,133 +189,41 @@ def batch_fetch_ride_details_async(self, user_id, ride_ids, concurrency=10):
         concurrency: max concurrent requests
     """
     try:
-        import asyncio
-        from peloton.async_client import AsyncPelotonClient
+        from peloton.async_client import AsyncPelotonClient, run_async
         user = User.objects.get(pk=user_id)
         connection = PelotonConnection.objects.get(user=user, is_active=True)
-        # Use existing PelotonClient to obtain headers/cookies for auth
-        sync_client = connection.get_client()
-        headers = dict(sync_client.session.headers) if getattr(sync_client, 'session', None) else None
-        # Convert requests cookies to simple dict if present
-        cookies = None
-        try:
-            if getattr(sync_client.session, 'cookies', None):
-                cookies = sync_client.session.cookies.get_dict()
-        except Exception:
-            cookies = None
 
         async def _fetch_all():
-            results = []
-            sem = asyncio.Semaphore(concurrency)
-            async with AsyncPelotonClient(base_url=sync_client.base_url, timeout=sync_client.timeout, headers=headers, cookies=cookies) as client:
-                async def _fetch_one(rid):
-                    async with sem:
-                        try:
-                            data = await client.fetch_ride_details(rid)
-                            return (rid, data, None)
-                        except Exception as e:
-                            return (rid, None, e)
-
-                tasks = [asyncio.create_task(_fetch_one(rid)) for rid in ride_ids]
-                for coro in asyncio.as_completed(tasks):
-                    res = await coro
-                    results.append(res)
-            return results
-
-        loop = asyncio.new_event_loop()
-        try:
-            asyncio.set_event_loop(loop)
-            fetched = loop.run_until_complete(_fetch_all())
-        finally:
-            try:
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            except Exception:
-                pass
-            asyncio.set_event_loop(None)
+            async with AsyncPelotonClient.for_connection(connection) as client:
+                return await client.fetch_many('fetch_ride_details', ride_ids, concurrency=concurrency)
+
+        fetched = [
+            (rid, None, result) if isinstance(result, Exception) else (rid, result, None)
+            for rid, result in run_async(_fetch_all()).items()
+        ]
 
         processed = []
+        to_store = {}
         for ride_id, ride_details, error in fetched:
             if error or not ride_details:
                 logger.warning(f"Batch fetch: failed to fetch ride {ride_id}: {error}")
                 processed.append({'ride_id': ride_id, 'status': 'error', 'error': str(error)})
-                continue
-
-            # Similar logic to store_ride_detail_from_api but using the already-fetched ride_details
-            ride_data = ride_details.get('ride', {})
-            if not ride_data:
+            elif not ride_details.get('ride'):
                 processed.append({'ride_id': ride_id, 'status': 'error', 'error': 'no ride data'})
-                continue
-
-            class_type_ids = ride_data.get('class_type_ids', []) if isinstance(ride_data.get('class_type_ids', []), list) else []
-            equipment_ids = ride_data.get('equipment_ids', []) if isinstance(ride_data.get('equipment_ids', []), list) else []
-            equipment_tags = ride_data.get('equipment_tags', []) if isinstance(ride_data.get('equipment_tags', []), list) else []
-
-            peloton_class_url = generate_peloton_url(ride_id) if ride_id else ''
+            else:
+                to_store[ride_id] = ride_details
 
+        if to_store:
+            archive_responses(ride_details=to_store)
             try:
-                workout_type_obj = WorkoutType.objects.get_or_create(
-                    slug=ride_data.get('fitness_discipline', 'other').lower(),
-                    defaults={'name': ride_data.get('fitness_discipline', 'Other').title()}
-                )[0]
-
-                ride_detail, created = RideDetail.objects.update_or_create(
-                    peloton_ride_id=ride_id,
-                    defaults={
-                        'title': ride_data.get('title', ''),
-                        'description': ride_data.get('description', ''),
-                        'duration_seconds': ride_data.get('duration', 0),
-                        'workout_type': workout_type_obj,
-                        'fitness_discipline': ride_data.get('fitness_discipline', ''),
-                        'fitness_discipline_display_name': ride_data.get('fitness_discipline_display_name', ''),
-                        'difficulty_rating_avg': ride_data.get('difficulty_rating_avg'),
-                        'difficulty_rating_count': ride_data.get('difficulty_rating_count', 0),
-                        'difficulty_level': ride_data.get('difficulty_level') or None,
-                        'overall_estimate': ride_data.get('overall_estimate'),
-                        'difficulty_estimate': ride_data.get('difficulty_estimate'),
-                        'image_url': ride_data.get('image_url', ''),
-                        'home_peloton_id': ride_data.get('home_peloton_id') or '',
-                        'peloton_class_url': peloton_class_url,
-                        'original_air_time': ride_data.get('original_air_time'),
-                        'scheduled_start_time': ride_data.get('scheduled_start_time'),
-                        'created_at_timestamp': ride_data.get('created_at'),
-                        'class_type': detect_class_type(ride_data, ride_details),
-                        'class_type_ids': class_type_ids,
-                        'equipment_ids': equipment_ids,
-                        'equipment_tags': equipment_tags,
-                        'target_metrics_data': ride_details.get('target_metrics_data', {}),
-                        'target_class_metrics': ride_details.get('target_class_metrics', {}),
-                        'pace_target_type': ride_details.get('pace_target_type'),
-                        'segments_data': ride_details.get('segments', {}),
-                        'is_archived': ride_data.get('is_archived', False),
-                        'is_power_zone_class': ride_data.get('is_power_zone_class', False),
-                    }
+                _, created_ids = WorkoutBatchWriter(user).store_fetched_ride_details(to_store)
+                processed.extend(
+                    {'ride_id': ride_id, 'status': 'success', 'created': ride_id in created_ids}
+                    for ride_id in to_store
                 )
-
-                # Instructor handling
-                instructor_id = ride_data.get('instructor_id')
-                if instructor_id:
-                    instructor_obj = ride_data.get('instructor', {})
-                    instructor_name = instructor_obj.get('name') or instructor_obj.get('full_name') or 'Unknown Instructor'
-                    instructor, _ = Instructor.objects.get_or_create(
-                        peloton_id=instructor_id,
-                        defaults={'name': instructor_name, 'image_url': instructor_obj.get('image_url', '')}
-                    )
-                    if ride_detail.instructor != instructor:
-                        ride_detail.instructor = instructor
-                        ride_detail.save()
-
-                # Playlist
-                playlist_data = ride_details.get('playlist')
-                if playlist_data:
-                    try:
-                        _store_playlist_from_data(playlist_data, ride_detail, logger)
-                    except Exception:
-                        logger.exception(f"Failed to store playlist for ride {ride_id}")
-
-                processed.append({'ride_id': ride_id, 'status': 'success', 'created': created})
             except Exception as e:
-                logger.exception(f"Error storing ride_detail for {ride_id}: {e}")
-                processed.append({'ride_id': ride_id, 'status': 'error', 'error': str(e)})
+                logger.exception(f"Error storing ride details for batch of {len(to_store)} rides: {e}")
+                processed.extend({'ride_id': ride_id, 'status': 'error', 'error': str(e)} for ride_id in to_store)
 
         return {'status': 'completed', 'results': processed}
 
@@ -629,3 +251,156 @@ def batch_fetch_performance_graphs(user_id, workout_data_list):
         )
         results.append(result)
     return results
+
+
+# ------------------------------------------------------------------------------
+# Background workout sync pipeline (see workouts.services.sync_engine)
+# ------------------------------------------------------------------------------
+MAX_SYNC_RESUMES = 5
+
+
+def enqueue_sync_page(job_id, page):
+    """Chain the list -> ride details -> performance -> persist stages for one page."""
+    from celery import chain
+    return chain(
+        sync_list_page.s(job_id, page),
+        sync_fetch_ride_details.s(),
+        sync_fetch_performance.s(),
+        sync_persist_page.s(),
+    ).apply_async()
+
+
+def _fail_sync_job(job_id, error):
+    from .services.sync_engine import WorkoutSyncEngine
+    try:
+        WorkoutSyncEngine.for_job_id(job_id).fail(error)
+    except Exception:
+        logger.exception(f"Could not mark sync job {job_id} as failed")
+
+
+@shared_task(bind=True, max_retries=3)
+def run_workout_sync_job(self, job_id):
+    """
+    Start (or restart) a WorkoutSyncJob from its checkpointed page.
+
+    Args:
+        job_id: WorkoutSyncJob ID
+    """
+    from .services.sync_engine import WorkoutSyncEngine
+    try:
+        engine = WorkoutSyncEngine.for_job_id(job_id)
+        engine.start()
+    except PelotonAPIError as e:
+        if self.request.retries >= self.max_retries:
+            _fail_sync_job(job_id, e)
+            return {'status': 'error', 'message': str(e)}
+        raise self.retry(exc=e, countdown=min(30 * (2 ** self.request.retries), 600))
+    except Exception as e:
+        logger.error(f"Could not start sync job {job_id}: {e}", exc_info=True)
+        _fail_sync_job(job_id, e)
+        return {'status': 'error', 'message': str(e)}
+
+    enqueue_sync_page(job_id, engine.job.next_page)
+    return {'status': 'started', 'job_id': job_id, 'page': engine.job.next_page}
+
+
+@shared_task(bind=True, max_retries=5)
+def sync_list_page(self, job_id, page):
+    """Stage 1: fetch one page of the user's workout list."""
+    from .services.sync_engine import SyncJobAborted, WorkoutSyncEngine
+    try:
+        return WorkoutSyncEngine.for_job_id(job_id).list_page(page)
+    except SyncJobAborted as e:
+        logger.info(f"Sync job {job_id}: skipping list stage ({e})")
+        return None
+    except PelotonAPIError as e:
+        if self.request.retries >= self.max_retries:
+            _fail_sync_job(job_id, e)
+            return None
+        raise self.retry(exc=e, countdown=min(30 * (2 ** self.request.retries), 900))
+
+
+@shared_task
+def sync_fetch_ride_details(payload):
+    """Stage 2: fetch ride details for rides on the page that we don't have yet."""
+    from .services.sync_engine import SyncJobAborted, WorkoutSyncEngine
+    if not payload:
+        return None
+    try:
+        return WorkoutSyncEngine.for_job_id(payload['job_id']).fetch_ride_details(payload)
+    except SyncJobAborted as e:
+        logger.info(f"Sync job {payload['job_id']}: skipping ride details stage ({e})")
+        return None
+
+
+@shared_task
+def sync_fetch_performance(payload):
+    """Stage 3: fetch detailed workouts and performance graphs for the page."""
+    from .services.sync_engine import SyncJobAborted, WorkoutSyncEngine
+    if not payload:
+        return None
+    try:
+        return WorkoutSyncEngine.for_job_id(payload['job_id']).fetch_performance(payload)
+    except SyncJobAborted as e:
+        logger.info(f"Sync job {payload['job_id']}: skipping performance stage ({e})")
+        return None
+
+
+@shared_task
+def sync_persist_page(payload):
+    """Stage 4: persist the page, checkpoint the job and chain the next page."""
+    from .services.sync_engine import SyncJobAborted, WorkoutSyncEngine
+    if not payload:
+        return None
+    job_id = payload['job_id']
+    try:
+        engine = WorkoutSyncEngine.for_job_id(job_id)
+        has_more = engine.persist_page(payload)
+    except SyncJobAborted as e:
+        logger.info(f"Sync job {job_id}: skipping persist stage ({e})")
+        return None
+    except Exception as e:
+        logger.error(f"Sync job {job_id}: persist stage failed: {e}", exc_info=True)
+        _fail_sync_job(job_id, e)
+        return {'status': 'error', 'message': str(e)}
+
+    if has_more:
+        enqueue_sync_page(job_id, engine.job.next_page)
+        return {'status': 'running', 'job_id': job_id, 'next_page': engine.job.next_page}
+    engine.finish()
+    return {'status': 'completed', 'job_id': job_id}
+
+
+@shared_task
+def resume_stalled_sync_jobs(minutes=10):
+    """
+    Resume sync jobs whose pipeline stopped making progress (e.g. a killed worker).
+
+    Jobs restart from their last checkpointed page; a job that stalls more than
+    MAX_SYNC_RESUMES times is marked failed.
+    """
+    from django.db.models import Q
+    from datetime import timedelta
+    from .models import WorkoutSyncJob
+
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    stalled = WorkoutSyncJob.objects.filter(
+        Q(status=WorkoutSyncJob.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+        | Q(status=WorkoutSyncJob.STATUS_PENDING, created_at__lt=cutoff)
+    )
+    resumed = failed = 0
+    for job in stalled:
+        if job.resume_count >= MAX_SYNC_RESUMES:
+            _fail_sync_job(job.pk, f"Sync stalled {job.resume_count} times at page {job.next_page}")
+            failed += 1
+            continue
+        job.resume_count += 1
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['resume_count', 'heartbeat_at'])
+        logger.info(f"Resuming stalled sync job {job.pk} at page {job.next_page} (attempt {job.resume_count})")
+        if job.status == WorkoutSyncJob.STATUS_PENDING:
+            run_workout_sync_job.delay(job.pk)
+        else:
+            enqueue_sync_page(job.pk, job.next_page)
+        resumed += 1
+    return {'resumed': resumed, 'failed': failed}
@@ -1,8 +1,10 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 from datetime import datetime
-from .models import WorkoutType, Instructor, RideDetail
+from io import StringIO
+from .models import WorkoutType, Instructor, RideDetail, RideMetrics
 from .services.class_filter import ClassLibraryFilter
 
 User = get_user_model()
@@ -380,6 +382,72 @@ class ClassLibraryFilterTestCase(TestCase):
         results = filter_obj.get_queryset()
         self.assertEqual(results.count(), 1)
         self.assertEqual(results.first().peloton_ride_id, 'ride_2024_jan')
+    
+    def _set_library_metrics(self, ride, **values):
+        RideMetrics.objects.update_or_create(ride=ride, defaults=values)
+    
+    def test_saved_ride_gets_library_metrics_row(self):
+        """Saving a ride refreshes its RideMetrics index row"""
+        self.assertTrue(RideMetrics.objects.filter(ride=self.ride_2024_jan).exists())
+    
+    def test_apply_tss_and_intensity_filters(self):
+        """TSS / IF filters run against the RideMetrics index"""
+        self._set_library_metrics(self.ride_2024_jan, kind='power', tss=55.0, intensity_factor=0.82)
+        self._set_library_metrics(self.ride_2024_march, kind='pace', tss=30.0, intensity_factor=0.65)
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_tss_filter('50')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_jan'])
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_intensity_filter('0.6', '0.7')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_march'])
+        self.assertEqual(filter_obj.get_filters()['if_min'], '0.6')
+    
+    def test_apply_zone_filter(self):
+        """Zone filter matches the dominant zone or a minimum share of a zone"""
+        self._set_library_metrics(self.ride_2024_jan, kind='power', dominant_zone=4, zone_4_pct=60.0, zone_2_pct=40.0)
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_zone_filter('4')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_jan'])
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_zone_filter('2', '50')
+        self.assertEqual(filter_obj.get_queryset().count(), 0)
+
+    def test_apply_zone_filter_separates_power_and_pace_zones(self):
+        """Pace levels share the zone columns, so the zone filter also matches the metrics kind"""
+        self._set_library_metrics(self.ride_2024_jan, kind='power', dominant_zone=3, zone_3_pct=60.0)
+        self._set_library_metrics(self.ride_2024_march, kind='pace', dominant_zone=3, zone_3_pct=60.0)
+
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_zone_filter('3', '40')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_jan'])
+
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_workout_type_filter('running')
+        filter_obj.apply_zone_filter('3')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_march'])
+
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_zone_filter('3', kind='pace')
+        self.assertEqual([r.peloton_ride_id for r in filter_obj.get_queryset()], ['ride_2024_march'])
+    
+    def test_apply_ordering_by_tss(self):
+        """Ordering by TSS puts rides without metrics last"""
+        self._set_library_metrics(self.ride_2024_jan, kind='power', tss=55.0)
+        self._set_library_metrics(self.ride_2024_march, kind='pace', tss=30.0)
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_ordering('-tss')
+        ride_ids = [r.peloton_ride_id for r in filter_obj.get_queryset()]
+        self.assertEqual(ride_ids[:2], ['ride_2024_jan', 'ride_2024_march'])
+        
+        filter_obj = ClassLibraryFilter(self.base_queryset)
+        filter_obj.apply_ordering('tss')
+        ride_ids = [r.peloton_ride_id for r in filter_obj.get_queryset()]
+        self.assertEqual(ride_ids[:2], ['ride_2024_march', 'ride_2024_jan'])
 
 
 class ClassLibraryViewTestCase(TestCase):
@@ -1368,3 +1436,1013 @@ class ChartBuilderTestCase(TestCase):
         self.assertIsNotNone(metrics)
         self.assertIsNotNone(stats)
 
+
+
+class FakePelotonClient:
+    """In-memory stand-in for PelotonClient used by the sync engine tests"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def fetch_user_workouts_page(self, user_id, limit=20, page=0, **kwargs):
+        self.calls.append(('list', page))
+        data = self.pages[page] if page < len(self.pages) else []
+        return {'data': data, 'show_next': page + 1 < len(self.pages)}
+
+    def fetch_workout(self, workout_id):
+        self.calls.append(('workout', workout_id))
+        return {'id': workout_id, 'tss': 42.0}
+
+    def fetch_ride_details(self, ride_id):
+        self.calls.append(('ride', ride_id))
+        return {
+            'ride': {
+                'id': ride_id,
+                'title': f'Class {ride_id}',
+                'duration': 1800,
+                'fitness_discipline': 'cycling',
+                'instructor_id': 'instr_1',
+                'instructor': {'name': 'Coach One'},
+            },
+            'playlist': {'id': f'pl_{ride_id}', 'songs': [{'title': 'Song'}]},
+        }
+
+    def fetch_performance_graph(self, workout_id, every_n=5):
+        self.calls.append(('performance', workout_id))
+        return {
+            'duration': 1800,
+            'seconds_since_pedaling_start': [0, 5, 10],
+            'summaries': [{'slug': 'total_output', 'value': 300}],
+            'metrics': [
+                {'slug': 'output', 'values': [100, 150, 200], 'average_value': 150, 'max_value': 200},
+                {'slug': 'cadence', 'values': [80.0, 85.0, None]},
+            ],
+        }
+
+
+class WorkoutSyncEngineTestCase(TestCase):
+    """Tests for the staged, checkpointed background sync engine"""
+
+    def setUp(self):
+        from peloton.models import PelotonConnection
+        self.user = User.objects.create_user(email='sync@example.com', password='testpass123')
+        self.connection = PelotonConnection.objects.create(user=self.user, peloton_user_id='peloton_user')
+
+    def _workout(self, workout_id, ride_id, created_at=1735689600):
+        return {
+            'id': workout_id,
+            'fitness_discipline': 'cycling',
+            'created_at': created_at,
+            'start_time': created_at,
+            'ride': {'id': ride_id, 'title': f'Class {ride_id}'},
+        }
+
+    def _run_page(self, engine, page):
+        payload = engine.list_page(page)
+        payload = engine.fetch_ride_details(payload)
+        payload = engine.fetch_performance(payload)
+        return engine.persist_page(payload)
+
+    def test_full_sync_persists_pages_and_checkpoints(self):
+        from .models import Workout, WorkoutDetails, WorkoutSyncJob
+        from .services.sync_engine import WorkoutSyncEngine, create_sync_job
+        from .services.time_series import get_series
+
+        client = FakePelotonClient([
+            [self._workout('w1', 'r1'), self._workout('w2', 'r2')],
+            [self._workout('w3', 'r1')],
+        ])
+        job = create_sync_job(self.connection)
+        self.connection.refresh_from_db()
+        self.assertTrue(self.connection.sync_in_progress)
+        self.assertTrue(job.is_full_sync)
+
+        engine = WorkoutSyncEngine(job, client=client)
+        engine.start()
+        self.assertTrue(self._run_page(engine, 0))
+        self.assertEqual(engine.job.next_page, 1)
+        self.assertFalse(self._run_page(engine, 1))
+        engine.finish()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, WorkoutSyncJob.STATUS_COMPLETED)
+        self.assertEqual(job.pages_completed, 2)
+        self.assertEqual(job.workouts_synced, 3)
+        self.assertEqual(Workout.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Workout.objects.get(peloton_workout_id='w1').ride_detail.title, 'Class r1')
+        details = WorkoutDetails.objects.get(workout__peloton_workout_id='w1')
+        self.assertEqual(details.tss, 42.0)
+        self.assertEqual(details.total_output, 300.0)
+        self.assertEqual(details.duration_seconds, 1800)
+        series = get_series(Workout.objects.get(peloton_workout_id='w1'))
+        self.assertEqual(series.column('cadence'), [80, 85, None])
+        # r1 was fetched once: on the second page it already has a playlist
+        self.assertEqual(client.calls.count(('ride', 'r1')), 1)
+
+        self.connection.refresh_from_db()
+        self.assertFalse(self.connection.sync_in_progress)
+        self.assertIsNotNone(self.connection.last_sync_at)
+        self.assertIsNotNone(self.connection.sync_cooldown_until)
+
+    def test_checkpointed_page_is_not_persisted_twice(self):
+        from .services.sync_engine import SyncJobAborted, WorkoutSyncEngine, create_sync_job
+
+        client = FakePelotonClient([[self._workout('w1', 'r1')], [self._workout('w2', 'r2')]])
+        engine = WorkoutSyncEngine(create_sync_job(self.connection), client=client)
+        engine.start()
+        payload = engine.fetch_performance(engine.fetch_ride_details(engine.list_page(0)))
+        engine.persist_page(payload)
+
+        # A redelivered stage for the already-checkpointed page is ignored
+        with self.assertRaises(SyncJobAborted):
+            engine.persist_page(payload)
+        with self.assertRaises(SyncJobAborted):
+            engine.list_page(0)
+        self.assertEqual(engine.job.workouts_synced, 1)
+
+    def test_incremental_sync_stops_at_cutoff(self):
+        from datetime import timezone as dt_timezone
+        from .services.sync_engine import WorkoutSyncEngine, create_sync_job
+
+        self.connection.last_sync_at = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.connection.save()
+        newer = int(datetime(2025, 2, 1, tzinfo=dt_timezone.utc).timestamp())
+        older = int(datetime(2024, 6, 1, tzinfo=dt_timezone.utc).timestamp())
+        page = [self._workout('new', 'r1', newer)] + [
+            self._workout(f'old{i}', 'r1', older) for i in range(6)
+        ]
+        client = FakePelotonClient([page, [self._workout('never', 'r2', older)]])
+        job = create_sync_job(self.connection)
+        self.assertFalse(job.is_full_sync)
+
+        engine = WorkoutSyncEngine(job, client=client)
+        engine.start()
+        payload = engine.list_page(0)
+        self.assertEqual([w['id'] for w in payload['entries']], ['new'])
+        self.assertTrue(payload['stop'])
+        self.assertFalse(engine.persist_page(engine.fetch_performance(engine.fetch_ride_details(payload))))
+
+    def test_manual_workout_uses_title_override(self):
+        from .models import Workout
+        from .services.sync_engine import WorkoutSyncEngine, create_sync_job
+
+        manual = self._workout('m1', '00000000000000000000000000000000')
+        manual['ride']['title'] = 'Outdoor Ride'
+
+        class NoRideClient(FakePelotonClient):
+            def fetch_workout(self, workout_id):
+                return {'id': workout_id, 'ride': {'id': '00000000000000000000000000000000'}}
+
+        engine = WorkoutSyncEngine(create_sync_job(self.connection), client=NoRideClient([[manual]]))
+        engine.start()
+        self._run_page(engine, 0)
+        workout = Workout.objects.get(peloton_workout_id='m1')
+        self.assertEqual(workout.ride_detail.peloton_ride_id, 'manual_cycling_m1')
+        self.assertEqual(workout.title, 'Outdoor Ride')
+
+    def test_fetch_stages_fan_out_through_async_client(self):
+        from django.test.utils import override_settings
+        from peloton.async_client import reset_rate_limiter
+        from peloton.fake_server import FakePelotonConfig, FakePelotonServer
+        from .models import WorkoutDetails
+        from .services.sync_engine import WorkoutSyncEngine, create_sync_job
+
+        server = FakePelotonServer(FakePelotonConfig(workouts_per_user=5, library_size=10)).start()
+        self.addCleanup(server.stop)
+        self.addCleanup(reset_rate_limiter)
+        self.connection.peloton_user_id = server.api.make_id('user', 0)
+        self.connection.bearer_token = 'token'
+        self.connection.save()
+
+        with override_settings(PELOTON_API_BASE_URL=server.base_url, PELOTON_API_RATE_LIMIT=0):
+            reset_rate_limiter()
+            # No injected client: ride details and graphs go through AsyncPelotonClient
+            engine = WorkoutSyncEngine.for_job_id(create_sync_job(self.connection).pk)
+            engine.start()
+            payload = engine.fetch_ride_details(engine.list_page(0))
+            self.assertEqual(len(payload['ride_details']), len({w['ride']['id'] for w in payload['entries']}))
+            payload = engine.fetch_performance(payload)
+            self.assertEqual(len(payload['performance_graphs']), 5)
+            engine.persist_page(payload)
+
+        self.assertEqual(WorkoutDetails.objects.filter(workout__user=self.user).count(), 5)
+        self.assertEqual(server.api.requests['performance_graph'], 5)
+
+
+class SyncWorkoutsViewTestCase(TestCase):
+    """The sync view only enqueues a background job"""
+
+    def setUp(self):
+        from unittest.mock import patch
+        from accounts.models import OnboardingWizard
+        from peloton.models import PelotonConnection
+        self.user = User.objects.create_user(email='syncview@example.com', password='testpass123', is_active=True)
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        self.connection = PelotonConnection.objects.create(user=self.user, peloton_user_id='peloton_user')
+        self.client = Client()
+        self.client.force_login(self.user)
+        patcher = patch('workouts.tasks.run_workout_sync_job.delay')
+        self.mock_delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_post_enqueues_job_and_reports_progress(self):
+        from .models import WorkoutSyncJob
+        response = self.client.post(reverse('workouts:sync'), HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        job = WorkoutSyncJob.objects.get(user=self.user)
+        self.mock_delay.assert_called_once_with(job.pk)
+        self.assertTrue(response.context['sync_in_progress'])
+        self.assertEqual(response.context['sync_progress']['job_id'], job.pk)
+
+        status = self.client.get(reverse('workouts:sync_status')).json()
+        self.assertTrue(status['sync_in_progress'])
+        self.assertEqual(status['progress']['status'], WorkoutSyncJob.STATUS_PENDING)
+
+    def test_second_post_does_not_enqueue_again(self):
+        self.client.post(reverse('workouts:sync'))
+        self.client.post(reverse('workouts:sync'))
+        self.assertEqual(self.mock_delay.call_count, 1)
+
+
+class WorkoutBatchWriterTestCase(TestCase):
+    """Bulk upsert path used by the sync engine"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='writer@example.com', password='testpass123')
+
+    def _entries(self, count, ride_prefix='ride'):
+        return [
+            {
+                'id': f'w{i}',
+                'fitness_discipline': 'cycling',
+                'start_time': 1735689600 + i * 3600,
+                'created_at': 1735689600 + i * 3600,
+                'timezone': 'Europe/London',
+                'ride': {'id': f'{ride_prefix}{i}', 'title': f'Class {i}'},
+                'instructor': {'id': f'{ride_prefix}-instr{i % 3}', 'name': f'Coach {i % 3}', 'image_url': 'https://example.com/a.png'},
+            }
+            for i in range(count)
+        ]
+
+    def _ride_details(self, entries):
+        return {
+            e['ride']['id']: {'ride': {'id': e['ride']['id'], 'title': e['ride']['title'], 'duration': 1200,
+                                       'fitness_discipline': 'cycling', 'instructor_id': e['instructor']['id']}}
+            for e in entries
+        }
+
+    def _graphs(self, entries):
+        return {
+            e['id']: {'duration': 1200, 'seconds_since_pedaling_start': [0, 5],
+                      'metrics': [{'slug': 'output', 'values': [100, 120], 'average_value': 110}]}
+            for e in entries
+        }
+
+    def test_statement_count_does_not_grow_with_page_size(self):
+        from .services.bulk_writer import WorkoutBatchWriter
+
+        def queries_for(count, prefix):
+            entries = self._entries(count, prefix)
+            for e in entries:
+                e['id'] = f"{prefix}-{e['id']}"
+            writer = WorkoutBatchWriter(self.user)
+            writer.workout_types({'cycling', 'other'})
+            from django.db import connection
+            from django.test.utils import CaptureQueriesContext
+            with CaptureQueriesContext(connection) as ctx:
+                writer.write_page(entries, ride_details=self._ride_details(entries), performance_graphs=self._graphs(entries))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(3, 'a'), queries_for(25, 'b'))
+
+    def test_write_page_creates_and_updates_rows(self):
+        from .models import Instructor, Workout, WorkoutDetails, WorkoutTimeSeries
+        from .services.bulk_writer import WorkoutBatchWriter
+
+        entries = self._entries(4)
+        writer = WorkoutBatchWriter(self.user)
+        result = writer.write_page(entries, ride_details=self._ride_details(entries), performance_graphs=self._graphs(entries))
+        self.assertEqual(len(result.created), 4)
+        self.assertEqual(Instructor.objects.count(), 3)
+
+        workout = Workout.objects.get(peloton_workout_id='w1')
+        self.assertEqual(workout.ride_detail.peloton_ride_id, 'ride1')
+        self.assertEqual(workout.ride_detail.instructor.peloton_id, 'ride-instr1')
+        self.assertEqual(workout.ride_detail.duration_seconds, 1200)
+        self.assertEqual(workout.peloton_timezone, 'Europe/London')
+        self.assertEqual(WorkoutDetails.objects.get(workout=workout).avg_output, 110.0)
+        self.assertEqual(WorkoutTimeSeries.objects.get(workout=workout).sample_count, 2)
+
+        entries[1]['ride']['title'] = 'Renamed'
+        details = self._ride_details(entries)
+        result = WorkoutBatchWriter(self.user).write_page(entries, ride_details=details, performance_graphs=self._graphs(entries))
+        self.assertEqual(len(result.updated), 4)
+        self.assertEqual(Workout.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Workout.objects.get(peloton_workout_id='w1').ride_detail.title, 'Renamed')
+        self.assertEqual(WorkoutTimeSeries.objects.get(workout=workout).sample_count, 2)
+
+    def test_ride_detail_task_helper_uses_batch_mapping(self):
+        from unittest.mock import Mock
+        from .services.bulk_writer import WorkoutBatchWriter
+        from .tasks import store_ride_detail_from_api
+
+        # Placeholder created during a sync, with the instructor from the workout list
+        instructor = Instructor.objects.create(name='Coach', peloton_id='coach')
+        WorkoutBatchWriter(self.user).ensure_ride_details({
+            'ride-x': {'title': 'Pending details for ride-x', 'duration_seconds': 0,
+                       'workout_type': WorkoutType.objects.create(name='Other', slug='other'), 'instructor': instructor},
+        })
+        client = Mock()
+        client.fetch_ride_details.return_value = {'ride': {
+            'id': 'ride-x', 'title': '30 min Climb Ride', 'duration': 1800,
+            'fitness_discipline': 'cycling', 'class_type_ids': ['climb'],
+        }}
+        result = store_ride_detail_from_api(client, 'ride-x')
+        self.assertEqual(result['status'], 'success')
+        self.assertFalse(result['created'])
+
+        ride = RideDetail.objects.get(peloton_ride_id='ride-x')
+        self.assertEqual(ride.title, '30 min Climb Ride')
+        self.assertEqual(ride.workout_type.slug, 'cycling')
+        self.assertEqual(ride.class_type_ids, ['climb'])
+        self.assertTrue(ride.peloton_class_url)
+        self.assertEqual(ride.instructor, instructor)
+
+        client.fetch_ride_details.return_value = {'ride': {'id': 'ride-y', 'title': 'New Ride', 'fitness_discipline': 'running'}}
+        self.assertTrue(store_ride_detail_from_api(client, 'ride-y')['created'])
+
+    def test_missing_ride_gets_placeholder_and_other_users_workouts_are_skipped(self):
+        from .models import Workout
+        from .services.bulk_writer import WorkoutBatchWriter
+
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        entries = self._entries(2)
+        WorkoutBatchWriter(other).write_page(entries[:1])
+
+        result = WorkoutBatchWriter(self.user).write_page(entries)
+        self.assertEqual(result.skipped, ['w0'])
+        self.assertEqual(result.created, ['w1'])
+        self.assertEqual(result.placeholder_ride_ids, ['ride1'])
+        self.assertEqual(Workout.objects.get(peloton_workout_id='w0').user, other)
+        self.assertTrue(Workout.objects.get(peloton_workout_id='w1').ride_detail.title.startswith('Pending details'))
+
+    def test_manual_workout_keeps_existing_title_override(self):
+        from .models import Workout
+        from .services.bulk_writer import WorkoutBatchWriter
+
+        entry = {'id': 'm1', 'fitness_discipline': 'running', 'start_time': 1735689600,
+                 'ride': {'id': '00000000000000000000000000000000', 'title': 'Outdoor Run'}}
+        WorkoutBatchWriter(self.user).write_page([entry])
+        workout = Workout.objects.get(peloton_workout_id='m1')
+        self.assertEqual(workout.ride_detail.peloton_ride_id, 'manual_running_m1')
+        self.assertEqual(workout.title_override, 'Outdoor Run')
+
+        Workout.objects.filter(pk=workout.pk).update(title_override='Parkrun')
+        WorkoutBatchWriter(self.user).write_page([entry])
+        self.assertEqual(Workout.objects.get(pk=workout.pk).title_override, 'Parkrun')
+
+
+class WorkoutTimeSeriesTestCase(TestCase):
+    """Packed time-series store, legacy fallback and the conversion command"""
+
+    def setUp(self):
+        from .models import Workout
+
+        self.user = User.objects.create_user(email='series@example.com', password='testpass123')
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        ride = RideDetail.objects.create(
+            peloton_ride_id='series-ride', title='Series Ride', fitness_discipline='cycling',
+            duration_seconds=600, workout_type=workout_type,
+        )
+        self.workout = Workout.objects.create(
+            user=self.user, ride_detail=ride, peloton_workout_id='series-w1',
+            recorded_date=timezone.now().date(), completed_date=timezone.now().date(),
+        )
+
+    def _samples(self):
+        from .services.time_series import PerformanceSample
+
+        return [
+            PerformanceSample(10, output=150.5, cadence=90, heart_rate=140, power_zone=3),
+            PerformanceSample(0, output=None, cadence=None, speed=6.2, intensity_zone='easy'),
+            PerformanceSample(5, output=120.0, cadence=85, resistance=40.0, intensity_zone='max'),
+        ]
+
+    def test_pack_round_trip(self):
+        from .models import Workout, WorkoutTimeSeries
+        from .services.time_series import build_time_series, get_series, store_time_series
+
+        store_time_series([build_time_series(self.workout, self._samples())])
+        row = WorkoutTimeSeries.objects.get(workout=self.workout)
+        self.assertEqual(row.sample_count, 3)
+
+        series = get_series(Workout.objects.select_related('time_series').get(pk=self.workout.pk))
+        self.assertEqual(series.timestamps, [0, 5, 10])
+        self.assertEqual(series.column('output'), [None, 120.0, 150.5])
+        self.assertEqual(series.column('cadence'), [None, 85, 90])
+        self.assertEqual(series.column('power_zone'), [None, None, 3])
+        self.assertEqual(series.column('intensity_zone'), ['easy', 'max', None])
+        self.assertEqual(series.pairs('speed'), [(0, 6.2)])
+        self.assertEqual(series.samples()[2].heart_rate, 140)
+
+    def test_legacy_rows_fallback_and_conversion_command(self):
+        from django.core.management import call_command
+        from .models import WorkoutPerformanceData, WorkoutTimeSeries
+        from .services.time_series import load_series_map
+
+        for sample in self._samples():
+            WorkoutPerformanceData.objects.create(workout=self.workout, **sample._asdict())
+
+        legacy = load_series_map([self.workout.pk])[self.workout.pk]
+        self.assertEqual(legacy.column('output'), [None, 120.0, 150.5])
+
+        call_command('migrate_performance_time_series', batch_size=1, stdout=StringIO())
+        self.assertFalse(WorkoutPerformanceData.objects.filter(workout=self.workout).exists())
+        self.assertEqual(WorkoutTimeSeries.objects.get(workout=self.workout).sample_count, 3)
+        packed = load_series_map([self.workout.pk])[self.workout.pk]
+        self.assertEqual(packed.samples(), legacy.samples())
+
+    def test_graph_fields_stored_for_detail_page(self):
+        from .models import WorkoutDetails
+        from .services.performance_ingest import store_performance_graph
+
+        targets = [{'segment_type': 'power_zone', 'offsets': {'start': 0, 'end': 60}, 'metrics': []}]
+        store_performance_graph(self.workout, {
+            'summaries': [{'slug': 'elevation', 'value': 512.0}],
+            'target_metrics_performance_data': {'target_metrics': targets},
+        })
+        details = WorkoutDetails.objects.get(workout=self.workout)
+        self.assertEqual(details.elevation, 512.0)
+        self.assertEqual(details.target_metrics, targets)
+        self.assertIsNotNone(details.performance_graph_fetched_at)
+
+    def test_graph_without_elevation_is_recorded(self):
+        from .models import WorkoutDetails
+        from .services.performance_ingest import store_performance_graph
+
+        store_performance_graph(self.workout, {'summaries': []})
+        details = WorkoutDetails.objects.get(workout=self.workout)
+        self.assertIsNone(details.elevation)
+        self.assertEqual(details.target_metrics, [])
+        self.assertIsNotNone(details.performance_graph_fetched_at)
+
+    def test_graph_invalidates_user_caches(self):
+        from core.services import TaggedCacheService
+        from .services.performance_ingest import store_performance_graph
+
+        tags = [TaggedCacheService.user_workouts_tag(self.workout.user_id)]
+        TaggedCacheService.set('metrics', 'stale', tags=tags)
+        with self.captureOnCommitCallbacks(execute=True):
+            store_performance_graph(self.workout, {'summaries': [{'slug': 'distance', 'value': 12.5}]})
+        self.assertIsNone(TaggedCacheService.get('metrics', tags))
+
+    def test_empty_graph_is_recorded(self):
+        from .models import WorkoutDetails
+        from .services.performance_ingest import store_performance_graph
+
+        targets = [{'segment_type': 'power_zone', 'offsets': {'start': 0, 'end': 60}, 'metrics': []}]
+        WorkoutDetails.objects.create(workout=self.workout, target_metrics=targets)
+        self.assertEqual(store_performance_graph(self.workout, {}), {'metrics': 0, 'samples': 0})
+        details = WorkoutDetails.objects.get(workout=self.workout)
+        self.assertIsNotNone(details.performance_graph_fetched_at)
+        self.assertEqual(details.target_metrics, targets)
+
+
+class PowerCurveTestCase(TestCase):
+    """Stored mean-max power curves"""
+
+    def setUp(self):
+        from .models import Workout
+
+        self.user = User.objects.create_user(email='curve@example.com', password='testpass123')
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        ride = RideDetail.objects.create(
+            peloton_ride_id='curve-ride', title='Curve Ride', fitness_discipline='cycling',
+            duration_seconds=600, workout_type=workout_type,
+        )
+        today = timezone.now().date()
+        self.workouts = [
+            Workout.objects.create(
+                user=self.user, ride_detail=ride, peloton_workout_id=f'curve-w{i}',
+                recorded_date=today, completed_date=today,
+            )
+            for i in range(2)
+        ]
+
+    def test_mean_max_curve_matches_brute_force(self):
+        from .services.power_curve import mean_max_curve
+
+        outputs = [100, 250, None, 300, 180, 90, 400, 120, 60, 200, 210, 220]
+        timestamps = list(range(0, 5 * len(outputs), 5))
+        curve = mean_max_curve(timestamps, outputs)
+
+        values = [v or 0 for v in outputs]
+        for duration, watts in curve.items():
+            window = duration // 5
+            expected = max(sum(values[i:i + window]) / window for i in range(len(values) - window + 1))
+            self.assertAlmostEqual(watts, expected)
+        self.assertEqual(curve[5], 400)
+        self.assertEqual(max(curve), 60)
+
+    def test_storing_series_updates_curve_and_best_power(self):
+        from .models import Workout, WorkoutPowerPeak
+        from .services.power_curve import best_power
+        from .services.time_series import PerformanceSample, build_time_series, store_time_series
+
+        rows = [
+            build_time_series(workout, [PerformanceSample(t * 5, output=base + t) for t in range(24)])
+            for workout, base in zip(self.workouts, (100, 200))
+        ]
+        store_time_series(rows)
+        self.assertTrue(WorkoutPowerPeak.objects.filter(workout=self.workouts[0], duration_seconds=120).exists())
+
+        best = best_power(Workout.objects.filter(user=self.user), durations=[5, 60])
+        self.assertEqual(best, {5: 223.0, 60: 217.5})
+
+    def test_backfill_command_uses_legacy_rows(self):
+        from django.core.management import call_command
+        from .models import WorkoutPerformanceData, WorkoutPowerPeak
+
+        for t in range(12):
+            WorkoutPerformanceData.objects.create(workout=self.workouts[0], timestamp=t * 5, output=150.0)
+
+        call_command('backfill_power_curves', stdout=StringIO())
+        self.assertEqual(
+            WorkoutPowerPeak.objects.get(workout=self.workouts[0], duration_seconds=60).watts, 150.0
+        )
+        self.assertFalse(WorkoutPowerPeak.objects.filter(workout=self.workouts[1]).exists())
+
+
+class ZoneTimesTestCase(TestCase):
+    """Per-workout zone vectors and the daily/monthly rollups"""
+
+    def setUp(self):
+        from accounts.models import FTPEntry
+        from datetime import date
+
+        self.user = User.objects.create_user(email='zones@example.com', password='testpass123')
+        self.workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        self.day = date(2025, 3, 10)
+        FTPEntry.objects.create(user=self.user, ftp_value=200, recorded_date=date(2025, 1, 1))
+
+    def _ride(self, pid, completed, outputs):
+        from .models import Workout
+        from .services.time_series import PerformanceSample, build_time_series, store_time_series
+
+        ride = RideDetail.objects.create(
+            peloton_ride_id=f'zones-{pid}', title='Zones', fitness_discipline='cycling',
+            duration_seconds=600, workout_type=self.workout_type,
+        )
+        workout = Workout.objects.create(
+            user=self.user, ride_detail=ride, peloton_workout_id=f'zones-{pid}',
+            recorded_date=completed, completed_date=completed,
+        )
+        store_time_series([
+            build_time_series(workout, [PerformanceSample(i * 5, output=out) for i, out in enumerate(outputs)])
+        ])
+        return workout
+
+    def test_vector_uses_ftp_on_workout_date_and_fills_rollups(self):
+        from datetime import date
+        from .models import WorkoutZoneTime, ZoneTimeRollup
+        from .services.zone_times import KIND_POWER, rollup_zone_seconds
+
+        # 100W = 50% of FTP (zone 1), 180W = 90% (zone 4)
+        workout = self._ride('a', self.day, [100, 100, 180, 180])
+        vector = WorkoutZoneTime.objects.get(workout=workout, kind=KIND_POWER)
+        self.assertEqual((vector.zone_1, vector.zone_4, vector.ftp_value), (10, 10, 200.0))
+
+        self._ride('b', date(2025, 4, 2), [180, 180])
+        self.assertEqual(
+            set(ZoneTimeRollup.objects.filter(user=self.user).values_list('period', 'period_start')),
+            {('day', self.day), ('month', date(2025, 3, 1)), ('day', date(2025, 4, 2)), ('month', date(2025, 4, 1))},
+        )
+        self.assertEqual(rollup_zone_seconds(self.user.id, KIND_POWER)[3], 20)
+        self.assertEqual(rollup_zone_seconds(self.user.id, KIND_POWER, date(2025, 3, 11), date(2025, 4, 30))[3], 10)
+        self.assertEqual(rollup_zone_seconds(self.user.id, KIND_POWER, date(2025, 3, 1), date(2025, 3, 31))[0], 10)
+
+    def test_ftp_change_invalidates_and_next_read_recomputes(self):
+        from datetime import date
+        from accounts.models import FTPEntry
+        from core.services import ZoneCalculatorService
+        from .models import Workout, WorkoutZoneTime
+
+        self._ride('a', self.day, [100, 100, 180, 180])
+        FTPEntry.objects.create(user=self.user, ftp_value=100, recorded_date=date(2025, 3, 1))
+        self.assertFalse(WorkoutZoneTime.objects.filter(user=self.user).exists())
+
+        # 100W and 180W are now 100% (zone 4) and 180% (zone 7) of FTP
+        zones = ZoneCalculatorService.calculate_cycling_zones(Workout.objects.filter(user=self.user))
+        self.assertEqual(zones['zones'][4]['time_seconds'], 10)
+        self.assertEqual(zones['zones'][7]['time_seconds'], 10)
+        self.assertEqual(WorkoutZoneTime.objects.get(user=self.user).ftp_value, 100.0)
+
+    def test_deleting_workout_refreshes_rollups(self):
+        from .models import ZoneTimeRollup
+
+        workout = self._ride('a', self.day, [100, 180])
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.delete()
+        self.assertFalse(ZoneTimeRollup.objects.filter(user=self.user).exists())
+
+
+class WorkoutSparklineTestCase(TestCase):
+    """Stored history card charts"""
+
+    def setUp(self):
+        from datetime import date
+        from accounts.models import FTPEntry, OnboardingWizard
+        from .models import Workout
+        from .services.time_series import PerformanceSample, build_time_series, store_time_series
+
+        self.user = User.objects.create_user(email='sparkline@example.com', password='testpass123', is_active=True)
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        FTPEntry.objects.create(user=self.user, ftp_value=200, recorded_date=date(2025, 1, 1))
+        workout_type = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        ride = RideDetail.objects.create(
+            peloton_ride_id='sparkline-ride', title='Sparkline Ride', fitness_discipline='cycling',
+            duration_seconds=600, workout_type=workout_type,
+        )
+        self.workout = Workout.objects.create(
+            user=self.user, ride_detail=ride, peloton_workout_id='sparkline-w1',
+            recorded_date=date(2025, 3, 10), completed_date=date(2025, 3, 10),
+        )
+        store_time_series([
+            build_time_series(self.workout, [PerformanceSample(i * 5, output=100 + i) for i in range(60)])
+        ])
+
+    def test_history_page_stores_and_reuses_sparkline(self):
+        from unittest.mock import patch
+        from .models import WorkoutSparkline
+
+        self.client.force_login(self.user)
+        url = reverse('workouts:history') + '?hide_manual=0'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sparkline = WorkoutSparkline.objects.get(workout=self.workout)
+        self.assertIsNotNone(sparkline.chart)
+        self.assertEqual(sparkline.last_timestamp, 295)
+
+        # Second view renders from the stored row without reading the series
+        with patch('workouts.views.load_series_map') as load_series_map:
+            response = self.client.get(url)
+        load_series_map.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        card = response.context['workouts'].object_list[0]
+        self.assertEqual(card.card_chart['kind'], 'cycling_output_zones')
+
+    def test_ftp_change_drops_sparkline(self):
+        from datetime import date
+        from accounts.models import FTPEntry
+        from .models import WorkoutSparkline
+        from .services.sparklines import store_sparklines
+
+        store_sparklines([WorkoutSparkline(workout=self.workout, chart=None)])
+        FTPEntry.objects.create(user=self.user, ftp_value=250, recorded_date=date(2025, 3, 1))
+        self.assertFalse(WorkoutSparkline.objects.filter(workout=self.workout).exists())
+
+
+class RideSearchTestCase(TestCase):
+    """Indexed class search (library filter and history suggest box)"""
+
+    def setUp(self):
+        from datetime import date
+        from accounts.models import OnboardingWizard
+        from .models import Workout
+
+        self.user = User.objects.create_user(email='search@example.com', password='testpass123', is_active=True)
+        OnboardingWizard.objects.update_or_create(
+            user=self.user,
+            defaults={'completed_stages': [1, 2, 3, 4, 5, 6], 'completed_at': timezone.now()},
+        )
+        cycling = WorkoutType.objects.create(name='Cycling', slug='cycling')
+        instructor = Instructor.objects.create(name='Zoë Moreno', peloton_id='instr_zoe')
+        self.pz_ride = RideDetail.objects.create(
+            peloton_ride_id='search-pz', title='45 min Power Zone Endurance Ride', fitness_discipline='cycling',
+            duration_seconds=2700, workout_type=cycling, instructor=instructor, class_type='power_zone',
+            description='Steady aerobic work in zones 2 and 3.',
+        )
+        self.climb_ride = RideDetail.objects.create(
+            peloton_ride_id='search-climb', title='30 min Climb Ride', fitness_discipline='cycling',
+            duration_seconds=1800, workout_type=cycling, class_type='climb',
+            description='Hills with a power zone finish.',
+        )
+        Workout.objects.create(
+            user=self.user, ride_detail=self.pz_ride, peloton_workout_id='search-w1',
+            recorded_date=date(2025, 3, 10), completed_date=date(2025, 3, 10),
+        )
+
+    def test_saved_ride_gets_search_document(self):
+        from .models import RideSearchDocument
+
+        document = RideSearchDocument.objects.get(ride=self.pz_ride)
+        self.assertEqual(document.title, '45 min power zone endurance ride')
+        self.assertIn('zoe moreno', document.document)
+        self.assertIn('steady aerobic', document.document)
+
+    def test_migration_backfills_missing_documents(self):
+        from importlib import import_module
+        from django.apps import apps
+        from .models import RideSearchDocument
+        from .services.search import search_rides
+
+        RideSearchDocument.objects.all().delete()
+        migration = import_module('workouts.migrations.0033_backfill_ridesearchdocument')
+        migration.backfill_search_documents(apps, None)
+        self.assertEqual(RideSearchDocument.objects.count(), 2)
+        self.assertEqual(list(search_rides(RideDetail.objects.all(), 'zoe')), [self.pz_ride])
+
+    def test_search_matches_word_prefixes_and_accents(self):
+        from .services.search import search_rides
+
+        self.assertEqual(list(search_rides(RideDetail.objects.all(), 'endur ZOE')), [self.pz_ride])
+        self.assertEqual(list(search_rides(RideDetail.objects.all(), 'aerobic')), [self.pz_ride])
+        self.assertFalse(search_rides(RideDetail.objects.all(), 'yoga').exists())
+
+    def test_relevance_ordering_puts_title_matches_first(self):
+        filter_obj = ClassLibraryFilter(RideDetail.objects.all())
+        filter_obj.apply_search('power zone')
+        filter_obj.apply_ordering('')
+        self.assertEqual(list(filter_obj.get_queryset()), [self.pz_ride, self.climb_ride])
+        self.assertEqual(filter_obj.get_filters()['order_by'], 'relevance')
+
+    def test_history_suggest_returns_titles_and_instructors(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('workouts:history_suggest') + '?q=zoe')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [(r['kind'], r['value']) for r in results],
+            [('title', '45 min Power Zone Endurance Ride'), ('instructor', 'Zoë Moreno')],
+        )
+
+
+class SegmentTimelineTestCase(TestCase):
+    """Compiled segment timelines match the per-sample lookups they replace"""
+
+    def test_power_zone_timeline_paints_later_segments_and_fills_gaps(self):
+        from .services.segment_timeline import power_zone_timeline
+
+        segments = [
+            {'start': 60, 'end': 180, 'zone': 2},
+            {'start': 120, 'end': 240, 'zone': 4},
+            {'start': 300, 'end': 360, 'zone': 3},
+        ]
+        spin_ups = [{'start': 240, 'end': 330}]
+        timeline = power_zone_timeline(segments, range(1, 8), spin_up_intervals=spin_ups)
+        # Shifted 60s earlier; the end of a segment is inclusive
+        self.assertEqual(
+            timeline.values_at([0, 59, 60, 120, 180, 200, 239, 240, 300, 301]),
+            [2, 2, 4, 4, 4, 1, 1, 3, 3, None],
+        )
+
+    def test_segment_lookup_keeps_first_match(self):
+        from core.utils.workout_targets import target_segment_at_time_with_shift, target_segments_at_times
+
+        segments = [
+            {'start': 0, 'end': 60, 'target': 100},
+            {'start': 30, 'end': 120, 'target': 150},
+            {'start': 120, 'end': 0, 'target': 200},
+        ]
+        timestamps = [0, 29, 30, 59, 60, 119, 120, 5000, None]
+        expected = [target_segment_at_time_with_shift(segments, t, -60) for t in timestamps]
+        self.assertEqual(target_segments_at_times(segments, timestamps, shift_seconds=-60), expected)
+
+    def test_segment_lookup_matches_per_sample_scan_on_random_classes(self):
+        import random
+
+        from core.utils.workout_targets import target_segment_at_time_with_shift, target_segments_at_times
+
+        rng = random.Random(7)
+        for _ in range(300):
+            segments = []
+            for _ in range(rng.randint(0, 12)):
+                start = rng.choice([rng.randint(0, 600), rng.uniform(0, 600), None])
+                end = rng.choice([(start or 0) + rng.randint(0, 200), rng.uniform(0, 800), 0, None])
+                segments.append({'start': start, 'end': end, 'target': rng.randint(50, 300)})
+            timestamps = [rng.choice([rng.randint(-100, 900), rng.uniform(-100, 900), None]) for _ in range(50)]
+            shift = rng.choice([0, -60, 30])
+            expected = [target_segment_at_time_with_shift(segments, t, shift) for t in timestamps]
+            self.assertEqual(target_segments_at_times(segments, timestamps, shift_seconds=shift), expected)
+
+    def test_zone_stats(self):
+        from .services.segment_timeline import power_zones_for_outputs, target_compliance, time_in_zones
+
+        timestamps = [0, 5, 10, 15]
+        zones = power_zones_for_outputs([100, 110, None, 300], 200)
+        self.assertEqual(zones, [1, 2, None, 7])
+        self.assertEqual(time_in_zones(timestamps, zones)[2], 5)
+
+        compliance = target_compliance(timestamps, zones, [1, 1, 1, None])
+        self.assertEqual(compliance['target_seconds'], {1: 15})
+        self.assertEqual(compliance['on_target_seconds'], {1: 5})
+        self.assertEqual(compliance['percentage'], 33.3)
+
+
+class PelotonPayloadArchiveTestCase(TestCase):
+    """Raw response archive and the offline re-parse engine"""
+
+    def setUp(self):
+        from peloton.models import PelotonConnection
+        self.user = User.objects.create_user(email='archive@example.com', password='testpass123')
+        self.connection = PelotonConnection.objects.create(user=self.user, peloton_user_id='peloton_user')
+
+    def _sync(self):
+        from .services.sync_engine import WorkoutSyncEngine, create_sync_job
+
+        client = FakePelotonClient([[
+            {'id': workout_id, 'fitness_discipline': 'cycling', 'created_at': 1735689600,
+             'start_time': 1735689600, 'ride': {'id': 'r1', 'title': 'Class r1'}}
+            for workout_id in ('w1', 'w2')
+        ]])
+        engine = WorkoutSyncEngine(create_sync_job(self.connection), client=client)
+        engine.start()
+        engine.persist_page(engine.fetch_performance(engine.fetch_ride_details(engine.list_page(0))))
+        engine.finish()
+
+    def test_sync_archives_every_response(self):
+        from .models import PelotonPayload
+        from .services.payload_archive import load_latest
+
+        self._sync()
+        archived = sorted(PelotonPayload.objects.values_list('endpoint', 'object_id'))
+        self.assertEqual(archived, [
+            ('performance_graph', 'w1'), ('performance_graph', 'w2'),
+            ('ride_details', 'r1'),
+            ('workout', 'w1'), ('workout', 'w2'),
+        ])
+        graph = load_latest(PelotonPayload.ENDPOINT_PERFORMANCE_GRAPH, ['w1'])['w1'].body
+        self.assertEqual(graph['seconds_since_pedaling_start'], [0, 5, 10])
+
+    def test_responses_are_content_addressed(self):
+        from datetime import timedelta
+        from .models import PelotonPayload, PelotonPayloadBlob
+        from .services.payload_archive import archive_payloads, load_latest
+
+        first = timezone.now() - timedelta(days=2)
+        archive_payloads('ride_details', {'r1': {'ride': {'id': 'r1'}}, 'r2': {'ride': {'id': 'r1'}}}, fetched_at=first)
+        # The same body again only moves fetched_at
+        archive_payloads('ride_details', {'r1': {'ride': {'id': 'r1'}}}, fetched_at=first + timedelta(days=1))
+        self.assertEqual(PelotonPayloadBlob.objects.count(), 1)
+        self.assertEqual(PelotonPayload.objects.filter(object_id='r1').count(), 1)
+        self.assertEqual(PelotonPayload.objects.get(object_id='r1').fetched_at, first + timedelta(days=1))
+
+        archive_payloads('ride_details', {'r1': {'ride': {'id': 'r1', 'title': 'New'}}})
+        self.assertEqual(PelotonPayload.objects.filter(object_id='r1').count(), 2)
+        self.assertEqual(load_latest('ride_details', ['r1', 'r2', 'r3'])['r1'].body['ride']['title'], 'New')
+        self.assertNotIn('r3', load_latest('ride_details', ['r3']))
+
+        with self.assertRaises(ValueError):
+            archive_payloads('overview', {'x': {}})
+
+    def test_reparse_rebuilds_rows_without_the_api(self):
+        from django.core.management import call_command
+        from .models import Playlist, PelotonPayload, Workout, WorkoutDetails, WorkoutTimeSeries
+        from .services.payload_archive import archive_payloads
+        from .services.reparse import run_reparse
+
+        self._sync()
+        WorkoutDetails.objects.all().delete()
+        WorkoutTimeSeries.objects.all().delete()
+        Playlist.objects.all().delete()
+        ride = RideDetail.objects.get(peloton_ride_id='r1')
+        self.assertEqual(ride.segments_data, {})
+
+        # A later response for the class carries segments
+        details = FakePelotonClient([]).fetch_ride_details('r1')
+        details['segments'] = {'segment_list': [{'name': 'Warm Up', 'start_time_offset': 0, 'length': 300}]}
+        archive_payloads(PelotonPayload.ENDPOINT_RIDE_DETAILS, {'r1': details})
+
+        totals = run_reparse(workers=1, chunk_size=1)
+        self.assertEqual(totals['performance'].parsed, 2)
+        self.assertEqual(totals['rides'].parsed, 1)
+        self.assertEqual(totals['playlists'].parsed, 1)
+
+        details_row = WorkoutDetails.objects.get(workout__peloton_workout_id='w1')
+        self.assertEqual(details_row.tss, 42.0)
+        self.assertEqual(details_row.total_output, 300.0)
+        self.assertEqual(WorkoutTimeSeries.objects.get(workout__peloton_workout_id='w2').sample_count, 3)
+        ride.refresh_from_db()
+        self.assertEqual(ride.segments_data['segment_list'][0]['name'], 'Warm Up')
+        self.assertEqual(ride.playlist.peloton_playlist_id, 'pl_r1')
+
+        # The command scopes to one user's workouts and classes
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        Workout.objects.filter(peloton_workout_id='w2').update(user=other)
+        out = StringIO()
+        call_command('reparse_payloads', user='archive@example.com', workers=1, target=['performance'], stdout=out)
+        self.assertIn('performance: 1 parsed, 0 skipped, 0 failed', out.getvalue())
+
+
+class SyncBenchmarkTestCase(TestCase):
+    """The sync load benchmark runs end to end against the fake Peloton API"""
+
+    def test_benchmark_syncs_fake_accounts(self):
+        from peloton.fake_server import FakePelotonConfig
+        from .models import Workout, WorkoutDetails
+        from .services.sync_benchmark import cleanup_benchmark_data, run_sync_benchmark
+
+        config = FakePelotonConfig(workouts_per_user=45, library_size=60, throttle_ratio=0.2)
+        report = run_sync_benchmark(
+            config=config, users=2, phases=('sync', 'library'), library_limit=10, rate_limit=0, keep=True,
+        )
+
+        sync = report.phase('sync')
+        self.assertEqual(sync.items, 90)
+        self.assertEqual(sync.errors, 0)
+        self.assertEqual(len(sync.latencies), 6)
+        self.assertGreater(sync.queries_per_item, 0)
+        self.assertIsNotNone(sync.percentile(95))
+        self.assertTrue(report.throttled)
+        self.assertEqual(Workout.objects.filter(user__email='sync-bench-1@example.com').count(), 45)
+        self.assertEqual(WorkoutDetails.objects.filter(workout__user__email='sync-bench-0@example.com').count(), 45)
+        self.assertIsNotNone(report.phase('library'))
+
+        cleanup_benchmark_data()
+        self.assertFalse(Workout.objects.filter(user__email__startswith='sync-bench-').exists())
+        self.assertFalse(RideDetail.objects.filter(peloton_ride_id__startswith='fa4ec0de').exists())
+
+    def test_command_fails_on_query_regression(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_sync', workouts=20, library_size=20, phase=['sync'], rate_limit=0,
+                max_queries_per_workout=0.5, stdout=out,
+            )
+        self.assertIn('sync', out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith='sync-bench-').exists())
+
+
+class SyntheticTenantTestCase(TestCase):
+    """The large-tenant generator writes a complete, reproducible tenant in bulk"""
+
+    def _config(self, tag):
+        from .services.synthetic_tenant import TenantConfig
+
+        return TenantConfig(
+            users=5, years=0.5, workouts_per_week=4, rides=60, series_ratio=1.0, graph_variants=2,
+            challenges=2, challenge_weeks=2, participation=0.8, team_size=2, chunk_size=2, batch_size=50,
+            seed=3, tag=tag,
+        )
+
+    def test_generates_tenant(self):
+        from accounts.models import FTPEntry
+        from challenges.models import Challenge, ChallengeInstance, TeamMember
+        from tracker.models import WeeklyPlan
+        from .models import Workout, WorkoutDetails, WorkoutPowerPeak, WorkoutTimeSeries
+        from .services.synthetic_tenant import delete_tenant, generate_tenant
+
+        report = generate_tenant(self._config('t1'))
+
+        users = User.objects.filter(email__startswith='t1-')
+        self.assertEqual(users.count(), 5)
+        self.assertTrue(all(user.profile.ftp_score for user in users))
+        self.assertEqual(RideDetail.objects.filter(peloton_ride_id__startswith='5eedda7a').count(), 60)
+        self.assertEqual(RideMetrics.objects.filter(ride__peloton_ride_id__startswith='5eedda7a').count(), 60)
+        workouts = Workout.objects.filter(user__in=users)
+        workout_count = workouts.count()
+        self.assertGreater(workout_count, 20)
+        self.assertEqual(WorkoutDetails.objects.filter(workout__in=workouts).count(), workout_count)
+        self.assertTrue(WorkoutTimeSeries.objects.filter(workout__in=workouts).exists())
+        self.assertTrue(WorkoutPowerPeak.objects.filter(workout__in=workouts).exists())
+        self.assertEqual(FTPEntry.objects.filter(user__in=users, is_active=True).count(), 5)
+        self.assertEqual(report.rows['Workout'], workout_count)
+
+        self.assertEqual(Challenge.objects.filter(name__startswith='t1 challenge ').count(), 2)
+        instances = ChallengeInstance.objects.filter(user__in=users)
+        self.assertEqual(instances.count(), 8)
+        self.assertEqual(TeamMember.objects.filter(challenge_instance__in=instances).count(), 8)
+        plans = WeeklyPlan.objects.filter(user__in=users)
+        self.assertEqual(plans.count(), 16)
+        self.assertTrue(plans.filter(total_points__gt=0).exists())
+
+        # Same seed, same tenant
+        generate_tenant(self._config('t2'))
+        self.assertEqual(Workout.objects.filter(user__email__startswith='t2-').count(), workout_count)
+
+        self.assertEqual(delete_tenant('t1'), 5)
+        self.assertFalse(Workout.objects.filter(user__email__startswith='t1-').exists())
+        self.assertFalse(Challenge.objects.filter(name__startswith='t1 challenge ').exists())
+        self.assertEqual(Workout.objects.filter(user__email__startswith='t2-').count(), workout_count)
+
+    def test_command_refuses_existing_tenant(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        out = StringIO()
+        call_command('seed_large_tenant', users=2, years=0.2, rides=20, challenges=1, challenge_weeks=1, tag='cmd', stdout=out)
+        self.assertIn('rows', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed_large_tenant', users=2, years=0.2, rides=20, tag='cmd', stdout=out)
+        call_command('seed_large_tenant', tag='cmd', delete=True, stdout=out)
+        self.assertFalse(User.objects.filter(email__startswith='cmd-').exists())
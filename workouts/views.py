@@ -1,9 +1,11 @@
 import json
 import re
+from collections import Counter
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
+from django.core.cache import cache
 from django.db.models import Q
 from django.utils import timezone
 from django.utils.safestring import mark_safe
@@ -26,12 +28,24 @@ except ImportError:
     except ImportError:
         pytz = None
 
-from .models import Workout, WorkoutType, Instructor, RideDetail, WorkoutDetails, Playlist
+from .models import Workout, WorkoutType, Instructor, RideDetail, Playlist, WorkoutSparkline
 from .services.class_filter import ClassLibraryFilter
 from .services.metrics import MetricsCalculator
 from .services.chart_builder import ChartBuilder
+from .services.sparklines import current_sparkline, series_summary, store_sparklines
+from .services.search import query_tokens, search_rides
+from .services.segment_timeline import power_zone_timeline, power_zones_for_outputs, target_compliance
+from .services.time_series import get_performance_samples, load_series_map, workouts_with_series_q
 from peloton.models import PelotonConnection
-from challenges.utils import generate_peloton_url
+from core.utils.workout_targets import (
+    calculate_pace_target_line_from_segments,
+    calculate_power_zone_target_line,
+    calculate_target_line_from_segments,
+    target_segment_at_time_with_shift,
+    target_segments_at_times,
+    target_value_at_time,
+    target_value_at_time_with_shift,
+)
 from accounts.pace_converter import DEFAULT_RUNNING_PACE_LEVELS, ZONE_COLORS
 from accounts.walking_pace_levels_data import DEFAULT_WALKING_PACE_LEVELS, WALKING_ZONE_COLORS
 from accounts.rowing_pace_levels_data import DEFAULT_ROWING_PACE_LEVELS, ROWING_ZONE_COLORS
@@ -733,9 +747,9 @@ def class_library(request):
         from accounts.walking_pace_levels_data import DEFAULT_WALKING_PACE_LEVELS
         
         # Running pace zones (7 zones)
-        running_pace_entry = request.user.pace_entries.filter(activity_type='running', is_active=True).first()
-        if running_pace_entry and running_pace_entry.level in DEFAULT_RUNNING_PACE_LEVELS:
-            level_data = DEFAULT_RUNNING_PACE_LEVELS[running_pace_entry.level]
+        running_pace_level = request.user.profile.get_current_pace('running')
+        if running_pace_level in DEFAULT_RUNNING_PACE_LEVELS:
+            level_data = DEFAULT_RUNNING_PACE_LEVELS[running_pace_level]
             user_running_pace_zones = {}
             for zone_name, (min_mph, max_mph, min_pace, max_pace, desc) in level_data.items():
                 # Use min_pace (the faster/lower end of the range) as target
@@ -743,9 +757,9 @@ def class_library(request):
                 user_running_pace_zones[zone_name] = int(min_pace * 60)
         
         # Walking pace zones (5 zones)
-        walking_pace_entry = request.user.pace_entries.filter(activity_type='walking', is_active=True).first()
-        if walking_pace_entry and walking_pace_entry.level in DEFAULT_WALKING_PACE_LEVELS:
-            level_data = DEFAULT_WALKING_PACE_LEVELS[walking_pace_entry.level]
+        walking_pace_level = request.user.profile.get_current_pace('walking')
+        if walking_pace_level in DEFAULT_WALKING_PACE_LEVELS:
+            level_data = DEFAULT_WALKING_PACE_LEVELS[walking_pace_level]
             user_walking_pace_zones = {}
             for zone_name, (min_mph, max_mph, min_pace, max_pace, desc) in level_data.items():
                 # Use min_pace (the faster/lower end of the range) as target
@@ -1396,13 +1410,7 @@ def class_detail(request, pk):
             
             # If no active PaceEntry, try to get the latest PaceEntry regardless of is_active status
             if user_pace_level is None:
-                from accounts.models import PaceEntry
-                latest_pace_entry = PaceEntry.objects.filter(
-                    user=request.user,
-                    activity_type=activity_type
-                ).order_by('-recorded_date', '-created_at').first()
-                if latest_pace_entry:
-                    user_pace_level = latest_pace_entry.level
+                user_pace_level = user_profile.get_target_timeline().latest_pace(activity_type)
             
             # Fallback to pace_target_level if no PaceEntry exists at all
             if user_pace_level is None:
@@ -2118,13 +2126,7 @@ def class_detail(request, pk):
             
             # If no active PaceEntry, try to get the latest PaceEntry regardless of is_active status
             if user_pace_level is None:
-                from accounts.models import PaceEntry
-                latest_pace_entry = PaceEntry.objects.filter(
-                    user=request.user,
-                    activity_type=activity_type
-                ).order_by('-recorded_date', '-created_at').first()
-                if latest_pace_entry:
-                    user_pace_level = latest_pace_entry.level
+                user_pace_level = user_profile.get_target_timeline().latest_pace(activity_type)
             
             # Fallback to old system: pace_target_level (deprecated but still used as fallback)
             if user_pace_level is None:
@@ -2271,10 +2273,7 @@ def workout_history(request):
     # Search query - all data comes from ride_detail via SQL joins
     search_query = request.GET.get('search', '').strip()
     if search_query:
-        workouts = workouts.filter(
-            Q(ride_detail__title__icontains=search_query) |
-            Q(ride_detail__instructor__name__icontains=search_query)
-        )
+        workouts = search_rides(workouts, search_query, ride_path='ride_detail', with_rank=False)
     
     # Filter by workout type - via ride_detail
     workout_type_filter = request.GET.get('type', '')
@@ -2357,24 +2356,9 @@ def workout_history(request):
     has_charts_raw = (request.GET.get('has_charts', '') or '').strip().lower()
     has_charts_filter = has_charts_raw in ['1', 'true', 'yes', 'on']
     if has_charts_filter:
-        try:
-            from django.db.models import Exists, OuterRef
-            from workouts.models import WorkoutPerformanceData
-
-            workouts = workouts.annotate(
-                has_charts=Exists(
-                    # Only count as "charted" if we have usable series for our cards
-                    # (stretches often only have HR, which we don't chart on cards)
-                    WorkoutPerformanceData.objects.filter(workout_id=OuterRef('pk')).filter(
-                        Q(output__isnull=False) | Q(speed__isnull=False)
-                    )
-                )
-            ).filter(has_charts=True)
-        except Exception:
-            # Fallback: may create duplicates; keep stable ordering via distinct()
-            workouts = workouts.filter(
-                Q(performance_data__output__isnull=False) | Q(performance_data__speed__isnull=False)
-            ).distinct()
+        # Only count as "charted" if we have usable series for our cards
+        # (stretches often only have HR, which we don't chart on cards)
+        workouts = workouts.filter(workouts_with_series_q('output', 'speed'))
     
     # Ordering - title ordering uses ride_detail__title via SQL join
     order_by = request.GET.get('order_by', '-completed_date')
@@ -2400,28 +2384,9 @@ def workout_history(request):
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
 
-    # Prefetch time-series performance data ONLY for the current page (critical for performance)
-    # and attach lightweight mini-chart data to each workout for rendering in cards.
-    try:
-        from django.db.models import Prefetch
-        from workouts.models import WorkoutPerformanceData
-
-        page_obj.object_list = page_obj.object_list.prefetch_related(
-            Prefetch(
-                'performance_data',
-                queryset=WorkoutPerformanceData.objects.only(
-                    'workout_id',
-                    'timestamp',
-                    'output',
-                    'speed',
-                    'power_zone',
-                    'intensity_zone',
-                ).order_by('timestamp'),
-            )
-        )
-    except Exception:
-        # If prefetch fails for any reason, continue without card charts.
-        pass
+    # Card charts come from stored sparklines (one row per workout, joined into
+    # the page query); only workouts without one read their time series.
+    page_obj.object_list = page_obj.object_list.select_related('sparkline')
     
     # Add pagination flag for template
     is_paginated = page_obj.has_other_pages()
@@ -2452,32 +2417,13 @@ def workout_history(request):
     ).values_list('ride_detail__fitness_discipline', flat=True).distinct()
     fitness_disciplines = [d for d in fitness_disciplines if d]  # Remove empty values
     
-    # Calculate sync status for template
-    sync_in_progress = False
-    sync_cooldown_until = None
-    cooldown_remaining_minutes = None
-    can_sync = True
-    
-    if peloton_connection:
-        sync_in_progress = peloton_connection.sync_in_progress
-        if peloton_connection.sync_cooldown_until and timezone.now() < peloton_connection.sync_cooldown_until:
-            sync_cooldown_until = peloton_connection.sync_cooldown_until
-            cooldown_remaining_minutes = int((peloton_connection.sync_cooldown_until - timezone.now()).total_seconds() / 60)
-            can_sync = False
-        if sync_in_progress:
-            can_sync = False
-    
     context = {
         'workouts': page_obj,
         'workout_types': workout_types,
         'instructors': instructors,
         'durations': all_durations,
         'fitness_disciplines': fitness_disciplines,
-        'peloton_connection': peloton_connection,
-        'sync_in_progress': sync_in_progress,
-        'sync_cooldown_until': sync_cooldown_until,
-        'cooldown_remaining_minutes': cooldown_remaining_minutes,
-        'can_sync': can_sync,
+        **_sync_status_context(peloton_connection),
         'search_query': search_query,
         'workout_type_filter': workout_type_filter,
         'instructor_filter': instructor_filter,
@@ -2545,11 +2491,7 @@ def workout_history(request):
     # Build per-card mini chart data (SVG sparkline + optional zone bands)
     try:
         user_profile = getattr(request.user, "profile", None)
-        for w in page_obj.object_list:
-            # Derived metrics for cards (avoid blanks when Peloton didn't send metrics)
-            w.derived_tss = _estimate_workout_tss(w, user_profile=user_profile)
-            w.derived_avg_speed = _estimate_workout_avg_speed_mph(w)
-            w.card_chart = _build_workout_card_chart(w, user_profile=user_profile)
+        _attach_card_charts(page_obj.object_list, user_profile=user_profile)
     except Exception:
         # Keep page usable even if chart derivation fails for an edge case.
         pass
@@ -2562,55 +2504,38 @@ def workout_history(request):
 def workout_history_suggest(request):
     """
     Lightweight JSON suggestions for the workout history search box.
-    Returns titles and instructor names matching the query.
+    Returns titles and instructor names of the user's classes matching the
+    query, best matches first (served by the ride search index).
     """
     from django.http import JsonResponse
-    from django.db.models import Q
 
     q = (request.GET.get('q', '') or '').strip()
     if len(q) < 2:
         return JsonResponse({'results': []})
-    # Guard against expensive regex / huge inputs
+    # Guard against huge inputs
     if len(q) > 64:
         q = q[:64]
 
-    # Build a safe "fuzzy" regex: characters in order, allowing gaps.
-    # Example: "pzr" -> "p.*z.*r"
-    import re
-    q_compact = re.sub(r"\s+", "", q)
-    # Keep alphanumerics only for the regex pattern to avoid special chars
-    q_alnum = re.sub(r"[^0-9A-Za-z]+", "", q_compact)
-    fuzzy_regex = None
-    if len(q_alnum) >= 2 and len(q_alnum) <= 32:
-        fuzzy_regex = ".*".join(re.escape(ch) for ch in q_alnum)
-
-    base = Workout.objects.filter(user=request.user, ride_detail__isnull=False).select_related(
-        'ride_detail', 'ride_detail__instructor'
-    )
-    base = base.filter(
-        Q(ride_detail__title__icontains=q) |
-        Q(ride_detail__instructor__name__icontains=q) |
-        (
-            Q(ride_detail__title__iregex=fuzzy_regex) |
-            Q(ride_detail__instructor__name__iregex=fuzzy_regex)
-        if fuzzy_regex else Q()
-        )
+    base = Workout.objects.filter(user=request.user, ride_detail__isnull=False)
+    matches = (
+        search_rides(base, q, ride_path='ride_detail')
+        .order_by('-search_rank', '-completed_date')
+        .values_list('ride_detail__title', 'ride_detail__instructor__name')[:50]
     )
 
-    titles = list(
-        base.order_by('ride_detail__title')
-        .values_list('ride_detail__title', flat=True)
-        .distinct()[:7]
-    )
-    instructors = list(
-        base.exclude(ride_detail__instructor__name__isnull=True)
-        .order_by('ride_detail__instructor__name')
-        .values_list('ride_detail__instructor__name', flat=True)
-        .distinct()[:5]
-    )
+    tokens = query_tokens(q)
+    titles, instructors = [], []
+    for title, instructor in matches:
+        if title and title not in titles and len(titles) < 7:
+            titles.append(title)
+        if (
+            instructor and instructor not in instructors and len(instructors) < 5
+            and any(word.startswith(token) for token in tokens for word in query_tokens(instructor))
+        ):
+            instructors.append(instructor)
 
-    results = [{'label': t, 'value': t, 'kind': 'title'} for t in titles if t]
-    results.extend([{'label': f'Instructor: {n}', 'value': n, 'kind': 'instructor'} for n in instructors if n])
+    results = [{'label': t, 'value': t, 'kind': 'title'} for t in titles]
+    results.extend([{'label': f'Instructor: {n}', 'value': n, 'kind': 'instructor'} for n in instructors])
 
     return JsonResponse({'results': results})
 
@@ -2636,8 +2561,8 @@ def _downsample_points(values, max_points=48):
     return out
 
 
-def _estimate_workout_avg_speed_mph(workout):
-    """Estimate avg speed (mph) from details or time-series speed."""
+def _estimate_workout_avg_speed_mph(workout, sparkline=None):
+    """Estimate avg speed (mph) from details or time-series speed (or its stored sparkline summary)."""
     try:
         details = getattr(workout, "details", None)
         if details and getattr(details, "avg_speed", None) is not None:
@@ -2645,8 +2570,11 @@ def _estimate_workout_avg_speed_mph(workout):
     except Exception:
         pass
 
+    if sparkline is not None:
+        return sparkline.avg_speed
+
     try:
-        perf = list(workout.performance_data.all())
+        perf = get_performance_samples(workout)
     except Exception:
         perf = []
     speeds = []
@@ -2700,13 +2628,15 @@ def _estimate_workout_if_from_tss(workout):
         return None
 
 
-def _estimate_workout_tss(workout, user_profile=None):
+def _estimate_workout_tss(workout, user_profile=None, sparkline=None):
     """
     Estimate cycling TSS when Peloton didn't provide it.
 
     Uses a common approximation:
       IF ≈ avg_power / FTP
       TSS ≈ hours * IF^2 * 100
+
+    With a stored sparkline its series summary replaces reading the samples.
     
     Delegates to MetricsCalculator service.
     """
@@ -2729,24 +2659,31 @@ def _estimate_workout_tss(workout, user_profile=None):
     except Exception:
         pass
 
-    try:
-        perf = list(workout.performance_data.all())
-    except Exception:
-        perf = []
-    outputs = []
-    max_t = None
-    for p in perf:
-        t = getattr(p, "timestamp", None)
-        if isinstance(t, int):
-            max_t = t if max_t is None else max(max_t, t)
-        v = getattr(p, "output", None)
-        if isinstance(v, (int, float)):
-            outputs.append(float(v))
-
-    if avg_power is None:
-        if not outputs:
+    if sparkline is not None:
+        max_t = sparkline.last_timestamp
+        if avg_power is None:
+            avg_power = sparkline.avg_output
+        if avg_power is None:
             return None
-        avg_power = sum(outputs) / float(len(outputs))
+    else:
+        try:
+            perf = get_performance_samples(workout)
+        except Exception:
+            perf = []
+        outputs = []
+        max_t = None
+        for p in perf:
+            t = getattr(p, "timestamp", None)
+            if isinstance(t, int):
+                max_t = t if max_t is None else max(max_t, t)
+            v = getattr(p, "output", None)
+            if isinstance(v, (int, float)):
+                outputs.append(float(v))
+
+        if avg_power is None:
+            if not outputs:
+                return None
+            avg_power = sum(outputs) / float(len(outputs))
 
     # Duration: prefer class duration; fallback to last timestamp
     duration_seconds = getattr(ride, "duration_seconds", None)
@@ -2973,17 +2910,7 @@ def _target_watts_for_zone(zone_ranges, zone_num):
 
 def _target_value_at_time(segments, t_seconds):
     """Find the segment covering time t_seconds and return its 'target' value."""
-    if not segments or not isinstance(t_seconds, int):
-        return None
-    for seg in segments:
-        try:
-            start = int(seg.get('start', 0))
-            end = int(seg.get('end', 0))
-        except Exception:
-            continue
-        if t_seconds >= start and (end == 0 or t_seconds < end):
-            return seg.get('target')
-    return None
+    return target_value_at_time(segments, t_seconds)
 
 
 def _target_value_at_time_with_shift(segments, t_seconds, shift_seconds=0):
@@ -2993,33 +2920,12 @@ def _target_value_at_time_with_shift(segments, t_seconds, shift_seconds=0):
     A negative shift (e.g. -60) means the target segments start earlier on the chart.
     Equivalent lookup: target(t) = target_original(t - shift).
     """
-    if not isinstance(t_seconds, int):
-        return None
-    try:
-        s = int(shift_seconds or 0)
-    except Exception:
-        s = 0
-    return _target_value_at_time(segments, t_seconds - s)
+    return target_value_at_time_with_shift(segments, t_seconds, shift_seconds)
 
 
 def _target_segment_at_time_with_shift(segments, t_seconds, shift_seconds=0):
     """Return the target segment dict at time t_seconds with optional time shift."""
-    if not segments or not isinstance(t_seconds, int):
-        return None
-    try:
-        s = int(shift_seconds or 0)
-    except Exception:
-        s = 0
-    t = t_seconds - s
-    for seg in segments:
-        try:
-            start = int(seg.get('start', 0))
-            end = int(seg.get('end', 0))
-        except Exception:
-            continue
-        if t >= start and (end == 0 or t < end):
-            return seg
-    return None
+    return target_segment_at_time_with_shift(segments, t_seconds, shift_seconds)
 
 
 def _extract_spin_up_intervals(ride_detail):
@@ -3274,16 +3180,19 @@ def _resolve_pace_context(user_profile, workout_date, discipline):
     return mapping.get(z)
 
 
-def _build_workout_card_chart(workout, user_profile=None):
+def _build_workout_card_chart(workout, user_profile=None, perf=None):
     """
     Build lightweight mini-chart data for workout cards.
     Output is a dict that templates can render as an inline SVG.
+
+    `perf` are the workout's samples if already loaded.
     """
     ride = getattr(workout, 'ride_detail', None)
     if not ride:
         return None
 
-    perf = list(getattr(workout, 'performance_data', []).all() if hasattr(workout, 'performance_data') else [])
+    if perf is None:
+        perf = get_performance_samples(workout) if isinstance(getattr(workout, 'pk', None), int) else []
     if not perf:
         return None
 
@@ -3436,10 +3345,11 @@ def _build_workout_card_chart(workout, user_profile=None):
 
     # Attach target values to points (so scaling includes them and tooltip can show them)
     if target_segments:
-        for pt in series:
-            t = pt.get('t')
-            if isinstance(t, int):
-                seg = _target_segment_at_time_with_shift(target_segments, t, shift_seconds=TARGET_TIME_SHIFT_SECONDS)
+        point_segments = target_segments_at_times(
+            target_segments, [pt.get('t') for pt in series], shift_seconds=TARGET_TIME_SHIFT_SECONDS
+        )
+        for pt, seg in zip(series, point_segments):
+            if isinstance(pt.get('t'), int):
                 if not isinstance(seg, dict):
                     continue
 
@@ -3649,19 +3559,77 @@ def _build_workout_card_chart(workout, user_profile=None):
     }
 
 
+def _attach_card_charts(workouts, user_profile=None):
+    """
+    Set card_chart / derived_tss / derived_avg_speed on a page of history cards.
+
+    Charts come from stored WorkoutSparkline rows (select_related 'sparkline');
+    workouts without a current one are built from their series in one batch
+    and stored for the next view.
+    """
+    workouts = list(workouts)
+    sparklines = {w.pk: current_sparkline(w) for w in workouts}
+    missing = [w for w in workouts if sparklines[w.pk] is None]
+    if missing:
+        series_map = load_series_map([w.pk for w in missing])
+        rows = []
+        for w in missing:
+            series = series_map.get(w.pk)
+            samples = series.samples() if series else []
+            try:
+                chart = _build_workout_card_chart(w, user_profile=user_profile, perf=samples)
+            except Exception:
+                logger.warning(f"Could not build card chart for workout {w.pk}", exc_info=True)
+                chart = None
+            rows.append(WorkoutSparkline(workout=w, chart=chart, **series_summary(samples)))
+        try:
+            store_sparklines(rows)
+        except Exception as e:
+            logger.warning(f"Could not store workout sparklines: {e}")
+        for row in rows:
+            sparklines[row.workout_id] = row
+
+    for w in workouts:
+        sparkline = sparklines[w.pk]
+        chart = sparkline.chart
+        if chart:
+            chart = {**chart, 'series_json': mark_safe(chart.get('series_json') or '[]')}
+        # Derived metrics for cards (avoid blanks when Peloton didn't send metrics)
+        w.derived_tss = _estimate_workout_tss(w, user_profile=user_profile, sparkline=sparkline)
+        w.derived_avg_speed = _estimate_workout_avg_speed_mph(w, sparkline=sparkline)
+        w.card_chart = chart
+
+
+PERFORMANCE_GRAPH_REFRESH_LOCK_SECONDS = 10 * 60
+
+
+def _queue_performance_graph_refresh(workout):
+    """Queue fetch_performance_graph_task for a workout at most once per lock window."""
+    from .tasks import fetch_performance_graph_task
+
+    lock_key = f"ctz:perf_graph_refresh:{workout.pk}"
+    if not cache.add(lock_key, 1, PERFORMANCE_GRAPH_REFRESH_LOCK_SECONDS):
+        return
+    try:
+        fetch_performance_graph_task.delay(workout.user_id, workout.pk, workout.peloton_workout_id)
+    except Exception as e:
+        logger.warning(f"Could not queue performance graph refresh for workout {workout.id}: {e}")
+
+
 @login_required
 def workout_detail(request, pk):
     """Display detailed view of a single workout"""
     workout = get_object_or_404(
         Workout.objects.select_related(
-            'ride_detail', 'ride_detail__workout_type', 'ride_detail__instructor', 'details', 'user', 'ride_detail__playlist'
-        ).prefetch_related('performance_data'),
+            'ride_detail', 'ride_detail__workout_type', 'ride_detail__instructor', 'details', 'user', 'ride_detail__playlist',
+            'time_series',
+        ),
         pk=pk,
         user=request.user
     )
     
-    # Get performance data ordered by timestamp
-    performance_data = workout.performance_data.all().order_by('timestamp')
+    # Get performance samples ordered by timestamp (packed series, legacy rows as fallback)
+    performance_data = get_performance_samples(workout)
     
     # Get user profile for target metrics calculations
     user_profile = request.user.profile
@@ -3717,8 +3685,8 @@ def workout_detail(request, pk):
             # Use segments from ride_detail.get_power_zone_segments() which has the class plan
             target_line_data = None
             
-            if user_ftp and performance_data.exists():
-                performance_timestamps = list(performance_data.values_list('timestamp', flat=True))
+            if user_ftp and performance_data:
+                performance_timestamps = [p.timestamp for p in performance_data]
                 
                 if segments and len(segments) > 0:
                     # Method 1: Use segments from class plan
@@ -3731,48 +3699,21 @@ def workout_detail(request, pk):
                     )
                     logger.info(f"Calculated target line from {len(segments)} segments for workout {workout.id}")
                 else:
-                    logger.warning(f"No segments found for power zone workout {workout.id}, trying API fallback")
+                    logger.warning(f"No segments found for power zone workout {workout.id}, trying stored target metrics")
                 
-                # Fallback: Try to fetch from performance graph API if segments not available
-                if not target_line_data and workout.peloton_workout_id:
-                    try:
-                        from peloton.models import PelotonConnection
-                        from peloton.services.peloton import PelotonClient, PelotonAPIError
-                        
-                        connection = PelotonConnection.objects.filter(
-                            user=request.user, 
-                            is_active=True
-                        ).first()
-                        
-                        if connection:
-                            client = connection.get_client()
-                            performance_graph = client.fetch_performance_graph(workout.peloton_workout_id, every_n=5)
-                            
-                            # Extract target_metrics_performance_data
-                            target_metrics_perf = performance_graph.get('target_metrics_performance_data', {})
-                            target_metrics_list = target_metrics_perf.get('target_metrics', [])
-                            
-                            if target_metrics_list and user_ftp:
-                                # Get timestamps from performance_data (database) to align target line
-                                # If no performance_data yet, use seconds_since_pedaling_start from graph
-                                if performance_data.exists():
-                                    performance_timestamps = list(performance_data.values_list('timestamp', flat=True))
-                                else:
-                                    performance_timestamps = performance_graph.get('seconds_since_pedaling_start', [])
-                                
-                                # Calculate target line data points aligned with performance data timestamps
-                                target_line_data = _calculate_power_zone_target_line(
-                                    target_metrics_list, 
-                                    user_ftp,
-                                    performance_timestamps
-                                )
-                                logger.info(f"Calculated target line from API for workout {workout.id}")
-                    except Exception as e:
-                        logger.warning(f"Could not fetch performance graph for workout {workout.id}: {e}")
+                # Fallback: class targets stored from the performance graph at sync time
+                details = getattr(workout, 'details', None)
+                if not target_line_data and details and details.target_metrics:
+                    target_line_data = _calculate_power_zone_target_line(
+                        details.target_metrics,
+                        user_ftp,
+                        performance_timestamps
+                    )
+                    logger.info(f"Calculated target line from stored target metrics for workout {workout.id}")
             else:
                 if not user_ftp:
                     logger.warning(f"No FTP found for power zone workout {workout.id}")
-                if not performance_data.exists():
+                if not performance_data:
                     logger.warning(f"No performance data found for workout {workout.id}")
         elif ride_detail.fitness_discipline in ['running', 'walking']:
             # Running/Walking class - get user's pace zones based on activity type
@@ -3858,7 +3799,7 @@ def workout_detail(request, pk):
     if performance_data and workout.ride_detail and (workout.ride_detail.is_power_zone_class or workout.ride_detail.class_type == 'power_zone'):
         # Calculate segment_length from performance data timestamps (default 5 seconds)
         segment_length = 5  # Default Peloton sampling interval
-        perf_list = list(performance_data.order_by('timestamp'))
+        perf_list = list(performance_data)
         if len(perf_list) > 1:
             # Calculate average interval between data points
             intervals = []
@@ -3912,7 +3853,7 @@ def workout_detail(request, pk):
         # Calculate segment_length from performance data timestamps (default 5 seconds)
         segment_length = 5  # Default Peloton sampling interval
         if performance_data:
-            perf_list = list(performance_data.order_by('timestamp'))
+            perf_list = list(performance_data)
             if len(perf_list) > 1:
                 # Calculate average interval between data points
                 intervals = []
@@ -3954,27 +3895,19 @@ def workout_detail(request, pk):
         
         # Calculate actual time in zones from performance data
         zone_actual_times = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0}
+        on_target_percentage = None
         if performance_data and user_ftp:
+            perf_timestamps = [perf.timestamp for perf in performance_data]
+            actual_zones = power_zones_for_outputs([perf.output for perf in performance_data], user_ftp)
             # Use segment_length to determine time duration per data point
-            for perf in performance_data:
-                if perf.output and perf.output > 0:
-                    percentage = perf.output / user_ftp
-                    
-                    # Map watts to power zone based on FTP (matching example code)
-                    if percentage < 0.55:
-                        zone_actual_times[1] += segment_length
-                    elif percentage < 0.75:
-                        zone_actual_times[2] += segment_length
-                    elif percentage < 0.90:
-                        zone_actual_times[3] += segment_length
-                    elif percentage < 1.05:
-                        zone_actual_times[4] += segment_length
-                    elif percentage < 1.20:
-                        zone_actual_times[5] += segment_length
-                    elif percentage < 1.50:
-                        zone_actual_times[6] += segment_length
-                    else:
-                        zone_actual_times[7] += segment_length
+            for zone, count in Counter(zone for zone in actual_zones if zone).items():
+                zone_actual_times[zone] += count * segment_length
+            # Share of the class's targeted time ridden in the target zone
+            if segments:
+                target_timeline = power_zone_timeline(segments, range(1, 8), spin_up_intervals=spin_up_intervals)
+                compliance = target_compliance(perf_timestamps, actual_zones, target_timeline.values_at(perf_timestamps))
+                if compliance['target_seconds']:
+                    on_target_percentage = compliance['percentage']
         
         # Build zone targets with progress
         zone_targets_list = []
@@ -4029,6 +3962,7 @@ def workout_detail(request, pk):
         if zone_targets_list:
             zone_targets = {
                 'overall_percentage': round(overall_percentage, 2),
+                'on_target_percentage': on_target_percentage,
                 'zones': zone_targets_list
             }
         else:
@@ -4074,7 +4008,7 @@ def workout_detail(request, pk):
         # Calculate segment_length from performance data timestamps (default 5 seconds)
         segment_length = 5  # Default Peloton sampling interval
         if performance_data:
-            perf_list = list(performance_data.order_by('timestamp'))
+            perf_list = list(performance_data)
             if len(perf_list) > 1:
                 intervals = []
                 for i in range(1, min(10, len(perf_list))):
@@ -4355,6 +4289,7 @@ def workout_detail(request, pk):
             'avg_heart_rate': details.avg_heart_rate,
             'max_heart_rate': details.max_heart_rate,
             'tss': details.tss,
+            'elevation_ft': details.elevation,
         }
     else:
         # If we don't have WorkoutDetails, still allow pace from performance data if present
@@ -4371,8 +4306,8 @@ def workout_detail(request, pk):
             return f"{mins}:{secs:02d}"
 
     # Fallback: derive avg speed/pace from stored performance_data (no API call)
-    if (not workout_summary.get('avg_speed_mph')) and performance_data.exists():
-        speeds = list(performance_data.values_list('speed', flat=True))
+    if (not workout_summary.get('avg_speed_mph')) and performance_data:
+        speeds = [p.speed for p in performance_data]
         speeds = [s for s in speeds if isinstance(s, (int, float)) and s and s > 0]
         if speeds:
             avg_speed = sum(speeds) / len(speeds)
@@ -4380,69 +4315,19 @@ def workout_detail(request, pk):
             if not workout_summary.get('avg_pace_str'):
                 workout_summary['avg_pace_str'] = _pace_str_from_mph(avg_speed)
 
-    # Fallback: fetch elevation (and missing summaries) from Peloton performance graph if available
-    # Only do this if we have a Peloton workout id and no elevation yet.
-    if workout.peloton_workout_id and workout_summary.get('elevation_ft') is None:
-        try:
-            connection = PelotonConnection.objects.filter(user=request.user, is_active=True).first()
-            if connection:
-                client = connection.get_client()
-                # Larger every_n reduces payload; summaries are unaffected.
-                performance_graph = client.fetch_performance_graph(workout.peloton_workout_id, every_n=30)
-                summaries_array = performance_graph.get('summaries', []) or []
-                for summary in summaries_array:
-                    if not isinstance(summary, dict):
-                        continue
-                    if summary.get('slug') == 'elevation' and summary.get('value') is not None:
-                        workout_summary['elevation_ft'] = summary.get('value')
-                        break
-
-                # Fill distance / total output / calories if missing in WorkoutDetails
-                if summaries_array:
-                    if workout_summary.get('distance_mi') is None:
-                        for s in summaries_array:
-                            if isinstance(s, dict) and s.get('slug') == 'distance' and s.get('value') is not None:
-                                workout_summary['distance_mi'] = s.get('value')
-                                break
-                    if workout_summary.get('total_output_kj') is None:
-                        for s in summaries_array:
-                            if isinstance(s, dict) and s.get('slug') == 'total_output' and s.get('value') is not None:
-                                workout_summary['total_output_kj'] = s.get('value')
-                                break
-                    if workout_summary.get('total_calories') is None:
-                        for s in summaries_array:
-                            if isinstance(s, dict) and s.get('slug') in ('total_calories', 'calories') and s.get('value') is not None:
-                                workout_summary['total_calories'] = s.get('value')
-                                break
-
-                # Fill avg_speed from average_summaries if missing (and thus avg pace)
-                if workout_summary.get('avg_speed_mph') is None:
-                    avg_summaries = performance_graph.get('average_summaries', []) or []
-                    for s in avg_summaries:
-                        if isinstance(s, dict) and s.get('slug') == 'avg_speed' and s.get('value') is not None:
-                            workout_summary['avg_speed_mph'] = s.get('value')
-                            break
-                    if workout_summary.get('avg_speed_mph') is None:
-                        # Some graphs use metrics[].slug == 'speed' with average_value
-                        metrics = performance_graph.get('metrics', []) or []
-                        for m in metrics:
-                            if isinstance(m, dict) and m.get('slug') == 'speed' and m.get('average_value') is not None:
-                                workout_summary['avg_speed_mph'] = m.get('average_value')
-                                break
-                if workout_summary.get('avg_speed_mph') is not None and not workout_summary.get('avg_pace_str'):
-                    workout_summary['avg_pace_str'] = _pace_str_from_mph(workout_summary.get('avg_speed_mph'))
-        except Exception:
-            # Keep page resilient even if Peloton API fails
-            pass
+    # Elevation and targets are stored with the performance graph at sync time.
+    # Workouts synced before that get their graph refetched in the background.
+    if workout.peloton_workout_id and (not details or details.performance_graph_fetched_at is None):
+        _queue_performance_graph_refresh(workout)
 
     # Generate chart data using ChartBuilder service
     performance_graph_data = None
     zone_distribution_data = None
     summary_stats_data = None
     
-    if performance_data.exists() and workout.ride_detail:
-        # Convert performance_data queryset to list of dicts for ChartBuilder
-        perf_list = list(performance_data.values('timestamp', 'output'))
+    if performance_data and workout.ride_detail:
+        # Convert performance samples to list of dicts for ChartBuilder
+        perf_list = [{'timestamp': p.timestamp, 'output': p.output} for p in performance_data]
         
         # Generate performance graph
         if workout.ride_detail.is_power_zone_class or workout.ride_detail.class_type == 'power_zone':
@@ -4588,328 +4473,32 @@ def workout_detail(request, pk):
 def _calculate_target_line_from_segments(segments, zone_ranges, seconds_array, user_ftp=None, spin_up_intervals=None):
     """
     Calculate target output line from class plan segments (from ride_detail.get_power_zone_segments()).
-    Uses the middle of each zone's watt range as the target.
-    Returns a list matching seconds_array length with target watts for each timestamp.
-    Shifts target line 60 seconds backwards (earlier).
-    Optionally accepts spin_up_intervals to backfill gaps (Spin Ups) so the line stays continuous.
+    Uses the middle of each zone's watt range as the target, shifted 60 seconds earlier.
+    See core.utils.workout_targets.calculate_target_line_from_segments.
     """
-    if not segments or not zone_ranges or not seconds_array:
-        return []
-    
-    sample_count = len(seconds_array)
-    target_series = [None] * sample_count
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    
-    # Shift target line 60 seconds backwards
-    TIME_SHIFT = -60
-    
-    # Try to get FTP directly; fallback to zone range upper bound (Z1 upper ≈ 55% FTP)
-    ftp_value = None
-    try:
-        if user_ftp:
-            ftp_value = float(user_ftp)
-    except (TypeError, ValueError):
-        ftp_value = None
-
-    zone_ranges_map = zone_ranges or {}
-
-    if ftp_value is None and zone_ranges_map:
-        zone1 = zone_ranges_map.get(1)
-        if zone1 and zone1[1]:
-            try:
-                ftp_value = float(zone1[1]) / 0.55
-            except (TypeError, ValueError, ZeroDivisionError):
-                ftp_value = None
-
-    zone_power_percentages = metrics_calculator.ZONE_POWER_PERCENTAGES
-
-    # Helper function to calculate target watts from zone number
-    def _zone_to_watts(zone_num):
-        if zone_num and ftp_value and zone_num in zone_power_percentages:
-            return round(ftp_value * zone_power_percentages[zone_num])
-
-        if zone_num and zone_num in zone_ranges_map:
-            lower, upper = zone_ranges_map[zone_num]
-            if lower is not None and upper is not None:
-                return round((lower + upper) / 2)
-            elif lower is not None:
-                if zone_num == 7:
-                    target_pct = zone_power_percentages.get(7)
-                    if target_pct and lower > 0:
-                        # lower ≈ 1.50 * FTP → rescale to target_pct
-                        scaling = target_pct / 1.50
-                        return round(lower * scaling)
-                return round(lower * 1.25)
-        return None
-    
-    base_segments = list(segments or [])
-
-    # Process each segment from the class plan
-    for segment in base_segments:
-        zone_num = segment.get('zone')
-        if not zone_num:
-            continue
-        
-        # Shift segment times 60 seconds backwards
-        start_time = max(0, segment.get('start', 0) + TIME_SHIFT)
-        end_time = max(0, segment.get('end', 0) + TIME_SHIFT)
-        
-        if end_time <= start_time:
-            continue
-        
-        # Skip segments that start after the workout ends (prevents index lookup failure)
-        if max_timestamp is not None and start_time > max_timestamp:
-            continue
-        
-        # Calculate target watts for this zone (middle of zone range)
-        target_watts = _zone_to_watts(zone_num)
-        if target_watts is None:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = target_watts
-
-    # Fill any gaps (None values) using spin-up intervals (treated as Zone 1 unless specified)
-    if spin_up_intervals:
-        for interval in spin_up_intervals:
-            if not isinstance(interval, dict):
-                continue
-            start_raw = interval.get('start')
-            end_raw = interval.get('end')
-            if start_raw is None or end_raw is None:
-                continue
-            try:
-                start_val = int(start_raw)
-                end_val = int(end_raw)
-            except (TypeError, ValueError):
-                continue
-            if end_val <= start_val:
-                continue
-
-            # Shift interval to match chart alignment
-            start_time = max(0, start_val + TIME_SHIFT)
-            end_time = max(0, end_val + TIME_SHIFT)
-            if end_time <= start_time:
-                continue
-            if max_timestamp is not None and start_time > max_timestamp:
-                continue
-
-            spin_zone = interval.get('zone') or 1
-            target_watts = _zone_to_watts(spin_zone)
-            if target_watts is None:
-                continue
-
-            start_idx = 0
-            end_idx = sample_count
-
-            for i, timestamp in enumerate(seconds_array):
-                if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                    start_idx = i
-                    break
-
-            for i in range(len(seconds_array) - 1, -1, -1):
-                timestamp = seconds_array[i]
-                if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                    end_idx = i + 1
-                    break
-
-            for i in range(start_idx, min(end_idx, sample_count)):
-                if target_series[i] is None:
-                    target_series[i] = target_watts
-    
-    # Convert to list of {timestamp, target_output} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_output': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    return calculate_target_line_from_segments(
+        segments, zone_ranges, seconds_array, user_ftp, spin_up_intervals,
+        zone_power_percentages=metrics_calculator.ZONE_POWER_PERCENTAGES
+    )
 
 
 def _calculate_pace_target_line_from_segments(segments, seconds_array):
     """
     Calculate target pace line from class plan segments (for running/walking classes).
-    Returns a list matching seconds_array length with target pace zones (0-6) for each timestamp.
-    No time shift applied for pace targets (unlike power zones).
+    See core.utils.workout_targets.calculate_pace_target_line_from_segments.
     """
-    if not segments or not seconds_array:
-        return []
-    
-    sample_count = len(seconds_array)
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    target_series = [None] * sample_count
-    
-    # Process each segment from the class plan
-    for idx, segment in enumerate(segments):
-        # Get pace zone/level (0-6)
-        zone_num = segment.get('zone') or segment.get('pace_level')
-        if zone_num is None:
-            continue
-        
-        # Ensure zone is in 0-6 range
-        zone_num = max(0, min(6, int(zone_num)))
-        
-        # Get segment times (no shift for pace targets)
-        start_time = max(0, segment.get('start', 0))
-        end_time = max(0, segment.get('end', 0))
-        
-        if end_time <= start_time:
-            continue
-        
-        # Skip segments that start after the workout ends (prevents index lookup failure)
-        if max_timestamp is not None and start_time > max_timestamp:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_time:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_time:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = zone_num
-    
-    # Convert to list of {timestamp, target_pace_zone} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_pace_zone': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    return calculate_pace_target_line_from_segments(segments, seconds_array)
 
 
 def _calculate_power_zone_target_line(target_metrics_list, user_ftp, seconds_array):
     """
-    Calculate target output line data points from target_metrics_performance_data.
-    Returns a list matching seconds_array length with target watts for each timestamp.
-    Similar to reference implementation - creates a target_series array aligned with actual data.
-    Shifts target line 60 seconds backwards (earlier).
-    
-    Power zone target percentages:
-    Zone 1: 45% of FTP (active recovery target)
-    Zone 2: 65% of FTP (midpoint of 55-75%)
-    Zone 3: 82.5% of FTP (midpoint of 75-90%)
-    Zone 4: 97.5% of FTP (midpoint of 90-105%)
-    Zone 5: 112.5% of FTP (midpoint of 105-120%)
-    Zone 6: 135% of FTP (midpoint of 120-150%)
-    Zone 7: 160% of FTP (typical sprint target)
+    Calculate target output line data points from target_metrics_performance_data, shifted 60 seconds earlier.
+    See core.utils.workout_targets.calculate_power_zone_target_line.
     """
-    zone_power_percentages = metrics_calculator.ZONE_POWER_PERCENTAGES
-    
-    # Shift target line 60 seconds backwards
-    TIME_SHIFT = -60
-    
-    # Create target series array matching seconds_array length
-    sample_count = len(seconds_array)
-    target_series = [None] * sample_count
-    max_timestamp = seconds_array[-1] if seconds_array else None
-    
-    # Helper function to calculate target watts from zone number
-    def _zone_to_watts(zone_num):
-        if zone_num and zone_num in zone_power_percentages:
-            return round(user_ftp * zone_power_percentages[zone_num])
-        return None
-    
-    # Process each target metric segment
-    for segment in target_metrics_list:
-        if segment.get('segment_type') != 'power_zone':
-            continue
-            
-        offsets = segment.get('offsets', {})
-        # Shift segment times 60 seconds backwards
-        start_offset = max(0, offsets.get('start', 0) + TIME_SHIFT)
-        end_offset = max(0, offsets.get('end', 0) + TIME_SHIFT)
-        
-        if start_offset is None or end_offset is None or end_offset <= start_offset:
-            continue
-        
-        # Skip segments that start after the workout ends (prevents index lookup failure)
-        if max_timestamp is not None and start_offset > max_timestamp:
-            continue
-        
-        # Extract zone number from metrics
-        zone_num = None
-        for metric in segment.get('metrics', []):
-            if metric.get('name') == 'power_zone':
-                zone_lower = metric.get('lower')
-                zone_upper = metric.get('upper')
-                # Use lower if they match, otherwise use lower (we'll apply midpoint percentage)
-                zone_num = zone_lower if zone_lower == zone_upper else zone_lower
-                break
-        
-        if zone_num is None:
-            continue
-        
-        # Calculate target watts for this zone
-        target_watts = _zone_to_watts(zone_num)
-        if target_watts is None:
-            continue
-        
-        # Map time offsets to array indices using seconds_array
-        # Find indices where seconds_array matches start/end times
-        start_idx = 0
-        end_idx = sample_count
-        
-        for i, timestamp in enumerate(seconds_array):
-            if isinstance(timestamp, (int, float)) and timestamp >= start_offset:
-                start_idx = i
-                break
-        
-        for i in range(len(seconds_array) - 1, -1, -1):
-            timestamp = seconds_array[i]
-            if isinstance(timestamp, (int, float)) and timestamp <= end_offset:
-                end_idx = i + 1
-                break
-        
-        # Fill target_series for this segment
-        for i in range(start_idx, min(end_idx, sample_count)):
-            target_series[i] = target_watts
-    
-    # Convert to list of {timestamp, target_output} objects for template
-    target_line_list = []
-    for i, timestamp in enumerate(seconds_array):
-        if not isinstance(timestamp, (int, float)):
-            continue
-        target_line_list.append({
-            'timestamp': int(timestamp),
-            'target_output': target_series[i] if i < len(target_series) else None
-        })
-    
-    return target_line_list
+    return calculate_power_zone_target_line(
+        target_metrics_list, user_ftp, seconds_array,
+        zone_power_percentages=metrics_calculator.ZONE_POWER_PERCENTAGES
+    )
 
 
 @login_required
@@ -4964,1267 +4553,148 @@ def _store_playlist_from_data(playlist_data, ride_detail, logger, workout_num=No
     return False
 
 
+def _sync_status_context(connection, job=None):
+    """
+    Build the context for the `sync_status.html` partial.
+
+    Args:
+        connection: PelotonConnection or None
+        job: Active WorkoutSyncJob (looked up when omitted)
+    """
+    from .services.sync_engine import get_active_sync_job, get_job_progress
+
+    if connection is None:
+        return {
+            'peloton_connection': None,
+            'sync_in_progress': False,
+            'sync_cooldown_until': None,
+            'cooldown_remaining_minutes': None,
+            'can_sync': False,
+            'sync_progress': None,
+        }
+
+    if job is None and connection.sync_in_progress:
+        job = get_active_sync_job(connection.user)
+
+    sync_cooldown_until = None
+    cooldown_remaining_minutes = None
+    if connection.sync_cooldown_until and timezone.now() < connection.sync_cooldown_until:
+        sync_cooldown_until = connection.sync_cooldown_until
+        cooldown_remaining_minutes = int((connection.sync_cooldown_until - timezone.now()).total_seconds() / 60)
+
+    sync_in_progress = connection.sync_in_progress
+    return {
+        'peloton_connection': connection,
+        'sync_in_progress': sync_in_progress,
+        'sync_cooldown_until': None if sync_in_progress else sync_cooldown_until,
+        'cooldown_remaining_minutes': None if sync_in_progress else cooldown_remaining_minutes,
+        'can_sync': not sync_in_progress and sync_cooldown_until is None,
+        'sync_progress': get_job_progress(job) if sync_in_progress else None,
+    }
+
+
 @login_required
 def sync_workouts(request):
-    """Trigger manual sync of workouts from Peloton API"""
+    """
+    Enqueue a background sync of workouts from the Peloton API.
+
+    The sync itself runs as a WorkoutSyncJob in Celery (see
+    `workouts.services.sync_engine`); this view only starts it and reports progress.
+    """
     if request.method != 'POST':
         return redirect('workouts:history')
-    
+
+    from .services.sync_engine import create_sync_job, get_active_sync_job, get_job_progress
+    from .tasks import run_workout_sync_job
+
     try:
         connection = PelotonConnection.objects.get(user=request.user)
     except PelotonConnection.DoesNotExist:
         messages.error(request, 'No Peloton connection found. Please connect your Peloton account first.')
         return redirect('workouts:history')
-    
+
+    is_htmx = bool(request.headers.get('HX-Request'))
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
     # Check if sync is already in progress
     if connection.sync_in_progress:
+        if is_htmx:
+            return render(request, 'workouts/partials/sync_status.html', _sync_status_context(connection))
+        if is_ajax:
+            return JsonResponse({
+                'status': 'in_progress',
+                'progress': get_job_progress(get_active_sync_job(request.user)),
+            }, status=409)
         messages.warning(request, 'A sync is already in progress. Please wait for it to complete.')
-        # If HTMX request, return partial
-        if request.headers.get('HX-Request'):
-            context = {
-                'peloton_connection': connection,
-                'sync_in_progress': True,
-                'sync_cooldown_until': None,
-                'cooldown_remaining_minutes': None,
-                'can_sync': False,
-            }
-            return render(request, 'workouts/partials/sync_status.html', context)
         return redirect('workouts:history')
-    
+
     # Check if sync is in cooldown period (60 minutes)
-    from datetime import timedelta
     if connection.sync_cooldown_until and timezone.now() < connection.sync_cooldown_until:
+        if is_htmx:
+            return render(request, 'workouts/partials/sync_status.html', _sync_status_context(connection))
         remaining_minutes = int((connection.sync_cooldown_until - timezone.now()).total_seconds() / 60)
-        messages.warning(request, f'Sync is on cooldown. Please wait {remaining_minutes} more minute(s) before syncing again.')
-        # If HTMX request, return partial
-        if request.headers.get('HX-Request'):
-            context = {
-                'peloton_connection': connection,
-                'sync_in_progress': False,
-                'sync_cooldown_until': connection.sync_cooldown_until,
-                'cooldown_remaining_minutes': remaining_minutes,
-                'can_sync': False,
-            }
-            return render(request, 'workouts/partials/sync_status.html', context)
+        message = f'Sync is on cooldown. Please wait {remaining_minutes} more minute(s) before syncing again.'
+        if is_ajax:
+            return JsonResponse({'status': 'cooldown', 'message': message}, status=429)
+        messages.warning(request, message)
         return redirect('workouts:history')
-    
-    # Mark sync as in progress
-    connection.sync_in_progress = True
-    connection.sync_started_at = timezone.now()
-    connection.save()
-    
-    try:
-        from peloton.services.peloton import PelotonAPIError
-        from datetime import datetime
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
-        # Get client
-        client = connection.get_client()
-        
-        # Get user ID
-        if not connection.peloton_user_id:
-            user_data = client.fetch_current_user()
-            peloton_user_id = user_data.get('id')
-            if peloton_user_id:
-                connection.peloton_user_id = str(peloton_user_id)
-                connection.save()
-            else:
-                messages.error(request, 'Could not determine Peloton user ID.')
-                return redirect('workouts:history')
-        else:
-            peloton_user_id = connection.peloton_user_id
-        
-        # Determine sync type: full or incremental
-        is_full_sync = connection.last_sync_at is None
-        sync_cutoff_timestamp = None
-        
-        if is_full_sync:
-            logger.info(f"Starting FULL sync for user {request.user.email}, Peloton ID: {peloton_user_id} (no previous sync found)")
-        else:
-            # Convert last_sync_at to Unix timestamp for comparison
-            # Ensure timezone-aware: last_sync_at is already UTC (Django stores in UTC when USE_TZ=True)
-            # But make it explicitly UTC-aware for safety
-            if connection.last_sync_at.tzinfo is None:
-                # If somehow timezone-naive, assume UTC
-                last_sync_utc = timezone.make_aware(connection.last_sync_at, UTC)
-            else:
-                last_sync_utc = connection.last_sync_at.astimezone(UTC)
-            
-            sync_cutoff_timestamp = last_sync_utc.timestamp()
-            logger.info(f"Starting INCREMENTAL sync for user {request.user.email}, Peloton ID: {peloton_user_id}")
-            logger.info(f"  - Last sync (UTC): {last_sync_utc}")
-            logger.info(f"  - Last sync timestamp: {sync_cutoff_timestamp}")
-            logger.info(f"  - Only syncing workouts after: {last_sync_utc}")
-        
-        workouts_synced = 0
-        workouts_updated = 0
-        workouts_skipped = 0
-        total_processed = 0
-        workouts_older_than_sync = 0
-        
-        # Iterate through workouts (newest first)
-        logger.info(f"Fetching workouts from Peloton API...")
-        for workout_data in client.iter_user_workouts(peloton_user_id):
-            total_processed += 1
-            
-            # Log progress every 50 workouts
-            if total_processed % 50 == 0:
-                logger.info(f"Progress: {total_processed} workouts processed ({workouts_synced} new, {workouts_updated} updated, {workouts_skipped} skipped)")
-            try:
-                peloton_workout_id = workout_data.get('id')
-                if not peloton_workout_id:
-                    workouts_skipped += 1
-                    logger.warning(f"Workout {total_processed}: Skipping workout with no ID")
-                    continue
-                
-                logger.info(f"Workout {total_processed}: Processing workout ID {peloton_workout_id}")
-                
-                # Log initial workout data structure for debugging
-                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Initial workout_data keys: {list(workout_data.keys())}")
-                if 'ride' in workout_data and workout_data.get('ride'):
-                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): ride keys: {list(workout_data.get('ride', {}).keys())}")
-                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): ride data: {str(workout_data.get('ride', {}))[:200]}")
-                
-                # Try to extract title and duration from workout_data first (might already be there)
-                initial_title = None
-                initial_duration_seconds = None
-                ride_data = workout_data.get('ride', {})
-                if ride_data:
-                    initial_title = ride_data.get('title') or ride_data.get('name') or ride_data.get('class_title')
-                    initial_duration_seconds = ride_data.get('duration') or ride_data.get('length')
-                    if initial_title:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found title in initial workout_data: '{initial_title}'")
-                    if initial_duration_seconds:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found duration in initial workout_data: {initial_duration_seconds}s")
-                
-                # Get or create workout type
-                workout_type_slug = (workout_data.get('fitness_discipline') or '').lower()
-                if not workout_type_slug or workout_type_slug == 'other':
-                    # Try to infer from device_type_display_name if present
-                    device_type = (workout_data.get('device_type_display_name') or '').lower()
-                    inferred = None
-                    if device_type:
-                        if device_type == 'garmin connect':
-                            inferred = 'other'  # Always treat as manual workout
-                            logger.info(f"Discipline fallback: Detected 'Garmin Connect' device, treating as manual workout for workout_data: {workout_data}")
-                        elif 'bike' in device_type:
-                            inferred = 'cycling'
-                        elif 'tread' in device_type:
-                            inferred = 'running'
-                        elif 'app' == device_type:
-                            # App could be anything, so fallback to title heuristics below
-                            inferred = None
-                        elif 'tread +' in device_type:
-                            inferred = 'running'
-                        elif 'bike +' in device_type:
-                            inferred = 'cycling'
-                        if inferred:
-                            logger.info(f"Discipline fallback: Inferred '{inferred}' from device_type_display_name '{device_type}' for workout_data: {workout_data}")
-                            workout_type_slug = inferred
-                    if not inferred:
-                        # Fallback to title heuristics
-                        title = (workout_data.get('title') or '').lower()
-                        if 'cycle' in title or 'bike' in title:
-                            inferred = 'cycling'
-                        elif 'yoga' in title:
-                            inferred = 'yoga'
-                        elif 'row' in title:
-                            inferred = 'rowing'
-                        elif 'run' in title:
-                            inferred = 'running'
-                        elif 'walk' in title:
-                            inferred = 'walking'
-                        elif 'strength' in title:
-                            inferred = 'strength'
-                        elif 'stretch' in title:
-                            inferred = 'stretching'
-                        elif 'meditat' in title:
-                            inferred = 'meditation'
-                        elif 'cardio' in title:
-                            inferred = 'cardio'
-                        if inferred:
-                            logger.info(f"Discipline fallback: Inferred '{inferred}' from title '{title}' for workout_data: {workout_data}")
-                            workout_type_slug = inferred
-                        else:
-                            logger.warning(f"Discipline fallback: Could not infer discipline for workout: {workout_data}. Defaulting to 'other'.")
-                            workout_type_slug = 'other'
-
-                # Map Peloton workout types to our workout types
-                type_mapping = {
-                    'cycling': 'cycling',
-                    'running': 'running',
-                    'walking': 'walking',
-                    'yoga': 'yoga',
-                    'strength': 'strength',
-                    'stretching': 'stretching',
-                    'meditation': 'meditation',
-                    'cardio': 'cardio',
-                    'rowing': 'rowing',
-                }
-                mapped_type = type_mapping.get(workout_type_slug, 'other')
-                if mapped_type == 'other':
-                    logger.warning(f"Type mapping fallback: '{workout_type_slug}' not in type_mapping for workout_data: {workout_data}. Using 'other'.")
-                workout_type, _ = WorkoutType.objects.get_or_create(
-                    slug=mapped_type,
-                    defaults={'name': mapped_type.title()}
-                )
-                
-                # Get or create instructor
-                instructor = None
-                instructor_data = workout_data.get('instructor', {})
-                if instructor_data:
-                    peloton_instructor_id = instructor_data.get('id')
-                    instructor_name = instructor_data.get('name', 'Unknown')
-                    if peloton_instructor_id:
-                        instructor, _ = Instructor.objects.get_or_create(
-                            peloton_id=peloton_instructor_id,
-                            defaults={'name': instructor_name}
-                        )
-                        if instructor.image_url != instructor_data.get('image_url'):
-                            instructor.image_url = instructor_data.get('image_url', '')
-                            instructor.save()
-                
-                # Parse dates - use created_at if available (more reliable for sync cutoff), otherwise start_time
-                # created_at is when Peloton created the workout record, start_time is when user completed it
-                # IMPORTANT: All Peloton timestamps are in UTC (Unix timestamps or ISO strings with Z)
-                workout_timestamp = None
-                created_at = workout_data.get('created_at')
-                start_time = workout_data.get('start_time')
-                
-                # Prefer created_at for sync cutoff comparison (more reliable)
-                # But use start_time for completed_date (what user sees)
-                if created_at:
-                    if isinstance(created_at, (int, float)):
-                        # Unix timestamp (seconds) - already UTC
-                        workout_timestamp = created_at
-                    else:
-                        # ISO string - parse and ensure UTC
-                        try:
-                            # Handle ISO format strings (e.g., "2024-01-01T12:00:00Z" or "2024-01-01T12:00:00+00:00")
-                            dt_str = str(created_at).replace('Z', '+00:00')
-                            dt = datetime.fromisoformat(dt_str)
-                            # If timezone-naive, assume UTC
-                            if dt.tzinfo is None:
-                                dt = timezone.make_aware(dt, UTC)
-                            else:
-                                dt = dt.astimezone(UTC)
-                            workout_timestamp = dt.timestamp()
-                        except Exception as e:
-                            logger.debug(f"Could not parse created_at '{created_at}': {e}")
-                            pass
-
-                    # Also parse Peloton's created_at into an aware UTC datetime for storage
-                    peloton_created_at_dt = None
-                    try:
-                        if created_at:
-                            if isinstance(created_at, (int, float)):
-                                ts = created_at
-                                if ts >= 1e12:
-                                    ts = ts / 1000.0
-                                peloton_created_at_dt = datetime.fromtimestamp(ts, tz=UTC)
-                            else:
-                                dt_str = str(created_at).replace('Z', '+00:00')
-                                dt = datetime.fromisoformat(dt_str)
-                                if dt.tzinfo is None:
-                                    peloton_created_at_dt = timezone.make_aware(dt, UTC)
-                                else:
-                                    peloton_created_at_dt = dt.astimezone(UTC)
-                    except Exception:
-                        peloton_created_at_dt = None
 
-                    # Peloton can include a timezone string in the workout payload (IANA). Store if present.
-                    peloton_tz = workout_data.get('timezone') or workout_data.get('tz') or None
-                
-                # Fallback to start_time if created_at not available
-                if not workout_timestamp and start_time:
-                    if isinstance(start_time, (int, float)):
-                        # Unix timestamp (seconds) - already UTC
-                        workout_timestamp = start_time
-                    else:
-                        # ISO string - parse and ensure UTC
-                        try:
-                            dt_str = str(start_time).replace('Z', '+00:00')
-                            dt = datetime.fromisoformat(dt_str)
-                            # If timezone-naive, assume UTC
-                            if dt.tzinfo is None:
-                                dt = timezone.make_aware(dt, UTC)
-                            else:
-                                dt = dt.astimezone(UTC)
-                            workout_timestamp = dt.timestamp()
-                        except Exception as e:
-                            logger.debug(f"Could not parse start_time '{start_time}': {e}")
-                            pass
-                
-                # Parse completed_date from start_time
-                # Use raw UTC date (no timezone conversion) to match the raw created_at time
-                try:
-                    if ZoneInfo:
-                        ET = ZoneInfo("America/New_York")  # US Eastern Time (handles DST automatically)
-                    elif pytz:
-                        ET = pytz.timezone("America/New_York")
-                    else:
-                        # No timezone library available, fallback to UTC
-                        ET = UTC
-                        logger.warning("No timezone library available, using UTC for completed_date")
-                except Exception as e:
-                    # Fallback to UTC if timezone conversion fails
-                    ET = UTC
-                    logger.warning(f"Failed to set ET timezone: {e}, using UTC for completed_date")
-                
-                # We'll store Peloton's API timestamp (UTC) in `completed_at` so the
-                # DB reflects the exact time Peloton reported. `completed_date` now
-                # uses raw UTC date.
-                completed_datetime_utc = None
-
-                if start_time:
-                    if isinstance(start_time, (int, float)):
-                        # Handle seconds vs milliseconds and build a UTC datetime
-                        ts = start_time
-                        if ts >= 1e12:
-                            ts = ts / 1000.0
-                        dt_utc = datetime.fromtimestamp(ts, tz=UTC)
-                        dt_et = dt_utc.astimezone(ET) if ET != UTC else dt_utc
-                        completed_datetime_utc = dt_utc
-                        completed_date = dt_utc.date()  # Use raw UTC date
-                        if dt_utc.date() != dt_et.date():
-                            logger.debug(f"Raw UTC date: {dt_utc.date()} (ET would be: {dt_et.date()})")
-                    else:
-                        try:
-                            dt_str = str(start_time).replace('Z', '+00:00')
-                            dt = datetime.fromisoformat(dt_str)
-                            if dt.tzinfo is None:
-                                dt = timezone.make_aware(dt, UTC)
-                            else:
-                                dt = dt.astimezone(UTC)
-                            dt_utc = dt.astimezone(UTC) if dt.tzinfo else timezone.make_aware(dt, UTC)
-                            dt_et = dt_utc.astimezone(ET) if ET != UTC else dt_utc
-                            completed_datetime_utc = dt_utc
-                            completed_date = dt_utc.date()  # Use raw UTC date
-                            if dt.date() != completed_date:
-                                logger.debug(f"Timezone conversion: UTC date {dt.date()} -> ET date {completed_date} (offset: {dt_et.utcoffset()})")
-                        except Exception as e:
-                            logger.debug(f"Error parsing start_time for completed_date: {e}")
-                            try:
-                                dt_utc = datetime.fromtimestamp(start_time, tz=UTC) if isinstance(start_time, (int, float)) else timezone.now()
-                                dt_et = dt_utc.astimezone(ET) if ET != UTC else dt_utc
-                                completed_datetime_utc = dt_utc
-                                completed_date = dt_utc.date()  # Use raw UTC date
-                            except Exception:
-                                fallback_dt = timezone.now()
-                                completed_datetime_utc = fallback_dt.astimezone(UTC) if fallback_dt.tzinfo else timezone.make_aware(fallback_dt, UTC)
-                                completed_date = completed_datetime_utc.date()  # Use raw UTC date
-                else:
-                    # No start_time, use current time
-                    try:
-                        dt_now = timezone.now()
-                        dt_et = dt_now.astimezone(ET) if ET != UTC else dt_now
-                        completed_datetime_utc = dt_now.astimezone(UTC) if dt_now.tzinfo else timezone.make_aware(dt_now, UTC)
-                        completed_date = completed_datetime_utc.date()  # Use raw UTC date
-                    except Exception:
-                        fallback_dt = timezone.now()
-                        completed_datetime_utc = fallback_dt.astimezone(UTC) if fallback_dt.tzinfo else timezone.make_aware(fallback_dt, UTC)
-                        completed_date = completed_datetime_utc.astimezone(ET).date() if ET != UTC else completed_datetime_utc.date()
-                
-                # If we still don't have a timestamp, use current time in UTC (shouldn't happen, but be safe)
-                if not workout_timestamp:
-                    workout_timestamp = timezone.now().timestamp()
-                
-                # For incremental sync: check if this workout is older than last sync
-                # Since workouts are sorted newest first, we can stop early
-                # Both timestamps are now in UTC, so comparison is safe regardless of server/user timezone
-                if not is_full_sync and sync_cutoff_timestamp and workout_timestamp:
-                    # Add small buffer (5 seconds) to account for potential clock skew or rounding differences
-                    # This ensures we don't miss workouts that were created at the exact same second
-                    buffer_seconds = 5
-                    if workout_timestamp <= (sync_cutoff_timestamp + buffer_seconds):
-                        workouts_older_than_sync += 1
-                        # If we've seen several older workouts in a row, we've likely passed the cutoff
-                        # (allowing for some clock skew or edge cases where timestamps might be slightly off)
-                        if workouts_older_than_sync >= 5:
-                            cutoff_dt = datetime.fromtimestamp(sync_cutoff_timestamp, tz=UTC)
-                            logger.info(f"Reached workouts older than last sync ({cutoff_dt} UTC). Stopping sync early.")
-                            logger.info(f"  - Processed {total_processed} workouts before cutoff")
-                            logger.info(f"  - Cutoff timestamp: {sync_cutoff_timestamp} (UTC)")
-                            break
-                        # Skip this workout but continue checking (in case of minor timestamp discrepancies)
-                        continue
-                    else:
-                        # Reset counter when we find a newer workout
-                        workouts_older_than_sync = 0
-                
-                # Step 1: Get ride_id from workout data
-                ride_id = None
-                if 'ride' in workout_data and workout_data.get('ride'):
-                    ride_id = workout_data.get('ride', {}).get('id')
-                    # Check if ride_id is a placeholder (all zeros - indicates manual workout)
-                    if ride_id and ride_id == '00000000000000000000000000000000':
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Ride ID is placeholder (all zeros) - treating as manual workout")
-                        ride_id = None
-                    else:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found ride_id in workout_data: {ride_id}")
-                
-                # Step 2: Check if RideDetail already exists, if not fetch it FIRST
-                ride_detail = None
-                if ride_id:
-                    # Check if we already have this ride detail
-                    try:
-                        ride_detail = RideDetail.objects.get(peloton_ride_id=ride_id)
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found existing RideDetail for ride_id {ride_id}: '{ride_detail.title}'")
-                        # Fetch playlist for existing RideDetail if not already present
-                        try:
-                            ride_detail.playlist
-                        except:
-                            # Playlist doesn't exist, fetch ride details to get playlist
-                            try:
-                                ride_details = client.fetch_ride_details(ride_id)
-                                playlist_data = ride_details.get('playlist')
-                                if playlist_data:
-                                    _store_playlist_from_data(playlist_data, ride_detail, logger, total_processed, peloton_workout_id)
-                            except Exception as e:
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Could not fetch ride details for playlist: {e}")
-                    except RideDetail.DoesNotExist:
-                        # RideDetail doesn't exist. Enqueue a background task to fetch it
-                        logger.info(f"Workout {total_processed} ({peloton_workout_id}): RideDetail not found for ride_id {ride_id}, enqueuing background fetch...")
-                        try:
-                            from config.celery import app as celery_app
-                            celery_app.send_task('workouts.tasks.fetch_ride_details_task', args=[request.user.id, str(ride_id)], queue='ride_details')
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): Enqueued fetch_ride_details_task for ride_id {ride_id}")
-                        except Exception:
-                            logger.exception(f"Workout {total_processed} ({peloton_workout_id}): failed to enqueue fetch_ride_details_task for ride_id {ride_id}")
-                        # Leave ride_details as None; create placeholder later so workout can be stored
-                        ride_details = None
-                else:
-                    # No ride_id yet, try to get it from detailed workout
-                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): No ride_id in workout_data, fetching detailed workout to get ride_id...")
-                    try:
-                        detailed_workout = client.fetch_workout(peloton_workout_id)
-                        ride_id = detailed_workout.get('ride', {}).get('id') or detailed_workout.get('ride_id')
-                        if ride_id:
-                            logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found ride_id in detailed_workout: {ride_id}")
-                            # Check if RideDetail exists
-                            try:
-                                ride_detail = RideDetail.objects.get(peloton_ride_id=ride_id)
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found existing RideDetail for ride_id {ride_id}")
-                                # Fetch playlist for existing RideDetail if not already present
-                                try:
-                                    ride_detail.playlist
-                                except:
-                                    # Playlist doesn't exist, fetch ride details to get playlist
-                                    try:
-                                        ride_details = client.fetch_ride_details(ride_id)
-                                        playlist_data = ride_details.get('playlist')
-                                        if playlist_data:
-                                            _store_playlist_from_data(playlist_data, ride_detail, logger, total_processed, peloton_workout_id)
-                                    except Exception as e:
-                                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Could not fetch ride details for playlist: {e}")
-                            except RideDetail.DoesNotExist:
-                                # RideDetail doesn't exist for this ride_id from detailed_workout — enqueue background fetch
-                                logger.info(f"Workout {total_processed} ({peloton_workout_id}): RideDetail not found for ride_id {ride_id} (from detailed_workout), enqueuing background fetch...")
-                                try:
-                                    from config.celery import app as celery_app
-                                    celery_app.send_task('workouts.tasks.fetch_ride_details_task', args=[request.user.id, str(ride_id)], queue='ride_details')
-                                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): Enqueued fetch_ride_details_task for ride_id {ride_id}")
-                                except Exception:
-                                    logger.exception(f"Workout {total_processed} ({peloton_workout_id}): failed to enqueue fetch_ride_details_task for ride_id {ride_id}")
-                                ride_details = None
-                        else:
-                            logger.warning(f"Workout {total_processed} ({peloton_workout_id}): No ride_id found in detailed workout")
-                            detailed_workout = None
-                            ride_details = None
-                    except Exception as e:
-                        logger.warning(f"Workout {total_processed} ({peloton_workout_id}): Could not fetch detailed workout: {e}")
-                        detailed_workout = None
-                        ride_details = None
-                
-                # Step 3a: Handle manual workouts (no ride_id) - map to generic RideDetail
-                if not ride_id and not ride_detail:
-                    # This is a manual workout (Garmin Tacx Training, etc.)
-                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): No ride_id found - using workout_data['ride'] fields for manual workout")
-
-                    ride_data = workout_data.get('ride', {})
-                    manual_title = ride_data.get('title', 'Manual Workout')
-                    manual_discipline = workout_type_slug
-                    manual_peloton_ride_id = f"manual_{manual_discipline}_{peloton_workout_id}"
-
-                    ride_detail, created = RideDetail.objects.get_or_create(
-                        peloton_ride_id=manual_peloton_ride_id,
-                        defaults={
-                            'title': manual_title,
-                            'fitness_discipline': manual_discipline,
-                            'workout_type': workout_type,
-                        }
-                    )
-                    if created:
-                        logger.info(f"Workout {total_processed} ({peloton_workout_id}): Created manual RideDetail - '{manual_title}'")
-                    else:
-                        logger.info(f"Workout {total_processed} ({peloton_workout_id}): Found existing manual RideDetail - '{ride_detail.title}'")
-                
-                # Step 3: Create or update RideDetail if we have ride_details and it doesn't exist yet
-                if ride_id and not ride_detail and 'ride_details' in locals() and ride_details:
-                    ride_data = ride_details.get('ride', {})
-                    if ride_data:
-                        logger.info(f"Workout {total_processed} ({peloton_workout_id}): Creating RideDetail for ride_id {ride_id}...")
-                        
-                        # Extract instructor from ride_details (more reliable than workout_data)
-                        # ride_details has: ride_data['instructor_id'] and ride_data['instructor'] object
-                        ride_instructor = None
-                        instructor_id_from_ride = ride_data.get('instructor_id')
-                        instructor_obj_from_ride = ride_data.get('instructor', {})
-                        
-                        if instructor_id_from_ride:
-                            # Try to get instructor by peloton_id
-                            try:
-                                ride_instructor = Instructor.objects.get(peloton_id=instructor_id_from_ride)
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found existing instructor: {ride_instructor.name}")
-                            except Instructor.DoesNotExist:
-                                # Create instructor from ride_details instructor object
-                                if instructor_obj_from_ride:
-                                    instructor_name = instructor_obj_from_ride.get('name') or instructor_obj_from_ride.get('full_name') or 'Unknown Instructor'
-                                    instructor_image = instructor_obj_from_ride.get('image_url') or ''
-                                    ride_instructor, created = Instructor.objects.get_or_create(
-                                        peloton_id=instructor_id_from_ride,
-                                        defaults={
-                                            'name': instructor_name,
-                                            'image_url': instructor_image,
-                                        }
-                                    )
-                                    if created:
-                                        logger.info(f"Workout {total_processed} ({peloton_workout_id}): Created new instructor: {ride_instructor.name}")
-                                    else:
-                                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found instructor after creation: {ride_instructor.name}")
-                                else:
-                                    logger.warning(f"Workout {total_processed} ({peloton_workout_id}): instructor_id {instructor_id_from_ride} found but no instructor object in ride_details")
-                        
-                        # Fallback to instructor from workout_data if not found in ride_details
-                        if not ride_instructor:
-                            ride_instructor = instructor
-                            if ride_instructor:
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Using instructor from workout_data: {ride_instructor.name}")
-                        
-                        # Extract equipment tags
-                        equipment_tags = ride_data.get('equipment_tags', [])
-                        if not isinstance(equipment_tags, list):
-                            equipment_tags = []
-                        
-                        # Extract class type IDs
-                        class_type_ids = ride_data.get('class_type_ids', [])
-                        if not isinstance(class_type_ids, list):
-                            class_type_ids = []
-                        
-                        # Detect class type from various sources
-                        detected_class_type = detect_class_type(ride_data, ride_details)
-                        
-                        # Extract equipment IDs
-                        equipment_ids = ride_data.get('equipment_ids', [])
-                        if not isinstance(equipment_ids, list):
-                            equipment_ids = []
-                        
-                        # Generate standardized Peloton URL in UK format
-                        peloton_class_url = generate_peloton_url(ride_id) if ride_id else ''
-                        
-                        ride_detail, ride_detail_created = RideDetail.objects.update_or_create(
-                            peloton_ride_id=ride_id,
-                            defaults={
-                                'title': ride_data.get('title', ''),
-                                'description': ride_data.get('description', ''),
-                                'duration_seconds': ride_data.get('duration', 0),
-                                'workout_type': workout_type,
-                                'instructor': ride_instructor,  # Use instructor from ride_details
-                                'fitness_discipline': ride_data.get('fitness_discipline', ''),
-                                'fitness_discipline_display_name': ride_data.get('fitness_discipline_display_name', ''),
-                                'difficulty_rating_avg': ride_data.get('difficulty_rating_avg'),
-                                'difficulty_rating_count': ride_data.get('difficulty_rating_count', 0),
-                                'difficulty_level': ride_data.get('difficulty_level') or None,
-                                'overall_estimate': ride_data.get('overall_estimate'),
-                                'difficulty_estimate': ride_data.get('difficulty_estimate'),
-                                'image_url': ride_data.get('image_url', ''),
-                                'home_peloton_id': ride_data.get('home_peloton_id') or '',
-                                'original_air_time': ride_data.get('original_air_time'),
-                                'scheduled_start_time': ride_data.get('scheduled_start_time'),
-                                'created_at_timestamp': ride_data.get('created_at'),
-                                'class_type_ids': class_type_ids,
-                                'equipment_ids': equipment_ids,
-                                'equipment_tags': equipment_tags,
-                                'content_format': ride_data.get('content_format', ''),
-                                'content_provider': ride_data.get('content_provider', ''),
-                                'has_closed_captions': ride_data.get('has_closed_captions', False),
-                                'is_archived': ride_data.get('is_archived', False),
-                                'is_power_zone_class': ride_data.get('is_power_zone_class', False),
-                                'class_type': detected_class_type,  # Store detected class type
-                                'peloton_class_url': peloton_class_url,
-                                # Store target metrics from ride_details (not ride_data)
-                                'target_metrics_data': ride_details.get('target_metrics_data', {}),
-                                'target_class_metrics': ride_details.get('target_class_metrics', {}),
-                                'pace_target_type': ride_details.get('pace_target_type'),
-                                # Store segments structure (contains segment_list with Warm Up, Main, Cool Down)
-                                'segments_data': ride_details.get('segments', {}),
-                            }
-                        )
-                        if ride_detail_created:
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): ✓ Created RideDetail: '{ride_detail.title}'")
-                        else:
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): ↻ Updated RideDetail: '{ride_detail.title}'")
-                        
-                        # Step 4: Store playlist from ride_details if available (playlist is included in ride_details response)
-                        playlist_data = ride_details.get('playlist') if 'ride_details' in locals() else None
-                        if playlist_data:
-                            _store_playlist_from_data(playlist_data, ride_detail, logger, total_processed, peloton_workout_id)
-                
-                # Step 4: Now fetch detailed workout for metrics (if we haven't already)
-                if 'detailed_workout' not in locals():
-                    try:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Fetching detailed workout for metrics...")
-                        detailed_workout = client.fetch_workout(peloton_workout_id)
-                    except Exception as e:
-                        logger.warning(f"Workout {total_processed} ({peloton_workout_id}): Could not fetch detailed workout: {e}")
-                        detailed_workout = None
-                
-                # Step 5: Extract title, duration, etc. from ride_detail if available, otherwise from other sources
-                if ride_detail:
-                    # For manual workouts, use the API title directly for the Workout
-                    is_manual = False
-                    if ride_detail.peloton_ride_id and str(ride_detail.peloton_ride_id).startswith('manual_'):
-                        is_manual = True
-                    if is_manual and 'ride_details' in locals() and ride_details:
-                        ride_data = ride_details.get('ride', {})
-                        title = ride_data.get('title') or ride_details.get('title') or ride_detail.title
-                        logger.info(f"Manual workout: Overriding Workout title with API value: '{title}'")
-                    else:
-                        title = ride_detail.title
-                    duration_seconds = ride_detail.duration_seconds
-                    duration_minutes = ride_detail.duration_minutes
-                    description = ride_detail.description
-                    difficulty_rating = ride_detail.difficulty_rating_avg
-                    total_ratings = ride_detail.difficulty_rating_count
-                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Using data from RideDetail: '{title}' ({duration_minutes}min)")
-                else:
-                    # Fallback: extract from ride_details or detailed_workout
-                    if 'ride_details' in locals() and ride_details:
-                        ride_data = ride_details.get('ride', {})
-                        title = ride_data.get('title') or ride_details.get('title') or workout_data.get('name', f"{workout_type.name} Workout")
-                        duration_seconds = ride_data.get('duration') or ride_data.get('length') or 0
-                        duration_minutes = int(duration_seconds / 60) if duration_seconds else 0
-                        description = ride_data.get('description', '')
-                        difficulty_rating = ride_data.get('difficulty_rating_avg')
-                        total_ratings = ride_data.get('difficulty_rating_count', 0)
-                    elif 'detailed_workout' in locals() and detailed_workout:
-                        ride_data = detailed_workout.get('ride', {})
-                        title = ride_data.get('title') or detailed_workout.get('name') or workout_data.get('name', f"{workout_type.name} Workout")
-                        duration_seconds = ride_data.get('duration') or ride_data.get('length') or 0
-                        duration_minutes = int(duration_seconds / 60) if duration_seconds else 0
-                        description = detailed_workout.get('description', '')
-                        difficulty_rating = None
-                        total_ratings = 0
-                    else:
-                        # Last resort: use workout_data
-                        title = initial_title or workout_data.get('name') or workout_data.get('title') or f"{workout_type.name} Workout"
-                        duration_seconds = initial_duration_seconds or workout_data.get('duration') or 0
-                        duration_minutes = int(duration_seconds / 60) if duration_seconds else 0
-                        description = ''
-                        difficulty_rating = None
-                        total_ratings = 0
-                    
-                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): Using fallback data - title: '{title}', duration: {duration_minutes}min")
-                
-                # Get Peloton workout URL - use workout ID format (profile/workouts/{id})
-                peloton_url = None
-                if peloton_workout_id:
-                    # The workout URL format is: /profile/workouts/{workout_id}
-                    peloton_url = f"https://members.onepeloton.com/profile/workouts/{peloton_workout_id}"
-                
-                # Create or update workout
-                # NOTE: ride_detail is REQUIRED for new workouts - all class data comes from here via SQL joins
-                # If we don't have ride_detail yet, enqueue a background fetch and create a lightweight
-                # placeholder RideDetail so the Workout can be created and later enriched by workers.
-                if not ride_detail:
-                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): ride_detail missing — enqueueing background fetch and creating placeholder")
-                    # Enqueue background task by name to avoid circular imports
-                    try:
-                        from config.celery import app as celery_app
-                        if ride_id:
-                            celery_app.send_task('workouts.tasks.fetch_ride_details_task', args=[request.user.id, str(ride_id)], queue='ride_details')
-                        else:
-                            # No ride_id available, nothing to fetch
-                            logger.debug(f"Workout {total_processed} ({peloton_workout_id}): no ride_id available to enqueue ride_detail fetch")
-                    except Exception:
-                        logger.exception(f"Workout {total_processed} ({peloton_workout_id}): failed to enqueue ride_detail fetch")
-
-                    # Create a minimal placeholder RideDetail so the Workout can be stored.
-                    try:
-                        # Ensure a generic WorkoutType exists
-                        wt, _ = WorkoutType.objects.get_or_create(slug='other', defaults={'name': 'Other'})
-
-                        # Detect manual-workout placeholder ride ids (all-zero id). If this is a manual
-                        # workout, try to map to a generic manual RideDetail template (so the app uses
-                        # a shared manual template). If no generic exists, create a RideDetail using the
-                        # workout's title so the user sees the correct name immediately.
-                        raw_ride_id = (workout_data.get('ride') or {}).get('id')
-                        # If the ride id is the all-zero placeholder (or missing), attempt a
-                        # quick fetch of the detailed workout to see if Peloton provides a
-                        # real `ride.id`. This avoids misclassifying actual classes as manual.
-                        is_manual_workout = False
-                        if not raw_ride_id or raw_ride_id == '00000000000000000000000000000000':
-                            try:
-                                detailed_workout_retry = client.fetch_workout(peloton_workout_id)
-                                resolved_ride_id = (detailed_workout_retry.get('ride') or {}).get('id') or detailed_workout_retry.get('ride_id')
-                                if resolved_ride_id and resolved_ride_id != '00000000000000000000000000000000':
-                                    # We found a real ride id in the detailed workout — treat as non-manual
-                                    ride_id = resolved_ride_id
-                                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): resolved ride_id from detailed_workout: {ride_id}")
-                                else:
-                                    is_manual_workout = True
-                            except Exception as e:
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): detailed_workout retry failed: {e}")
-                                is_manual_workout = True
-
-                        if is_manual_workout:
-                            fitness_discipline = (workout_data.get('fitness_discipline') or 'other')
-                            MANUAL_RIDE_DETAIL_MAP = {
-                                'running': 9999999,
-                                'walking': 9999997,
-                                'cycling': 9999998,
-                                'bike': 9999998,
-                                'ride': 9999998,
-                                'rowing': 9999996,
-                                'strength': 9999995,
-                                'yoga': 9999994,
-                                'meditation': 9999993,
-                                'stretching': 9999992,
-                                'cardio': 9999991,
-                            }
-                            generic_ride_id = MANUAL_RIDE_DETAIL_MAP.get(fitness_discipline.lower(), 9999990)
-                            generic_peloton_ride_id = f"manual_{fitness_discipline.lower()}_{generic_ride_id}"
-                            try:
-                                ride_detail = RideDetail.objects.get(peloton_ride_id=generic_peloton_ride_id)
-                                logger.info(f"Workout {total_processed} ({peloton_workout_id}): Using generic manual RideDetail {generic_peloton_ride_id}")
-                            except RideDetail.DoesNotExist:
-                                # Create a manual RideDetail entry using the workout title so it renders nicely
-                                placeholder_peloton_id = generic_peloton_ride_id
-                                ride_detail, rd_created = RideDetail.objects.get_or_create(
-                                    peloton_ride_id=placeholder_peloton_id,
-                                    defaults={
-                                        'title': title,
-                                        'description': 'Manual workout created from user upload',
-                                        'duration_seconds': duration_seconds or 0,
-                                        'workout_type': workout_type or wt,
-                                        'fitness_discipline': fitness_discipline,
-                                    }
-                                )
-                                if rd_created:
-                                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): Created manual RideDetail {placeholder_peloton_id}")
-                                else:
-                                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Using existing RideDetail {ride_detail.peloton_ride_id}")
-                        else:
-                            # Non-manual: use pending placeholder pattern and let background workers fill details
-                            placeholder_peloton_id = str(ride_id) if ride_id else f"pending_{peloton_workout_id}"
-                            ride_detail, rd_created = RideDetail.objects.get_or_create(
-                                peloton_ride_id=placeholder_peloton_id,
-                                defaults={
-                                    'title': f'Pending details for {placeholder_peloton_id}',
-                                    'description': 'Placeholder created during sync; details will be filled by background task',
-                                    'duration_seconds': 0,
-                                    'workout_type': wt,
-                                }
-                            )
-                            if rd_created:
-                                logger.info(f"Workout {total_processed} ({peloton_workout_id}): Created placeholder RideDetail {placeholder_peloton_id}")
-                            else:
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Using existing RideDetail {ride_detail.peloton_ride_id}")
-                    except Exception:
-                        logger.exception(f"Workout {total_processed} ({peloton_workout_id}): failed to create placeholder RideDetail; skipping workout")
-                        workouts_skipped += 1
-                        continue
-                
-                # For manual workouts, always set title_override to the API title
-                is_manual = False
-                if ride_detail and ride_detail.peloton_ride_id and str(ride_detail.peloton_ride_id).startswith('manual_'):
-                    is_manual = True
-                workout_defaults = {
-                    'ride_detail': ride_detail,  # REQUIRED - all class data comes from here
-                    'peloton_url': peloton_url,
-                    'recorded_date': completed_date,
-                    'completed_date': completed_date,
-                    'completed_at': completed_datetime_utc,
-                    'peloton_created_at': peloton_created_at_dt,
-                    'peloton_timezone': peloton_tz,
-                }
-                if is_manual:
-                    # Only set title_override if it is currently blank/null
-                    existing_workout = Workout.objects.filter(peloton_workout_id=peloton_workout_id, user=request.user).first()
-                    if not existing_workout or not existing_workout.title_override:
-                        workout_defaults['title_override'] = title
-                    # Do not set 'title' directly; let property handle it
-                else:
-                    workout_defaults['title_override'] = None
-                workout, created = Workout.objects.update_or_create(
-                    peloton_workout_id=peloton_workout_id,
-                    user=request.user,
-                    defaults=workout_defaults
-                )
-                
-                if created:
-                    workouts_synced += 1
-                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): ✓ Created - '{ride_detail.title}' ({ride_detail.duration_minutes}min, {ride_detail.workout_type.name})")
-                else:
-                    workouts_updated += 1
-                    logger.info(f"Workout {total_processed} ({peloton_workout_id}): ↻ Updated - '{ride_detail.title}' ({ride_detail.duration_minutes}min, {ride_detail.workout_type.name})")
-                
-                # Fetch performance graph to get detailed metrics (TSS, cadence, resistance, etc.)
-                # This endpoint contains the actual workout metrics
-                try:
-                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Fetching performance graph for metrics (every_n=5)...")
-                    performance_graph = client.fetch_performance_graph(peloton_workout_id, every_n=5)
-                    
-                    # Extract duration from performance graph (especially important for manual workouts)
-                    duration_seconds = performance_graph.get('duration')
-                    if duration_seconds:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found duration in performance graph: {duration_seconds} seconds ({int(duration_seconds/60)} minutes)")
-                    
-                    # Extract metrics from performance graph
-                    # The performance graph has a 'summaries' array with summary metrics (total_output, etc.)
-                    # and a 'metrics' array with time-series data (for avg/max calculations)
-                    summaries_array = performance_graph.get('summaries', [])
-                    metrics_array = performance_graph.get('metrics', [])
-                    metrics_dict = {}
-                    
-                    # Extract from summaries array (has slug and value)
-                    for summary in summaries_array:
-                        if isinstance(summary, dict):
-                            slug = summary.get('slug')
-                            value = summary.get('value')
-                            
-                            if slug and value is not None:
-                                metrics_dict[slug] = value
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found summary metric {slug} = {value}")
-                    
-                    # Extract avg/max from metrics array (time-series data with average_value and max_value)
-                    for metric in metrics_array:
-                        if isinstance(metric, dict):
-                            slug = metric.get('slug')
-                            avg_value = metric.get('average_value')
-                            max_value = metric.get('max_value')
-                            
-                            if slug:
-                                # Map slug to our field names
-                                if avg_value is not None:
-                                    # Map common slugs to our field names
-                                    avg_field_map = {
-                                        'output': 'avg_output',
-                                        'cadence': 'avg_cadence',
-                                        'resistance': 'avg_resistance',
-                                        'speed': 'avg_speed',
-                                        'heart_rate': 'avg_heart_rate',
-                                    }
-                                    field_name = avg_field_map.get(slug, f'avg_{slug}')
-                                    metrics_dict[field_name] = avg_value
-                                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found avg metric {slug} -> {field_name} = {avg_value}")
-                                
-                                if max_value is not None:
-                                    max_field_map = {
-                                        'output': 'max_output',
-                                        'cadence': 'max_cadence',
-                                        'resistance': 'max_resistance',
-                                        'speed': 'max_speed',
-                                        'heart_rate': 'max_heart_rate',
-                                    }
-                                    field_name = max_field_map.get(slug, f'max_{slug}')
-                                    metrics_dict[field_name] = max_value
-                                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found max metric {slug} -> {field_name} = {max_value}")
-                    
-                    # Also check for average_summaries (if present)
-                    average_summaries = performance_graph.get('average_summaries', [])
-                    for summary in average_summaries:
-                        if isinstance(summary, dict):
-                            slug = summary.get('slug')
-                            value = summary.get('value')
-                            if slug and value is not None:
-                                # These are typically averages
-                                avg_field_map = {
-                                    'output': 'avg_output',
-                                    'cadence': 'avg_cadence',
-                                    'resistance': 'avg_resistance',
-                                    'speed': 'avg_speed',
-                                    'heart_rate': 'avg_heart_rate',
-                                }
-                                field_name = avg_field_map.get(slug, f'avg_{slug}')
-                                if field_name not in metrics_dict:  # Don't overwrite if already set
-                                    metrics_dict[field_name] = value
-                                    logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found average_summary {slug} -> {field_name} = {value}")
-                    
-                    # Also check detailed_workout for any metrics that might be there (fallback)
-                    if 'detailed_workout' in locals() and detailed_workout:
-                        top_level_metrics = ['total_output', 'avg_output', 'max_output', 'distance', 'total_calories', 
-                                            'avg_heart_rate', 'max_heart_rate', 'avg_cadence', 'max_cadence', 
-                                            'avg_resistance', 'max_resistance', 'avg_speed', 'max_speed', 'tss', 'tss_target']
-                        for key in top_level_metrics:
-                            if key in detailed_workout and key not in metrics_dict:
-                                metrics_dict[key] = detailed_workout[key]
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found metric in detailed_workout {key} = {detailed_workout[key]}")
-                    
-                    # Update workout details with extracted metrics
-                    if metrics_dict or duration_seconds:
-                        details, details_created = WorkoutDetails.objects.get_or_create(workout=workout)
-                        details_updated = False
-                        
-                        # Save duration from performance graph (especially important for manual workouts)
-                        if duration_seconds:
-                            try:
-                                details.duration_seconds = int(duration_seconds)
-                                details_updated = True
-                                logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Saved duration_seconds = {duration_seconds}")
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # TSS (might be in detailed_workout, not performance graph)
-                        if 'tss' in metrics_dict:
-                            try:
-                                details.tss = float(metrics_dict['tss'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'tss_target' in metrics_dict:
-                            try:
-                                details.tss_target = float(metrics_dict['tss_target'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Output metrics
-                        if 'total_output' in metrics_dict:
-                            try:
-                                details.total_output = float(metrics_dict['total_output'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'avg_output' in metrics_dict:
-                            try:
-                                details.avg_output = float(metrics_dict['avg_output'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'max_output' in metrics_dict:
-                            try:
-                                details.max_output = float(metrics_dict['max_output'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Speed metrics
-                        if 'avg_speed' in metrics_dict:
-                            try:
-                                details.avg_speed = float(metrics_dict['avg_speed'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'max_speed' in metrics_dict:
-                            try:
-                                details.max_speed = float(metrics_dict['max_speed'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Distance
-                        if 'distance' in metrics_dict:
-                            try:
-                                details.distance = float(metrics_dict['distance'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Heart rate (might be in metrics array as 'heart_rate')
-                        if 'avg_heart_rate' in metrics_dict:
-                            try:
-                                details.avg_heart_rate = int(float(metrics_dict['avg_heart_rate']))
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'max_heart_rate' in metrics_dict:
-                            try:
-                                details.max_heart_rate = int(float(metrics_dict['max_heart_rate']))
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Cadence
-                        if 'avg_cadence' in metrics_dict:
-                            try:
-                                details.avg_cadence = int(float(metrics_dict['avg_cadence']))
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'max_cadence' in metrics_dict:
-                            try:
-                                details.max_cadence = int(float(metrics_dict['max_cadence']))
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Resistance
-                        if 'avg_resistance' in metrics_dict:
-                            try:
-                                details.avg_resistance = float(metrics_dict['avg_resistance'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        if 'max_resistance' in metrics_dict:
-                            try:
-                                details.max_resistance = float(metrics_dict['max_resistance'])
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Calories (from summaries, slug is 'calories')
-                        if 'calories' in metrics_dict or 'total_calories' in metrics_dict:
-                            try:
-                                calories_value = metrics_dict.get('calories') or metrics_dict.get('total_calories')
-                                details.total_calories = int(float(calories_value))
-                                details_updated = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if details_updated:
-                            details.save()
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): WorkoutDetails {'created' if details_created else 'updated'} with {len(metrics_dict)} metrics")
-                        else:
-                            logger.debug(f"Workout {total_processed} ({peloton_workout_id}): No metrics to update")
-                    
-                    # Store time-series performance data in WorkoutPerformanceData
-                    # The performance graph has 'seconds_since_pedaling_start' and 'metrics' with 'values' arrays
-                    seconds_array = performance_graph.get('seconds_since_pedaling_start', [])
-                    if seconds_array and metrics_array:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Storing time-series performance data...")
-                        
-                        # Delete existing performance data for this workout
-                        from .models import WorkoutPerformanceData
-                        WorkoutPerformanceData.objects.filter(workout=workout).delete()
-                        
-                        # Build a dict of metric values by slug for easier access
-                        metric_values_by_slug = {}
-                        for metric in metrics_array:
-                            slug = metric.get('slug')
-                            values = metric.get('values', [])
-                            if slug and values:
-                                metric_values_by_slug[slug] = values
-                            
-                            # For running classes, speed might be in the 'pace' metric's alternatives array
-                            if slug == 'pace':
-                                alternatives = metric.get('alternatives', [])
-                                for alt in alternatives:
-                                    alt_slug = alt.get('slug')
-                                    alt_values = alt.get('values', [])
-                                    if alt_slug == 'speed' and alt_values:
-                                        # Use speed from alternatives if not already found
-                                        if 'speed' not in metric_values_by_slug:
-                                            metric_values_by_slug['speed'] = alt_values
-                                            logger.debug(f"Workout {total_processed} ({peloton_workout_id}): Found speed in pace metric alternatives ({len(alt_values)} values)")
-                        
-                        # Create performance data entries for each timestamp
-                        performance_data_entries = []
-                        for idx, timestamp in enumerate(seconds_array):
-                            if not isinstance(timestamp, (int, float)):
-                                continue
-                            
-                            # Extract values for this timestamp from each metric
-                            perf_data = WorkoutPerformanceData(
-                                workout=workout,
-                                timestamp=int(timestamp),
-                                output=metric_values_by_slug.get('output', [None])[idx] if idx < len(metric_values_by_slug.get('output', [])) else None,
-                                cadence=int(metric_values_by_slug.get('cadence', [None])[idx]) if idx < len(metric_values_by_slug.get('cadence', [])) and metric_values_by_slug.get('cadence', [None])[idx] is not None else None,
-                                resistance=metric_values_by_slug.get('resistance', [None])[idx] if idx < len(metric_values_by_slug.get('resistance', [])) else None,
-                                speed=metric_values_by_slug.get('speed', [None])[idx] if idx < len(metric_values_by_slug.get('speed', [])) else None,
-                                heart_rate=int(metric_values_by_slug.get('heart_rate', [None])[idx]) if idx < len(metric_values_by_slug.get('heart_rate', [])) and metric_values_by_slug.get('heart_rate', [None])[idx] is not None else None,
-                            )
-                            performance_data_entries.append(perf_data)
-                        
-                        # Bulk create performance data
-                        if performance_data_entries:
-                            WorkoutPerformanceData.objects.bulk_create(performance_data_entries, ignore_conflicts=True)
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): Stored {len(performance_data_entries)} time-series data points")
-                        else:
-                            logger.debug(f"Workout {total_processed} ({peloton_workout_id}): No time-series data to store")
-                        
-                        # Log target_metrics_performance_data availability for power zone classes
-                        target_metrics_perf = performance_graph.get('target_metrics_performance_data', {})
-                        target_metrics_list = target_metrics_perf.get('target_metrics', [])
-                        if target_metrics_list:
-                            logger.info(f"Workout {total_processed} ({peloton_workout_id}): Found {len(target_metrics_list)} target metric segments (will be fetched on-demand for graph)")
-                        elif ride_detail and ride_detail.is_power_zone_class:
-                            logger.warning(f"Workout {total_processed} ({peloton_workout_id}): Power zone class but no target_metrics_performance_data found in API response")
-                    else:
-                        logger.debug(f"Workout {total_processed} ({peloton_workout_id}): No time-series data available (seconds_array: {len(seconds_array) if seconds_array else 0}, metrics_array: {len(metrics_array) if metrics_array else 0})")
-                        
-                except Exception as e:
-                    logger.warning(f"Workout {total_processed} ({peloton_workout_id}): Could not fetch performance graph for metrics: {e}")
-                    # Continue without metrics - workout is still created
-                
-            except Exception as e:
-                workouts_skipped += 1
-                logger.error(f"Workout {total_processed} ({workout_data.get('id', 'unknown')}): ✗ Error syncing workout: {e}", exc_info=True)
-                continue
-        
-        # Update connection last sync time
-        sync_completed_at = timezone.now()
-        connection.last_sync_at = sync_completed_at
-        
-        # Clear sync in progress and set cooldown period (60 minutes)
-        connection.sync_in_progress = False
-        connection.sync_started_at = None
-        connection.sync_cooldown_until = sync_completed_at + timedelta(minutes=60)
-        connection.save()
-        
-        # Also update profile sync time
-        if hasattr(request.user, 'profile'):
-            request.user.profile.peloton_last_synced_at = sync_completed_at
-            request.user.profile.save()
-
-        try:
-            from annual_challenge.services import update_annual_challenge_progress_from_peloton
-
-            update_annual_challenge_progress_from_peloton(user=request.user)
-        except Exception as e:
-            logger.warning(f"Could not update annual challenge progress after sync: {e}")
-        
-        # Build success message
-        sync_type_str = "full" if is_full_sync else "incremental"
-        if workouts_synced > 0 or workouts_updated > 0:
-            success_message = f'Successfully synced {workouts_synced} new workouts and updated {workouts_updated} existing workouts ({sync_type_str} sync)!'
-        else:
-            success_message = f'No new workouts to sync ({sync_type_str} sync).'
-        
-        messages.success(request, success_message)
-        logger.info(f"Workout sync completed for user {request.user.email} ({sync_type_str} sync):")
-        logger.info(f"  - Sync type: {sync_type_str}")
-        logger.info(f"  - Total processed: {total_processed}")
-        logger.info(f"  - New workouts: {workouts_synced}")
-        logger.info(f"  - Updated workouts: {workouts_updated}")
-        logger.info(f"  - Skipped/errors: {workouts_skipped}")
-        if not is_full_sync:
-            logger.info(f"  - Workouts older than last sync (skipped): {workouts_older_than_sync}")
-        logger.info(f"  - Success rate: {((workouts_synced + workouts_updated) / total_processed * 100) if total_processed > 0 else 0:.1f}%")
-        logger.info(f"  - Next sync will be incremental (after {sync_completed_at})")
-        
-        # If HTMX request, return partial
-        if request.headers.get('HX-Request'):
-            context = {
-                'peloton_connection': connection,
-                'sync_in_progress': False,
-                'sync_cooldown_until': connection.sync_cooldown_until,
-                'cooldown_remaining_minutes': 60,  # Just started cooldown
-                'can_sync': False,
-            }
-            return render(request, 'workouts/partials/sync_status.html', context)
-        
-        # If AJAX request, return JSON (backwards compatibility)
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({
-                'status': 'success',
-                'sync_type': sync_type_str,
-                'message': success_message,
-                'workouts_synced': workouts_synced,
-                'workouts_updated': workouts_updated,
-            })
-        
-    except PelotonAPIError as e:
-        logger.error(f"Peloton API error during sync: {e}", exc_info=True)
-        error_message = f'Peloton API error: {str(e)}'
-        
-        # Clear sync status on error
-        connection.sync_in_progress = False
-        connection.sync_started_at = None
-        connection.save()
-        
-        messages.error(request, error_message)
-        
-        # If AJAX request, return JSON
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({
-                'status': 'error',
-                'message': error_message,
-            }, status=400)
+    job = create_sync_job(connection)
+    try:
+        run_workout_sync_job.delay(job.pk)
     except Exception as e:
-        logger.error(f"Error syncing workouts: {e}", exc_info=True)
-        error_message = f'Error syncing workouts: {str(e)}'
-        
-        # Clear sync status on error
-        connection.sync_in_progress = False
-        connection.sync_started_at = None
-        connection.save()
-        
+        logger.error(f"Could not enqueue sync job {job.pk}: {e}", exc_info=True)
+        from .services.sync_engine import WorkoutSyncEngine
+        WorkoutSyncEngine(job).fail(e)
+        connection.refresh_from_db()
+        error_message = 'Could not start sync. Please try again in a few minutes.'
+        if is_ajax:
+            return JsonResponse({'status': 'error', 'message': error_message}, status=503)
         messages.error(request, error_message)
-        
-        # If AJAX request, return JSON
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({
-                'status': 'error',
-                'message': error_message,
-            }, status=500)
-    
+        if is_htmx:
+            return render(request, 'workouts/partials/sync_status.html', _sync_status_context(connection))
+        return redirect('workouts:history')
+
+    logger.info(f"Enqueued sync job {job.pk} for user {request.user.email} ({'full' if job.is_full_sync else 'incremental'})")
+
+    if is_htmx:
+        return render(request, 'workouts/partials/sync_status.html', _sync_status_context(connection, job))
+    if is_ajax:
+        return JsonResponse({'status': 'queued', 'progress': get_job_progress(job)}, status=202)
+    messages.success(request, 'Sync started. Your workouts will appear as they are imported.')
     return redirect('workouts:history')
 
 
 @login_required
 @require_http_methods(["GET"])
 def sync_status(request):
-    """Return sync status for AJAX/HTMX polling"""
-    try:
-        peloton_connection = PelotonConnection.objects.get(user=request.user)
-        
-        # Check if sync is in progress or cooldown
-        sync_in_progress = peloton_connection.sync_in_progress
-        sync_cooldown_until = None
-        cooldown_remaining_minutes = None
-        can_sync = True
-        
-        if peloton_connection.sync_cooldown_until and timezone.now() < peloton_connection.sync_cooldown_until:
-            sync_cooldown_until = peloton_connection.sync_cooldown_until
-            cooldown_remaining_minutes = int((peloton_connection.sync_cooldown_until - timezone.now()).total_seconds() / 60)
-            can_sync = False
-        
-        if sync_in_progress:
-            can_sync = False
-        
-        # If HTMX request, return HTML partial
-        if request.headers.get('HX-Request'):
-            context = {
-                'peloton_connection': peloton_connection,
-                'sync_in_progress': sync_in_progress,
-                'sync_cooldown_until': sync_cooldown_until,
-                'cooldown_remaining_minutes': cooldown_remaining_minutes,
-                'can_sync': can_sync,
-            }
-            return render(request, 'workouts/partials/sync_status.html', context)
-        
-        # Otherwise return JSON (for backwards compatibility)
-        status = {
-            'connected': True,
-            'last_sync_at': peloton_connection.last_sync_at.isoformat() if peloton_connection.last_sync_at else None,
-            'sync_in_progress': sync_in_progress,
-            'sync_cooldown_until': sync_cooldown_until.isoformat() if sync_cooldown_until else None,
-            'cooldown_remaining_minutes': cooldown_remaining_minutes,
-            'workout_count': Workout.objects.filter(user=request.user).count(),
-        }
-    except PelotonConnection.DoesNotExist:
-        # If HTMX request, return HTML partial
-        if request.headers.get('HX-Request'):
-            context = {
-                'peloton_connection': None,
-                'sync_in_progress': False,
-                'sync_cooldown_until': None,
-                'cooldown_remaining_minutes': None,
-                'can_sync': False,
-            }
-            return render(request, 'workouts/partials/sync_status.html', context)
-        
-        # Otherwise return JSON
-        status = {
+    """Return sync status (and background sync progress) for AJAX/HTMX polling"""
+    peloton_connection = PelotonConnection.objects.filter(user=request.user).first()
+    context = _sync_status_context(peloton_connection)
+
+    # If HTMX request, return HTML partial
+    if request.headers.get('HX-Request'):
+        return render(request, 'workouts/partials/sync_status.html', context)
+
+    # Otherwise return JSON (for backwards compatibility)
+    if peloton_connection is None:
+        return JsonResponse({
             'connected': False,
             'last_sync_at': None,
             'sync_in_progress': False,
             'sync_cooldown_until': None,
             'cooldown_remaining_minutes': None,
             'workout_count': 0,
-        }
-    
-    return JsonResponse(status)
+            'progress': None,
+        })
+
+    sync_cooldown_until = context['sync_cooldown_until']
+    return JsonResponse({
+        'connected': True,
+        'last_sync_at': peloton_connection.last_sync_at.isoformat() if peloton_connection.last_sync_at else None,
+        'sync_in_progress': context['sync_in_progress'],
+        'sync_cooldown_until': sync_cooldown_until.isoformat() if sync_cooldown_until else None,
+        'cooldown_remaining_minutes': context['cooldown_remaining_minutes'],
+        'workout_count': Workout.objects.filter(user=request.user).count(),
+        'progress': context['sync_progress'],
+    })